@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, Address, Notification, SuperSetting, UserPaymentMethod, Withdrawal, Agent
+from .models import User, Address, Notification, OtpSmsDispatch, PushNotificationOutbox, SuperSetting, PlatformBalanceShard, UserPaymentMethod, Withdrawal, Agent
 
 
 @admin.register(User)
@@ -31,6 +31,27 @@ class NotificationAdmin(admin.ModelAdmin):
     ordering = ['-created_at']
 
 
+@admin.register(PushNotificationOutbox)
+class PushNotificationOutboxAdmin(admin.ModelAdmin):
+    """Push notification outbox admin"""
+    list_display = ['user', 'title', 'notification_type', 'status', 'attempts', 'created_at', 'sent_at']
+    list_filter = ['status', 'notification_type', 'created_at']
+    search_fields = ['user__name', 'user__phone', 'title']
+    ordering = ['-created_at']
+    readonly_fields = ['message_id', 'last_error', 'sent_at', 'created_at', 'updated_at']
+
+
+@admin.register(OtpSmsDispatch)
+class OtpSmsDispatchAdmin(admin.ModelAdmin):
+    """OTP SMS dispatch admin"""
+    list_display = ['phone', 'country_code', 'status', 'message', 'created_at', 'updated_at']
+    list_filter = ['status', 'country_code', 'created_at']
+    search_fields = ['phone', 'request_id']
+    ordering = ['-created_at']
+    exclude = ['otp']
+    readonly_fields = ['request_id', 'phone', 'country_code', 'status', 'message', 'created_at', 'updated_at']
+
+
 @admin.register(SuperSetting)
 class SuperSettingAdmin(admin.ModelAdmin):
     """SuperSetting admin"""
@@ -49,6 +70,16 @@ class SuperSettingAdmin(admin.ModelAdmin):
         return False
 
 
+@admin.register(PlatformBalanceShard)
+class PlatformBalanceShardAdmin(admin.ModelAdmin):
+    """Platform balance shard admin (read-only; rolled up into SuperSetting)"""
+    list_display = ['shard', 'balance', 'updated_at']
+    readonly_fields = ['shard', 'balance', 'updated_at']
+    
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(UserPaymentMethod)
 class UserPaymentMethodAdmin(admin.ModelAdmin):
     """UserPaymentMethod admin"""
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+    
+    def ready(self):
+        import core.signals  # noqa
+        core.signals.connect_kpi_rollup_signals()
+        core.signals.connect_delta_sync_signals()
@@ -0,0 +1,97 @@
+"""
+Django management command to benchmark concurrent platform balance credits
+Compares the single locked SuperSetting row with the sharded platform balance
+under concurrent payout transactions. Each credit runs in its own transaction
+that is rolled back, so the benchmark leaves balances unchanged.
+
+Run against the production database engine (MySQL); SQLite serializes all
+writers and will not show the difference.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction as db_transaction
+from django.db.models import F
+from core.models import SuperSetting, PlatformBalanceShard
+from core.services.platform_balance import credit_platform
+
+AMOUNT = Decimal('0.01')
+
+
+def _credit_single():
+    super_setting = SuperSetting.objects.select_for_update().only('pk', 'balance').first()
+    SuperSetting.objects.filter(pk=super_setting.pk).update(balance=F('balance') + AMOUNT)
+
+
+def _credit_sharded():
+    credit_platform(AMOUNT)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark platform balance credits: single SuperSetting row vs sharded counter'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--credits',
+            type=int,
+            default=2000,
+            help='Number of credits per run (default: 2000)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=16,
+            help='Concurrent worker threads (default: 16)',
+        )
+        parser.add_argument(
+            '--hold-ms',
+            type=float,
+            default=5,
+            help='Milliseconds each transaction stays open after the credit, '
+                 'standing in for the rest of the payout work (default: 5)',
+        )
+
+    def handle(self, *args, **options):
+        if not SuperSetting.objects.exists():
+            SuperSetting.objects.create()
+        # Create shards up front so the run measures steady state
+        for shard in range(max(1, getattr(settings, 'PLATFORM_BALANCE_SHARDS', 16))):
+            PlatformBalanceShard.objects.get_or_create(shard=shard)
+        
+        total = max(1, options['credits'])
+        workers = max(1, options['workers'])
+        hold = max(0, options['hold_ms']) / 1000
+        
+        for label, credit in (('single', _credit_single), ('sharded', _credit_sharded)):
+            latencies = []
+            
+            def run_one(_):
+                started = time.perf_counter()
+                with db_transaction.atomic():
+                    credit()
+                    if hold:
+                        time.sleep(hold)
+                    db_transaction.set_rollback(True)
+                return time.perf_counter() - started
+            
+            def worker(count):
+                try:
+                    return [run_one(i) for i in range(count)]
+                finally:
+                    connection.close()
+            
+            per_worker = [total // workers + (1 if i < total % workers else 0) for i in range(workers)]
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for result in executor.map(worker, per_worker):
+                    latencies.extend(result)
+            elapsed = time.perf_counter() - started
+            
+            latencies.sort()
+            p50 = latencies[len(latencies) // 2] * 1000
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+            self.stdout.write(self.style.SUCCESS(
+                f"{label:8s} {total / elapsed:10.0f} credits/s  p50 {p50:7.1f} ms  p99 {p99:7.1f} ms"
+            ))
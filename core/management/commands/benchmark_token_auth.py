@@ -0,0 +1,56 @@
+"""
+Django management command to benchmark API token authentication
+Compares CsrfExemptTokenAuthentication with and without the token cache
+(AUTH_TOKEN_CACHE_TTL) over a set of existing tokens.
+"""
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test import RequestFactory, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from ecommerce_backend.authentication import CsrfExemptTokenAuthentication
+
+
+class Command(BaseCommand):
+    help = 'Benchmark token authentication with and without the token cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=5000,
+            help='Number of authentications per run (default: 5000)',
+        )
+        parser.add_argument(
+            '--tokens',
+            type=int,
+            default=50,
+            help='Number of distinct tokens to cycle through (default: 50)',
+        )
+
+    def handle(self, *args, **options):
+        keys = list(Token.objects.values_list('key', flat=True)[:options['tokens']])
+        if not keys:
+            raise CommandError('No auth tokens found; log in at least one user first')
+        
+        factory = RequestFactory()
+        requests = [
+            Request(factory.get('/api/auth/profile/', HTTP_AUTHORIZATION=f'Token {key}'))
+            for key in keys
+        ]
+        total = max(1, options['requests'])
+        
+        for label, ttl in (('uncached', 0), ('cached', 60)):
+            with override_settings(AUTH_TOKEN_CACHE_TTL=ttl, DEBUG=True):
+                authenticator = CsrfExemptTokenAuthentication()
+                reset_queries()
+                started = time.perf_counter()
+                for index in range(total):
+                    authenticator.authenticate(requests[index % len(requests)])
+                elapsed = time.perf_counter() - started
+                queries = len(connection.queries)
+            self.stdout.write(self.style.SUCCESS(
+                f"{label:9s} {total / elapsed:10.0f} auth/s  "
+                f"{elapsed / total * 1e6:8.1f} us/auth  {queries / total:.2f} queries/auth"
+            ))
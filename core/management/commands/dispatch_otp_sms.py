@@ -0,0 +1,36 @@
+"""
+Django management command to retry OTP SMS lost by their worker
+Run this every minute via cron (or with --loop) so a send queued just before a
+restart is still delivered while its OTP is valid.
+"""
+import time
+from django.core.management.base import BaseCommand
+from core.services.otp_dispatch import redeliver_orphaned
+
+
+class Command(BaseCommand):
+    help = 'Send queued OTP SMS that no worker picked up and fail the expired ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and check every --interval seconds',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=15,
+            help='Seconds between checks in --loop mode (default: 15)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            result = redeliver_orphaned()
+            if any(result.values()) or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Sent {result['sent']}, failed {result['failed']}, expired {result['expired']}"
+                ))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,56 @@
+"""
+Django management command to send queued push notifications
+Run this periodically (e.g., every minute via cron) or with --loop as a worker
+
+Notifications are queued in PushNotificationOutbox and sent in batches of up
+to 500 through a single FCM send_each call per batch.
+"""
+import time
+from django.core.management.base import BaseCommand
+from core.services.fcm_service import FCMService
+
+
+class Command(BaseCommand):
+    help = 'Send pending push notifications from the outbox through FCM'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Notifications per FCM send_each call (max 500, default: 500)',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and poll the outbox every --interval seconds',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Seconds between polls in --loop mode (default: 5)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = min(max(1, options['batch_size']), 500)
+        
+        while True:
+            released = FCMService.release_stale_outbox()
+            if released:
+                self.stdout.write(self.style.WARNING(f'Re-queued {released} notifications stuck in processing'))
+            
+            started = time.monotonic()
+            totals = FCMService.drain_outbox(batch_size=batch_size)
+            elapsed = time.monotonic() - started
+            
+            if totals['claimed'] or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Sent {totals['sent']}, retrying {totals['retried']}, failed {totals['failed']}, "
+                    f"skipped {totals['skipped']}, pruned {totals['pruned_tokens']} tokens "
+                    f"in {elapsed:.2f}s"
+                ))
+            
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
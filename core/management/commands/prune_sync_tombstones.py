@@ -0,0 +1,20 @@
+"""
+Django management command to delete old delta-sync tombstones
+Clients whose cursor is older than SYNC_TOMBSTONE_RETENTION_DAYS get
+410 Gone from the sync endpoints and resync from scratch, so tombstones
+past that age are never read.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.services.delta_sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Delete delta-sync tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS'
+
+    def handle(self, *args, **options):
+        days = getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 30)
+        deleted = prune_tombstones(timezone.now() - timedelta(days=days))
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} sync tombstones older than {days} days'))
@@ -0,0 +1,27 @@
+"""
+Django management command to delete expired OTP rows
+Expired Otp rows only exist with OTP_BACKEND = 'database' or
+OTP_AUDIT_TO_DATABASE = True; OTP SMS dispatch records are kept the same time.
+"""
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.models import Otp, OtpSmsDispatch
+
+
+class Command(BaseCommand):
+    help = 'Delete OTP rows that expired (and OTP SMS records created) more than --older-than-hours ago'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-hours',
+            type=float,
+            default=24,
+            help='Keep expired OTPs this long for auditing (default: 24)',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['older_than_hours'])
+        deleted, _ = Otp.objects.filter(expires_at__lt=cutoff).delete()
+        dispatches, _ = OtpSmsDispatch.objects.filter(created_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired OTPs and {dispatches} OTP SMS records'))
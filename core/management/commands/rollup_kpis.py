@@ -0,0 +1,43 @@
+"""
+Django management command to maintain the KPI daily rollups
+Run this periodically (e.g., hourly via cron); each run rolls up the days
+since the last run plus any days marked dirty by later changes. Today is
+always read live by the dashboards.
+"""
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from core.services.kpi_rollup import rollup_kpis, get_earliest_date
+
+
+class Command(BaseCommand):
+    help = 'Roll up dashboard KPIs into daily summary rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            type=str,
+            help='Recompute from this date (YYYY-MM-DD) instead of the last rolled-up day',
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recompute every day from the earliest data',
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['rebuild']:
+            since = get_earliest_date()
+        elif options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError('--since must be a date in YYYY-MM-DD format')
+        
+        days = rollup_kpis(since=since)
+        if days:
+            self.stdout.write(self.style.SUCCESS(
+                f'Rolled up {len(days)} day(s) from {days[0]} to {days[-1]}'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('KPI rollups are up to date'))
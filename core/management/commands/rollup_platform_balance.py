@@ -0,0 +1,40 @@
+"""
+Django management command to fold platform balance shards into SuperSetting
+Run this periodically (e.g., every few minutes via cron) or with --loop as a worker
+
+Platform commission credits are spread over PlatformBalanceShard rows so that
+payouts don't all lock the SuperSetting row; the platform balance is always
+SuperSetting.balance plus the shards, so rolling up only tidies the total.
+"""
+import time
+from django.core.management.base import BaseCommand
+from core.services.platform_balance import rollup_platform_balance, get_platform_balance
+
+
+class Command(BaseCommand):
+    help = 'Roll up sharded platform balance credits into SuperSetting.balance'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and roll up every --interval seconds',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=60,
+            help='Seconds between roll-ups in --loop mode (default: 60)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            rolled_up = rollup_platform_balance()
+            if rolled_up or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Rolled up ₹{rolled_up}; platform balance is ₹{get_platform_balance()}'
+                ))
+            
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
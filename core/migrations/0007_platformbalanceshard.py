@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_pushnotificationoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformBalanceShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField(unique=True)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, help_text='Credits not yet rolled up into SuperSetting.balance', max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Platform Balance Shard',
+                'verbose_name_plural': 'Platform Balance Shards',
+                'ordering': ['shard'],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_platformbalanceshard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KpiDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('metric', models.CharField(max_length=50)),
+                ('dimension', models.CharField(blank=True, default='', max_length=50)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'KPI Daily Rollup',
+                'verbose_name_plural': 'KPI Daily Rollups',
+                'ordering': ['-date', 'metric', 'dimension'],
+                'indexes': [models.Index(fields=['metric', 'date'], name='core_kpidai_metric_7261d2_idx')],
+                'constraints': [models.UniqueConstraint(fields=('metric', 'dimension', 'date'), name='unique_kpi_daily_rollup')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_kpidailyrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stream', models.CharField(help_text='Sync stream the deleted row belonged to', max_length=50)),
+                ('scope_id', models.BigIntegerField(help_text='Id of the user/driver whose stream contained the row')),
+                ('object_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['deleted_at', 'id'],
+                'indexes': [models.Index(fields=['stream', 'scope_id', 'deleted_at', 'id'], name='core_syncto_stream_73649b_idx'), models.Index(fields=['deleted_at'], name='core_syncto_deleted_380427_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_synctombstone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OtpSmsDispatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('request_id', models.CharField(max_length=32, unique=True)),
+                ('phone', models.CharField(max_length=15)),
+                ('country_code', models.CharField(choices=[('+977', '+977'), ('+91', '+91')], max_length=5)),
+                ('otp', models.CharField(blank=True, help_text='Cleared once the SMS is sent or has failed', max_length=6)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('message', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'OTP SMS Dispatch',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='core_otpsms_status_e06cf9_idx'), models.Index(fields=['created_at'], name='core_otpsms_created_7ff6e7_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_otpsmsdispatch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='otp',
+            name='failed_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_otp_failed_attempts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='otpsmsdispatch',
+            name='ip_address',
+            field=models.GenericIPAddressField(blank=True, help_text='Requesting client IP (rate limiting)', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='otpsmsdispatch',
+            index=models.Index(fields=['phone', 'created_at'], name='core_otpsms_phone_402f83_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='otpsmsdispatch',
+            index=models.Index(fields=['ip_address', 'created_at'], name='core_otpsms_ip_addr_4e0184_idx'),
+        ),
+    ]
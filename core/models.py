@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
 
 
 class UserManager(BaseUserManager):
@@ -124,7 +125,16 @@ class User(AbstractUser):
                 'is_merchant': 'User cannot be both merchant and driver at the same time',
                 'is_driver': 'User cannot be both merchant and driver at the same time'
             })
-    
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        """Load all deferred fields together (API auth hands out users with only a cached snapshot loaded)"""
+        if fields is not None:
+            fields = set(fields)
+            deferred_fields = self.get_deferred_fields()
+            if fields.intersection(deferred_fields):
+                fields = fields.union(deferred_fields)
+        super().refresh_from_db(using, fields, **kwargs)
+
     def save(self, *args, **kwargs):
         # Set username to phone number before validation
         if self.phone:
@@ -206,6 +216,7 @@ class Otp(models.Model):
     otp = models.CharField(max_length=6)
     country_code = models.CharField(max_length=5, choices=User.COUNTRY_CODE_CHOICES)
     expires_at = models.DateTimeField()
+    failed_attempts = models.PositiveSmallIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     
     def is_expired(self):
@@ -223,6 +234,39 @@ class Otp(models.Model):
         ]
 
 
+class OtpSmsDispatch(models.Model):
+    """Queued OTP SMS and its delivery state (see core.services.otp_dispatch)"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    request_id = models.CharField(max_length=32, unique=True)
+    phone = models.CharField(max_length=15)
+    country_code = models.CharField(max_length=5, choices=User.COUNTRY_CODE_CHOICES)
+    otp = models.CharField(max_length=6, blank=True, help_text='Cleared once the SMS is sent or has failed')
+    ip_address = models.GenericIPAddressField(null=True, blank=True, help_text='Requesting client IP (rate limiting)')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    message = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"OTP SMS to {self.phone} ({self.get_status_display()})"
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'OTP SMS Dispatch'
+        indexes = [
+            models.Index(fields=['status', 'updated_at']),
+            models.Index(fields=['created_at']),
+            models.Index(fields=['phone', 'created_at']),
+            models.Index(fields=['ip_address', 'created_at']),
+        ]
+
+
 class Notification(models.Model):
     """User notification model"""
     NOTIFICATION_TYPES = [
@@ -246,6 +290,48 @@ class Notification(models.Model):
         ordering = ['-created_at']
 
 
+class PushNotificationOutbox(models.Model):
+    """Pending FCM push notification, written with the triggering change and sent by the dispatcher"""
+    NOTIFICATION_TYPES = [
+        ('new_order', 'New Order'),
+        ('general', 'General'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+        ('skipped', 'Skipped'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='push_notifications')
+    notification_type = models.CharField(max_length=20, choices=NOTIFICATION_TYPES, default='general')
+    title = models.CharField(max_length=200)
+    body = models.TextField(blank=True)
+    data = models.JSONField(default=dict, blank=True, help_text='FCM data payload (values are sent as strings)')
+    related_order = models.ForeignKey('ecommerce.Order', on_delete=models.SET_NULL, null=True, blank=True, related_name='push_notifications')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    message_id = models.CharField(max_length=255, blank=True, null=True, help_text='FCM message ID once sent')
+    available_at = models.DateTimeField(default=timezone.now, help_text='Not dispatched before this time (retry backoff)')
+    sent_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.name} - {self.title} ({self.get_status_display()})"
+
+    class Meta:
+        ordering = ['created_at']
+        verbose_name = 'Push Notification'
+        verbose_name_plural = 'Push Notification Outbox'
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
+
+
 class SuperSetting(models.Model):
     """Super Setting model for platform-wide configuration"""
     sales_commission = models.DecimalField(max_digits=5, decimal_places=2, default=0,
@@ -285,6 +371,64 @@ class SuperSetting(models.Model):
         return "Super Setting"
 
 
+class KpiDailyRollup(models.Model):
+    """Per-day count/amount of a dashboard metric, split by one dimension (status, committee, user, ...)"""
+    date = models.DateField()
+    metric = models.CharField(max_length=50)
+    dimension = models.CharField(max_length=50, blank=True, default='')
+    count = models.PositiveIntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.metric}[{self.dimension}] {self.date}: {self.count} / {self.amount}"
+
+    class Meta:
+        ordering = ['-date', 'metric', 'dimension']
+        verbose_name = 'KPI Daily Rollup'
+        verbose_name_plural = 'KPI Daily Rollups'
+        constraints = [
+            models.UniqueConstraint(fields=['metric', 'dimension', 'date'], name='unique_kpi_daily_rollup'),
+        ]
+        indexes = [
+            models.Index(fields=['metric', 'date']),
+        ]
+
+
+class PlatformBalanceShard(models.Model):
+    """Unrolled platform balance credits, spread over shard rows so payouts don't serialize on SuperSetting"""
+    shard = models.PositiveSmallIntegerField(unique=True)
+    balance = models.DecimalField(max_digits=12, decimal_places=2, default=0,
+                                  help_text='Credits not yet rolled up into SuperSetting.balance')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Platform balance shard {self.shard}"
+
+    class Meta:
+        ordering = ['shard']
+        verbose_name = 'Platform Balance Shard'
+        verbose_name_plural = 'Platform Balance Shards'
+
+
+class SyncTombstone(models.Model):
+    """Deleted row reported to delta-sync clients (see core.services.delta_sync)"""
+    stream = models.CharField(max_length=50, help_text='Sync stream the deleted row belonged to')
+    scope_id = models.BigIntegerField(help_text='Id of the user/driver whose stream contained the row')
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.stream}[{self.scope_id}] #{self.object_id} deleted {self.deleted_at}"
+
+    class Meta:
+        ordering = ['deleted_at', 'id']
+        indexes = [
+            models.Index(fields=['stream', 'scope_id', 'deleted_at', 'id']),
+            models.Index(fields=['deleted_at']),
+        ]
+
+
 class UserPaymentMethod(models.Model):
     """User payment method model - renamed from MerchantPaymentSetting to support all users"""
     PAYMENT_METHOD_TYPE_CHOICES = [
@@ -0,0 +1,195 @@
+"""
+Delta sync
+Apps poll a list endpoint with the opaque `since` cursor from their previous
+response and get back only the rows changed since then (ordered by
+updated_at, id) plus the ids deleted since then (SyncTombstone rows written
+on delete).
+
+Rows committed out of order by concurrent transactions can carry an
+updated_at slightly older than rows already returned, so only rows (and
+tombstones) up to now - SYNC_CURSOR_LAG_SECONDS are returned and the cursor
+never moves past that horizon. Changes at the horizon may be sent twice;
+clients upsert by id.
+
+Rows that only leave a stream (e.g. a store deactivated) are not tombstoned;
+they stop appearing in the stream and are dropped on the next full refresh.
+"""
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from core.models import SyncTombstone
+from core.utils.cursors import encode_cursor, decode_cursor
+
+
+class SyncCursorExpired(Exception):
+    """The cursor is older than the tombstone retention window; the client must resync from scratch"""
+
+
+class SyncStream:
+    """Rows of one model that belong to a scope (a user, a driver, ...)"""
+
+    def __init__(self, name, model, scope_of):
+        self.name = name
+        self.model = model
+        # Scope ids whose stream contained the instance, for tombstones
+        self.scope_of = scope_of
+
+
+def _merchant_scope(order):
+    if not order.merchant_id:
+        return []
+    from ecommerce.models import Store
+    owner_id = Store.objects.filter(pk=order.merchant_id).values_list('owner_id', flat=True).first()
+    return [owner_id] if owner_id else []
+
+
+def _driver_scope(booking):
+    if not booking.vehicle_id:
+        return []
+    from taxi.models import Vehicle
+    driver_id = Vehicle.objects.filter(pk=booking.vehicle_id).values_list('driver_id', flat=True).first()
+    return [driver_id] if driver_id else []
+
+
+def _build_streams():
+    from ecommerce.models import Order
+    from taxi.models import TaxiBooking
+    return {stream.name: stream for stream in [
+        SyncStream('orders.customer', Order, lambda order: [order.user_id]),
+        SyncStream('orders.merchant', Order, _merchant_scope),
+        SyncStream('taxi.bookings.driver', TaxiBooking, _driver_scope),
+    ]}
+
+
+_streams = None
+
+
+def get_streams():
+    global _streams
+    if _streams is None:
+        _streams = _build_streams()
+    return _streams
+
+
+def record_tombstones(sender, instance):
+    """Remember a deleted row's id for every stream it was in (wired up in core.signals)"""
+    tombstones = []
+    for stream in get_streams().values():
+        if stream.model is not sender:
+            continue
+        for scope_id in stream.scope_of(instance):
+            tombstones.append(SyncTombstone(stream=stream.name, scope_id=scope_id, object_id=instance.pk))
+    if tombstones:
+        SyncTombstone.objects.bulk_create(tombstones)
+
+
+def _parse_position(values):
+    moment = datetime.fromisoformat(values[0])
+    if timezone.is_naive(moment):
+        raise ValueError('Cursor datetimes are timezone-aware')
+    return moment, int(values[1])
+
+
+def _after(position, date_field):
+    moment, pk = position
+    return Q(**{f'{date_field}__gt': moment}) | Q(**{date_field: moment, 'pk__gt': pk})
+
+
+def delta_sync(queryset, stream_name, scope_id, since=None, limit=None):
+    """
+    Rows of queryset changed after the cursor, and ids deleted from the stream
+
+    Args:
+        queryset: The stream's rows for this scope (the same filter as the list endpoint)
+        stream_name: Tombstone stream name (see get_streams)
+        scope_id: Tombstone scope, e.g. the requesting user's id
+        since: Cursor from a previous call; None returns every row
+        limit: Maximum rows (and tombstones) per call, defaults to SYNC_PAGE_SIZE
+
+    Returns:
+        dict: {'changed': [instances], 'deleted': [ids], 'since': cursor, 'has_more': bool}
+
+    Raises:
+        ValueError: malformed cursor
+        SyncCursorExpired: tombstones the client would need have been pruned
+    """
+    limit = limit or getattr(settings, 'SYNC_PAGE_SIZE', 100)
+    now = timezone.now()
+    horizon = now - timedelta(seconds=getattr(settings, 'SYNC_CURSOR_LAG_SECONDS', 5))
+
+    changed_position = deleted_position = None
+    if since:
+        values = decode_cursor(since, 4)
+        if values is None:
+            raise ValueError('Invalid cursor')
+        try:
+            changed_position = _parse_position(values[:2])
+            deleted_position = _parse_position(values[2:])
+        except (TypeError, ValueError):
+            raise ValueError('Invalid cursor')
+        retention = timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 30))
+        if deleted_position[0] < now - retention:
+            raise SyncCursorExpired()
+
+    rows = queryset.filter(updated_at__lte=horizon).order_by('updated_at', 'pk')
+    if changed_position:
+        rows = rows.filter(_after(changed_position, 'updated_at'))
+    changed = list(rows[:limit + 1])
+
+    deleted = []
+    if deleted_position:
+        tombstones = SyncTombstone.objects.filter(
+            stream=stream_name, scope_id=scope_id, deleted_at__lte=horizon
+        ).filter(_after(deleted_position, 'deleted_at')).order_by('deleted_at', 'pk')
+        deleted = list(tombstones.values_list('deleted_at', 'pk', 'object_id')[:limit + 1])
+
+    has_more = len(changed) > limit or len(deleted) > limit
+    changed, deleted = changed[:limit], deleted[:limit]
+
+    # Caught-up positions move to the horizon; a first sync starts the tombstone
+    # stream there too, since nothing deleted earlier is on the client
+    next_changed, next_deleted = changed_position, deleted_position
+    if len(changed) == limit:
+        next_changed = (changed[-1].updated_at, changed[-1].pk)
+    elif changed_position is None or changed_position[0] < horizon:
+        next_changed = (horizon, 0)
+    if len(deleted) == limit:
+        next_deleted = (deleted[-1][0], deleted[-1][1])
+    elif deleted_position is None or deleted_position[0] < horizon:
+        next_deleted = (horizon, 0)
+
+    return {
+        'changed': changed,
+        'deleted': [object_id for _, _, object_id in deleted],
+        'since': encode_cursor(*next_changed, *next_deleted),
+        'has_more': has_more,
+    }
+
+
+def prune_tombstones(older_than):
+    """Delete tombstones older than the given datetime; returns the number deleted"""
+    deleted, _ = SyncTombstone.objects.filter(deleted_at__lt=older_than).delete()
+    return deleted
+
+
+def delta_sync_response(request, queryset, stream_name, scope_id, serializer_class):
+    """API response for a ?since= sync request against one stream"""
+    try:
+        sync = delta_sync(queryset, stream_name, scope_id, request.query_params.get('since'))
+    except ValueError:
+        return Response({'error': 'Invalid since cursor'}, status=status.HTTP_400_BAD_REQUEST)
+    except SyncCursorExpired:
+        return Response({
+            'error': 'Sync cursor expired. Fetch the full list and sync again without since.'
+        }, status=status.HTTP_410_GONE)
+
+    serializer = serializer_class(sync['changed'], many=True, context={'request': request})
+    return Response({
+        'results': serializer.data,
+        'deleted': sync['deleted'],
+        'since': sync['since'],
+        'has_more': sync['has_more'],
+    })
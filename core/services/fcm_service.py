@@ -4,8 +4,13 @@ Handles sending push notifications to merchant devices
 """
 import json
 import logging
+import threading
+from datetime import timedelta
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
@@ -86,51 +91,8 @@ class FCMService:
             return False
         
         try:
-            # Get customer name
-            customer_name = order.user.name if order.user else "Customer"
-            
-            # Prepare notification data
-            notification_data = {
-                'type': 'new_order',
-                'order_id': str(order.id),
-                'order_number': order.order_number,
-                'total_amount': str(order.total_amount),
-                'customer_name': customer_name,
-                'priority': 'high',
-                'sound': 'order_alarm',
-            }
-            
-            # Create Android-specific notification config
-            android_config = messaging.AndroidConfig(
-                priority='high',
-                notification=messaging.AndroidNotification(
-                    sound='order_alarm',
-                    channel_id='order_alerts',
-                    priority='max',
-                ),
-            )
-            
-            # Create the message
-            message = messaging.Message(
-                token=merchant_user.fcm_token,
-                notification=messaging.Notification(
-                    title='New Order Received!',
-                    body=f'Order #{order.order_number} - ₹{order.total_amount}',
-                ),
-                data={
-                    k: str(v) for k, v in notification_data.items()
-                },
-                android=android_config,
-                apns=messaging.APNSConfig(
-                    payload=messaging.APNSPayload(
-                        aps=messaging.Aps(
-                            sound='order_alarm.caf',
-                            badge=1,
-                            content_available=True,
-                        )
-                    )
-                ),
-            )
+            title, body, data = cls._order_notification_payload(order)
+            message = cls._build_message(merchant_user.fcm_token, 'new_order', title, body, data)
             
             # Send the message
             response = messaging.send(message)
@@ -147,6 +109,252 @@ class FCMService:
             logger.error(f"Failed to send notification to merchant {merchant_user.id}: {str(e)}")
             return False
     
+    @staticmethod
+    def _order_notification_payload(order):
+        """Title, body and data payload for a new-order notification"""
+        customer_name = order.user.name if order.user else "Customer"
+        data = {
+            'type': 'new_order',
+            'order_id': str(order.id),
+            'order_number': order.order_number,
+            'total_amount': str(order.total_amount),
+            'customer_name': customer_name,
+            'priority': 'high',
+            'sound': 'order_alarm',
+        }
+        return 'New Order Received!', f'Order #{order.order_number} - ₹{order.total_amount}', data
+    
+    @staticmethod
+    def _build_message(token, notification_type, title, body, data):
+        """Build an FCM message; new-order alerts are high priority with the order alarm sound"""
+        kwargs = {}
+        if notification_type == 'new_order':
+            # Create Android-specific notification config
+            kwargs['android'] = messaging.AndroidConfig(
+                priority='high',
+                notification=messaging.AndroidNotification(
+                    sound='order_alarm',
+                    channel_id='order_alerts',
+                    priority='max',
+                ),
+            )
+            kwargs['apns'] = messaging.APNSConfig(
+                payload=messaging.APNSPayload(
+                    aps=messaging.Aps(
+                        sound='order_alarm.caf',
+                        badge=1,
+                        content_available=True,
+                    )
+                )
+            )
+        return messaging.Message(
+            token=token,
+            notification=messaging.Notification(title=title, body=body),
+            data={k: str(v) for k, v in (data or {}).items()},
+            **kwargs
+        )
+    
+    @classmethod
+    def queue_order_notification(cls, merchant_user, order):
+        """
+        Queue a new-order push notification for the merchant in the outbox
+        
+        The row is written in the caller's transaction; delivery happens in
+        dispatch_outbox (dispatch_push_notifications command, or a background
+        drain scheduled on commit), so order creation never waits on Firebase.
+        
+        Args:
+            merchant_user: User object (merchant/store owner)
+            order: Order object
+            
+        Returns:
+            PushNotificationOutbox entry, or None if the merchant has no FCM token
+        """
+        from core.models import PushNotificationOutbox
+        
+        if not merchant_user.fcm_token:
+            logger.warning(f"Merchant {merchant_user.id} does not have FCM token. Notification not queued.")
+            return None
+        
+        title, body, data = cls._order_notification_payload(order)
+        entry = PushNotificationOutbox.objects.create(
+            user=merchant_user,
+            notification_type='new_order',
+            title=title,
+            body=body,
+            data=data,
+            related_order=order,
+        )
+        if getattr(settings, 'FCM_OUTBOX_DISPATCH_ON_COMMIT', True):
+            transaction.on_commit(cls.dispatch_outbox_async)
+        return entry
+    
+    @classmethod
+    def _claim_outbox_batch(cls, batch_size):
+        """Lock and mark a batch of due outbox rows as processing"""
+        from core.models import PushNotificationOutbox
+        
+        now = timezone.now()
+        with transaction.atomic():
+            entries = list(
+                PushNotificationOutbox.objects.select_for_update(skip_locked=True).filter(
+                    status='pending', available_at__lte=now
+                ).order_by('available_at', 'id')[:batch_size]
+            )
+            if entries:
+                PushNotificationOutbox.objects.filter(
+                    pk__in=[entry.pk for entry in entries]
+                ).update(status='processing', updated_at=now)
+        if not entries:
+            return []
+        # Re-read with the user so the current FCM token is used
+        return list(PushNotificationOutbox.objects.select_related('user').filter(pk__in=[entry.pk for entry in entries]))
+    
+    @classmethod
+    def dispatch_outbox(cls, batch_size=500, max_attempts=None):
+        """
+        Send one batch of pending outbox notifications with a single send_each call
+        
+        Notifications rejected as unregistered/invalid are marked failed and the
+        token is cleared from every user holding it. Other failures are retried
+        with exponential backoff up to FCM_OUTBOX_MAX_ATTEMPTS.
+        
+        Args:
+            batch_size: Maximum notifications per batch (FCM allows up to 500 per send_each)
+            max_attempts: Attempts before a notification is marked failed
+            
+        Returns:
+            dict: Counts of 'claimed', 'sent', 'failed', 'retried', 'skipped' and 'pruned_tokens'
+        """
+        from core.models import PushNotificationOutbox, User
+        
+        result = {'claimed': 0, 'sent': 0, 'failed': 0, 'retried': 0, 'skipped': 0, 'pruned_tokens': 0}
+        if not FIREBASE_AVAILABLE:
+            logger.warning("Firebase Admin SDK not available. Cannot dispatch notifications.")
+            return result
+        if not cls._initialized and not cls.initialize():
+            return result
+        
+        max_attempts = max_attempts or getattr(settings, 'FCM_OUTBOX_MAX_ATTEMPTS', 5)
+        entries = cls._claim_outbox_batch(min(max(1, batch_size), 500))
+        result['claimed'] = len(entries)
+        if not entries:
+            return result
+        
+        now = timezone.now()
+        sendable = []
+        for entry in entries:
+            if entry.user.fcm_token:
+                sendable.append(entry)
+            else:
+                entry.status = 'skipped'
+                entry.last_error = 'User has no FCM token'
+                result['skipped'] += 1
+        
+        invalid_tokens = set()
+        if sendable:
+            messages = [
+                cls._build_message(entry.user.fcm_token, entry.notification_type, entry.title, entry.body, entry.data)
+                for entry in sendable
+            ]
+            batch_error = ''
+            try:
+                responses = messaging.send_each(messages).responses
+            except Exception as e:
+                logger.error(f"FCM send_each failed for {len(messages)} notifications: {str(e)}")
+                responses = [None] * len(messages)
+                batch_error = str(e)
+            
+            for entry, response in zip(sendable, responses):
+                entry.attempts += 1
+                if response is not None and response.success:
+                    entry.status = 'sent'
+                    entry.message_id = response.message_id
+                    entry.sent_at = now
+                    entry.last_error = ''
+                    result['sent'] += 1
+                    continue
+                
+                error = response.exception if response is not None else None
+                entry.last_error = str(error) if error is not None else batch_error
+                if isinstance(error, (messaging.UnregisteredError, messaging.SenderIdMismatchError)):
+                    invalid_tokens.add(entry.user.fcm_token)
+                    entry.status = 'failed'
+                    result['failed'] += 1
+                elif entry.attempts >= max_attempts:
+                    entry.status = 'failed'
+                    result['failed'] += 1
+                else:
+                    entry.status = 'pending'
+                    entry.available_at = now + timedelta(seconds=30 * 2 ** (entry.attempts - 1))
+                    result['retried'] += 1
+        
+        for entry in entries:
+            entry.updated_at = now
+        PushNotificationOutbox.objects.bulk_update(
+            entries,
+            ['status', 'attempts', 'last_error', 'message_id', 'sent_at', 'available_at', 'updated_at'],
+            batch_size=500
+        )
+        
+        if invalid_tokens:
+            result['pruned_tokens'] = User.objects.filter(fcm_token__in=invalid_tokens).update(fcm_token=None)
+            logger.warning(f"Cleared {result['pruned_tokens']} unregistered FCM tokens")
+        
+        logger.info(
+            f"Dispatched push outbox batch: {result['sent']} sent, {result['retried']} retried, "
+            f"{result['failed']} failed, {result['skipped']} skipped"
+        )
+        return result
+    
+    @classmethod
+    def drain_outbox(cls, batch_size=500, max_batches=None):
+        """Dispatch batches until no due notifications remain (or max_batches is reached)"""
+        totals = {'claimed': 0, 'sent': 0, 'failed': 0, 'retried': 0, 'skipped': 0, 'pruned_tokens': 0}
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            result = cls.dispatch_outbox(batch_size=batch_size)
+            batches += 1
+            for key in totals:
+                totals[key] += result[key]
+            if result['claimed'] < batch_size:
+                break
+        return totals
+    
+    @classmethod
+    def release_stale_outbox(cls, older_than_minutes=10):
+        """Return rows stuck in 'processing' (e.g. a crashed dispatcher) to the queue"""
+        from core.models import PushNotificationOutbox
+        
+        cutoff = timezone.now() - timedelta(minutes=older_than_minutes)
+        return PushNotificationOutbox.objects.filter(
+            status='processing', updated_at__lt=cutoff
+        ).update(status='pending', updated_at=timezone.now())
+    
+    @classmethod
+    def dispatch_outbox_async(cls):
+        """
+        Drain the outbox in a background thread
+        
+        A short cache lock keeps concurrent checkouts from each starting a
+        drain; rows queued meanwhile are picked up by the next drain or the
+        dispatch_push_notifications command.
+        """
+        if not cache.add('fcm_outbox_dispatch_lock', True, 30):
+            return False
+        
+        def _worker():
+            try:
+                cls.drain_outbox(max_batches=10)
+            except Exception as e:
+                logger.error(f"Background push outbox dispatch failed: {str(e)}")
+            finally:
+                cache.delete('fcm_outbox_dispatch_lock')
+                connection.close()
+        
+        threading.Thread(target=_worker, daemon=True).start()
+        return True
+    
     @classmethod
     def send_multicast_notification(cls, fcm_tokens, notification_data, android_config=None):
         """
@@ -184,7 +392,7 @@ class FCMService:
                 android=android_config,
             )
             
-            response = messaging.send_multicast(message)
+            response = messaging.send_each_for_multicast(message)
             logger.info(f"Sent multicast notification. Success: {response.success_count}, Failure: {response.failure_count}")
             
             return {
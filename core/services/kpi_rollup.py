@@ -0,0 +1,314 @@
+"""
+KPI rollups
+Dashboard metrics (new users, orders by status, taxi and travel bookings,
+travel revenue per user) are summarised per day into KpiDailyRollup by
+`manage.py rollup_kpis`. Readers combine the rolled-up days with a live
+query for the days after the rollup watermark (normally just today), using
+half-open datetime ranges so the created_at indexes are usable.
+
+Saving or deleting a row created on an already rolled-up day marks that day
+dirty; the next rollup run recomputes it.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.db import transaction as db_transaction
+from django.db.models import Count, Sum, Min, Max, Q
+from django.utils import timezone
+from core.models import User, Transaction, KpiDailyRollup
+from ecommerce.models import Order as EcommerceOrder
+from taxi.models import TaxiBooking
+from travel.models import TravelBooking
+
+# Marker rows kept alongside the metrics
+COMPLETE = 'rollup.complete'
+DIRTY = 'rollup.dirty'
+
+
+class KpiMetric:
+    """A dashboard metric: rows of a queryset counted (and optionally summed) per day and dimension"""
+
+    def __init__(self, name, queryset, date_field='created_at', dimension=None, amount=None):
+        self.name = name
+        self._queryset = queryset
+        self.date_field = date_field
+        self.dimension = dimension
+        self.amount = amount
+
+    def queryset(self):
+        return self._queryset()
+
+    def aggregate(self, start=None, end=None, dimensions=None):
+        """
+        Live count/amount per dimension for created datetimes in [start, end)
+
+        Returns:
+            dict: {dimension: {'count': int, 'amount': Decimal}}
+        """
+        queryset = self.queryset()
+        if start is not None:
+            queryset = queryset.filter(**{f'{self.date_field}__gte': start})
+        if end is not None:
+            queryset = queryset.filter(**{f'{self.date_field}__lt': end})
+        if dimensions is not None and self.dimension:
+            queryset = queryset.filter(**{f'{self.dimension}__in': list(dimensions)})
+
+        annotations = {'count': Count('pk')}
+        if self.amount:
+            annotations['amount'] = Sum(self.amount)
+        if self.dimension:
+            rows = queryset.values(self.dimension).annotate(**annotations).order_by()
+        else:
+            rows = [queryset.aggregate(**annotations)]
+
+        totals = {}
+        for row in rows:
+            if not row['count']:
+                continue
+            key = _dimension_key(row.get(self.dimension)) if self.dimension else ''
+            totals[key] = {
+                'count': row['count'],
+                'amount': Decimal(str(row.get('amount') or 0)),
+            }
+        return totals
+
+
+def _dimension_key(value):
+    return '' if value is None else str(value)
+
+
+METRICS = {metric.name: metric for metric in [
+    KpiMetric('users.new', lambda: User.objects.all()),
+    KpiMetric('orders', lambda: EcommerceOrder.objects.all(), dimension='status', amount='total_amount'),
+    KpiMetric('taxi.bookings', lambda: TaxiBooking.objects.all(), dimension='trip_status', amount='price'),
+    KpiMetric('travel.bookings.committee', lambda: TravelBooking.objects.all(), dimension='vehicle__committee_id'),
+    KpiMetric('travel.bookings.dealer', lambda: TravelBooking.objects.filter(agent__dealer__isnull=False),
+              dimension='agent__dealer_id'),
+    KpiMetric('travel.bookings.agent', lambda: TravelBooking.objects.filter(agent__isnull=False), dimension='agent_id'),
+    KpiMetric('travel.revenue', lambda: Transaction.objects.filter(
+        transaction_type='travel_booking_revenue', status='completed', user__isnull=False
+    ), dimension='user_id', amount='amount'),
+]}
+
+# Models whose changes can alter an already rolled-up day
+TRACKED_MODELS = (User, EcommerceOrder, TaxiBooking, TravelBooking, Transaction)
+
+
+def day_start(day):
+    """Aware datetime at the start of a local date"""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def get_rollup_watermark():
+    """Last contiguous rolled-up date, or None if rollups have never run"""
+    return KpiDailyRollup.objects.filter(metric=COMPLETE).aggregate(last=Max('date'))['last']
+
+
+def get_earliest_date():
+    """Earliest local date with data for any metric"""
+    dates = [
+        metric.queryset().aggregate(first=Min(metric.date_field))['first']
+        for metric in METRICS.values()
+    ]
+    dates = [timezone.localtime(value).date() for value in dates if value]
+    return min(dates) if dates else None
+
+
+def rollup_day(day):
+    """Recompute every metric for one date"""
+    start, end = day_start(day), day_start(day + timedelta(days=1))
+    # Cleared before aggregating, so only changes made after this point re-mark the day
+    KpiDailyRollup.objects.filter(date=day, metric=DIRTY).delete()
+    rows = []
+    for metric in METRICS.values():
+        for dimension, total in metric.aggregate(start, end).items():
+            rows.append(KpiDailyRollup(
+                date=day, metric=metric.name, dimension=dimension,
+                count=total['count'], amount=total['amount'],
+            ))
+    rows.append(KpiDailyRollup(date=day, metric=COMPLETE, dimension='', count=1))
+
+    with db_transaction.atomic():
+        # A change marked dirty while the day was being aggregated keeps its marker for the next run
+        KpiDailyRollup.objects.filter(date=day).exclude(metric=DIRTY).delete()
+        KpiDailyRollup.objects.bulk_create(rows)
+    return len(rows) - 1
+
+
+def rollup_kpis(since=None, until=None):
+    """
+    Roll up new days and re-roll dirty ones
+
+    Args:
+        since: First date to (re)compute; defaults to the day after the watermark,
+            or the earliest data when rollups have never run
+        until: Last date to compute; defaults to yesterday (today is always read live)
+
+    Returns:
+        list: Dates rolled up
+    """
+    until = until or timezone.localdate() - timedelta(days=1)
+    if since is None:
+        watermark = get_rollup_watermark()
+        since = watermark + timedelta(days=1) if watermark else get_earliest_date()
+
+    days = set(
+        KpiDailyRollup.objects.filter(metric=DIRTY, date__lte=until).values_list('date', flat=True)
+    )
+    if since:
+        day = since
+        while day <= until:
+            days.add(day)
+            day += timedelta(days=1)
+
+    for day in sorted(days):
+        rollup_day(day)
+    return sorted(days)
+
+
+def mark_dirty(created_at):
+    """Flag the rolled-up day of a changed row for recomputation"""
+    if not created_at:
+        return
+    day = timezone.localtime(created_at).date()
+    if day >= timezone.localdate():
+        return
+    KpiDailyRollup.objects.get_or_create(metric=DIRTY, dimension='', date=day)
+
+
+def mark_queryset_dirty(queryset):
+    """mark_dirty for the rows of a queryset about to be changed with update(), which skips post_save"""
+    if queryset.model not in TRACKED_MODELS:
+        return
+    days = {}
+    for created_at in queryset.values_list('created_at', flat=True):
+        if created_at:
+            days.setdefault(timezone.localtime(created_at).date(), created_at)
+    for created_at in days.values():
+        mark_dirty(created_at)
+
+
+class KpiReader:
+    """Reads metric totals for date windows from rollups plus a live tail"""
+
+    def __init__(self):
+        self.watermark = get_rollup_watermark()
+
+    def totals(self, metric_name, start=None, end=None, dimensions=None):
+        """
+        Count/amount per dimension for local dates in [start, end)
+
+        Args:
+            start: First date (None for all history)
+            end: Date after the last one (None for up to now)
+            dimensions: Restrict to these dimension values
+
+        Returns:
+            dict: {dimension: {'count': int, 'amount': Decimal}}
+        """
+        metric = METRICS[metric_name]
+        if dimensions is not None:
+            dimensions = [_dimension_key(value) for value in dimensions]
+        totals = defaultdict(lambda: {'count': 0, 'amount': Decimal('0')})
+
+        live_start = start
+        if self.watermark and (start is None or start <= self.watermark):
+            rolled_end = self.watermark + timedelta(days=1)
+            if end is not None:
+                rolled_end = min(rolled_end, end)
+            rows = KpiDailyRollup.objects.filter(metric=metric_name, date__lt=rolled_end)
+            if start is not None:
+                rows = rows.filter(date__gte=start)
+            if dimensions is not None:
+                rows = rows.filter(dimension__in=dimensions)
+            for row in rows.values('dimension').annotate(count=Sum('count'), amount=Sum('amount')).order_by():
+                totals[row['dimension']]['count'] += row['count'] or 0
+                totals[row['dimension']]['amount'] += Decimal(str(row['amount'] or 0))
+            live_start = rolled_end
+
+        if end is None or live_start is None or live_start < end:
+            live = metric.aggregate(
+                day_start(live_start) if live_start else None,
+                day_start(end) if end else None,
+                dimensions,
+            )
+            for dimension, total in live.items():
+                totals[dimension]['count'] += total['count']
+                totals[dimension]['amount'] += total['amount']
+        return dict(totals)
+
+    def total(self, metric_name, start=None, end=None, dimensions=None):
+        """Count/amount summed over dimensions, as {'count': int, 'amount': Decimal}"""
+        return self.window_totals(metric_name, {'total': (start, end, dimensions)})['total']
+
+    def window_totals(self, metric_name, windows):
+        """
+        Count/amount for several date windows with one rollup query and one live query
+
+        Each window is aggregated with Sum/Count(filter=Q(...)) over half-open ranges,
+        so the number of queries doesn't grow with the number of windows.
+
+        Args:
+            windows: {name: (start, end) or (start, end, dimensions)}, same meaning
+                as the arguments of totals()
+
+        Returns:
+            dict: {name: {'count': int, 'amount': Decimal}}
+        """
+        metric = METRICS[metric_name]
+        rolled = {}
+        live = {}
+        for index, (name, window) in enumerate(windows.items()):
+            start, end = window[0], window[1]
+            dimensions = window[2] if len(window) > 2 else None
+            if dimensions is not None:
+                dimensions = [_dimension_key(value) for value in dimensions]
+            alias = f'w{index}'
+
+            live_start = start
+            if self.watermark and (start is None or start <= self.watermark):
+                rolled_end = self.watermark + timedelta(days=1)
+                if end is not None:
+                    rolled_end = min(rolled_end, end)
+                q = Q(date__lt=rolled_end)
+                if start is not None:
+                    q &= Q(date__gte=start)
+                if dimensions is not None:
+                    q &= Q(dimension__in=dimensions)
+                rolled[alias] = q
+                live_start = rolled_end
+
+            if end is None or live_start is None or live_start < end:
+                q = Q()
+                if live_start is not None:
+                    q &= Q(**{f'{metric.date_field}__gte': day_start(live_start)})
+                if end is not None:
+                    q &= Q(**{f'{metric.date_field}__lt': day_start(end)})
+                if dimensions is not None and metric.dimension:
+                    q &= Q(**{f'{metric.dimension}__in': dimensions})
+                live[alias] = q
+
+        values = {}
+        if rolled:
+            aggregates = {}
+            for alias, q in rolled.items():
+                aggregates[f'{alias}_rolled_count'] = Sum('count', filter=q)
+                aggregates[f'{alias}_rolled_amount'] = Sum('amount', filter=q)
+            values.update(KpiDailyRollup.objects.filter(metric=metric_name).aggregate(**aggregates))
+        if live:
+            aggregates = {}
+            for alias, q in live.items():
+                aggregates[f'{alias}_live_count'] = Count('pk', filter=q)
+                if metric.amount:
+                    aggregates[f'{alias}_live_amount'] = Sum(metric.amount, filter=q)
+            values.update(metric.queryset().aggregate(**aggregates))
+
+        results = {}
+        for index, name in enumerate(windows):
+            alias = f'w{index}'
+            results[name] = {
+                'count': (values.get(f'{alias}_rolled_count') or 0) + (values.get(f'{alias}_live_count') or 0),
+                'amount': Decimal(str(values.get(f'{alias}_rolled_amount') or 0))
+                          + Decimal(str(values.get(f'{alias}_live_amount') or 0)),
+            }
+        return results
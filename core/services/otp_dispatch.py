@@ -0,0 +1,240 @@
+"""
+Asynchronous OTP SMS dispatch
+Queues OTP messages to a bounded worker pool so auth endpoints respond
+without waiting on the SMS gateway, with throttling per phone number and
+client IP (in the shared cache, or over recent OtpSmsDispatch rows when the
+cache is per-process).
+
+Each send is recorded in OtpSmsDispatch, so its delivery state can be polled
+from any worker, and a send whose worker died before delivering it (e.g. a
+restart) is retried by `manage.py dispatch_otp_sms`.
+"""
+import sys
+import threading
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from core.utils.cache_backends import cache_is_shared
+from core.utils.sms_service import sms_service
+
+COOLDOWN_CACHE_PREFIX = 'otp_sms:cooldown'
+COUNT_CACHE_PREFIX = 'otp_sms:count'
+
+# Delivery states: queued -> sending -> sent | failed
+WINDOW_SECONDS = 60 * 60
+# Queued sends older than this are assumed lost by their worker and retried
+ORPHANED_AFTER_SECONDS = 30
+# Sends stuck in 'sending' longer than this are failed rather than retried (the SMS may have gone out)
+STALE_SENDING_SECONDS = 60 * 5
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'OTP_SMS_WORKERS', 4),
+                thread_name_prefix='otp-sms'
+            )
+        return _executor
+
+
+def get_client_ip(request):
+    """
+    Client IP for throttling
+
+    REMOTE_ADDR, unless OTP_TRUSTED_PROXY_COUNT reverse proxies sit in front of
+    the app: then the X-Forwarded-For entry appended by the outermost trusted
+    proxy. Entries left of it are client-supplied and can be forged.
+    """
+    trusted_proxies = getattr(settings, 'OTP_TRUSTED_PROXY_COUNT', 0)
+    forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if trusted_proxies and forwarded_for:
+        hops = [hop.strip() for hop in forwarded_for.split(',') if hop.strip()]
+        if len(hops) >= trusted_proxies:
+            return hops[-trusted_proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _increment(key, timeout):
+    """Increment a fixed-window counter, creating it with the window TTL"""
+    if cache.add(key, 1, timeout):
+        return 1
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr()
+        cache.set(key, 1, timeout)
+        return 1
+
+
+def check_rate_limit(phone, ip_address):
+    """
+    Check and consume the OTP send allowance for a phone number and IP
+
+    Limits (settings):
+        OTP_RESEND_COOLDOWN_SECONDS: minimum gap between sends to one phone
+        OTP_MAX_PER_PHONE_PER_HOUR: sends per phone per hour
+        OTP_MAX_PER_IP_PER_HOUR: sends per client IP per hour
+
+    Counters live in the cache when it is shared between workers. A
+    local-memory cache would give every process its own allowance, so then
+    the sends recorded in OtpSmsDispatch are counted instead (the allowance
+    is consumed by enqueue_otp_sms).
+
+    Returns:
+        tuple: (allowed, error message or None, retry_after seconds or None)
+    """
+    cooldown = getattr(settings, 'OTP_RESEND_COOLDOWN_SECONDS', 30)
+    max_per_phone = getattr(settings, 'OTP_MAX_PER_PHONE_PER_HOUR', 5)
+    max_per_ip = getattr(settings, 'OTP_MAX_PER_IP_PER_HOUR', 20)
+
+    if not cache_is_shared():
+        return _check_recorded_sends(phone, ip_address, cooldown, max_per_phone, max_per_ip)
+
+    cooldown_key = f"{COOLDOWN_CACHE_PREFIX}:{phone}"
+    cooldown_error = (False, f'Please wait {cooldown} seconds before requesting another OTP', cooldown)
+    if cooldown and cache.get(cooldown_key):
+        return cooldown_error
+
+    if _increment(f"{COUNT_CACHE_PREFIX}:phone:{phone}", WINDOW_SECONDS) > max_per_phone:
+        return False, 'Too many OTP requests for this phone number. Please try again later.', WINDOW_SECONDS
+
+    if ip_address and _increment(f"{COUNT_CACHE_PREFIX}:ip:{ip_address}", WINDOW_SECONDS) > max_per_ip:
+        return False, 'Too many OTP requests. Please try again later.', WINDOW_SECONDS
+
+    # Start the cooldown only for a send that is allowed; add() still loses to a concurrent request
+    if cooldown and not cache.add(cooldown_key, True, cooldown):
+        return cooldown_error
+
+    return True, None, None
+
+
+def _check_recorded_sends(phone, ip_address, cooldown, max_per_phone, max_per_ip):
+    """check_rate_limit over the OtpSmsDispatch rows of the last WINDOW_SECONDS"""
+    from core.models import OtpSmsDispatch
+    now = timezone.now()
+    recent = OtpSmsDispatch.objects.filter(created_at__gt=now - timedelta(seconds=WINDOW_SECONDS))
+
+    phone_sends = list(recent.filter(phone=phone).order_by('-created_at').values_list('created_at', flat=True)[:max_per_phone])
+    if cooldown and phone_sends and phone_sends[0] > now - timedelta(seconds=cooldown):
+        return False, f'Please wait {cooldown} seconds before requesting another OTP', cooldown
+
+    if len(phone_sends) >= max_per_phone:
+        return False, 'Too many OTP requests for this phone number. Please try again later.', WINDOW_SECONDS
+
+    if ip_address and recent.filter(ip_address=ip_address).count() >= max_per_ip:
+        return False, 'Too many OTP requests. Please try again later.', WINDOW_SECONDS
+
+    return True, None, None
+
+
+def _set_status(request_id, state, message=''):
+    from core.models import OtpSmsDispatch
+    OtpSmsDispatch.objects.filter(request_id=request_id).update(
+        status=state, message=message[:255], otp='', updated_at=timezone.now()
+    )
+
+
+def _claim(request_id):
+    """Move a queued send to 'sending'; False if another worker already took it"""
+    from core.models import OtpSmsDispatch
+    return OtpSmsDispatch.objects.filter(request_id=request_id, status='queued').update(
+        status='sending', updated_at=timezone.now()
+    ) == 1
+
+
+def get_dispatch_status(request_id):
+    """
+    Delivery state of a queued OTP SMS
+
+    Returns:
+        dict with 'request_id', 'status', 'message', 'updated_at' or None if unknown
+    """
+    from core.models import OtpSmsDispatch
+    dispatch = OtpSmsDispatch.objects.filter(request_id=request_id).values(
+        'request_id', 'status', 'message', 'updated_at'
+    ).first()
+    if dispatch:
+        dispatch['updated_at'] = dispatch['updated_at'].isoformat()
+    return dispatch
+
+
+def _deliver(request_id, phone, otp, country_code):
+    if not _claim(request_id):
+        return
+    try:
+        sms_result = sms_service.send_otp(phone, otp, country_code)
+    except Exception as e:
+        traceback.print_exc()
+        sms_result = {'success': False, 'message': str(e)}
+
+    if sms_result.get('success'):
+        _set_status(request_id, 'sent', 'OTP sent successfully to your phone number')
+    else:
+        print(f"[ERROR] OTP SMS {request_id} to {phone} failed: {sms_result.get('message')}")
+        sys.stdout.flush()
+        _set_status(request_id, 'failed', f"Failed to send SMS: {sms_result.get('message')}")
+
+
+def enqueue_otp_sms(phone, otp, country_code, ip_address=None):
+    """
+    Queue an OTP SMS for background delivery
+
+    Args:
+        phone: Phone number
+        otp: OTP code
+        country_code: '+91' (Fast2SMS) or '+977' (Kaicho)
+        ip_address: Requesting client IP, counted by check_rate_limit
+
+    Returns:
+        str: Request ID to poll with get_dispatch_status
+    """
+    from core.models import OtpSmsDispatch
+    request_id = uuid.uuid4().hex
+    OtpSmsDispatch.objects.create(
+        request_id=request_id, phone=phone, country_code=country_code, otp=otp, ip_address=ip_address or None
+    )
+    transaction.on_commit(lambda: _get_executor().submit(_deliver, request_id, phone, otp, country_code))
+    return request_id
+
+
+def redeliver_orphaned():
+    """
+    Send queued OTP SMS that no worker picked up (e.g. lost in a restart)
+
+    Sends whose OTP has already expired are failed instead, as are sends left
+    in 'sending' for STALE_SENDING_SECONDS.
+
+    Returns:
+        dict: Counts of 'sent', 'failed' and 'expired'
+    """
+    from core.models import OtpSmsDispatch
+    now = timezone.now()
+    expired_before = now - timedelta(minutes=getattr(settings, 'OTP_EXPIRY_MINUTES', 10))
+    result = {'sent': 0, 'failed': 0, 'expired': 0}
+
+    result['expired'] = OtpSmsDispatch.objects.filter(status='queued', created_at__lt=expired_before).update(
+        status='failed', message='OTP expired before the SMS could be sent', otp='', updated_at=now
+    )
+    result['expired'] += OtpSmsDispatch.objects.filter(
+        status='sending', updated_at__lt=now - timedelta(seconds=STALE_SENDING_SECONDS)
+    ).update(status='failed', message='SMS delivery was interrupted', otp='', updated_at=now)
+
+    orphaned = OtpSmsDispatch.objects.filter(
+        status='queued', updated_at__lt=now - timedelta(seconds=ORPHANED_AFTER_SECONDS)
+    ).values_list('request_id', 'phone', 'otp', 'country_code')
+    for request_id, phone, otp, country_code in orphaned:
+        _deliver(request_id, phone, otp, country_code)
+        state = OtpSmsDispatch.objects.filter(request_id=request_id).values_list('status', flat=True).first()
+        if state in result:
+            result[state] += 1
+    return result
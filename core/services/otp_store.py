@@ -0,0 +1,194 @@
+"""
+OTP storage backends
+Issue and verify one-time passwords through a common interface. The cache
+backend keeps a hashed code with a TTL, so nothing accumulates in the
+database, but it needs a cache shared by all workers (REDIS_URL); the
+database backend (default without one) keeps the Otp table behaviour.
+Set OTP_AUDIT_TO_DATABASE to also record issued codes in the Otp table
+(purged with `manage.py purge_expired_otps`).
+"""
+import hashlib
+import hmac
+import secrets
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import F
+from django.utils import timezone
+from core.utils.cache_backends import cache_is_shared
+
+VALID = 'valid'
+INVALID = 'invalid'
+EXPIRED = 'expired'
+TOO_MANY_ATTEMPTS = 'too_many_attempts'
+
+ERROR_MESSAGES = {
+    INVALID: 'Invalid OTP code',
+    EXPIRED: 'OTP has expired. Please request a new one',
+    TOO_MANY_ATTEMPTS: 'Too many incorrect attempts. Please request a new OTP',
+}
+
+# Expired entries are kept this long so verification can report "expired" rather than "invalid"
+EXPIRED_GRACE_SECONDS = 60 * 10
+
+
+def generate_otp():
+    """Generate 6-digit OTP"""
+    return str(100000 + secrets.randbelow(900000))
+
+
+def _hash_otp(phone, country_code, otp):
+    message = f"{country_code}:{phone}:{otp}".encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+class BaseOtpBackend:
+    """Interface for OTP storage"""
+
+    def issue(self, phone, country_code, otp):
+        """Store a new OTP for the phone, replacing any previous one"""
+        raise NotImplementedError
+
+    def verify(self, phone, country_code, otp, consume=True):
+        """
+        Check an OTP in constant time
+
+        Args:
+            consume: Invalidate the OTP when it is valid (False for a pre-check
+                before a later consuming verify, e.g. forgot password)
+
+        Returns:
+            str: VALID, INVALID, EXPIRED or TOO_MANY_ATTEMPTS
+        """
+        raise NotImplementedError
+
+    def invalidate(self, phone, country_code):
+        """Remove any outstanding OTP for the phone"""
+        raise NotImplementedError
+
+    @property
+    def ttl_seconds(self):
+        return int(getattr(settings, 'OTP_EXPIRY_MINUTES', 10) * 60)
+
+    @property
+    def max_attempts(self):
+        return getattr(settings, 'OTP_MAX_VERIFY_ATTEMPTS', 5)
+
+    def _attempts_key(self, phone, country_code):
+        return f"otp:attempts:{country_code}:{phone}"
+
+    def _reset_attempts(self, phone, country_code):
+        cache.delete(self._attempts_key(phone, country_code))
+
+    def _attempts_exhausted(self, phone, country_code):
+        return (cache.get(self._attempts_key(phone, country_code)) or 0) >= self.max_attempts
+
+    def _record_failure(self, phone, country_code):
+        key = self._attempts_key(phone, country_code)
+        if not cache.add(key, 1, self.ttl_seconds + EXPIRED_GRACE_SECONDS):
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, 1, self.ttl_seconds + EXPIRED_GRACE_SECONDS)
+
+    def _audit(self, phone, country_code, otp):
+        from core.models import Otp
+        Otp.objects.create(
+            phone=phone,
+            otp=otp,
+            country_code=country_code,
+            expires_at=timezone.now() + timedelta(seconds=self.ttl_seconds)
+        )
+
+
+class CacheOtpBackend(BaseOtpBackend):
+    """OTP hashes in the cache with automatic expiry; failed verifications are counted per phone in the cache"""
+
+    def __init__(self, audit=False):
+        self.audit = audit
+
+    def _key(self, phone, country_code):
+        return f"otp:code:{country_code}:{phone}"
+
+    def issue(self, phone, country_code, otp):
+        cache.set(self._key(phone, country_code), {
+            'hash': _hash_otp(phone, country_code, otp),
+            'expires_at': time.time() + self.ttl_seconds,
+        }, self.ttl_seconds + EXPIRED_GRACE_SECONDS)
+        self._reset_attempts(phone, country_code)
+        if self.audit:
+            self._audit(phone, country_code, otp)
+
+    def verify(self, phone, country_code, otp, consume=True):
+        entry = cache.get(self._key(phone, country_code))
+        if not entry:
+            return INVALID
+        if self._attempts_exhausted(phone, country_code):
+            self.invalidate(phone, country_code)
+            return TOO_MANY_ATTEMPTS
+        if not hmac.compare_digest(entry['hash'], _hash_otp(phone, country_code, str(otp))):
+            self._record_failure(phone, country_code)
+            return INVALID
+        if time.time() > entry['expires_at']:
+            return EXPIRED
+        if consume:
+            self.invalidate(phone, country_code)
+        return VALID
+
+    def invalidate(self, phone, country_code):
+        cache.delete(self._key(phone, country_code))
+        self._reset_attempts(phone, country_code)
+
+
+class DatabaseOtpBackend(BaseOtpBackend):
+    """Otp table storage (one row per outstanding OTP, which counts its failed verifications)"""
+
+    def issue(self, phone, country_code, otp):
+        from core.models import Otp
+        Otp.objects.filter(phone=phone).delete()
+        self._audit(phone, country_code, otp)
+
+    def verify(self, phone, country_code, otp, consume=True):
+        from core.models import Otp
+        otp_record = Otp.objects.filter(phone=phone, country_code=country_code).order_by('-created_at').first()
+        if not otp_record:
+            return INVALID
+        if otp_record.failed_attempts >= self.max_attempts:
+            self.invalidate(phone, country_code)
+            return TOO_MANY_ATTEMPTS
+        if not hmac.compare_digest(otp_record.otp, str(otp)):
+            Otp.objects.filter(pk=otp_record.pk).update(failed_attempts=F('failed_attempts') + 1)
+            return INVALID
+        if otp_record.is_expired():
+            return EXPIRED
+        if consume:
+            self.invalidate(phone, country_code)
+        return VALID
+
+    def invalidate(self, phone, country_code):
+        from core.models import Otp
+        Otp.objects.filter(phone=phone, country_code=country_code).delete()
+
+
+_backend = None
+
+
+def get_otp_backend():
+    """
+    OTP backend selected by settings.OTP_BACKEND ('cache' or 'database')
+
+    Raises:
+        ImproperlyConfigured: 'cache' with a per-process cache, where an OTP
+            issued by one worker can't be verified by another
+    """
+    global _backend
+    if _backend is None:
+        if getattr(settings, 'OTP_BACKEND', 'database') == 'database':
+            _backend = DatabaseOtpBackend()
+        elif not cache_is_shared():
+            raise ImproperlyConfigured("OTP_BACKEND = 'cache' needs a shared cache (set REDIS_URL)")
+        else:
+            _backend = CacheOtpBackend(audit=getattr(settings, 'OTP_AUDIT_TO_DATABASE', False))
+    return _backend
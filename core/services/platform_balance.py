@@ -0,0 +1,71 @@
+"""
+Platform balance
+Commission credits to the platform are added to one of PLATFORM_BALANCE_SHARDS
+PlatformBalanceShard rows picked at random, so concurrent deliveries and
+boardings lock different rows instead of all waiting on SuperSetting.
+The total is SuperSetting.balance plus the shard balances; shards are folded
+back into SuperSetting with `manage.py rollup_platform_balance`.
+"""
+import random
+from decimal import Decimal
+from django.conf import settings
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import F, Sum
+from core.models import SuperSetting, PlatformBalanceShard
+
+
+def _shard_count():
+    return max(1, getattr(settings, 'PLATFORM_BALANCE_SHARDS', 16))
+
+
+def _get_super_setting():
+    super_setting = SuperSetting.objects.first()
+    if not super_setting:
+        super_setting = SuperSetting.objects.create()
+    return super_setting
+
+
+def credit_platform(amount):
+    """
+    Add an amount to a random platform balance shard
+
+    Must run inside the caller's transaction; only the chosen shard row is locked.
+
+    Returns:
+        int: Shard number credited
+    """
+    shard = random.randrange(_shard_count())
+    if PlatformBalanceShard.objects.filter(shard=shard).update(balance=F('balance') + amount):
+        return shard
+    try:
+        with db_transaction.atomic():
+            PlatformBalanceShard.objects.create(shard=shard, balance=amount)
+    except IntegrityError:
+        # Another transaction created the shard first
+        PlatformBalanceShard.objects.filter(shard=shard).update(balance=F('balance') + amount)
+    return shard
+
+
+def get_platform_balance():
+    """Current platform balance (rolled-up balance plus unrolled shard credits), without locking"""
+    unrolled = PlatformBalanceShard.objects.aggregate(total=Sum('balance'))['total'] or Decimal('0')
+    return Decimal(str(_get_super_setting().balance)) + Decimal(str(unrolled))
+
+
+def rollup_platform_balance():
+    """
+    Move shard balances into SuperSetting.balance
+
+    Returns:
+        Decimal: Amount rolled up
+    """
+    with db_transaction.atomic():
+        shards = list(
+            PlatformBalanceShard.objects.select_for_update().exclude(balance=0).order_by('shard').values('pk', 'balance')
+        )
+        total = sum((Decimal(str(shard['balance'])) for shard in shards), Decimal('0'))
+        if not shards:
+            return total
+        PlatformBalanceShard.objects.filter(pk__in=[shard['pk'] for shard in shards]).update(balance=0)
+        SuperSetting.objects.filter(pk=_get_super_setting().pk).update(balance=F('balance') + total)
+    return total
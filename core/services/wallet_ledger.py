@@ -0,0 +1,158 @@
+"""
+Wallet ledger
+Posts balance changes for users and the platform in one database transaction:
+user balances are read under row locks (in primary-key order, so concurrent
+postings cannot deadlock), updated with F() expressions instead of
+User.save(), and the Transaction rows are written with bulk_create carrying
+the running wallet_before / wallet_after of each entry. Platform credits go
+to a sharded counter (core.services.platform_balance) without a global lock.
+"""
+from collections import OrderedDict
+from decimal import Decimal, ROUND_HALF_UP
+from django.db import transaction as db_transaction
+from django.db.models import F
+from core.models import User, Transaction
+from core.services.platform_balance import credit_platform, get_platform_balance
+
+TWO_PLACES = Decimal('0.01')
+
+
+class InsufficientBalanceError(Exception):
+    """Raised when a posting would take a user's wallet below zero"""
+
+    def __init__(self, user_id, balance, required):
+        self.user_id = user_id
+        self.balance = balance
+        self.required = required
+        super().__init__(f'Insufficient balance for user {user_id}: available ₹{balance}, required ₹{required}')
+
+
+class LedgerEntry:
+    """
+    One balance movement
+
+    Args:
+        user: User to credit/debit, or None for the platform balance
+        amount: Signed change to the wallet (negative for deductions)
+        transaction_type: Transaction.transaction_type of the ledger row
+        description: Transaction description
+        record: Write a Transaction row for this entry (False only moves the balance)
+        transaction_amount: Amount stored on the Transaction row if it differs from
+            the wallet change (e.g. withdrawals are stored positive)
+        transaction: Existing Transaction to complete instead of creating a new row
+        **fields: Extra Transaction fields (related_order, related_withdrawal, payer_name, ...)
+    """
+
+    def __init__(self, user, amount, transaction_type, description='', record=True,
+                 transaction_amount=None, transaction=None, status='completed', **fields):
+        self.user = user
+        self.amount = Decimal(str(amount)).quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+        self.transaction_type = transaction_type
+        self.description = description
+        self.record = record
+        self.transaction_amount = self.amount if transaction_amount is None else transaction_amount
+        self.transaction = transaction
+        self.status = status
+        self.fields = fields
+        self.wallet_before = None
+        self.wallet_after = None
+
+    @property
+    def user_id(self):
+        return self.user.pk if self.user is not None else None
+
+
+def _lock_user_balances(user_ids):
+    """Locked read of user balances, in primary-key order"""
+    return {
+        row['pk']: Decimal(str(row['balance']))
+        for row in User.objects.select_for_update().filter(pk__in=user_ids).order_by('pk').values('pk', 'balance')
+    }
+
+
+def post_entries(entries, allow_negative=False):
+    """
+    Apply ledger entries atomically
+
+    Entries are applied in list order, so several entries for the same user get
+    chained wallet_before/wallet_after values. Each wallet gets a single
+    UPDATE ... SET balance = balance + <net change>.
+
+    Args:
+        entries: List of LedgerEntry
+        allow_negative: Permit user wallets to end below zero
+
+    Returns:
+        List of Transaction rows written (created or completed)
+
+    Raises:
+        InsufficientBalanceError: A user wallet would end below zero
+    """
+    entries = [entry for entry in entries if entry.amount or entry.record]
+    if not entries:
+        return []
+
+    with db_transaction.atomic():
+        user_ids = sorted({entry.user_id for entry in entries if entry.user_id is not None})
+        balances = _lock_user_balances(user_ids) if user_ids else {}
+        if any(entry.user_id is None for entry in entries):
+            # Unlocked snapshot: platform wallet_before/after are informational only
+            balances[None] = get_platform_balance()
+
+        running = dict(balances)
+        for entry in entries:
+            entry.wallet_before = running[entry.user_id].quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+            entry.wallet_after = (entry.wallet_before + entry.amount).quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+            running[entry.user_id] = entry.wallet_after
+
+        if not allow_negative:
+            for user_id in user_ids:
+                if running[user_id] < 0:
+                    required = balances[user_id] - running[user_id]
+                    raise InsufficientBalanceError(user_id, balances[user_id], required)
+
+        net_changes = OrderedDict()
+        for entry in entries:
+            net_changes[entry.user_id] = net_changes.get(entry.user_id, Decimal('0')) + entry.amount
+        for user_id, change in net_changes.items():
+            if not change:
+                continue
+            if user_id is None:
+                credit_platform(change)
+            else:
+                User.objects.filter(pk=user_id).update(balance=F('balance') + change)
+
+        to_create = []
+        to_update = []
+        for entry in entries:
+            if not entry.record:
+                continue
+            if entry.transaction is not None:
+                txn = entry.transaction
+                txn.transaction_type = entry.transaction_type
+                txn.status = entry.status
+                txn.description = entry.description or txn.description
+                txn.wallet_before = entry.wallet_before
+                txn.wallet_after = entry.wallet_after
+                to_update.append(txn)
+            else:
+                to_create.append(Transaction(
+                    user=entry.user,
+                    transaction_type=entry.transaction_type,
+                    amount=entry.transaction_amount,
+                    status=entry.status,
+                    description=entry.description,
+                    wallet_before=entry.wallet_before,
+                    wallet_after=entry.wallet_after,
+                    **entry.fields
+                ))
+
+        created = Transaction.objects.bulk_create(to_create) if to_create else []
+        for txn in to_update:
+            txn.save(update_fields=['transaction_type', 'status', 'description', 'wallet_before', 'wallet_after', 'updated_at'])
+
+    # Keep in-memory instances in line with the database
+    for entry in entries:
+        if entry.user is not None:
+            entry.user.balance = running[entry.user_id]
+    return list(created) + to_update
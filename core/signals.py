@@ -0,0 +1,47 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from ecommerce_backend.authentication import invalidate_token_cache, invalidate_user_token_cache
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_auth_for_user(sender, instance, **kwargs):
+    """Any user change (freeze, deactivation, password, roles) drops the cached token snapshot"""
+    invalidate_user_token_cache(instance.pk)
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def invalidate_cached_auth_for_token(sender, instance, **kwargs):
+    """Deleted or re-keyed tokens must stop authenticating immediately"""
+    invalidate_token_cache(instance.key)
+    invalidate_user_token_cache(instance.user_id)
+
+
+def mark_kpi_day_dirty(sender, instance, **kwargs):
+    """Changes to rows from an already rolled-up day send that day back through rollup_kpis"""
+    from core.services.kpi_rollup import mark_dirty
+    mark_dirty(getattr(instance, 'created_at', None))
+
+
+def connect_kpi_rollup_signals():
+    from core.services.kpi_rollup import TRACKED_MODELS
+    for model in TRACKED_MODELS:
+        # A user's creation date never changes, so only deletions affect the users rollup
+        if model is not User:
+            post_save.connect(mark_kpi_day_dirty, sender=model, dispatch_uid=f'kpi_dirty_save_{model._meta.label_lower}')
+        post_delete.connect(mark_kpi_day_dirty, sender=model, dispatch_uid=f'kpi_dirty_delete_{model._meta.label_lower}')
+
+
+def record_sync_tombstones(sender, instance, **kwargs):
+    """Deleted orders/bookings are reported to delta-sync clients"""
+    from core.services.delta_sync import record_tombstones
+    record_tombstones(sender, instance)
+
+
+def connect_delta_sync_signals():
+    from core.services.delta_sync import get_streams
+    for model in {stream.model for stream in get_streams().values()}:
+        post_delete.connect(record_sync_tombstones, sender=model, dispatch_uid=f'delta_sync_tombstone_{model._meta.label_lower}')
@@ -1,3 +1,460 @@
-from django.test import TestCase
+"""Core service tests."""
+import io
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+
+from core.models import Address, KpiDailyRollup, Otp, OtpSmsDispatch, PushNotificationOutbox, Transaction, User
+from core.services import fcm_service, kpi_rollup, otp_dispatch, otp_store
+from core.services.delta_sync import SyncCursorExpired, delta_sync
+from core.services.fcm_service import FCMService
+from core.utils.cursors import decode_cursor, encode_cursor
+from ecommerce.models import Order, Store
+from core.services.wallet_ledger import InsufficientBalanceError, LedgerEntry, post_entries
+from ecommerce_backend.authentication import CsrfExemptTokenAuthentication
+
+
+@override_settings(
+    OTP_RESEND_COOLDOWN_SECONDS=30,
+    OTP_MAX_PER_PHONE_PER_HOUR=2,
+    OTP_MAX_PER_IP_PER_HOUR=20,
+)
+class OtpDispatchTests(TestCase):
+    """OTP SMS throttling and durable delivery state."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_client_ip_ignores_forwarded_for_without_trusted_proxies(self):
+        request = RequestFactory().get('/', HTTP_X_FORWARDED_FOR='1.1.1.1', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(otp_dispatch.get_client_ip(request), '10.0.0.1')
+
+    @override_settings(OTP_TRUSTED_PROXY_COUNT=1)
+    def test_client_ip_takes_hop_appended_by_trusted_proxy(self):
+        request = RequestFactory().get(
+            '/', HTTP_X_FORWARDED_FOR='1.1.1.1, 203.0.113.7', REMOTE_ADDR='10.0.0.1'
+        )
+        self.assertEqual(otp_dispatch.get_client_ip(request), '203.0.113.7')
+
+    @mock.patch.object(otp_dispatch, 'cache_is_shared', return_value=True)
+    def test_rejected_send_does_not_start_cooldown(self, _):
+        cache.set(f'{otp_dispatch.COUNT_CACHE_PREFIX}:ip:1.2.3.4', 20, 60)
+        allowed, _, _ = otp_dispatch.check_rate_limit('9800000000', '1.2.3.4')
+        self.assertFalse(allowed)
+        self.assertIsNone(cache.get(f'{otp_dispatch.COOLDOWN_CACHE_PREFIX}:9800000000'))
+
+        allowed, _, _ = otp_dispatch.check_rate_limit('9800000000', '5.6.7.8')
+        self.assertTrue(allowed)
+        allowed, _, retry_after = otp_dispatch.check_rate_limit('9800000000', '5.6.7.8')
+        self.assertFalse(allowed)
+        self.assertEqual(retry_after, 30)
+
+    def test_without_shared_cache_recorded_sends_are_counted(self):
+        self.assertEqual(otp_dispatch.check_rate_limit('9800000000', '1.2.3.4'), (True, None, None))
+        otp_dispatch.enqueue_otp_sms('9800000000', '123456', '+977', '1.2.3.4')
+        allowed, _, retry_after = otp_dispatch.check_rate_limit('9800000000', '1.2.3.4')
+        self.assertEqual((allowed, retry_after), (False, 30))
+
+        OtpSmsDispatch.objects.update(created_at=timezone.now() - timedelta(minutes=1))
+        self.assertTrue(otp_dispatch.check_rate_limit('9800000000', '1.2.3.4')[0])
+        otp_dispatch.enqueue_otp_sms('9800000000', '123456', '+977', '1.2.3.4')
+        OtpSmsDispatch.objects.update(created_at=timezone.now() - timedelta(minutes=1))
+        allowed, _, retry_after = otp_dispatch.check_rate_limit('9800000000', '5.6.7.8')
+        self.assertEqual((allowed, retry_after), (False, otp_dispatch.WINDOW_SECONDS))
+
+        with override_settings(OTP_MAX_PER_IP_PER_HOUR=2):
+            self.assertFalse(otp_dispatch.check_rate_limit('9800000001', '1.2.3.4')[0])
+            self.assertTrue(otp_dispatch.check_rate_limit('9800000001', '5.6.7.8')[0])
+
+        OtpSmsDispatch.objects.update(created_at=timezone.now() - timedelta(hours=2))
+        self.assertTrue(otp_dispatch.check_rate_limit('9800000000', '1.2.3.4')[0])
+
+    def test_status_is_read_from_the_database(self):
+        request_id = otp_dispatch.enqueue_otp_sms('9800000000', '123456', '+977')
+        self.assertEqual(otp_dispatch.get_dispatch_status(request_id)['status'], 'queued')
+        self.assertIsNone(otp_dispatch.get_dispatch_status('unknown'))
+
+    def test_orphaned_send_is_redelivered_and_expired_one_failed(self):
+        orphaned = otp_dispatch.enqueue_otp_sms('9800000000', '123456', '+977')
+        expired = otp_dispatch.enqueue_otp_sms('9800000001', '654321', '+977')
+        OtpSmsDispatch.objects.update(updated_at=timezone.now() - timedelta(minutes=1))
+        OtpSmsDispatch.objects.filter(request_id=expired).update(created_at=timezone.now() - timedelta(hours=1))
+
+        with mock.patch.object(otp_dispatch.sms_service, 'send_otp', return_value={'success': True}) as send_otp:
+            result = otp_dispatch.redeliver_orphaned()
+
+        send_otp.assert_called_once_with('9800000000', '123456', '+977')
+        self.assertEqual(result, {'sent': 1, 'failed': 0, 'expired': 1})
+        sent = OtpSmsDispatch.objects.get(request_id=orphaned)
+        self.assertEqual((sent.status, sent.otp), ('sent', ''))
+        self.assertEqual(OtpSmsDispatch.objects.get(request_id=expired).status, 'failed')
+
+
+@override_settings(OTP_MAX_VERIFY_ATTEMPTS=3, OTP_EXPIRY_MINUTES=2)
+class OtpStoreTests(TestCase):
+    """Verification and attempt limits of both OTP backends."""
+
+    def setUp(self):
+        cache.clear()
+
+    def _assert_attempt_limit(self, backend):
+        backend.issue('9800000000', '+977', '123456')
+        self.assertEqual(backend.verify('9800000000', '+977', '123456', consume=False), otp_store.VALID)
+        for _ in range(3):
+            self.assertEqual(backend.verify('9800000000', '+977', '000000'), otp_store.INVALID)
+        self.assertEqual(backend.verify('9800000000', '+977', '123456'), otp_store.TOO_MANY_ATTEMPTS)
+        # The OTP is gone after too many attempts
+        self.assertEqual(backend.verify('9800000000', '+977', '123456'), otp_store.INVALID)
+
+        backend.issue('9800000000', '+977', '654321')
+        self.assertEqual(backend.verify('9800000000', '+977', '654321'), otp_store.VALID)
+        self.assertEqual(backend.verify('9800000000', '+977', '654321'), otp_store.INVALID)
+
+    def test_database_backend_attempt_limit(self):
+        self._assert_attempt_limit(otp_store.DatabaseOtpBackend())
+
+    def test_cache_backend_attempt_limit(self):
+        self._assert_attempt_limit(otp_store.CacheOtpBackend())
+
+    def test_database_backend_reports_expired(self):
+        backend = otp_store.DatabaseOtpBackend()
+        backend.issue('9800000000', '+977', '123456')
+        Otp.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(backend.verify('9800000000', '+977', '123456'), otp_store.EXPIRED)
+
+    @override_settings(OTP_BACKEND='cache')
+    def test_cache_backend_refused_with_local_memory_cache(self):
+        with mock.patch.object(otp_store, '_backend', None):
+            with self.assertRaises(ImproperlyConfigured):
+                otp_store.get_otp_backend()
+
+
+class WalletLedgerTests(TestCase):
+    """Atomic ledger postings."""
+
+    def setUp(self):
+        self.payer = User.objects.create_user(phone='9800000010', name='Payer', password='testpass123', balance=100)
+        self.payee = User.objects.create_user(phone='9800000011', name='Payee', password='testpass123', balance=0)
+
+    def test_insufficient_balance_rolls_back_every_entry(self):
+        with self.assertRaises(InsufficientBalanceError) as raised:
+            post_entries([
+                LedgerEntry(self.payee, 150, 'payout', description='Payout'),
+                LedgerEntry(self.payer, -150, 'commission_deduction', description='Commission'),
+            ])
+
+        self.assertEqual(raised.exception.user_id, self.payer.pk)
+        self.assertEqual(raised.exception.required, Decimal('150.00'))
+        self.payer.refresh_from_db()
+        self.payee.refresh_from_db()
+        self.assertEqual(self.payer.balance, Decimal('100'))
+        self.assertEqual(self.payee.balance, Decimal('0'))
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_entries_for_one_user_chain_wallet_balances(self):
+        transactions = post_entries([
+            LedgerEntry(self.payer, -30, 'commission_deduction'),
+            LedgerEntry(self.payer, -70, 'shipping_charge_deduction'),
+        ])
+
+        self.assertEqual(
+            [(txn.wallet_before, txn.wallet_after) for txn in transactions],
+            [(Decimal('100.00'), Decimal('70.00')), (Decimal('70.00'), Decimal('0.00'))],
+        )
+        self.payer.refresh_from_db()
+        self.assertEqual(self.payer.balance, Decimal('0'))
+
+
+class KpiRollupDirtyTests(TestCase):
+    """Dirty markers of rolled-up KPI days."""
+
+    def setUp(self):
+        self.yesterday = timezone.localdate() - timedelta(days=1)
+        self.user = User.objects.create_user(phone='9800000020', name='Old User', password='testpass123')
+        User.objects.filter(pk=self.user.pk).update(created_at=timezone.now() - timedelta(days=1))
+
+    def _dirty_days(self):
+        return list(KpiDailyRollup.objects.filter(metric=kpi_rollup.DIRTY).values_list('date', flat=True))
+
+    def test_queryset_update_marks_created_days_dirty(self):
+        kpi_rollup.mark_queryset_dirty(User.objects.filter(pk=self.user.pk))
+        self.assertEqual(self._dirty_days(), [self.yesterday])
+
+    def test_rollup_clears_the_marker(self):
+        kpi_rollup.mark_dirty(timezone.now() - timedelta(days=1))
+        kpi_rollup.rollup_day(self.yesterday)
+        self.assertEqual(self._dirty_days(), [])
+        self.assertEqual(
+            KpiDailyRollup.objects.get(date=self.yesterday, metric='users.new').count, 1
+        )
+
+    def test_change_during_rollup_keeps_the_marker(self):
+        metric = kpi_rollup.METRICS['users.new']
+        aggregate = metric.aggregate
+
+        def aggregate_then_change(*args, **kwargs):
+            totals = aggregate(*args, **kwargs)
+            kpi_rollup.mark_dirty(timezone.now() - timedelta(days=1))
+            return totals
+
+        kpi_rollup.mark_dirty(timezone.now() - timedelta(days=1))
+        with mock.patch.object(metric, 'aggregate', side_effect=aggregate_then_change):
+            kpi_rollup.rollup_day(self.yesterday)
+        self.assertEqual(self._dirty_days(), [self.yesterday])
+
+
+@override_settings(SYNC_CURSOR_LAG_SECONDS=0, SYNC_TOMBSTONE_RETENTION_DAYS=30)
+class DeltaSyncTests(TestCase):
+    """Order delta sync cursors, tombstones and scoping."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user(phone='9800000030', name='Customer', password='testpass123')
+        cls.other = User.objects.create_user(phone='9800000031', name='Other', password='testpass123')
+        merchant = User.objects.create_user(phone='9800000032', name='Merchant', password='testpass123')
+        cls.store = Store.objects.create(name='Store', owner=merchant, phone='9800000032')
+
+    def _order(self, user):
+        address = Address.objects.create(
+            user=user, title='Home', full_name=user.name, phone=user.phone,
+            address='Street 1', city='City', state='State', zip_code='000000',
+        )
+        return Order.objects.create(
+            user=user, merchant=self.store, order_number=f'SYNC{Order.objects.count():04d}',
+            subtotal=Decimal('10.00'), total_amount=Decimal('10.00'),
+            shipping_address=address, billing_address=address,
+        )
+
+    def _sync(self, user, since=None, limit=None):
+        return delta_sync(Order.objects.filter(user=user), 'orders.customer', user.id, since, limit)
+
+    def test_since_cursor_returns_only_later_changes(self):
+        first, second = self._order(self.customer), self._order(self.customer)
+        sync = self._sync(self.customer)
+        self.assertEqual([order.pk for order in sync['changed']], [first.pk, second.pk])
+
+        second.status = 'confirmed'
+        second.save()
+        sync = self._sync(self.customer, sync['since'])
+        self.assertEqual([order.pk for order in sync['changed']], [second.pk])
+        self.assertEqual(self._sync(self.customer, sync['since'])['changed'], [])
+
+    @override_settings(SYNC_CURSOR_LAG_SECONDS=60)
+    def test_full_page_stops_at_the_horizon(self):
+        settled = self._order(self.customer)
+        Order.objects.filter(pk=settled.pk).update(updated_at=timezone.now() - timedelta(minutes=5))
+        recent = [self._order(self.customer), self._order(self.customer)]
+
+        sync = self._sync(self.customer, limit=1)
+        self.assertEqual([order.pk for order in sync['changed']], [settled.pk])
+        sync = self._sync(self.customer, sync['since'], limit=1)
+        self.assertEqual(sync['changed'], [])
+        cursor_moment = datetime.fromisoformat(decode_cursor(sync['since'], 4)[0])
+        self.assertLess(cursor_moment, min(order.updated_at for order in recent))
+
+        # Once they age past the horizon the recent rows are not skipped
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(minutes=2)):
+            sync = self._sync(self.customer, sync['since'])
+        self.assertEqual({order.pk for order in sync['changed']}, {order.pk for order in recent})
+
+    def test_deletes_are_reported_per_scope(self):
+        mine, theirs = self._order(self.customer), self._order(self.other)
+        since = self._sync(self.customer)['since']
+        mine_id, theirs_id = mine.pk, theirs.pk
+        mine.delete()
+        theirs.delete()
+
+        sync = self._sync(self.customer, since)
+        self.assertEqual(sync['changed'], [])
+        self.assertEqual(sync['deleted'], [mine_id])
+        self.assertNotIn(theirs_id, sync['deleted'])
+        self.assertEqual(self._sync(self.other, since)['deleted'], [theirs_id])
+
+    def test_endpoint_only_returns_the_users_orders(self):
+        mine = self._order(self.customer)
+        self._order(self.other)
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        response = client.get('/api/orders/sync/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([order['id'] for order in response.data['results']], [mine.pk])
+
+    def test_cursor_older_than_tombstone_retention_expires(self):
+        old = timezone.now() - timedelta(days=31)
+        since = encode_cursor(old, 0, old, 0)
+        with self.assertRaises(SyncCursorExpired):
+            self._sync(self.customer, since)
+
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        self.assertEqual(client.get('/api/orders/sync/', {'since': since}).status_code, 410)
+        self.assertEqual(client.get('/api/orders/sync/', {'since': 'garbage'}).status_code, 400)
+
+
+class PushOutboxTests(TestCase):
+    """New-order push notifications are queued and dispatched in batches."""
+
+    @classmethod
+    def setUpTestData(cls):
+        customer = User.objects.create_user(phone='9800000040', name='Customer', password='testpass123')
+        cls.merchant = User.objects.create_user(phone='9800000041', name='Merchant', password='testpass123')
+        User.objects.filter(pk=cls.merchant.pk).update(fcm_token='token-a')
+        cls.merchant.refresh_from_db()
+        store = Store.objects.create(name='Store', owner=cls.merchant, phone='9800000041')
+        address = Address.objects.create(
+            user=customer, title='Home', full_name='Customer', phone='9800000040',
+            address='Street 1', city='City', state='State', zip_code='000000',
+        )
+        cls.order = Order.objects.create(
+            user=customer, merchant=store, order_number='PUSH0001',
+            subtotal=Decimal('10.00'), total_amount=Decimal('10.00'),
+            shipping_address=address, billing_address=address,
+        )
+
+    def setUp(self):
+        patcher = mock.patch.object(FCMService, '_initialized', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _queue(self, user=None):
+        return PushNotificationOutbox.objects.create(
+            user=user or self.merchant, notification_type='new_order', title='New Order Received!',
+            body='Order', data={'order_id': str(self.order.id)}, related_order=self.order,
+        )
+
+    def _send_each(self, *responses):
+        return mock.patch.object(
+            fcm_service.messaging, 'send_each', return_value=mock.Mock(responses=list(responses))
+        )
+
+    def test_queue_writes_outbox_row_and_dispatches_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            entry = FCMService.queue_order_notification(self.merchant, self.order)
+        self.assertEqual(callbacks, [FCMService.dispatch_outbox_async])
+        self.assertEqual((entry.status, entry.related_order, entry.data['order_number']), ('pending', self.order, 'PUSH0001'))
+
+    def test_queue_skips_merchant_without_token(self):
+        self.merchant.fcm_token = None
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertIsNone(FCMService.queue_order_notification(self.merchant, self.order))
+        self.assertEqual(callbacks, [])
+        self.assertFalse(PushNotificationOutbox.objects.exists())
+
+    def test_claim_skips_locked_rows_and_marks_them_processing(self):
+        due = self._queue()
+        later = self._queue()
+        PushNotificationOutbox.objects.filter(pk=later.pk).update(available_at=timezone.now() + timedelta(minutes=5))
+
+        manager = PushNotificationOutbox.objects
+        with mock.patch.object(manager, 'select_for_update', wraps=manager.select_for_update) as select_for_update:
+            claimed = FCMService._claim_outbox_batch(10)
+        select_for_update.assert_called_once_with(skip_locked=True)
+        self.assertEqual(claimed, [due])
+        self.assertEqual(PushNotificationOutbox.objects.get(pk=due.pk).status, 'processing')
+        self.assertEqual(FCMService._claim_outbox_batch(10), [])
+
+    def test_failed_send_is_retried_with_backoff(self):
+        entry = self._queue()
+        error = fcm_service.messaging.SendResponse(None, Exception('unavailable'))
+        with self._send_each(error):
+            result = FCMService.dispatch_outbox()
+        entry.refresh_from_db()
+        self.assertEqual(result['retried'], 1)
+        self.assertEqual((entry.status, entry.attempts, entry.last_error), ('pending', 1, 'unavailable'))
+        self.assertAlmostEqual(
+            (entry.available_at - entry.updated_at).total_seconds(), 30, delta=1
+        )
+
+        PushNotificationOutbox.objects.filter(pk=entry.pk).update(available_at=timezone.now())
+        with mock.patch.object(fcm_service.messaging, 'send_each', side_effect=Exception('timeout')):
+            FCMService.dispatch_outbox()
+        entry.refresh_from_db()
+        self.assertEqual((entry.status, entry.attempts, entry.last_error), ('pending', 2, 'timeout'))
+        self.assertAlmostEqual(
+            (entry.available_at - entry.updated_at).total_seconds(), 60, delta=1
+        )
+
+    def test_unregistered_token_is_pruned(self):
+        other = User.objects.create_user(phone='9800000042', name='Other', password='testpass123')
+        User.objects.filter(pk=other.pk).update(fcm_token='token-b')
+        stale, delivered = self._queue(), self._queue(other)
+        unregistered = fcm_service.messaging.SendResponse(None, fcm_service.messaging.UnregisteredError('gone'))
+        sent = fcm_service.messaging.SendResponse({'name': 'message-1'}, None)
+
+        with self._send_each(unregistered, sent):
+            result = FCMService.dispatch_outbox()
+
+        self.assertEqual((result['sent'], result['failed'], result['pruned_tokens']), (1, 1, 1))
+        self.assertEqual(PushNotificationOutbox.objects.get(pk=stale.pk).status, 'failed')
+        self.assertEqual(PushNotificationOutbox.objects.get(pk=delivered.pk).message_id, 'message-1')
+        self.assertIsNone(User.objects.get(pk=self.merchant.pk).fcm_token)
+        self.assertEqual(User.objects.get(pk=other.pk).fcm_token, 'token-b')
+
+    def test_command_requeues_rows_stuck_in_processing(self):
+        stuck, in_flight = self._queue(), self._queue()
+        PushNotificationOutbox.objects.filter(pk=stuck.pk).update(
+            status='processing', updated_at=timezone.now() - timedelta(minutes=15)
+        )
+        PushNotificationOutbox.objects.filter(pk=in_flight.pk).update(status='processing')
+        sent = fcm_service.messaging.SendResponse({'name': 'message-1'}, None)
+
+        with self._send_each(sent):
+            call_command('dispatch_push_notifications', stdout=io.StringIO())
+
+        self.assertEqual(PushNotificationOutbox.objects.get(pk=stuck.pk).status, 'sent')
+        self.assertEqual(PushNotificationOutbox.objects.get(pk=in_flight.pk).status, 'processing')
+
+
+@override_settings(AUTH_TOKEN_CACHE_TTL=60)
+class TokenAuthCacheTests(TestCase):
+    """Cached token snapshots skip the database but never serve stale state."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(phone='9800000050', name='Customer', password='testpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CsrfExemptTokenAuthentication()
+        self.auth.authenticate_credentials(self.token.key)
+
+    def test_cache_hit_makes_no_queries(self):
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+            self.assertEqual((user.pk, user.name, token.key), (self.user.pk, 'Customer', self.token.key))
+
+    def test_deferred_fields_load_fresh(self):
+        User.objects.filter(pk=self.user.pk).update(balance=Decimal('50.00'))
+        user, _ = self.auth.authenticate_credentials(self.token.key)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.balance, Decimal('50.00'))
+
+    def test_saving_or_freezing_the_user_reauthenticates(self):
+        self.user.name = 'Renamed'
+        self.user.save()
+        with self.assertNumQueries(1):
+            user, _ = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(user.name, 'Renamed')
+
+        self.user.is_freeze = True
+        self.user.save()
+        user, _ = self.auth.authenticate_credentials(self.token.key)
+        self.assertTrue(user.is_freeze)
+
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_deleted_token_stops_authenticating(self):
+        key = self.token.key
+        self.token.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(key)
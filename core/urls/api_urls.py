@@ -8,6 +8,7 @@ urlpatterns = [
     path('auth/register/send-otp/', auth_views.send_registration_otp, name='send-registration-otp'),
     path('auth/register/verify-otp/', auth_views.verify_otp_and_register, name='verify-otp-and-register'),
     path('auth/register/resend-otp/', auth_views.resend_otp, name='resend-otp'),
+    path('auth/otp-status/<str:request_id>/', auth_views.otp_delivery_status, name='otp-delivery-status'),
     path('auth/forgot-password/send-otp/', auth_views.send_forgot_password_otp, name='send-forgot-password-otp'),
     path('auth/forgot-password/verify-otp/', auth_views.verify_forgot_password_otp, name='verify-forgot-password-otp'),
     path('auth/forgot-password/reset-password/', auth_views.reset_password, name='reset-password'),
@@ -0,0 +1,9 @@
+"""Properties of the configured Django cache."""
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def cache_is_shared():
+    """True if the default cache is seen by every worker process (not local-memory or dummy)"""
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
@@ -0,0 +1,26 @@
+"""Opaque pagination cursors for keyset pagination."""
+import base64
+import json
+
+
+def encode_cursor(*values):
+    """Encode position values (datetimes as ISO strings, ids, ...) into an opaque token"""
+    payload = json.dumps([value.isoformat() if hasattr(value, 'isoformat') else value for value in values])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, size):
+    """
+    Decode a cursor from encode_cursor
+
+    Returns:
+        list: The encoded values, or None if the token is malformed
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
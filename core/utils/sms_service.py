@@ -1,4 +1,5 @@
 import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
 from typing import Dict, Any
 from urllib.parse import urlencode
@@ -26,6 +27,14 @@ class SMSService:
             'ROUTE': getattr(settings, 'FAST2SMS_ROUTE', 'q'),
             'LANGUAGE': getattr(settings, 'FAST2SMS_LANGUAGE', 'english')
         }
+        
+        # Pooled HTTP session shared by dispatch workers (keep-alive to the SMS gateways)
+        pool_size = getattr(settings, 'OTP_SMS_WORKERS', 4)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.timeout = getattr(settings, 'SMS_API_TIMEOUT', 30)
     
     def send_sms_kaicho(self, phone_number: str, message: str) -> Dict[str, Any]:
         """
@@ -54,7 +63,7 @@ class SMSService:
             url = f"{self.kaicho_config['API_URL']}?{urlencode(params)}"
             
             # Send request
-            response = requests.get(url, timeout=30)
+            response = self.session.get(url, timeout=self.timeout)
             
             # Check if SMS was sent successfully
             if response.status_code == 200:
@@ -132,11 +141,11 @@ class SMSService:
             }
             
             # Send POST request with JSON body
-            response = requests.post(
+            response = self.session.post(
                 self.fast2sms_config['API_URL'],
                 json=payload,
                 headers=headers,
-                timeout=30
+                timeout=self.timeout
             )
             
             # Check if SMS was sent successfully
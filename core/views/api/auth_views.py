@@ -3,17 +3,16 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
-from django.utils import timezone
-from datetime import timedelta
-import random
-from ...models import User, Otp
+from ...models import User
 from ...serializers import (
     UserSerializer, UserCreateSerializer, UserUpdateSerializer,
     SendOTPSerializer, VerifyOTPSerializer, ResendOTPSerializer,
     ForgotPasswordSendOTPSerializer, ForgotPasswordVerifyOTPSerializer, ResetPasswordSerializer,
     DeleteAccountSerializer, UserUpgradeSerializer
 )
-from ...utils.sms_service import sms_service
+from ...services import otp_store
+from ...services.otp_store import get_otp_backend, generate_otp
+from ...services.otp_dispatch import enqueue_otp_sms, check_rate_limit, get_client_ip, get_dispatch_status
 from django.conf import settings
 
 
@@ -171,11 +170,6 @@ def user_profile(request):
     return Response(user_data)
 
 
-def generate_otp():
-    """Generate 6-digit OTP"""
-    return str(random.randint(100000, 999999))
-
-
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
 def send_registration_otp(request):
@@ -194,50 +188,37 @@ def send_registration_otp(request):
             'error': 'User already exists with this phone number'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    # Generate OTP
-    otp = generate_otp()
-    
-    # Delete any existing OTP for this phone
-    Otp.objects.filter(phone=phone).delete()
-    
-    # Create new OTP with expiration
-    expires_at = timezone.now() + timedelta(minutes=getattr(settings, 'OTP_EXPIRY_MINUTES', 10))
-    Otp.objects.create(
-        phone=phone,
-        otp=otp,
-        country_code=country_code,
-        expires_at=expires_at
-    )
-    
-    # Send SMS based on country code
-    if country_code == '+91':
-        # India: Send SMS via Fast2SMS
-        sms_result = sms_service.send_otp(phone, otp, country_code)
-        if sms_result['success']:
-            message = "OTP sent successfully to your phone number"
-        else:
-            return Response({
-                'error': f"Failed to send SMS: {sms_result['message']}"
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    elif country_code == '+977':
-        # Nepal: Send SMS via Kaicho Group API
-        sms_result = sms_service.send_otp(phone, otp, country_code)
-        if sms_result['success']:
-            message = "OTP sent successfully to your phone number"
-        else:
-            return Response({
-                'error': f"Failed to send SMS: {sms_result['message']}"
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    else:
+    # Validate country code before generating an OTP
+    if country_code not in ('+91', '+977'):
         return Response({
             'error': 'Invalid country code'
         }, status=status.HTTP_400_BAD_REQUEST)
     
+    # Throttle OTP sends per phone number and client IP
+    client_ip = get_client_ip(request)
+    allowed, error, retry_after = check_rate_limit(phone, client_ip)
+    if not allowed:
+        return Response({
+            'error': error,
+            'retry_after': retry_after
+        }, status=status.HTTP_429_TOO_MANY_REQUESTS)
+    
+    # Generate OTP
+    otp = generate_otp()
+    
+    # Store OTP (replaces any previous OTP for this phone; expires after OTP_EXPIRY_MINUTES)
+    get_otp_backend().issue(phone, country_code, otp)
+    
+    # Send SMS in the background (Fast2SMS for +91, Kaicho Group for +977)
+    request_id = enqueue_otp_sms(phone, otp, country_code, client_ip)
+    
     return Response({
-        'message': message,
+        'message': 'OTP is being sent to your phone number',
         'phone': phone,
         'country_code': country_code,
-        'expires_in_minutes': getattr(settings, 'OTP_EXPIRY_MINUTES', 10)
+        'expires_in_minutes': getattr(settings, 'OTP_EXPIRY_MINUTES', 10),
+        'request_id': request_id,
+        'delivery_status': 'queued'
     }, status=status.HTTP_200_OK)
 
 
@@ -264,16 +245,11 @@ def verify_otp_and_register(request):
             'error': 'User already exists with this phone number'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    # Verify OTP
-    try:
-        otp_record = Otp.objects.get(phone=phone, otp=otp, country_code=country_code)
-        if otp_record.is_expired():
-            return Response({
-                'error': 'OTP has expired. Please request a new one'
-            }, status=status.HTTP_400_BAD_REQUEST)
-    except Otp.DoesNotExist:
+    # Verify OTP (invalidated only once the action below succeeds)
+    otp_result = get_otp_backend().verify(phone, country_code, otp, consume=False)
+    if otp_result != otp_store.VALID:
         return Response({
-            'error': 'Invalid OTP code'
+            'error': otp_store.ERROR_MESSAGES[otp_result]
         }, status=status.HTTP_400_BAD_REQUEST)
     
     # Create user
@@ -302,8 +278,8 @@ def verify_otp_and_register(request):
         # Create token
         token, created = Token.objects.get_or_create(user=user)
         
-        # Delete OTP after successful registration
-        otp_record.delete()
+        # Invalidate OTP after successful registration
+        get_otp_backend().invalidate(phone, country_code)
         
         return Response({
             'user': UserSerializer(user).data,
@@ -336,53 +312,52 @@ def resend_otp(request):
             'error': 'User already exists with this phone number'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    # Generate new OTP
-    otp = generate_otp()
-    
-    # Delete any existing OTP for this phone
-    Otp.objects.filter(phone=phone).delete()
-    
-    # Create new OTP with expiration
-    expires_at = timezone.now() + timedelta(minutes=getattr(settings, 'OTP_EXPIRY_MINUTES', 10))
-    Otp.objects.create(
-        phone=phone,
-        otp=otp,
-        country_code=country_code,
-        expires_at=expires_at
-    )
-    
-    # Send SMS based on country code
-    if country_code == '+91':
-        # India: Send SMS via Fast2SMS
-        sms_result = sms_service.send_otp(phone, otp, country_code)
-        if sms_result['success']:
-            message = "OTP sent successfully to your phone number"
-        else:
-            return Response({
-                'error': f"Failed to send SMS: {sms_result['message']}"
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    elif country_code == '+977':
-        # Nepal: Send SMS via Kaicho Group API
-        sms_result = sms_service.send_otp(phone, otp, country_code)
-        if sms_result['success']:
-            message = "OTP sent successfully to your phone number"
-        else:
-            return Response({
-                'error': f"Failed to send SMS: {sms_result['message']}"
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    else:
+    # Validate country code before generating an OTP
+    if country_code not in ('+91', '+977'):
         return Response({
             'error': 'Invalid country code'
         }, status=status.HTTP_400_BAD_REQUEST)
     
+    # Throttle OTP sends per phone number and client IP
+    client_ip = get_client_ip(request)
+    allowed, error, retry_after = check_rate_limit(phone, client_ip)
+    if not allowed:
+        return Response({
+            'error': error,
+            'retry_after': retry_after
+        }, status=status.HTTP_429_TOO_MANY_REQUESTS)
+    
+    # Generate new OTP
+    otp = generate_otp()
+    
+    # Store OTP (replaces any previous OTP for this phone; expires after OTP_EXPIRY_MINUTES)
+    get_otp_backend().issue(phone, country_code, otp)
+    
+    # Send SMS in the background (Fast2SMS for +91, Kaicho Group for +977)
+    request_id = enqueue_otp_sms(phone, otp, country_code, client_ip)
+    
     return Response({
-        'message': message,
+        'message': 'OTP is being sent to your phone number',
         'phone': phone,
         'country_code': country_code,
-        'expires_in_minutes': getattr(settings, 'OTP_EXPIRY_MINUTES', 10)
+        'expires_in_minutes': getattr(settings, 'OTP_EXPIRY_MINUTES', 10),
+        'request_id': request_id,
+        'delivery_status': 'queued'
     }, status=status.HTTP_200_OK)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def otp_delivery_status(request, request_id):
+    """Delivery state of a queued OTP SMS (queued, sending, sent, failed)"""
+    dispatch_status = get_dispatch_status(request_id)
+    if not dispatch_status:
+        return Response({
+            'error': 'Unknown or expired OTP request'
+        }, status=status.HTTP_404_NOT_FOUND)
+    return Response(dispatch_status, status=status.HTTP_200_OK)
+
+
 # Forgot Password Views
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
@@ -403,50 +378,37 @@ def send_forgot_password_otp(request):
             'error': 'No account found with this phone number'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    # Generate OTP
-    otp = generate_otp()
-    
-    # Delete any existing OTP for this phone
-    Otp.objects.filter(phone=phone).delete()
-    
-    # Create new OTP with expiration
-    expires_at = timezone.now() + timedelta(minutes=getattr(settings, 'OTP_EXPIRY_MINUTES', 10))
-    Otp.objects.create(
-        phone=phone,
-        otp=otp,
-        country_code=country_code,
-        expires_at=expires_at
-    )
-    
-    # Send SMS based on country code
-    if country_code == '+91':
-        # India: Send SMS via Fast2SMS
-        sms_result = sms_service.send_otp(phone, otp, country_code)
-        if sms_result['success']:
-            message = "OTP sent successfully to your phone number"
-        else:
-            return Response({
-                'error': f"Failed to send SMS: {sms_result['message']}"
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    elif country_code == '+977':
-        # Nepal: Send SMS via Kaicho Group API
-        sms_result = sms_service.send_otp(phone, otp, country_code)
-        if sms_result['success']:
-            message = "OTP sent successfully to your phone number"
-        else:
-            return Response({
-                'error': f"Failed to send SMS: {sms_result['message']}"
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    else:
+    # Validate country code before generating an OTP
+    if country_code not in ('+91', '+977'):
         return Response({
             'error': 'Invalid country code'
         }, status=status.HTTP_400_BAD_REQUEST)
     
+    # Throttle OTP sends per phone number and client IP
+    client_ip = get_client_ip(request)
+    allowed, error, retry_after = check_rate_limit(phone, client_ip)
+    if not allowed:
+        return Response({
+            'error': error,
+            'retry_after': retry_after
+        }, status=status.HTTP_429_TOO_MANY_REQUESTS)
+    
+    # Generate OTP
+    otp = generate_otp()
+    
+    # Store OTP (replaces any previous OTP for this phone; expires after OTP_EXPIRY_MINUTES)
+    get_otp_backend().issue(phone, country_code, otp)
+    
+    # Send SMS in the background (Fast2SMS for +91, Kaicho Group for +977)
+    request_id = enqueue_otp_sms(phone, otp, country_code, client_ip)
+    
     return Response({
-        'message': message,
+        'message': 'OTP is being sent to your phone number',
         'phone': phone,
         'country_code': country_code,
-        'expires_in_minutes': getattr(settings, 'OTP_EXPIRY_MINUTES', 10)
+        'expires_in_minutes': getattr(settings, 'OTP_EXPIRY_MINUTES', 10),
+        'request_id': request_id,
+        'delivery_status': 'queued'
     }, status=status.HTTP_200_OK)
 
 
@@ -470,16 +432,11 @@ def verify_forgot_password_otp(request):
             'error': 'No account found with this phone number'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    # Verify OTP
-    try:
-        otp_record = Otp.objects.get(phone=phone, otp=otp, country_code=country_code)
-        if otp_record.is_expired():
-            return Response({
-                'error': 'OTP has expired. Please request a new one'
-            }, status=status.HTTP_400_BAD_REQUEST)
-    except Otp.DoesNotExist:
+    # Verify OTP (invalidated only once the action below succeeds)
+    otp_result = get_otp_backend().verify(phone, country_code, otp, consume=False)
+    if otp_result != otp_store.VALID:
         return Response({
-            'error': 'Invalid OTP code'
+            'error': otp_store.ERROR_MESSAGES[otp_result]
         }, status=status.HTTP_400_BAD_REQUEST)
     
     return Response({
@@ -510,16 +467,11 @@ def reset_password(request):
             'error': 'No account found with this phone number'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    # Verify OTP
-    try:
-        otp_record = Otp.objects.get(phone=phone, otp=otp, country_code=country_code)
-        if otp_record.is_expired():
-            return Response({
-                'error': 'OTP has expired. Please request a new one'
-            }, status=status.HTTP_400_BAD_REQUEST)
-    except Otp.DoesNotExist:
+    # Verify OTP (invalidated only once the action below succeeds)
+    otp_result = get_otp_backend().verify(phone, country_code, otp, consume=False)
+    if otp_result != otp_store.VALID:
         return Response({
-            'error': 'Invalid OTP code'
+            'error': otp_store.ERROR_MESSAGES[otp_result]
         }, status=status.HTTP_400_BAD_REQUEST)
     
     # Update password
@@ -527,8 +479,8 @@ def reset_password(request):
         user.set_password(new_password)
         user.save()
         
-        # Delete OTP after successful reset
-        otp_record.delete()
+        # Invalidate OTP after successful reset
+        get_otp_backend().invalidate(phone, country_code)
         
         return Response({
             'message': 'Password reset successfully'
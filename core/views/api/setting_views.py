@@ -2,6 +2,7 @@ from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from ...models import SuperSetting
+from ...services.platform_balance import get_platform_balance
 import sys
 import traceback
 
@@ -25,7 +26,7 @@ def super_setting(request):
             'sales_commission': float(setting.sales_commission),
             'shipping_charge_commission': int(setting.shipping_charge_commission),
             'travel_ticket_percentage': float(setting.travel_ticket_percentage),
-            'balance': float(setting.balance),
+            'balance': float(get_platform_balance()),
             'merchant_agreement_file': merchant_agreement_file_url,
             'is_phone_pe': setting.is_phone_pe,
             'is_sabpaisa': setting.is_sabpaisa,
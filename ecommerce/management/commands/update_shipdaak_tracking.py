@@ -1,13 +1,13 @@
 """
 Django management command to update order tracking from Shipdaak
 Run this periodically (e.g., every 30 minutes via cron or Celery)
+
+Shipments are picked by due time (see ecommerce.services.shipdaak_tracking),
+fetched through a bounded worker pool and written back in bulk.
 """
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from django.db.models import Q
-from ecommerce.models import Order
 from ecommerce.services.shipdaak_service import ShipdaakService
-import traceback
+from ecommerce.services.shipdaak_tracking import trackable_orders, due_for_tracking, sync_tracking
 
 
 class Command(BaseCommand):
@@ -20,111 +20,62 @@ class Command(BaseCommand):
             default=100,
             help='Maximum number of orders to process (default: 100)',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Number of concurrent Shipdaak tracking requests (default: 8)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Number of orders fetched and written per batch (default: 200)',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Track every in-flight shipment, ignoring per-status refresh intervals',
+        )
 
     def handle(self, *args, **options):
         limit = options['limit']
+        workers = options['workers']
+        batch_size = max(1, options['batch_size'])
         
         # Get orders with AWB numbers that are not yet delivered
-        orders = Order.objects.filter(
-            shipdaak_awb_number__isnull=False
-        ).exclude(
-            Q(status='delivered') | Q(status='cancelled') | Q(status='refunded')
-        ).select_related('merchant')[:limit]
+        if options['all']:
+            queryset = trackable_orders().order_by('shipdaak_tracking_checked_at')
+        else:
+            queryset = due_for_tracking()
+        orders = list(queryset.select_related('merchant')[:limit])
         
-        if not orders.exists():
+        if not orders:
             self.stdout.write(self.style.SUCCESS('No orders to track'))
             return
         
-        self.stdout.write(f'Processing {orders.count()} orders...')
+        self.stdout.write(f'Processing {len(orders)} orders with {workers} workers...')
         
         shipdaak = ShipdaakService()
         updated_count = 0
         error_count = 0
+        elapsed = 0.0
         
-        for order in orders:
-            try:
-                tracking_data = shipdaak.track_shipment(order.shipdaak_awb_number)
-                
-                if not tracking_data:
-                    error_count += 1
-                    continue
-                
-                # Update Shipdaak status
-                shipdaak_status = tracking_data.get('status', '').lower()
-                order.shipdaak_status = tracking_data.get('status')
-                
-                # Map Shipdaak status to order status
-                status_mapping = {
-                    'pending pickup': 'accepted',
-                    'picked up': 'shipped',
-                    'in transit': 'shipped',
-                    'out for delivery': 'shipped',
-                    'delivered': 'delivered',
-                    'rto': 'cancelled',  # Handle RTO as cancelled
-                    'cancelled': 'cancelled',
-                }
-                
-                # Update order status based on Shipdaak status
-                new_status = None
-                for shipdaak_key, order_status in status_mapping.items():
-                    if shipdaak_key in shipdaak_status:
-                        new_status = order_status
-                        break
-                
-                if new_status and new_status != order.status:
-                    order.status = new_status
-                    self.stdout.write(
-                        f'Order {order.order_number}: Status updated to {new_status}'
-                    )
-                
-                # Update dates from tracking data
-                if tracking_data.get('pickupDate'):
-                    try:
-                        from datetime import datetime
-                        pickup_date = datetime.fromisoformat(
-                            tracking_data['pickupDate'].replace('Z', '+00:00')
-                        )
-                        if timezone.is_naive(pickup_date):
-                            pickup_date = timezone.make_aware(pickup_date)
-                        if not order.pickup_date:
-                            order.pickup_date = pickup_date
-                    except (ValueError, TypeError):
-                        pass
-                
-                if tracking_data.get('deliveredDate'):
-                    try:
-                        from datetime import datetime
-                        delivered_date = datetime.fromisoformat(
-                            tracking_data['deliveredDate'].replace('Z', '+00:00')
-                        )
-                        if timezone.is_naive(delivered_date):
-                            delivered_date = timezone.make_aware(delivered_date)
-                        if not order.delivered_date:
-                            order.delivered_date = delivered_date
-                    except (ValueError, TypeError):
-                        pass
-                
-                # Save order
-                order.save()
-                updated_count += 1
-                
-            except Exception as e:
-                error_count += 1
-                print(
-                    f"[ERROR] Error updating tracking for order {order.order_number} "
-                    f"(AWB: {order.shipdaak_awb_number}): {str(e)}"
-                )
-                traceback.print_exc()
+        for start in range(0, len(orders), batch_size):
+            result = sync_tracking(orders[start:start + batch_size], max_workers=workers, shipdaak=shipdaak)
+            updated_count += result['updated']
+            error_count += result['errors']
+            elapsed += result['elapsed']
+            for order in result['status_changes']:
                 self.stdout.write(
-                    self.style.ERROR(
-                        f'Error processing order {order.order_number}: {str(e)}'
-                    )
+                    f'Order {order.order_number}: Status updated to {order.status}'
                 )
         
+        throughput = len(orders) / elapsed if elapsed else 0
         self.stdout.write(
             self.style.SUCCESS(
                 f'Successfully updated {updated_count} orders. '
-                f'Errors: {error_count}'
+                f'Errors: {error_count}. '
+                f'Took {elapsed:.1f}s ({throughput:.1f} orders/s)'
             )
         )
-
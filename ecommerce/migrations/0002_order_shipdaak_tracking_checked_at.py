@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 04:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecommerce', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='shipdaak_tracking_checked_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='When tracking was last fetched from Shipdaak', null=True),
+        ),
+    ]
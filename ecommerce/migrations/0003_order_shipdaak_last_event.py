@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 04:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecommerce', '0002_order_shipdaak_tracking_checked_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='shipdaak_last_event',
+            field=models.CharField(blank=True, help_text='Latest Shipdaak tracking event (snapshot)', max_length=255, null=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_kpidailyrollup'),
+        ('ecommerce', '0003_order_shipdaak_last_event'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['merchant', 'updated_at'], name='ecommerce_o_merchan_08722b_idx'),
+        ),
+    ]
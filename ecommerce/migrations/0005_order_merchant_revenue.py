@@ -0,0 +1,56 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:21
+
+from django.conf import settings
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import F, Value, DecimalField, ExpressionWrapper
+from django.db.models.functions import Round
+
+
+def backfill_order_revenue(apps, schema_editor):
+    """Store commission/revenue for existing orders with one UPDATE"""
+    Order = apps.get_model('ecommerce', 'Order')
+    SuperSetting = apps.get_model('core', 'SuperSetting')
+    super_setting = SuperSetting.objects.first()
+    percentage = Decimal(str(super_setting.sales_commission)) if super_setting else Decimal('0')
+
+    money = DecimalField(max_digits=14, decimal_places=2)
+    commission = Round(
+        ExpressionWrapper(
+            F('subtotal') * Value(percentage, output_field=money) / Value(Decimal('100'), output_field=money),
+            output_field=money,
+        ),
+        2,
+        output_field=money,
+    )
+    Order.objects.filter(merchant_commission__isnull=True).update(
+        merchant_commission=commission,
+        merchant_revenue=ExpressionWrapper(F('total_amount') - commission, output_field=money),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_kpidailyrollup'),
+        ('ecommerce', '0004_order_merchant_updated_at_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='merchant_commission',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Sales commission on the subtotal, fixed when the order is finalized', max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='merchant_revenue',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Order total minus merchant_commission, fixed when the order is finalized', max_digits=10, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['merchant', '-created_at', '-id'], name='ecommerce_o_merchan_f1e1b7_idx'),
+        ),
+        migrations.RunPython(backfill_order_revenue, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_synctombstone'),
+        ('ecommerce', '0005_order_merchant_revenue'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'updated_at'], name='ecommerce_o_user_id_0de8e2_idx'),
+        ),
+    ]
@@ -287,12 +287,16 @@ class Order(models.Model):
     shipdaak_status = models.CharField(max_length=50, blank=True, null=True, help_text='Current Shipdaak shipment status')
     shipdaak_courier_id = models.IntegerField(null=True, blank=True, help_text='Shipdaak courier ID used for shipment')
     shipdaak_courier_name = models.CharField(max_length=100, blank=True, null=True, help_text='Shipdaak courier name')
+    shipdaak_tracking_checked_at = models.DateTimeField(null=True, blank=True, db_index=True, help_text='When tracking was last fetched from Shipdaak')
+    shipdaak_last_event = models.CharField(max_length=255, blank=True, null=True, help_text='Latest Shipdaak tracking event (snapshot)')
     # Package dimensions (set when merchant accepts order)
     package_length = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True, help_text='Package length in cm')
     package_breadth = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True, help_text='Package breadth in cm')
     package_height = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True, help_text='Package height in cm')
     package_weight = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True, help_text='Package weight in grams')
     commission_processed = models.BooleanField(default=False, help_text='Whether commission has been processed for this order')
+    merchant_commission = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, help_text='Sales commission on the subtotal, fixed when the order is finalized')
+    merchant_revenue = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, help_text='Order total minus merchant_commission, fixed when the order is finalized')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -301,6 +305,11 @@ class Order(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['merchant', 'updated_at']),
+            models.Index(fields=['merchant', '-created_at', '-id']),
+            models.Index(fields=['user', 'updated_at']),
+        ]
 
 
 class OrderItem(models.Model):
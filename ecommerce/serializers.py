@@ -1,5 +1,7 @@
 from rest_framework import serializers
+from collections import defaultdict
 from decimal import Decimal
+from django.db.models import Prefetch
 from .models import (
     Store, Category, Product, ProductImage, Cart, Order, OrderItem, 
     Review, Wishlist, Coupon, Banner, Popup,
@@ -55,10 +57,20 @@ class CategorySerializer(serializers.ModelSerializer):
     
     def get_subcategories(self, obj):
         # Filter only active subcategories and recursively serialize them
-        active_subcategories = obj.subcategories.filter(is_active=True)
-        if active_subcategories.exists():
+        active_subcategories = self._active_subcategories_by_parent().get(obj.id)
+        if active_subcategories:
             return CategorySerializer(active_subcategories, many=True, context=self.context).data
         return []
+    
+    def _active_subcategories_by_parent(self):
+        """Active categories grouped by parent id, loaded with one query per serialization (shared via context)"""
+        by_parent = self.context.get('_active_subcategories_by_parent')
+        if by_parent is None:
+            by_parent = defaultdict(list)
+            for category in Category.objects.filter(is_active=True, parent__isnull=False):
+                by_parent[category.parent_id].append(category)
+            self.context['_active_subcategories_by_parent'] = by_parent
+        return by_parent
 
 
 class ProductImageSerializer(serializers.ModelSerializer):
@@ -295,6 +307,21 @@ class OrderSerializer(serializers.ModelSerializer):
     shipping_address = AddressSerializer(read_only=True)
     billing_address = AddressSerializer(read_only=True)
     
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Load everything the serializer nests (items -> product -> store/category/images/reviews)
+        with a fixed number of queries, however many orders and items are serialized
+        """
+        items = OrderItem.objects.select_related(
+            'store__owner', 'product__store__owner', 'product__category'
+        ).prefetch_related(
+            'product__images', 'product__reviews'
+        )
+        return queryset.select_related(
+            'user', 'merchant__owner', 'shipping_address', 'billing_address'
+        ).prefetch_related(Prefetch('items', queryset=items))
+    
     class Meta:
         model = Order
         fields = ['id', 'order_number', 'user', 'merchant', 'status', 'subtotal', 'shipping_cost',
@@ -456,14 +483,14 @@ class OrderCreateSerializer(serializers.ModelSerializer):
             
             # Shipping charge history will be created when merchant accepts order
             
-            # Send push notification to merchant
+            # Queue push notification to merchant (sent by the outbox dispatcher)
             try:
                 from core.services.fcm_service import FCMService
                 if store.owner:
-                    FCMService.send_order_notification(store.owner, order)
+                    FCMService.queue_order_notification(store.owner, order)
             except Exception as e:
                 import sys
-                print(f"[ERROR] Failed to send order notification: {str(e)}")
+                print(f"[ERROR] Failed to queue order notification: {str(e)}")
                 sys.stdout.flush()
             
             created_orders.append(order)
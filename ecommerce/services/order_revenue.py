@@ -0,0 +1,78 @@
+"""
+Merchant revenue per order
+Revenue = order total - sales commission, where the commission is the
+SuperSetting sales commission percentage of the subtotal rounded to 2
+places. The values are stored on Order (merchant_commission /
+merchant_revenue) when its commission is processed, freezing them at that
+rate; until then they are computed from the current percentage, in SQL for
+querysets.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+from django.db.models import Case, F, Value, When, DecimalField, ExpressionWrapper
+from django.db.models.functions import Round
+from core.models import SuperSetting
+
+TWO_PLACES = Decimal('0.01')
+
+
+def get_sales_commission_percentage():
+    """Current sales commission percentage from SuperSetting"""
+    super_setting = SuperSetting.objects.only('sales_commission').first()
+    if not super_setting:
+        super_setting = SuperSetting.objects.create()
+    return Decimal(str(super_setting.sales_commission))
+
+
+def compute_order_revenue(subtotal, total_amount, sales_commission_percentage):
+    """
+    Commission and revenue for order amounts
+
+    Returns:
+        tuple: (commission, revenue) as Decimals rounded to 2 places
+    """
+    commission = (Decimal(str(subtotal)) * sales_commission_percentage / Decimal('100')).quantize(
+        TWO_PLACES, rounding=ROUND_HALF_UP
+    )
+    revenue = (Decimal(str(total_amount)) - commission).quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+    return commission, revenue
+
+
+def apply_order_revenue(order, sales_commission_percentage=None):
+    """Set merchant_commission / merchant_revenue on an order instance (not saved)"""
+    if sales_commission_percentage is None:
+        sales_commission_percentage = get_sales_commission_percentage()
+    order.merchant_commission, order.merchant_revenue = compute_order_revenue(
+        order.subtotal or 0, order.total_amount or 0, sales_commission_percentage
+    )
+
+
+def order_revenue_expressions(sales_commission_percentage):
+    """
+    Database expressions for an Order queryset
+
+    Returns:
+        tuple: (commission, revenue) expressions; stored values are used once the
+            commission is processed, otherwise the commission is computed and
+            rounded per order as in compute_order_revenue
+    """
+    money = DecimalField(max_digits=14, decimal_places=2)
+    computed_commission = Round(
+        ExpressionWrapper(
+            F('subtotal') * Value(sales_commission_percentage, output_field=money) / Value(Decimal('100'), output_field=money),
+            output_field=money,
+        ),
+        2,
+        output_field=money,
+    )
+    stored = {'commission_processed': True, 'merchant_revenue__isnull': False}
+    commission = Case(
+        When(then=F('merchant_commission'), **stored),
+        default=computed_commission,
+        output_field=money,
+    )
+    revenue = Case(
+        When(then=F('merchant_revenue'), **stored),
+        default=ExpressionWrapper(F('total_amount') - computed_commission, output_field=money),
+        output_field=money,
+    )
+    return commission, revenue
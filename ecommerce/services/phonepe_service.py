@@ -696,10 +696,11 @@ def get_merchant_auth_token():
             print("ERROR: PhonePe credentials not configured for auth token")
             return None
         
-        # Construct auth URL based on environment
-        if env == 'PRODUCTION':
+        # Construct auth URL based on environment (PHONEPE_AUTH_TOKEN_URL overrides, e.g. for the simulator)
+        auth_url = getattr(settings, 'PHONEPE_AUTH_TOKEN_URL', None)
+        if not auth_url and env == 'PRODUCTION':
             auth_url = 'https://api.phonepe.com/apis/identity-manager/v1/oauth/token'
-        else:
+        elif not auth_url:
             auth_url = 'https://api-preprod.phonepe.com/apis/identity-manager/v1/oauth/token'
         
         print(f"[INFO] Getting auth token from: {auth_url}")
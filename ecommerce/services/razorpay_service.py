@@ -29,7 +29,12 @@ def get_razorpay_client():
         if not key_id or not key_secret:
             raise ValueError("RAZORPAY_KEY_ID and RAZORPAY_KEY_SECRET must be set in settings")
         
-        _razorpay_client = razorpay.Client(auth=(key_id, key_secret))
+        # RAZORPAY_API_BASE_URL overrides the API host (e.g. for the gateway simulator)
+        base_url = getattr(settings, 'RAZORPAY_API_BASE_URL', None)
+        if base_url:
+            _razorpay_client = razorpay.Client(auth=(key_id, key_secret), base_url=base_url)
+        else:
+            _razorpay_client = razorpay.Client(auth=(key_id, key_secret))
     
     return _razorpay_client
 
@@ -8,6 +8,8 @@ import base64
 import json
 import traceback
 import sys
+import math
+import threading
 from typing import Dict, Any, Optional, List
 from django.conf import settings
 from django.core.cache import cache
@@ -24,6 +26,10 @@ class ShipdaakService:
         self.password = getattr(settings, 'SHIPDAAK_API_PASSWORD', '')
         self.token_cache_key = getattr(settings, 'SHIPDAAK_TOKEN_CACHE_KEY', 'shipdaak_access_token')
         self.token_expiry_cache_key = getattr(settings, 'SHIPDAAK_TOKEN_EXPIRY_CACHE_KEY', 'shipdaak_token_expiry')
+        self.rate_cache_ttl = getattr(settings, 'SHIPDAAK_RATE_CACHE_TTL', 60 * 30)
+        self.rate_cache_stale_ttl = getattr(settings, 'SHIPDAAK_RATE_CACHE_STALE_TTL', 60 * 60 * 6)
+        self.rate_cache_weight_band = getattr(settings, 'SHIPDAAK_RATE_CACHE_WEIGHT_BAND', 500)
+        self.rate_cache_amount_band = getattr(settings, 'SHIPDAAK_RATE_CACHE_AMOUNT_BAND', 500)
         
         if not self.base_url:
             print("[WARNING] SHIPDAAK_API_BASE_URL not configured in settings")
@@ -778,6 +784,116 @@ class ShipdaakService:
             traceback.print_exc()
             return None
     
+    RATE_CACHE_PREFIX = 'shipdaak_rate'
+    RATE_CACHE_HITS_KEY = 'shipdaak_rate_cache_hits'
+    RATE_CACHE_MISSES_KEY = 'shipdaak_rate_cache_misses'
+    RATE_CACHE_STALE_HITS_KEY = 'shipdaak_rate_cache_stale_hits'
+    
+    @staticmethod
+    def _normalize_pincode(pincode) -> Optional[str]:
+        """
+        Normalize a pincode to exactly 6 digits
+        
+        Returns:
+            6 digit pincode string or None if no digits are present
+        """
+        pincode = re.sub(r'\D', '', str(pincode or ''))
+        if len(pincode) >= 6:
+            return pincode[:6]
+        elif len(pincode) > 0:
+            return pincode.zfill(6)
+        return None
+    
+    @staticmethod
+    def _band(value: float, size: int) -> int:
+        """Upper bound of the slab of the given size that a value falls into"""
+        size = size or 500
+        return max(1, int(math.ceil(float(value) / size))) * size
+    
+    def _weight_band(self, grams: float) -> int:
+        """Upper bound (in grams) of the weight slab the given weight falls into"""
+        return self._band(grams, self.rate_cache_weight_band)
+    
+    def _rate_cache_key(self, origin_pincode: str, destination_pincode: str, weight: float,
+                        length: float, breadth: float, height: float, order_amount: float,
+                        filter_type: str) -> str:
+        """
+        Build the quote cache key for a rate/serviceability lookup
+        
+        Quotes are keyed on the pincode pair plus the order-amount band, the
+        dead-weight band and the volumetric-weight band (L x B x H / 5000 kg,
+        expressed in grams), because couriers price per weight slab rather than
+        per exact gram, and the order amount feeds COD and insurance charges.
+        """
+        volumetric_grams = float(length) * float(breadth) * float(height) / 5
+        return (
+            f"{self.RATE_CACHE_PREFIX}:{filter_type}:{origin_pincode}:{destination_pincode}:"
+            f"a{self._band(order_amount, self.rate_cache_amount_band)}:"
+            f"w{self._weight_band(weight)}:v{self._weight_band(volumetric_grams)}"
+        )
+    
+    def _incr_rate_counter(self, key: str) -> None:
+        """Increment a rate cache counter, creating it if missing"""
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 0, None)
+            cache.incr(key)
+    
+    def get_rate_cache_stats(self) -> Dict[str, int]:
+        """
+        Get hit/miss counters for the rate quote cache
+        
+        Returns:
+            Dict with 'hits', 'stale_hits' and 'misses'
+        """
+        return {
+            'hits': cache.get(self.RATE_CACHE_HITS_KEY, 0),
+            'stale_hits': cache.get(self.RATE_CACHE_STALE_HITS_KEY, 0),
+            'misses': cache.get(self.RATE_CACHE_MISSES_KEY, 0),
+        }
+    
+    def _refresh_rate_quote(self, cache_key: str, request_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Fetch a rate quote from Shipdaak and store it in the quote cache
+        
+        Args:
+            cache_key: Quote cache key
+            request_data: Request body for get-rate-serviceability
+        
+        Returns:
+            Response data or None if the API call fails
+        """
+        response = self._make_request('POST', '/v1/courier/get-rate-serviceability', data=request_data)
+        if response:
+            cache.set(
+                cache_key,
+                {'data': response, 'fetched_at': timezone.now(), 'request': request_data},
+                self.rate_cache_ttl + self.rate_cache_stale_ttl
+            )
+        return response
+    
+    def _refresh_rate_quote_async(self, cache_key: str, request_data: Dict[str, Any]) -> None:
+        """
+        Revalidate a stale quote in a background thread
+        
+        A short-lived lock key ensures only one refresh per quote is in flight.
+        """
+        lock_key = f"{cache_key}:refreshing"
+        if not cache.add(lock_key, True, 60):
+            return
+        
+        def _worker():
+            try:
+                self._refresh_rate_quote(cache_key, request_data)
+            except Exception as e:
+                print(f"[WARNING] Background refresh of Shipdaak rate quote failed: {str(e)}")
+                sys.stdout.flush()
+            finally:
+                cache.delete(lock_key)
+        
+        threading.Thread(target=_worker, daemon=True).start()
+    
     def get_rate_serviceability(
         self,
         origin_pincode: str,
@@ -788,11 +904,17 @@ class ShipdaakService:
         height: float,
         order_amount: float,
         payment_type: str = "prepaid",
-        filter_type: str = "rate"
+        filter_type: str = "rate",
+        use_cache: bool = True
     ) -> Optional[Dict[str, Any]]:
         """
         Get courier rates and serviceability for given parameters
         
+        Quotes are served from a cache keyed by pincode pair and weight/volumetric
+        bands. Fresh quotes (younger than SHIPDAAK_RATE_CACHE_TTL) are returned as-is;
+        stale quotes (within SHIPDAAK_RATE_CACHE_STALE_TTL after that) are returned
+        immediately while a background refresh re-sends the request that produced them.
+        
         Args:
             origin_pincode: Origin pincode (6 digits)
             destination_pincode: Destination pincode (6 digits)
@@ -803,31 +925,26 @@ class ShipdaakService:
             order_amount: Order amount
             payment_type: Payment type ('cod' or 'prepaid')
             filter_type: Filter type ('rate' or 'serviceability')
+            use_cache: Whether to use the quote cache (False always calls the API)
         
         Returns:
             Dict with courier rates and serviceability data or None if fails
         """
         try:
             # Validate and normalize pincodes
-            origin_pincode = re.sub(r'\D', '', str(origin_pincode))
-            if len(origin_pincode) >= 6:
-                origin_pincode = origin_pincode[:6]
-            elif len(origin_pincode) > 0:
-                origin_pincode = origin_pincode.zfill(6)
-            else:
+            normalized_origin = self._normalize_pincode(origin_pincode)
+            if not normalized_origin:
                 print(f"[ERROR] Invalid origin pincode: {origin_pincode}")
                 sys.stdout.flush()
                 return None
+            origin_pincode = normalized_origin
             
-            destination_pincode = re.sub(r'\D', '', str(destination_pincode))
-            if len(destination_pincode) >= 6:
-                destination_pincode = destination_pincode[:6]
-            elif len(destination_pincode) > 0:
-                destination_pincode = destination_pincode.zfill(6)
-            else:
+            normalized_destination = self._normalize_pincode(destination_pincode)
+            if not normalized_destination:
                 print(f"[ERROR] Invalid destination pincode: {destination_pincode}")
                 sys.stdout.flush()
                 return None
+            destination_pincode = normalized_destination
             
             # Prepare request data
             request_data = {
@@ -842,11 +959,30 @@ class ShipdaakService:
                 "orderAmount": float(order_amount)
             }
             
+            cache_key = self._rate_cache_key(
+                origin_pincode, destination_pincode, weight, length, breadth, height, order_amount, filter_type
+            )
+            
+            if use_cache:
+                cached = cache.get(cache_key)
+                if cached:
+                    age = (timezone.now() - cached['fetched_at']).total_seconds()
+                    if age < self.rate_cache_ttl:
+                        self._incr_rate_counter(self.RATE_CACHE_HITS_KEY)
+                    else:
+                        self._incr_rate_counter(self.RATE_CACHE_STALE_HITS_KEY)
+                        # Re-send the original request so the entry isn't rewritten with this caller's amounts
+                        self._refresh_rate_quote_async(cache_key, cached.get('request', request_data))
+                    print(f"[INFO] Shipdaak rate quote served from cache: {cache_key} (age={int(age)}s)")
+                    sys.stdout.flush()
+                    return cached['data']
+                self._incr_rate_counter(self.RATE_CACHE_MISSES_KEY)
+            
             print(f"[INFO] Shipdaak API Request - get-rate-serviceability:")
             print(f"[INFO] Request Data: {json.dumps(request_data, indent=2)}")
             sys.stdout.flush()
             
-            response = self._make_request('POST', '/v1/courier/get-rate-serviceability', data=request_data)
+            response = self._refresh_rate_quote(cache_key, request_data)
             
             if response:
                 print(f"[INFO] Shipdaak API Response (raw): {json.dumps(response, indent=2, default=str)}")
@@ -863,4 +999,3 @@ class ShipdaakService:
             print(f"[ERROR] Error getting courier rates: {str(e)}")
             traceback.print_exc()
             return None
-
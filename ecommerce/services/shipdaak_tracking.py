@@ -0,0 +1,304 @@
+"""
+Shipdaak tracking sync helpers
+Shared by the update_shipdaak_tracking command and admin tracking views
+"""
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, List, Iterable
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q, Case, When, Value, IntegerField
+from django.utils import timezone
+from ecommerce.models import Order
+from ecommerce.services.shipdaak_service import ShipdaakService
+
+
+# Map Shipdaak status to order status
+STATUS_MAPPING = {
+    'pending pickup': 'accepted',
+    'picked up': 'shipped',
+    'in transit': 'shipped',
+    'out for delivery': 'shipped',
+    'delivered': 'delivered',
+    'rto': 'cancelled',  # Handle RTO as cancelled
+    'cancelled': 'cancelled',
+}
+
+# How often a shipment is re-checked, by Shipdaak status (first match wins).
+# Shipments close to delivery change often; pending pickups rarely do.
+REFRESH_INTERVALS = [
+    ('out for delivery', timedelta(minutes=15)),
+    ('in transit', timedelta(minutes=60)),
+    ('picked up', timedelta(minutes=60)),
+    ('pending pickup', timedelta(hours=3)),
+]
+DEFAULT_REFRESH_INTERVAL = timedelta(hours=1)
+# A failed lookup is retried this soon instead of waiting a full refresh interval
+RETRY_INTERVAL = timedelta(minutes=10)
+
+TERMINAL_ORDER_STATUSES = ['delivered', 'cancelled', 'refunded']
+
+# Tracked fields; an order is only rewritten (and its updated_at bumped) when one of them changes
+TRACKED_FIELDS = ['shipdaak_status', 'shipdaak_last_event', 'pickup_date', 'delivered_date']
+
+# Fields written by bulk_update for orders whose order status did not change
+TRACKING_FIELDS = TRACKED_FIELDS + ['shipdaak_tracking_checked_at', 'updated_at']
+
+REFRESH_LOCK_PREFIX = 'shipdaak_tracking_refresh'
+
+
+def trackable_orders():
+    """Orders with an AWB number that are not in a terminal state"""
+    return Order.objects.filter(
+        shipdaak_awb_number__isnull=False
+    ).exclude(
+        shipdaak_awb_number=''
+    ).exclude(
+        status__in=TERMINAL_ORDER_STATUSES
+    )
+
+
+def refresh_interval(shipdaak_status) -> timedelta:
+    """How often a shipment with the given Shipdaak status is re-checked (as in due_for_tracking)"""
+    shipdaak_status = (shipdaak_status or '').lower()
+    for status_key, interval in REFRESH_INTERVALS:
+        if status_key in shipdaak_status:
+            return interval
+    return DEFAULT_REFRESH_INTERVAL
+
+
+def due_for_tracking(queryset=None, now=None):
+    """
+    Filter and order shipments that are due for a tracking refresh
+    
+    Never-checked shipments come first, then by status priority
+    (out for delivery before in transit before pending pickup) and oldest check.
+    """
+    now = now or timezone.now()
+    queryset = queryset if queryset is not None else trackable_orders()
+    
+    due = Q(shipdaak_tracking_checked_at__isnull=True)
+    known = Q()
+    priority_whens = []
+    for index, (status_key, interval) in enumerate(REFRESH_INTERVALS):
+        status_q = Q(shipdaak_status__icontains=status_key)
+        due |= status_q & Q(shipdaak_tracking_checked_at__lte=now - interval)
+        known |= status_q
+        priority_whens.append(When(status_q, then=Value(index)))
+    due |= ~known & Q(shipdaak_tracking_checked_at__lte=now - DEFAULT_REFRESH_INTERVAL)
+    
+    return queryset.filter(due).annotate(
+        never_checked=Case(
+            When(shipdaak_tracking_checked_at__isnull=True, then=Value(0)),
+            default=Value(1),
+            output_field=IntegerField()
+        ),
+        tracking_priority=Case(*priority_whens, default=Value(len(REFRESH_INTERVALS)), output_field=IntegerField())
+    ).order_by('never_checked', 'tracking_priority', 'shipdaak_tracking_checked_at')
+
+
+def _parse_tracking_date(value) -> Optional[datetime]:
+    """Parse an ISO date from Shipdaak tracking data"""
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def _latest_event(tracking_data: Dict[str, Any]) -> Optional[str]:
+    """Summarize the most recent tracking history event as a short string"""
+    history = tracking_data.get('history') or []
+    if not isinstance(history, list) or not history:
+        return None
+    event = max(history, key=lambda e: str(e.get('eventTime') or '') if isinstance(e, dict) else '')
+    if not isinstance(event, dict):
+        return None
+    parts = [event.get('statusCode'), event.get('message'), event.get('location')]
+    summary = ' - '.join(str(part) for part in parts if part)
+    return summary[:255] or None
+
+
+def is_tracking_stale(order, now=None) -> bool:
+    """Whether an order's stored tracking snapshot is older than SHIPDAAK_TRACKING_STALE_MINUTES"""
+    if order.status in TERMINAL_ORDER_STATUSES or not order.shipdaak_awb_number:
+        return False
+    if not order.shipdaak_tracking_checked_at:
+        return True
+    now = now or timezone.now()
+    stale_after = timedelta(minutes=getattr(settings, 'SHIPDAAK_TRACKING_STALE_MINUTES', 30))
+    return order.shipdaak_tracking_checked_at <= now - stale_after
+
+
+def apply_tracking_data(order, tracking_data: Dict[str, Any]) -> bool:
+    """
+    Apply Shipdaak tracking data to an order instance (does not save)
+    
+    Returns:
+        True if the order status changed
+    """
+    shipdaak_status = (tracking_data.get('status') or '').lower()
+    order.shipdaak_status = tracking_data.get('status')
+    order.shipdaak_last_event = _latest_event(tracking_data) or order.shipdaak_last_event
+    
+    new_status = None
+    for shipdaak_key, order_status in STATUS_MAPPING.items():
+        if shipdaak_key in shipdaak_status:
+            new_status = order_status
+            break
+    
+    status_changed = bool(new_status and new_status != order.status)
+    if status_changed:
+        order.status = new_status
+    
+    if tracking_data.get('pickupDate') and not order.pickup_date:
+        order.pickup_date = _parse_tracking_date(tracking_data['pickupDate'])
+    
+    if tracking_data.get('deliveredDate') and not order.delivered_date:
+        order.delivered_date = _parse_tracking_date(tracking_data['deliveredDate'])
+    
+    return status_changed
+
+
+def fetch_tracking(awb_numbers: Iterable[str], max_workers: int = 8,
+                   shipdaak: Optional[ShipdaakService] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Fetch tracking data for many AWB numbers through a bounded thread pool
+    
+    Only HTTP calls run in worker threads; no database access happens here.
+    
+    Returns:
+        Dict of AWB number -> tracking data (None if the call failed)
+    """
+    shipdaak = shipdaak or ShipdaakService()
+    awb_numbers = list(dict.fromkeys(awb_numbers))
+    if not awb_numbers:
+        return {}
+    
+    # Obtain the access token once up front so workers don't race to authenticate
+    shipdaak._get_access_token()
+    
+    def _track(awb_number):
+        try:
+            return shipdaak.track_shipment(awb_number)
+        except Exception as e:
+            print(f"[ERROR] Error tracking Shipdaak shipment {awb_number}: {str(e)}")
+            sys.stdout.flush()
+            return None
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(awb_numbers)))) as executor:
+        results = executor.map(_track, awb_numbers)
+        return dict(zip(awb_numbers, results))
+
+
+def sync_tracking(orders: List[Order], max_workers: int = 8,
+                  shipdaak: Optional[ShipdaakService] = None) -> Dict[str, Any]:
+    """
+    Fetch and persist tracking for a batch of orders
+    
+    Orders whose order status changes are saved individually so post_save
+    signals (delivery commission) still run. Orders whose tracked fields
+    changed are written with one bulk_update (bumping updated_at, which
+    delta sync and the merchant stats cache key on); the rest only get their
+    last-checked timestamp. A failed lookup is stamped so the shipment falls
+    due again after RETRY_INTERVAL rather than a full refresh interval.
+    
+    Returns:
+        Dict with 'checked', 'updated', 'status_changed', 'errors', 'elapsed'
+        and 'status_changes' (orders whose order status changed)
+    """
+    started = time.monotonic()
+    orders = [order for order in orders if order.shipdaak_awb_number]
+    tracking = fetch_tracking([order.shipdaak_awb_number for order in orders], max_workers, shipdaak)
+    
+    now = timezone.now()
+    changed_orders = []
+    checked_orders = []
+    status_changes = []
+    error_count = 0
+    
+    for order in orders:
+        tracking_data = tracking.get(order.shipdaak_awb_number)
+        if not tracking_data:
+            error_count += 1
+            order.shipdaak_tracking_checked_at = now - refresh_interval(order.shipdaak_status) + RETRY_INTERVAL
+            checked_orders.append(order)
+            continue
+        order.shipdaak_tracking_checked_at = now
+        before = [getattr(order, field) for field in TRACKED_FIELDS]
+        try:
+            if apply_tracking_data(order, tracking_data):
+                status_changes.append(order)
+                continue
+        except Exception as e:
+            error_count += 1
+            print(f"[ERROR] Error applying tracking for order {order.order_number} "
+                  f"(AWB: {order.shipdaak_awb_number}): {str(e)}")
+            traceback.print_exc()
+            for field, value in zip(TRACKED_FIELDS, before):
+                setattr(order, field, value)
+        if [getattr(order, field) for field in TRACKED_FIELDS] != before:
+            order.updated_at = now
+            changed_orders.append(order)
+        else:
+            checked_orders.append(order)
+    
+    if changed_orders:
+        Order.objects.bulk_update(changed_orders, TRACKING_FIELDS, batch_size=500)
+    if checked_orders:
+        Order.objects.bulk_update(checked_orders, ['shipdaak_tracking_checked_at'], batch_size=500)
+    
+    for order in status_changes:
+        try:
+            order.save()
+        except Exception as e:
+            error_count += 1
+            print(f"[ERROR] Error saving tracking status for order {order.order_number}: {str(e)}")
+            traceback.print_exc()
+    
+    return {
+        'checked': len(orders),
+        'updated': len(orders) - error_count,
+        'status_changed': len(status_changes),
+        'errors': error_count,
+        'elapsed': time.monotonic() - started,
+        'status_changes': status_changes,
+    }
+
+
+def refresh_tracking_async(order_ids: Iterable[int], max_workers: int = 4) -> int:
+    """
+    Refresh tracking for the given orders in a background thread
+    
+    Orders already being refreshed (per a short-lived cache lock) are skipped,
+    so repeated page loads don't queue duplicate Shipdaak calls.
+    
+    Returns:
+        Number of orders queued for refresh
+    """
+    order_ids = [
+        order_id for order_id in order_ids
+        if cache.add(f"{REFRESH_LOCK_PREFIX}:{order_id}", True, 300)
+    ]
+    if not order_ids:
+        return 0
+    
+    def _worker():
+        try:
+            sync_tracking(list(Order.objects.filter(pk__in=order_ids)), max_workers=max_workers)
+        except Exception as e:
+            print(f"[ERROR] Background tracking refresh failed: {str(e)}")
+            traceback.print_exc()
+        finally:
+            cache.delete_many([f"{REFRESH_LOCK_PREFIX}:{order_id}" for order_id in order_ids])
+            connection.close()
+    
+    threading.Thread(target=_worker, daemon=True).start()
+    return len(order_ids)
@@ -3,8 +3,9 @@ from django.db import transaction as db_transaction
 from django.dispatch import receiver
 from decimal import Decimal, ROUND_HALF_UP
 from .models import Order
-from core.models import Transaction
 from core.models import SuperSetting
+from core.services.wallet_ledger import LedgerEntry, post_entries
+from .services.order_revenue import apply_order_revenue
 import sys
 import traceback
 
@@ -28,8 +29,14 @@ def handle_order_delivery(sender, instance, created, **kwargs):
         try:
             # Use database transaction to ensure atomicity
             with db_transaction.atomic():
-                # Get SuperSetting
-                super_setting = SuperSetting.objects.select_for_update().first()
+                # Lock the order row so concurrent saves can't both pay out
+                if Order.objects.select_for_update().values_list('commission_processed', flat=True).get(pk=instance.pk):
+                    print(f"[INFO] Order {instance.id} commission already processed, skipping")
+                    sys.stdout.flush()
+                    return
+                
+                # Get SuperSetting (commission rate only; the platform balance is posted by the ledger)
+                super_setting = SuperSetting.objects.first()
                 if not super_setting:
                     print("[WARNING] SuperSetting not found, creating default")
                     sys.stdout.flush()
@@ -56,6 +63,7 @@ def handle_order_delivery(sender, instance, created, **kwargs):
                 # Commission = what customer paid (price) - what merchant should get (actual_price)
                 commission = total_price - total_actual_price
                 commission = commission.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+                total_actual_price = total_actual_price.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
                 
                 # Get shipping charge from ShippingChargeHistory
                 from .models import ShippingChargeHistory
@@ -73,69 +81,41 @@ def handle_order_delivery(sender, instance, created, **kwargs):
                 vendor_payout = total_actual_price - shipping_charge
                 vendor_payout = vendor_payout.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
                 
-                # Update SuperSetting balance with commission
-                super_setting.balance = Decimal(str(super_setting.balance)) + commission
-                # Round SuperSetting balance to 2 decimal places
-                super_setting.balance = super_setting.balance.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-                super_setting.save()
-                
-                # Get vendor and initial wallet balance
                 vendor = instance.merchant.owner
-                current_wallet = Decimal(str(vendor.balance))
-                current_wallet = current_wallet.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-                
-                # Get payment transaction details from Transaction model if available
-                # Check for both PhonePe and SabPaisa transactions
-                payment_transaction = Transaction.objects.filter(
-                    related_order=instance,
-                    transaction_type__in=['phonepe_payment', 'sabpaisa_payment']
-                ).first()
-                
-                # Transaction 1: Add actual_price to merchant wallet
-                wallet_before_actual_price = current_wallet
-                current_wallet = current_wallet + total_actual_price
-                current_wallet = current_wallet.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-                wallet_after_actual_price = current_wallet
-                
-                Transaction.objects.create(
-                    user=vendor,
-                    transaction_type='payout',
-                    amount=total_actual_price,  # Positive amount - actual_price goes to merchant
-                    status='completed',
-                    description=f'Actual price from order {instance.order_number} (₹{total_actual_price})',
-                    related_order=instance,
-                    payer_name=vendor.name if vendor.name else None,
-                    wallet_before=wallet_before_actual_price,
-                    wallet_after=wallet_after_actual_price,
-                )
+                payer_name = vendor.name if vendor.name else None
                 
+                entries = [
+                    # Commission to platform balance (no ledger row, as before)
+                    LedgerEntry(None, commission, 'commission', record=False),
+                    # Transaction 1: Add actual_price to merchant wallet
+                    LedgerEntry(
+                        vendor, total_actual_price, 'payout',
+                        description=f'Actual price from order {instance.order_number} (₹{total_actual_price})',
+                        related_order=instance,
+                        payer_name=payer_name,
+                    ),
+                ]
                 # Transaction 2: Shipping Charge Deduction (negative amount)
-                wallet_before_shipping = current_wallet
                 if shipping_charge > 0:
-                    current_wallet = current_wallet - shipping_charge
-                    current_wallet = current_wallet.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-                    wallet_after_shipping = current_wallet
-                    
-                    Transaction.objects.create(
-                        user=vendor,
-                        transaction_type='shipping_charge_deduction',
-                        amount=-shipping_charge,  # Negative amount for deduction
-                        status='completed',
+                    entries.append(LedgerEntry(
+                        vendor, -shipping_charge, 'shipping_charge_deduction',
                         description=f'Shipping charge deducted from order {instance.order_number} (₹{shipping_charge})',
                         related_order=instance,
-                        payer_name=vendor.name if vendor.name else None,
-                        wallet_before=wallet_before_shipping,
-                        wallet_after=wallet_after_shipping,
-                    )
-                
-                # Update vendor balance to final amount
-                vendor.balance = current_wallet
-                vendor.save()
+                        payer_name=payer_name,
+                    ))
+                post_entries(entries, allow_negative=True)
                 
-                # Mark commission as processed (use update to avoid triggering signal again)
-                Order.objects.filter(pk=instance.pk).update(commission_processed=True)
+                # Mark commission as processed and freeze the merchant revenue at this rate
+                # (use update to avoid triggering signal again)
+                apply_order_revenue(instance, sales_commission_percentage)
+                Order.objects.filter(pk=instance.pk).update(
+                    commission_processed=True,
+                    merchant_commission=instance.merchant_commission,
+                    merchant_revenue=instance.merchant_revenue,
+                )
+                instance.commission_processed = True
                 
-                print(f"[INFO] Order {instance.id} delivered: Total Price={total_price}, Total Actual Price={total_actual_price}, Commission={commission} (added to SuperSetting), Shipping Charge={shipping_charge}, Payout={vendor_payout} (added to vendor), SuperSetting balance={super_setting.balance}, Vendor balance={vendor.balance}")
+                print(f"[INFO] Order {instance.id} delivered: Total Price={total_price}, Total Actual Price={total_actual_price}, Commission={commission} (added to platform balance), Shipping Charge={shipping_charge}, Payout={vendor_payout} (added to vendor), Platform balance={entries[0].wallet_after}, Vendor balance={entries[-1].wallet_after}")
                 sys.stdout.flush()
             
         except Exception as e:
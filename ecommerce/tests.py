@@ -1,3 +1,355 @@
+"""Ecommerce API tests."""
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.models import User, Address, SuperSetting
+from ecommerce.models import Store, Category, Product, ProductImage, Review, Order, OrderItem
+from ecommerce.services import shipdaak_tracking
+from ecommerce.services.order_revenue import get_sales_commission_percentage, order_revenue_expressions
+from ecommerce.services.shipdaak_service import ShipdaakService
+from ecommerce.views.api.merchant_views import _merchant_order_stats, calculate_order_revenue
+
+
+class OrderListQueryTests(TestCase):
+    """Order list endpoints serialize a page with a fixed number of queries."""
+
+    ORDERS = 20
+    ITEMS_PER_ORDER = 5
+    # Count, orders (+ user, store, addresses joined), items (+ product, store,
+    # category joined), images, reviews and the active category tree
+    MAX_QUERIES = 8
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user(phone='9600000001', name='Customer', password='testpass123')
+        cls.merchant = User.objects.create_user(phone='9600000002', name='Merchant', password='testpass123')
+        User.objects.filter(pk=cls.merchant.pk).update(is_merchant=True)
+        cls.merchant.refresh_from_db()
+        cls.store = Store.objects.create(name='Store', owner=cls.merchant, phone='9600000002')
+        address = Address.objects.create(
+            user=cls.customer, title='Home', full_name='Customer', phone='9600000001',
+            address='Street 1', city='City', state='State', zip_code='000000',
+        )
+        parent = Category.objects.create(name='Parent')
+        category = Category.objects.create(name='Child', parent=parent)
+        Category.objects.create(name='Leaf', parent=category)
+
+        products = []
+        for index in range(cls.ITEMS_PER_ORDER):
+            product = Product.objects.create(
+                name=f'Product {index}', description='', store=cls.store,
+                category=parent if index % 2 else category, price=Decimal('10.00'),
+            )
+            ProductImage.objects.create(product=product, image=f'products/{index}.jpg')
+            Review.objects.create(user=cls.customer, product=product, rating=4)
+            products.append(product)
+
+        for index in range(cls.ORDERS):
+            order = Order.objects.create(
+                user=cls.customer, merchant=cls.store, order_number=f'TEST{index:04d}',
+                subtotal=Decimal('50.00'), total_amount=Decimal('50.00'),
+                shipping_address=address, billing_address=address,
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=product, store=cls.store, quantity=1,
+                          price=product.price, total=product.price)
+                for product in products
+            ])
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def _assert_page_within_budget(self, user, url):
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), self.ORDERS)
+        self.assertEqual(len(response.data['results'][0]['items']), self.ITEMS_PER_ORDER)
+        self.assertLessEqual(len(queries), self.MAX_QUERIES)
+
+    def test_customer_order_list_query_budget(self):
+        self._assert_page_within_budget(self.customer, '/api/orders/')
+
+    def test_merchant_order_list_query_budget(self):
+        self._assert_page_within_budget(self.merchant, '/api/merchant/orders/')
+
+
+class OrderRevenueExpressionTests(TestCase):
+    """Stored merchant revenue is only used once the commission is processed."""
+
+    @classmethod
+    def setUpTestData(cls):
+        customer = User.objects.create_user(phone='9600000011', name='Customer', password='testpass123')
+        merchant = User.objects.create_user(phone='9600000012', name='Merchant', password='testpass123')
+        store = Store.objects.create(name='Store', owner=merchant, phone='9600000012')
+        address = Address.objects.create(
+            user=customer, title='Home', full_name='Customer', phone='9600000011',
+            address='Street 1', city='City', state='State', zip_code='000000',
+        )
+        for index in range(2):
+            Order.objects.create(
+                user=customer, merchant=store, order_number=f'REV{index:04d}',
+                subtotal=Decimal('100.00'), total_amount=Decimal('120.00'),
+                shipping_address=address, billing_address=address,
+            )
+        # Both rows carry revenue stored at an older 5% rate
+        Order.objects.update(merchant_commission=Decimal('5.00'), merchant_revenue=Decimal('115.00'))
+        Order.objects.filter(order_number='REV0001').update(commission_processed=True)
+
+    def test_unprocessed_orders_use_the_current_rate(self):
+        commission, revenue = order_revenue_expressions(Decimal('10'))
+        rows = {
+            row['order_number']: (row['commission'], row['revenue'])
+            for row in Order.objects.annotate(commission=commission, revenue=revenue).values(
+                'order_number', 'commission', 'revenue'
+            )
+        }
+        self.assertEqual(rows['REV0000'], (Decimal('10.00'), Decimal('110.00')))
+        self.assertEqual(rows['REV0001'], (Decimal('5.00'), Decimal('115.00')))
+
+
+class ShipdaakRateCacheTests(TestCase):
+    """Rate quotes are cached per pincode pair and weight band."""
+
+    def setUp(self):
+        cache.clear()
+        self.service = ShipdaakService()
+
+    def _key(self, weight, length=10, breadth=10, height=10, origin='560001', destination='110001', amount=100):
+        return self.service._rate_cache_key(origin, destination, weight, length, breadth, height, amount, 'rate')
+
+    def test_weights_in_the_same_band_share_a_key(self):
+        self.assertEqual(self._key(1), self._key(500))
+        self.assertNotEqual(self._key(500), self._key(501))
+        self.assertTrue(self._key(0).endswith(':w500:v500'))
+
+    def test_volumetric_weight_and_pincodes_are_part_of_the_key(self):
+        # 10x10x10 cm is 200 g volumetric, 30x30x30 cm is 5400 g
+        self.assertNotEqual(self._key(400), self._key(400, 30, 30, 30))
+        self.assertTrue(self._key(400, 30, 30, 30).endswith(':w500:v5500'))
+        self.assertNotEqual(self._key(400), self._key(400, destination='110002'))
+
+    def test_quote_for_the_same_band_is_served_from_cache(self):
+        quote = {'data': [{'courier': 'A', 'rate': 50}]}
+        with mock.patch.object(self.service, '_make_request', return_value=quote) as request:
+            first = self.service.get_rate_serviceability('560001', '110001', 300, 10, 10, 10, 100)
+            second = self.service.get_rate_serviceability('560001', '110001', 450, 10, 10, 10, 100)
+            self.service.get_rate_serviceability('560001', '110001', 900, 10, 10, 10, 100)
+        self.assertEqual(first, quote)
+        self.assertEqual(second, quote)
+        self.assertEqual(request.call_count, 2)
+        self.assertEqual(self.service.get_rate_cache_stats()['hits'], 1)
+
+    def test_order_amount_band_is_part_of_the_key(self):
+        self.assertEqual(self._key(400, amount=100), self._key(400, amount=500))
+        self.assertNotEqual(self._key(400, amount=500), self._key(400, amount=5000))
+
+        quote = {'data': [{'courier': 'A', 'rate': 50}]}
+        with mock.patch.object(self.service, '_make_request', return_value=quote) as request:
+            self.service.get_rate_serviceability('560001', '110001', 300, 10, 10, 10, 100)
+            self.service.get_rate_serviceability('560001', '110001', 300, 10, 10, 10, 5000)
+        self.assertEqual(request.call_count, 2)
+        self.assertEqual(
+            [call.kwargs['data']['orderAmount'] for call in request.call_args_list], [100.0, 5000.0]
+        )
+
+    def test_stale_quote_is_refreshed_with_its_own_request(self):
+        quote = {'data': [{'courier': 'A', 'rate': 50}]}
+        with mock.patch.object(self.service, '_make_request', return_value=quote):
+            self.service.get_rate_serviceability('560001', '110001', 300, 10, 10, 10, 100)
+        key = self._key(300, amount=100)
+        entry = cache.get(key)
+        entry['fetched_at'] -= timedelta(seconds=self.service.rate_cache_ttl + 1)
+        cache.set(key, entry)
+
+        with mock.patch.object(self.service, '_refresh_rate_quote_async') as refresh:
+            served = self.service.get_rate_serviceability('560001', '110001', 450, 10, 10, 10, 400)
+        self.assertEqual(served, quote)
+        refresh.assert_called_once_with(key, entry['request'])
+        self.assertEqual(entry['request']['orderAmount'], 100.0)
+
+
+class ShipdaakTrackingSyncTests(TestCase):
+    """Tracking sync only rewrites orders whose tracked fields changed."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user(phone='9600000021', name='Customer', password='testpass123')
+        merchant = User.objects.create_user(phone='9600000022', name='Merchant', password='testpass123')
+        cls.store = Store.objects.create(name='Store', owner=merchant, phone='9600000022')
+        cls.address = Address.objects.create(
+            user=cls.customer, title='Home', full_name='Customer', phone='9600000021',
+            address='Street 1', city='City', state='State', zip_code='000000',
+        )
+
+    def _order(self, awb, shipdaak_status=None, checked_at=None, status='accepted'):
+        order = Order.objects.create(
+            user=self.customer, merchant=self.store, order_number=f'TRK{awb}',
+            subtotal=Decimal('50.00'), total_amount=Decimal('50.00'),
+            shipping_address=self.address, billing_address=self.address,
+            status=status, shipdaak_awb_number=awb, shipdaak_status=shipdaak_status,
+        )
+        Order.objects.filter(pk=order.pk).update(shipdaak_tracking_checked_at=checked_at)
+        order.refresh_from_db()
+        return order
+
+    def _sync(self, orders, responses):
+        shipdaak = mock.Mock()
+        shipdaak.track_shipment.side_effect = lambda awb: responses.get(awb)
+        return shipdaak_tracking.sync_tracking(orders, max_workers=2, shipdaak=shipdaak)
+
+    def test_due_for_tracking_respects_status_intervals_and_priority(self):
+        now = timezone.now()
+        never = self._order('A1')
+        out_for_delivery = self._order('A2', 'Out For Delivery', now - timedelta(minutes=20))
+        pending = self._order('A3', 'Pending Pickup', now - timedelta(hours=4))
+        self._order('A4', 'Pending Pickup', now - timedelta(hours=1))
+        self._order('A5', 'In Transit', now - timedelta(minutes=30))
+        unknown = self._order('A6', 'Manifested', now - timedelta(hours=2))
+        self._order('A7', 'Delivered', None, status='delivered')
+
+        due = list(shipdaak_tracking.due_for_tracking(now=now).values_list('pk', flat=True))
+        self.assertEqual(due, [never.pk, out_for_delivery.pk, pending.pk, unknown.pk])
+
+    def test_apply_tracking_data_maps_status_and_keeps_existing_dates(self):
+        order = self._order('B1', 'Pending Pickup')
+        picked_up = timezone.now() - timedelta(days=1)
+        order.pickup_date = picked_up
+        changed = shipdaak_tracking.apply_tracking_data(order, {
+            'status': 'In Transit',
+            'pickupDate': '2026-01-01T10:00:00Z',
+            'history': [
+                {'eventTime': '2026-01-02T10:00:00', 'statusCode': 'IT', 'message': 'Reached hub', 'location': 'Delhi'},
+                {'eventTime': '2026-01-01T10:00:00', 'statusCode': 'PU', 'message': 'Picked up'},
+            ],
+        })
+        self.assertTrue(changed)
+        self.assertEqual(order.status, 'shipped')
+        self.assertEqual(order.shipdaak_status, 'In Transit')
+        self.assertEqual(order.shipdaak_last_event, 'IT - Reached hub - Delhi')
+        self.assertEqual(order.pickup_date, picked_up)
+        self.assertFalse(shipdaak_tracking.apply_tracking_data(order, {'status': 'Out For Delivery'}))
+        self.assertEqual(order.shipdaak_last_event, 'IT - Reached hub - Delhi')
+
+    def test_unchanged_shipment_only_updates_checked_at(self):
+        earlier = timezone.now() - timedelta(hours=2)
+        order = self._order('C1', 'In Transit', earlier, status='shipped')
+        Order.objects.filter(pk=order.pk).update(updated_at=earlier)
+        order.refresh_from_db()
+
+        result = self._sync([order], {'C1': {'status': 'In Transit'}})
+
+        order.refresh_from_db()
+        self.assertEqual((result['updated'], result['errors'], result['status_changed']), (1, 0, 0))
+        self.assertEqual(order.updated_at, earlier)
+        self.assertGreater(order.shipdaak_tracking_checked_at, earlier)
+
+    def test_changed_shipment_bumps_updated_at(self):
+        earlier = timezone.now() - timedelta(hours=2)
+        order = self._order('D1', 'Picked Up', earlier, status='shipped')
+        Order.objects.filter(pk=order.pk).update(updated_at=earlier)
+        order.refresh_from_db()
+
+        self._sync([order], {'D1': {'status': 'In Transit', 'history': [{'statusCode': 'IT', 'eventTime': 'x'}]}})
+
+        order.refresh_from_db()
+        self.assertEqual(order.shipdaak_status, 'In Transit')
+        self.assertEqual(order.shipdaak_last_event, 'IT')
+        self.assertGreater(order.updated_at, earlier)
+
+    def test_status_change_is_saved(self):
+        order = self._order('E1', 'Pending Pickup')
+        result = self._sync([order], {'E1': {'status': 'Picked Up'}})
+        order.refresh_from_db()
+        self.assertEqual(result['status_changed'], 1)
+        self.assertEqual(result['status_changes'], [order])
+        self.assertEqual(order.status, 'shipped')
+
+    def test_failed_lookup_is_retried_soon(self):
+        earlier = timezone.now() - timedelta(hours=4)
+        order = self._order('F1', 'Pending Pickup', earlier)
+        Order.objects.filter(pk=order.pk).update(updated_at=earlier)
+        order.refresh_from_db()
+
+        result = self._sync([order], {})
+
+        order.refresh_from_db()
+        self.assertEqual(result['errors'], 1)
+        self.assertEqual(order.updated_at, earlier)
+        now = timezone.now()
+        self.assertNotIn(order, shipdaak_tracking.due_for_tracking(now=now))
+        self.assertIn(order, shipdaak_tracking.due_for_tracking(now=now + shipdaak_tracking.RETRY_INTERVAL))
+
+
+class MerchantOrderStatsTests(TestCase):
+    """merchant_stats aggregates match the per-order calculate_order_revenue loop."""
+
+    @classmethod
+    def setUpTestData(cls):
+        SuperSetting.objects.create(sales_commission=Decimal('7.50'))
+        customer = User.objects.create_user(phone='9600000041', name='Customer', password='testpass123')
+        merchant = User.objects.create_user(phone='9600000042', name='Merchant', password='testpass123')
+        store = Store.objects.create(name='Store', owner=merchant, phone='9600000042')
+        address = Address.objects.create(
+            user=customer, title='Home', full_name='Customer', phone='9600000041',
+            address='Street 1', city='City', state='State', zip_code='000000',
+        )
+        now = timezone.now()
+        rows = [
+            ('pending', Decimal('99.99'), Decimal('10.00'), now),
+            ('delivered', Decimal('10.01'), Decimal('0.00'), now - timedelta(days=2)),
+            ('delivered', Decimal('250.35'), Decimal('45.00'), now - timedelta(days=40)),
+            ('cancelled', Decimal('13.33'), Decimal('5.00'), now - timedelta(days=90)),
+        ]
+        for index, (status, subtotal, shipping, created_at) in enumerate(rows):
+            order = Order.objects.create(
+                user=customer, merchant=store, order_number=f'STAT{index:04d}', status=status,
+                subtotal=subtotal, shipping_cost=shipping, total_amount=subtotal + shipping,
+                shipping_address=address, billing_address=address,
+            )
+            Order.objects.filter(pk=order.pk).update(created_at=created_at)
+        # A finalized order keeps the revenue stored at an older rate
+        Order.objects.filter(order_number='STAT0002').update(
+            commission_processed=True, merchant_commission=Decimal('12.52'), merchant_revenue=Decimal('282.83'),
+        )
+        cls.orders = Order.objects.all()
+
+    def _stats(self, start_date=None, end_date=None):
+        return _merchant_order_stats(
+            self.orders, Product.objects.none(), get_sales_commission_percentage(), start_date, end_date
+        )
+
+    def _loop_revenue(self, orders):
+        total = sum((Decimal(str(calculate_order_revenue(order)['revenue'])) for order in orders), Decimal('0'))
+        return float(total.quantize(Decimal('0.01')))
+
+    def test_totals_match_the_per_order_loop(self):
+        stats = self._stats()
+        thirty_days_ago = timezone.now() - timedelta(days=30)
+        recent = [order for order in self.orders if order.created_at >= thirty_days_ago]
+
+        self.assertEqual(stats['total_orders'], 4)
+        self.assertEqual(stats['total_revenue'], self._loop_revenue(self.orders))
+        self.assertEqual(stats['recent_orders_30_days'], len(recent))
+        self.assertEqual(stats['recent_revenue_30_days'], self._loop_revenue(recent))
+        self.assertEqual(stats['orders_by_status'], {'pending': 1, 'delivered': 2, 'cancelled': 1})
+        self.assertIsNone(stats['date_filtered_revenue'])
+
+    def test_date_filtered_revenue_matches_the_per_order_loop(self):
+        start = (timezone.now() - timedelta(days=45)).date()
+        end = (timezone.now() - timedelta(days=1)).date()
+        in_range = [order for order in self.orders if start <= order.created_at.date() <= end]
 
-# Create your tests here.
+        stats = self._stats(start.isoformat(), end.isoformat())
+        self.assertEqual(len(in_range), 2)
+        self.assertEqual(stats['date_filtered_revenue'], self._loop_revenue(in_range))
+        self.assertEqual(self._stats('not-a-date')['date_filtered_revenue'], stats['total_revenue'])
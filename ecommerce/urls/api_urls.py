@@ -28,6 +28,7 @@ urlpatterns = [
     # Order URLs
     path('orders/validate/', order_views.validate_cart_for_order, name='validate-cart-for-order'),
     path('orders/', order_views.order_list_create, name='order-list-create'),
+    path('orders/sync/', order_views.order_sync, name='order-sync'),
     path('orders/create-after-razorpay/', order_views.create_order_after_razorpay_payment, name='create-order-after-razorpay'),
     path('orders/<int:pk>/', order_views.order_detail, name='order-detail'),
     path('orders/<int:pk>/cancel/', order_views.cancel_order, name='cancel-order'),
@@ -63,6 +64,7 @@ urlpatterns = [
     path('merchant/products/', merchant_views.merchant_products, name='merchant-products'),
     path('merchant/products/<int:pk>/', merchant_views.merchant_product_detail, name='merchant-product-detail'),
     path('merchant/orders/', merchant_views.merchant_orders, name='merchant-orders'),
+    path('merchant/orders/sync/', merchant_views.merchant_orders_sync, name='merchant-orders-sync'),
     path('merchant/orders/<int:pk>/', merchant_views.merchant_order_detail, name='merchant-order-detail'),
     path('merchant/orders/<int:pk>/update-status/', merchant_views.merchant_order_update_status, name='merchant-order-update-status'),
     path('merchant/orders/<int:pk>/accept/', merchant_views.merchant_accept_order, name='merchant-accept-order'),
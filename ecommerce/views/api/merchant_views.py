@@ -3,16 +3,21 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
 from django.shortcuts import get_object_or_404
-from django.db.models import Q, Sum, Count
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q, Sum, Count, Max, Case, When, Value, CharField
 from django.utils import timezone
 from datetime import timedelta, datetime
 import json
 import sys
 import traceback
 from ...models import Product, Store, Order, OrderItem, Category, ProductImage
-from core.models import Transaction, SuperSetting, Withdrawal
+from core.models import Transaction, Withdrawal
 from ...serializers import ProductSerializer, ProductCreateSerializer, ProductMerchantSerializer, OrderSerializer, StoreSerializer, TransactionSerializer, RevenueHistorySerializer
 from core.models import User
+from core.utils.cursors import encode_cursor, decode_cursor
+from core.services.delta_sync import delta_sync_response
+from ...services.order_revenue import get_sales_commission_percentage, compute_order_revenue, order_revenue_expressions
 from decimal import Decimal, ROUND_HALF_UP
 
 
@@ -28,25 +33,17 @@ def check_merchant_permission(user):
 def calculate_order_revenue(order):
     """Calculate revenue for an order: Order Total - Sales Commission %"""
     try:
-        # Get SuperSetting for sales commission percentage
-        super_setting = SuperSetting.objects.first()
-        if not super_setting:
-            super_setting = SuperSetting.objects.create()
-        
-        sales_commission_percentage = Decimal(str(super_setting.sales_commission))
-        subtotal = Decimal(str(order.subtotal))
         shipping_cost = Decimal(str(order.shipping_cost))
         total_amount = Decimal(str(order.total_amount))
         
-        # Commission is calculated on subtotal only (shipping is handled separately)
-        commission = (subtotal * sales_commission_percentage) / Decimal('100')
-        
-        # Round commission to 2 decimal places
-        commission = commission.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-        
-        # Revenue = total_amount - commission
-        revenue = total_amount - commission
-        revenue = revenue.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        # Stored values are fixed once the commission has been processed
+        if order.commission_processed and order.merchant_revenue is not None and order.merchant_commission is not None:
+            commission, revenue = order.merchant_commission, order.merchant_revenue
+        else:
+            # Commission is calculated on subtotal only (shipping is handled separately)
+            commission, revenue = compute_order_revenue(
+                order.subtotal, total_amount, get_sales_commission_percentage()
+            )
         
         return {
             'revenue': float(revenue),
@@ -66,6 +63,77 @@ def calculate_order_revenue(order):
         }
 
 
+REVENUE_SUCCESS_PAYMENT_STATUSES = ['success', 'paid']
+REVENUE_HISTORY_PAGE_SIZE = 20
+
+
+def _money(value):
+    return float(Decimal(str(value or 0)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP))
+
+
+def _merchant_order_stats(orders, merchant_products, sales_commission_percentage, start_date=None, end_date=None):
+    """Order counts, revenue, status breakdown and best sellers for merchant_stats in two queries"""
+    commission, revenue = order_revenue_expressions(sales_commission_percentage)
+    thirty_days_ago = timezone.now() - timedelta(days=30)
+    
+    # Revenue by date range if provided (half-open range over whole days)
+    date_filter = Q()
+    if start_date:
+        try:
+            start = datetime.strptime(start_date, '%Y-%m-%d')
+            date_filter &= Q(created_at__gte=timezone.make_aware(start))
+        except ValueError:
+            pass
+    if end_date:
+        try:
+            end = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
+            date_filter &= Q(created_at__lt=timezone.make_aware(end))
+        except ValueError:
+            pass
+    
+    aggregates = {
+        'total_orders': Count('pk'),
+        'total_revenue': Sum(revenue),
+        'recent_orders': Count('pk', filter=Q(created_at__gte=thirty_days_ago)),
+        'recent_revenue': Sum(revenue, filter=Q(created_at__gte=thirty_days_ago)),
+    }
+    if date_filter:
+        aggregates['date_filtered_revenue'] = Sum(revenue, filter=date_filter)
+    for status_value, _ in Order.STATUS_CHOICES:
+        aggregates[f'status_{status_value}'] = Count('pk', filter=Q(status=status_value))
+    totals = orders.aggregate(**aggregates)
+    
+    # Best selling products (top 5 by order items)
+    best_sellers = merchant_products.filter(is_active=True).annotate(
+        total_sold=Sum('orderitem__quantity')
+    ).order_by('-total_sold').values('id', 'name', 'total_sold')[:5]
+    
+    return {
+        'total_orders': totals['total_orders'],
+        'total_revenue': _money(totals['total_revenue']),
+        'orders_by_status': {
+            status_value: totals[f'status_{status_value}']
+            for status_value, _ in Order.STATUS_CHOICES
+            if totals[f'status_{status_value}']
+        },
+        'recent_orders_30_days': totals['recent_orders'],
+        'recent_revenue_30_days': _money(totals['recent_revenue']),
+        'best_selling_products': [
+            {
+                'id': product['id'],
+                'name': product['name'],
+                'total_sold': product['total_sold'] or 0
+            }
+            for product in best_sellers
+        ],
+        # Unparseable dates filter nothing, so the whole revenue is returned
+        'date_filtered_revenue': (
+            _money(totals['date_filtered_revenue'] if date_filter else totals['total_revenue'])
+            if (start_date or end_date) else None
+        ),
+    }
+
+
 @api_view(['GET', 'POST'])
 @permission_classes([permissions.IsAuthenticated])
 def merchant_products(request):
@@ -305,7 +373,7 @@ def merchant_orders(request):
         return paginator.get_paginated_response(serializer.data)
     
     # Get orders for merchant's stores (using new merchant field)
-    orders = Order.objects.filter(merchant__in=stores).select_related('user', 'merchant').order_by('-created_at')
+    orders = OrderSerializer.setup_eager_loading(Order.objects.filter(merchant__in=stores)).order_by('-created_at')
     
     # Apply status filter if provided
     status_filter = request.query_params.get('status')
@@ -343,6 +411,21 @@ def merchant_orders(request):
     return paginator.get_paginated_response(serializer.data)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def merchant_orders_sync(request):
+    """Orders of the merchant's stores changed or deleted since the ?since= cursor of a previous sync"""
+    if not check_merchant_permission(request.user):
+        return Response({
+            'error': 'Only merchants can access this endpoint. Please upgrade your account to merchant status.'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    orders = OrderSerializer.setup_eager_loading(Order.objects.filter(
+        merchant__owner=request.user, merchant__is_active=True
+    ))
+    return delta_sync_response(request, orders, 'orders.merchant', request.user.id, OrderSerializer)
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def merchant_order_detail(request, pk):
@@ -362,7 +445,7 @@ def merchant_order_detail(request, pk):
     stores = Store.objects.filter(owner=request.user, is_active=True)
     
     # Get order that belongs to one of merchant's stores (using new merchant field)
-    order = get_object_or_404(Order, pk=pk, merchant__in=stores)
+    order = get_object_or_404(OrderSerializer.setup_eager_loading(Order.objects.all()), pk=pk, merchant__in=stores)
     
     serializer = OrderSerializer(order, context={'request': request})
     return Response(serializer.data)
@@ -682,95 +765,37 @@ def merchant_stats(request):
     
     # Get all stores owned by the merchant
     stores = Store.objects.filter(owner=request.user, is_active=True)
+    merchant_products = Product.objects.filter(store__in=stores)
     
-    # Get products count
-    products_count = Product.objects.filter(store__in=stores, is_active=True).count()
-    
-    # Get orders count and revenue
-    order_items = OrderItem.objects.filter(store__in=stores)
-    order_ids = order_items.values_list('order_id', flat=True).distinct()
-    orders = Order.objects.filter(id__in=order_ids)
-    
-    total_orders = orders.count()
-    
-    # Calculate total revenue: Order Total - Sales Commission %
-    total_revenue = Decimal('0')
-    for order in orders:
-        revenue_data = calculate_order_revenue(order)
-        total_revenue += Decimal(str(revenue_data['revenue']))
-    total_revenue = float(total_revenue.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP))
-    
-    # Get orders by status
-    orders_by_status = orders.values('status').annotate(count=Count('id'))
-    status_counts = {item['status']: item['count'] for item in orders_by_status}
+    # Get orders containing the merchant's items
+    orders = Order.objects.filter(id__in=OrderItem.objects.filter(store__in=stores).values('order_id'))
     
-    # Get recent orders (last 30 days)
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    recent_orders = orders.filter(created_at__gte=thirty_days_ago).count()
-    recent_orders_list = orders.filter(created_at__gte=thirty_days_ago)
-    
-    # Calculate recent revenue: Order Total - Sales Commission %
-    recent_revenue = Decimal('0')
-    for order in recent_orders_list:
-        revenue_data = calculate_order_revenue(order)
-        recent_revenue += Decimal(str(revenue_data['revenue']))
-    recent_revenue = float(recent_revenue.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP))
-    
-    # Get low stock products (stock < 10)
-    low_stock_products = Product.objects.filter(
-        store__in=stores, 
-        is_active=True, 
-        stock_quantity__lt=10
-    ).count()
-    
-    # Get best selling products (top 5 by order items)
-    best_sellers = Product.objects.filter(
-        store__in=stores,
-        is_active=True
-    ).annotate(
-        total_sold=Sum('orderitem__quantity')
-    ).order_by('-total_sold')[:5]
-    
-    best_sellers_data = [
-        {
-            'id': product.id,
-            'name': product.name,
-            'total_sold': product.total_sold or 0
-        }
-        for product in best_sellers
-    ]
+    # Products count, low stock products (stock < 10) and the product watermark in one query
+    product_stats = merchant_products.aggregate(
+        products_count=Count('pk', filter=Q(is_active=True)),
+        low_stock_products=Count('pk', filter=Q(is_active=True, stock_quantity__lt=10)),
+        last_updated=Max('updated_at'),
+    )
     
-    # Get revenue by date range if provided
     start_date = request.query_params.get('start_date')
     end_date = request.query_params.get('end_date')
-    date_filtered_revenue = total_revenue
-    if start_date or end_date:
-        filtered_orders = orders
-        if start_date:
-            try:
-                start = datetime.strptime(start_date, '%Y-%m-%d').date()
-                filtered_orders = filtered_orders.filter(created_at__gte=timezone.make_aware(
-                    datetime.combine(start, datetime.min.time())
-                ))
-            except ValueError:
-                pass
-        if end_date:
-            try:
-                end = datetime.strptime(end_date, '%Y-%m-%d').date()
-                filtered_orders = filtered_orders.filter(created_at__lte=timezone.make_aware(
-                    datetime.combine(end, datetime.max.time())
-                ))
-            except ValueError:
-                pass
-        filtered_order_ids = filtered_orders.values_list('id', flat=True)
-        filtered_orders_list = Order.objects.filter(id__in=filtered_order_ids)
-        
-        # Calculate date filtered revenue: Order Total - Sales Commission %
-        date_filtered_revenue = Decimal('0')
-        for order in filtered_orders_list:
-            revenue_data = calculate_order_revenue(order)
-            date_filtered_revenue += Decimal(str(revenue_data['revenue']))
-        date_filtered_revenue = float(date_filtered_revenue.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP))
+    sales_commission_percentage = get_sales_commission_percentage()
+    
+    # Order statistics only change when an order (or product) changes, so they are cached
+    # per merchant on the latest updated_at
+    last_order_update = orders.aggregate(last_updated=Max('updated_at'))['last_updated']
+    cache_key = 'merchant_stats:{}:{}:{}:{}:{}:{}'.format(
+        request.user.id,
+        last_order_update.timestamp() if last_order_update else 0,
+        product_stats['last_updated'].timestamp() if product_stats['last_updated'] else 0,
+        sales_commission_percentage,
+        start_date or '',
+        end_date or '',
+    )
+    order_stats = cache.get(cache_key)
+    if order_stats is None:
+        order_stats = _merchant_order_stats(orders, merchant_products, sales_commission_percentage, start_date, end_date)
+        cache.set(cache_key, order_stats, getattr(settings, 'MERCHANT_STATS_CACHE_TTL', 300))
     
     # Get wallet information
     balance = Decimal(str(request.user.balance))
@@ -798,15 +823,15 @@ def merchant_stats(request):
     
     return Response({
         'stores_count': stores.count(),
-        'products_count': products_count,
-        'total_orders': total_orders,
-        'total_revenue': total_revenue,
-        'orders_by_status': status_counts,
-        'recent_orders_30_days': recent_orders,
-        'recent_revenue_30_days': recent_revenue,
-        'low_stock_products': low_stock_products,
-        'best_selling_products': best_sellers_data,
-        'date_filtered_revenue': date_filtered_revenue if (start_date or end_date) else None,
+        'products_count': product_stats['products_count'],
+        'total_orders': order_stats['total_orders'],
+        'total_revenue': order_stats['total_revenue'],
+        'orders_by_status': order_stats['orders_by_status'],
+        'recent_orders_30_days': order_stats['recent_orders_30_days'],
+        'recent_revenue_30_days': order_stats['recent_revenue_30_days'],
+        'low_stock_products': product_stats['low_stock_products'],
+        'best_selling_products': order_stats['best_selling_products'],
+        'date_filtered_revenue': order_stats['date_filtered_revenue'],
         # Wallet information
         'wallet': {
             'balance': float(balance),
@@ -827,11 +852,8 @@ def merchant_revenue_history(request):
             'error': 'Only merchants can access this endpoint. Please upgrade your account to merchant status.'
         }, status=status.HTTP_403_FORBIDDEN)
     
-    # Get all stores owned by the merchant
-    stores = Store.objects.filter(owner=request.user, is_active=True)
-    
-    # Get all orders for this merchant
-    orders = Order.objects.filter(merchant__in=stores).order_by('-created_at')
+    # Get all orders for this merchant's active stores
+    orders = Order.objects.filter(merchant__owner=request.user, merchant__is_active=True)
     
     # Apply filters
     status_filter = request.query_params.get('status')  # 'pending' or 'success'
@@ -840,83 +862,130 @@ def merchant_revenue_history(request):
     
     if start_date:
         try:
-            start = datetime.strptime(start_date, '%Y-%m-%d').date()
-            orders = orders.filter(created_at__gte=timezone.make_aware(
-                datetime.combine(start, datetime.min.time())
-            ))
+            start = datetime.strptime(start_date, '%Y-%m-%d')
+            orders = orders.filter(created_at__gte=timezone.make_aware(start))
         except ValueError:
             pass
     
     if end_date:
         try:
-            end = datetime.strptime(end_date, '%Y-%m-%d').date()
-            orders = orders.filter(created_at__lte=timezone.make_aware(
-                datetime.combine(end, datetime.max.time())
-            ))
+            end = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
+            orders = orders.filter(created_at__lt=timezone.make_aware(end))
         except ValueError:
             pass
     
-    # Build revenue history list
-    revenue_history = []
-    for order in orders:
-        # Determine status: success if delivered AND payment success, otherwise pending
-        is_success = (order.status == 'delivered' and 
-                     order.payment_status in ['success', 'paid'])
-        revenue_status = 'success' if is_success else 'pending'
-        
-        # Apply status filter if provided
-        if status_filter and revenue_status != status_filter:
-            continue
-        
-        # Calculate revenue for this order
-        revenue_data = calculate_order_revenue(order)
-        
-        revenue_history.append({
+    # Success if delivered AND payment success, otherwise pending
+    success = Q(status='delivered', payment_status__in=REVENUE_SUCCESS_PAYMENT_STATUSES)
+    if status_filter == 'success':
+        orders = orders.filter(success)
+    elif status_filter == 'pending':
+        orders = orders.exclude(success)
+    
+    # Count and totals for the filtered history in one query
+    commission, revenue = order_revenue_expressions(get_sales_commission_percentage())
+    totals = orders.aggregate(
+        count=Count('pk'),
+        total_revenue=Sum(revenue),
+        total_commission=Sum(commission),
+        success_revenue=Sum(revenue, filter=success),
+        pending_revenue=Sum(revenue, filter=~success),
+    )
+    total_count = totals['count']
+    page_size = REVENUE_HISTORY_PAGE_SIZE
+    total_pages = (total_count + page_size - 1) // page_size if total_count > 0 else 1
+    
+    rows = OrderSerializer.setup_eager_loading(orders).annotate(
+        revenue_commission=commission,
+        revenue_amount=revenue,
+        revenue_status=Case(
+            When(success, then=Value('success')),
+            default=Value('pending'),
+            output_field=CharField(),
+        ),
+    ).order_by('-created_at', '-id')
+    
+    # Keyset pagination on (created_at, id); ?page=N is still accepted
+    cursor = request.query_params.get('cursor')
+    page_num = None
+    if cursor:
+        position = decode_cursor(cursor, 2)
+        if position is None:
+            return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            cursor_created_at = datetime.fromisoformat(position[0])
+            cursor_id = int(position[1])
+        except (TypeError, ValueError):
+            return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+        rows = rows.filter(
+            Q(created_at__lt=cursor_created_at) | Q(created_at=cursor_created_at, id__lt=cursor_id)
+        )
+        page_orders = list(rows[:page_size + 1])
+    else:
+        try:
+            page_num = max(int(request.query_params.get('page', '1')), 1)
+        except ValueError:
+            page_num = 1
+        start_idx = (page_num - 1) * page_size
+        page_orders = list(rows[start_idx:start_idx + page_size + 1])
+    
+    has_more = len(page_orders) > page_size
+    page_orders = page_orders[:page_size]
+    next_cursor = encode_cursor(page_orders[-1].created_at, page_orders[-1].id) if has_more else None
+    
+    revenue_history = [
+        {
             'order': order,
             'order_id': order.id,
             'order_number': order.order_number,
             'created_at': order.created_at,
             'order_status': order.status,
             'payment_status': order.payment_status,
-            'order_total': Decimal(str(revenue_data['order_total'])),
-            'shipping_cost': Decimal(str(revenue_data['shipping_cost'])),
-            'commission': Decimal(str(revenue_data['commission'])),
-            'revenue': Decimal(str(revenue_data['revenue'])),
-            'status': revenue_status
-        })
-    
-    # Pagination
-    paginator = PageNumberPagination()
-    paginator.page_size = 20
-    page = request.query_params.get('page', '1')
-    
-    try:
-        page_num = int(page)
-    except ValueError:
-        page_num = 1
-    
-    # Calculate pagination
-    total_count = len(revenue_history)
-    page_size = paginator.page_size
-    total_pages = (total_count + page_size - 1) // page_size if total_count > 0 else 1
-    
-    start_idx = (page_num - 1) * page_size
-    end_idx = start_idx + page_size
-    paginated_history = revenue_history[start_idx:end_idx]
+            'order_total': Decimal(str(order.total_amount)),
+            'shipping_cost': Decimal(str(order.shipping_cost)),
+            'commission': Decimal(str(order.revenue_commission)),
+            'revenue': Decimal(str(order.revenue_amount)),
+            'status': order.revenue_status
+        }
+        for order in page_orders
+    ]
     
     # Serialize the data
-    serializer = RevenueHistorySerializer(paginated_history, many=True, context={'request': request})
+    serializer = RevenueHistorySerializer(revenue_history, many=True, context={'request': request})
+    
+    if page_num is None:
+        next_url = request.build_absolute_uri(f'{request.path}?{_replace_query(request, cursor=next_cursor)}') if next_cursor else None
+        previous_url = None
+    else:
+        next_url = request.build_absolute_uri(f'{request.path}?{_replace_query(request, page=page_num + 1)}') if has_more else None
+        previous_url = request.build_absolute_uri(f'{request.path}?{_replace_query(request, page=page_num - 1)}') if page_num > 1 else None
     
     return Response({
         'count': total_count,
-        'next': f"{request.build_absolute_uri()}?page={page_num + 1}" if page_num < total_pages else None,
-        'previous': f"{request.build_absolute_uri()}?page={page_num - 1}" if page_num > 1 else None,
+        'next': next_url,
+        'previous': previous_url,
+        'next_cursor': next_cursor,
         'results': serializer.data,
         'current_page': page_num,
-        'total_pages': total_pages
+        'total_pages': total_pages,
+        'totals': {
+            'revenue': _money(totals['total_revenue']),
+            'commission': _money(totals['total_commission']),
+            'success_revenue': _money(totals['success_revenue']),
+            'pending_revenue': _money(totals['pending_revenue']),
+        }
     })
 
 
+def _replace_query(request, **params):
+    """Current query string with params replaced (page and cursor are mutually exclusive)"""
+    query = request.query_params.copy()
+    query.pop('page', None)
+    query.pop('cursor', None)
+    for key, value in params.items():
+        query[key] = value
+    return query.urlencode()
+
+
 @api_view(['GET', 'POST'])
 @permission_classes([permissions.IsAuthenticated])
 def merchant_stores(request):
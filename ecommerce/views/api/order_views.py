@@ -15,6 +15,7 @@ from ...models import Order, OrderItem, Store
 from ...serializers import OrderSerializer, OrderCreateSerializer
 from ...services.phonepe_service import initiate_payment, generate_merchant_order_id
 from core.models import SuperSetting, Transaction
+from core.services.delta_sync import delta_sync_response
 
 
 @api_view(['POST'])
@@ -83,12 +84,20 @@ def validate_cart_for_order(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def order_sync(request):
+    """Orders of the user changed or deleted since the ?since= cursor of a previous sync"""
+    orders = OrderSerializer.setup_eager_loading(Order.objects.filter(user=request.user))
+    return delta_sync_response(request, orders, 'orders.customer', request.user.id, OrderSerializer)
+
+
 @api_view(['GET', 'POST'])
 @permission_classes([permissions.IsAuthenticated])
 def order_list_create(request):
     """List user's orders or create a new order"""
     if request.method == 'GET':
-        orders = Order.objects.filter(user=request.user)
+        orders = OrderSerializer.setup_eager_loading(Order.objects.filter(user=request.user))
         paginator = PageNumberPagination()
         paginated_orders = paginator.paginate_queryset(orders, request)
         serializer = OrderSerializer(paginated_orders, many=True)
@@ -461,7 +470,7 @@ def order_list_create(request):
 @permission_classes([permissions.IsAuthenticated])
 def order_detail(request, pk):
     """Retrieve, update or delete an order"""
-    order = get_object_or_404(Order, pk=pk, user=request.user)
+    order = get_object_or_404(OrderSerializer.setup_eager_loading(Order.objects.all()), pk=pk, user=request.user)
     
     if request.method == 'GET':
         serializer = OrderSerializer(order)
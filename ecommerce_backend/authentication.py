@@ -1,9 +1,46 @@
 """
 Custom authentication classes for Django REST Framework
 """
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 
+TOKEN_CACHE_PREFIX = 'auth_token'
+USER_TOKEN_CACHE_PREFIX = 'auth_token_user'
+
+# User fields kept in the cached snapshot. Anything else (balance, fcm_token,
+# KYC fields, ...) is deferred and loaded from the database on first access,
+# so it is never served stale from the cache. The snapshot is invalidated by
+# the User post_save signal (core.signals); a queryset.update() skips it, so
+# only fields outside this list may be written that way (as wallet_ledger
+# does for balance).
+USER_SNAPSHOT_FIELDS = [
+    'id', 'phone', 'username', 'name', 'email', 'country_code', 'country',
+    'is_active', 'is_staff', 'is_superuser', 'is_merchant', 'is_driver',
+    'is_freeze', 'is_kyc_verified', 'merchant_code', 'is_edit_access',
+]
+
+
+def _token_cache_key(key):
+    return f"{TOKEN_CACHE_PREFIX}:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+def invalidate_token_cache(key):
+    """Drop a cached token (e.g. after the Token row is deleted or rotated)"""
+    if key:
+        cache.delete(_token_cache_key(key))
+
+
+def invalidate_user_token_cache(user_id):
+    """Drop the cached token/snapshot of a user (logout, deactivation, freeze, password change)"""
+    user_key = f"{USER_TOKEN_CACHE_PREFIX}:{user_id}"
+    token_cache_key = cache.get(user_key)
+    if token_cache_key:
+        cache.delete_many([token_cache_key, user_key])
+
 
 class CsrfExemptTokenAuthentication(TokenAuthentication):
     """
@@ -46,6 +83,44 @@ class CsrfExemptTokenAuthentication(TokenAuthentication):
             # This ensures IsAuthenticated permission checks work correctly
             raise
     
+    def authenticate_credentials(self, key):
+        """
+        Resolve a token to its user, caching token -> user snapshot for AUTH_TOKEN_CACHE_TTL seconds
+        
+        On a cache hit no query is made; the returned user only has
+        USER_SNAPSHOT_FIELDS loaded, other fields load lazily. Off (0) by
+        default: with a per-process cache, a logout or freeze would only
+        invalidate the worker that handled it, so enable it only with a
+        shared cache (settings.SHARED_CACHE).
+        """
+        ttl = getattr(settings, 'AUTH_TOKEN_CACHE_TTL', 0)
+        if not ttl:
+            return super().authenticate_credentials(key)
+        
+        model = self.get_model()
+        user_model = model._meta.get_field('user').related_model
+        token_cache_key = _token_cache_key(key)
+        snapshot = cache.get(token_cache_key)
+        
+        if snapshot is None:
+            user, token = super().authenticate_credentials(key)
+            snapshot = {field: getattr(user, field) for field in USER_SNAPSHOT_FIELDS}
+            cache.set(token_cache_key, snapshot, ttl)
+            cache.set(f"{USER_TOKEN_CACHE_PREFIX}:{user.pk}", token_cache_key, ttl)
+            return user, token
+        
+        if not snapshot['is_active']:
+            raise AuthenticationFailed('User inactive or deleted.')
+        
+        db = router.db_for_read(user_model)
+        # from_db() takes the loaded values in concrete field order
+        field_names = [field.attname for field in user_model._meta.concrete_fields if field.attname in snapshot]
+        user = user_model.from_db(db, field_names, [snapshot[field] for field in field_names])
+        token = model(key=key, user=user)
+        token._state.adding = False
+        token._state.db = db
+        return user, token
+    
     def enforce_csrf(self, request):
         """
         Override to disable CSRF enforcement for token authentication.
@@ -95,6 +95,35 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
 }
+# Cache shared by all worker processes (e.g. redis://127.0.0.1:6379/1). Without it each
+# process has its own local-memory cache, so OTPs are kept in the database and the
+# cross-request caches below that are invalidated on writes stay off by default.
+REDIS_URL = os.environ.get('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+SHARED_CACHE = bool(REDIS_URL)
+# Seconds a token -> user snapshot is cached by CsrfExemptTokenAuthentication (0 disables).
+# Needs SHARED_CACHE: logout/freeze only invalidate the cache of the process handling them.
+AUTH_TOKEN_CACHE_TTL = 60 if SHARED_CACHE else 0
+# Seconds a user's travel roles (committee/staff/dealer/agent) are cached by check_user_travel_role
+# across requests (0 disables; needs SHARED_CACHE for the role-change invalidation to reach every worker)
+TRAVEL_ROLE_CACHE_TTL = 60 if SHARED_CACHE else 0
+# Seconds the admin dashboard statistics snapshot is shared between staff users (0 disables)
+ADMIN_DASHBOARD_CACHE_TTL = 60
+# Rows fetched per database round trip by the streaming admin CSV exports
+CSV_EXPORT_CHUNK_SIZE = 2000
+# Upper bound (seconds) on caching merchant_stats; entries are also keyed on the latest order/product update
+MERCHANT_STATS_CACHE_TTL = 300
+# Delta sync (?since= cursors on the order/booking sync endpoints)
+SYNC_PAGE_SIZE = 100  # Changed rows (and deleted ids) per sync response
+SYNC_CURSOR_LAG_SECONDS = 5  # Cursors stay this far behind now so late commits aren't skipped
+SYNC_TOMBSTONE_RETENTION_DAYS = 30  # Older cursors get 410 and must resync (`manage.py prune_sync_tombstones`)
+TRAVEL_SEARCH_CACHE_SECONDS = 0  # Cache travel route search results per (route, date); 0 disables
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOWED_HEADERS = [
@@ -214,6 +243,18 @@ FAST2SMS_LANGUAGE = 'english'
 
 # OTP Configuration
 OTP_EXPIRY_MINUTES = 2
+# OTP SMS are sent by a background worker pool; sends are throttled per phone and client IP
+# Run `manage.py dispatch_otp_sms` every minute to retry sends lost in a restart
+OTP_SMS_WORKERS = 4
+SMS_API_TIMEOUT = 30
+OTP_RESEND_COOLDOWN_SECONDS = 30
+OTP_MAX_PER_PHONE_PER_HOUR = 5
+OTP_MAX_PER_IP_PER_HOUR = 20
+OTP_TRUSTED_PROXY_COUNT = 0  # Reverse proxies appending to X-Forwarded-For; 0 uses REMOTE_ADDR
+# OTP storage: 'cache' (hashed, auto-expiring; needs a shared cache) or 'database' (Otp table)
+OTP_BACKEND = 'cache' if SHARED_CACHE else 'database'
+OTP_AUDIT_TO_DATABASE = False  # Also record issued OTPs in the Otp table (see purge_expired_otps)
+OTP_MAX_VERIFY_ATTEMPTS = 5
 
 # PhonePe Payment Gateway Configuration
 PHONEPE_CLIENT_ID = 'SU2511191730406050273204'
@@ -279,6 +320,17 @@ SHIPDAAK_API_EMAIL = 'sewasajilo2@gmail.com'  # Set this in environment or .env
 SHIPDAAK_API_PASSWORD = 'Bikash@1234'  # Set this in environment or .env file
 SHIPDAAK_TOKEN_CACHE_KEY = 'shipdaak_access_token'
 SHIPDAAK_TOKEN_EXPIRY_CACHE_KEY = 'shipdaak_token_expiry'
+# Rate/serviceability quote cache (seconds / grams)
+SHIPDAAK_RATE_CACHE_TTL = 60 * 30  # Quotes younger than this are served without revalidation
+SHIPDAAK_RATE_CACHE_STALE_TTL = 60 * 60 * 6  # Stale quotes served while refreshing in background
+SHIPDAAK_RATE_CACHE_WEIGHT_BAND = 500  # Weight slab size used in the cache key
+SHIPDAAK_RATE_CACHE_AMOUNT_BAND = 500  # Order amount slab size used in the cache key
+# Admin tracking list refreshes rows whose stored snapshot is older than this
+SHIPDAAK_TRACKING_STALE_MINUTES = 30
+# Logo-stamped label/manifest PDFs (content-addressed, kept outside MEDIA_ROOT)
+SHIPMENT_DOCUMENT_CACHE_DIR = os.path.join(BASE_DIR, 'cache', 'shipment_documents')
+SHIPMENT_DOCUMENT_CACHE_MAX_AGE_DAYS = 7  # Cached PDFs older than this are deleted
+SHIPMENT_DOCUMENT_CACHE_MAX_MB = 500  # Oldest cached PDFs are deleted beyond this total size
 
 # Firebase Cloud Messaging (FCM) Configuration
 # Option 1: Path to Firebase service account JSON file
@@ -286,6 +338,13 @@ FIREBASE_CREDENTIALS_PATH = os.path.join(BASE_DIR, 'firebase-service.json')
 # Option 2: Firebase credentials as JSON string (for environment variables)
 # FIREBASE_CREDENTIALS_JSON = os.environ.get('FIREBASE_CREDENTIALS_JSON', '')
 # Note: Set one of the above in your environment or .env file
+# Push notification outbox (drained by `manage.py dispatch_push_notifications`)
+FCM_OUTBOX_DISPATCH_ON_COMMIT = True  # Also start a background drain when a notification is queued
+FCM_OUTBOX_MAX_ATTEMPTS = 5
+
+# Platform commission credits are spread over this many PlatformBalanceShard rows
+# (folded into SuperSetting.balance by `manage.py rollup_platform_balance`)
+PLATFORM_BALANCE_SHARDS = 16
 
 # CKEditor 5 Configuration
 customColorPalette = [
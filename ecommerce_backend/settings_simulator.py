@@ -0,0 +1,65 @@
+"""
+Settings for running against the offline gateway simulator.
+
+All third-party integrations (Shipdaak, Fast2SMS/Kaicho SMS, PhonePe REST,
+SabPaisa, Razorpay, FCM) are pointed at the `simulator` app, so checkout,
+OTP, shipping and tracking flows can be exercised and load-tested without
+real credentials or network access.
+
+    SIMULATOR_TRANSPORT=http       python manage.py runserver --settings=ecommerce_backend.settings_simulator
+    SIMULATOR_TRANSPORT=inprocess  python manage.py simulator_benchmark --settings=ecommerce_backend.settings_simulator
+
+'http' sends real HTTP requests to the running server; 'inprocess' routes
+them through Django's test client so no server is needed.
+"""
+import os
+from .settings import *  # noqa: F403, F401
+
+DEBUG = True
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'simulator.sqlite3'),  # noqa: F405
+    }
+}
+
+INSTALLED_APPS = INSTALLED_APPS + ['simulator']  # noqa: F405
+
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+
+# Simulator transport and behaviour
+SIMULATOR_TRANSPORT = os.environ.get('SIMULATOR_TRANSPORT', 'http')
+SIMULATOR_ORIGIN = os.environ.get('SIMULATOR_ORIGIN', 'http://127.0.0.1:8000')
+SIMULATOR_BASE_URL = f'{SIMULATOR_ORIGIN}/simulator'
+SIMULATOR_PATCH_FCM = True
+SIMULATOR = {
+    'latency_ms': {'default': [20, 80], 'shipdaak': [80, 250], 'fcm': [30, 120]},
+    'error_rate': {'default': 0.0},
+    'webhook_delay_ms': 500,
+    'webhook_target': SIMULATOR_ORIGIN,
+    'tracking_step_seconds': 60,
+}
+
+# Point integrations at the simulator
+SMS_API_URL = f'{SIMULATOR_BASE_URL}/kaicho/smsapi/index.php'
+FAST2SMS_API_URL = f'{SIMULATOR_BASE_URL}/fast2sms/dev/bulkV2'
+
+PHONEPE_API_BASE_URL = f'{SIMULATOR_BASE_URL}/phonepe/apis'
+PHONEPE_API_URL = f'{PHONEPE_API_BASE_URL}/pg/checkout/v2/pay'
+PHONEPE_AUTHORIZATION_API_URL = f'{PHONEPE_API_BASE_URL}/identity-manager/v1/oauth/token'
+PHONEPE_AUTH_TOKEN_URL = PHONEPE_AUTHORIZATION_API_URL
+PHONEPE_ORDER_STATUS_API_URL = f'{PHONEPE_API_BASE_URL}/pg/checkout/v2/order/{{merchant_order_id}}/status'
+PHONEPE_TRANSACTION_STATUS_API_URL = f'{PHONEPE_API_BASE_URL}/pg/checkout/v2/transaction/{{transaction_id}}/status'
+PHONEPE_MOBILE_SDK_ORDER_API_URL = f'{PHONEPE_API_BASE_URL}/pg/checkout/v2/sdk/order'
+PHONEPE_BASE_URL = SIMULATOR_ORIGIN
+
+SABPAISA_URL = f'{SIMULATOR_BASE_URL}/sabpaisa/SabPaisa/sabPaisaInit?v=1'
+
+RAZORPAY_KEY_ID = 'rzp_test_simulator'
+RAZORPAY_KEY_SECRET = 'simulator-secret'
+RAZORPAY_API_BASE_URL = f'{SIMULATOR_BASE_URL}/razorpay'
+
+SHIPDAAK_API_BASE_URL = f'{SIMULATOR_BASE_URL}/shipdaak'
+SHIPDAAK_API_EMAIL = 'simulator@example.com'
+SHIPDAAK_API_PASSWORD = 'simulator'
@@ -31,5 +31,9 @@ urlpatterns = [
     path('ckeditor5/', include('django_ckeditor_5.urls')),
 ]
 
+# Offline gateway simulator (only with settings_simulator)
+if 'simulator' in settings.INSTALLED_APPS:
+    urlpatterns += [path('simulator/', include('simulator.urls'))]
+
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
@@ -167,12 +167,12 @@ class SuperSettingForm(forms.ModelForm):
     """Form for SuperSetting"""
     class Meta:
         model = SuperSetting
-        fields = ['sales_commission', 'shipping_charge_commission', 'travel_ticket_percentage', 'balance', 'merchant_agreement_file', 'is_phone_pe', 'is_sabpaisa', 'is_cod']
+        # balance is credited by the platform ledger (shards rolled up by rollup_platform_balance), never edited here
+        fields = ['sales_commission', 'shipping_charge_commission', 'travel_ticket_percentage', 'merchant_agreement_file', 'is_phone_pe', 'is_sabpaisa', 'is_cod']
         widgets = {
             'sales_commission': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01', 'min': '0', 'max': '100'}),
             'shipping_charge_commission': forms.NumberInput(attrs={'class': 'form-control', 'min': '0', 'max': '100'}),
             'travel_ticket_percentage': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01', 'min': '0', 'max': '100'}),
-            'balance': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01', 'min': '0'}),
             'merchant_agreement_file': forms.FileInput(attrs={'class': 'form-control', 'accept': '.pdf,.doc,.docx'}),
             'is_phone_pe': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
             'is_sabpaisa': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
@@ -202,13 +202,6 @@ class SuperSettingForm(forms.ModelForm):
             if travel_ticket_percentage < 0 or travel_ticket_percentage > 100:
                 raise forms.ValidationError('Travel ticket percentage must be between 0 and 100.')
         return travel_ticket_percentage
-    
-    def clean_balance(self):
-        """Validate balance is >= 0"""
-        balance = self.cleaned_data.get('balance')
-        if balance is not None and balance < 0:
-            raise forms.ValidationError('Balance must be greater than or equal to 0.')
-        return balance
 
 
 class TransactionForm(forms.ModelForm):
@@ -1,3 +1,285 @@
+"""Admin panel tests."""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import Address, PlatformBalanceShard, SuperSetting, Transaction, User
+from core.services.platform_balance import rollup_platform_balance
+from ecommerce.models import Category, Order, Product, Store
+from myadmin.utils.export import export_products_csv, iterate_in_chunks
+from myadmin.views.report_views import REVENUE_STATUSES
+
+
+class DashboardViewTests(TestCase):
+    """Admin dashboard query budget."""
+
+    # Session and user, rollup watermark, one aggregation pass per model
+    # (rollup + live for KPI metrics) and the three recent lists
+    MAX_QUERIES = 14
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(
+            phone='9700000001',
+            name='Staff',
+            password='testpass123',
+            is_staff=True,
+            is_superuser=True,
+        )
+        for index in range(5):
+            User.objects.create_user(
+                phone=f'97100000{index:02d}',
+                name=f'User {index}',
+                password='testpass123',
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.staff)
+
+    def test_dashboard_query_count_is_bounded(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('myadmin:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_users'], 6)
+        self.assertEqual(response.context['new_users_today'], 6)
+        self.assertLessEqual(len(queries), self.MAX_QUERIES)
+
+    def test_dashboard_snapshot_is_cached(self):
+        self.client.get(reverse('myadmin:dashboard'))
+        with CaptureQueriesContext(connection) as cold:
+            cache.clear()
+            self.client.get(reverse('myadmin:dashboard'))
+        with CaptureQueriesContext(connection) as warm:
+            response = self.client.get(reverse('myadmin:dashboard'))
+        self.assertEqual(response.context['total_users'], 6)
+        self.assertLess(len(warm), len(cold))
+
+
+class SuperSettingViewTests(TestCase):
+    """Editing platform settings never touches the ledger-managed balance."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(
+            phone='9700000002',
+            name='Staff',
+            password='testpass123',
+            is_staff=True,
+            is_superuser=True,
+        )
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+        self.setting = SuperSetting.objects.create(balance=Decimal('100.00'))
+        PlatformBalanceShard.objects.create(shard=0, balance=Decimal('25.00'))
+
+    def test_detail_shows_unrolled_credits_without_rolling_up(self):
+        response = self.client.get(reverse('myadmin:core:supersetting_detail'))
+        self.assertEqual(response.context['platform_balance'], Decimal('125.00'))
+        self.assertEqual(PlatformBalanceShard.objects.get(shard=0).balance, Decimal('25.00'))
+
+    def test_update_keeps_balance_credited_meanwhile(self):
+        response = self.client.get(reverse('myadmin:core:supersetting_update'))
+        self.assertNotIn('balance', response.context['form'].fields)
+
+        rollup_platform_balance()
+        response = self.client.post(reverse('myadmin:core:supersetting_update'), {
+            'sales_commission': '5.00', 'shipping_charge_commission': '10',
+            'travel_ticket_percentage': '2.00', 'balance': '0', 'is_cod': 'on',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.setting.refresh_from_db()
+        self.assertEqual(self.setting.sales_commission, Decimal('5.00'))
+        self.assertEqual(self.setting.balance, Decimal('125.00'))
+
+
+class ReportViewTests(TestCase):
+    """Merchant and customer reports annotate their statistics in the page query."""
+
+    START = datetime(2026, 1, 10, tzinfo=dt_timezone.utc)
+    END = datetime(2026, 1, 11, tzinfo=dt_timezone.utc)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(
+            phone='9700000003',
+            name='Staff',
+            password='testpass123',
+            is_staff=True,
+            is_superuser=True,
+        )
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def _add_merchant_with_orders(self):
+        index = User.objects.count()
+        merchant = User.objects.create_user(
+            phone=f'97200000{index:02d}', name=f'Merchant {index}', password='testpass123', is_merchant=True,
+        )
+        customer = User.objects.create_user(
+            phone=f'97300000{index:02d}', name=f'Customer {index}', password='testpass123',
+        )
+        store = Store.objects.create(name=f'Store {index}', owner=merchant, phone=merchant.phone)
+        address = Address.objects.create(
+            user=customer, title='Home', full_name=customer.name, phone=customer.phone,
+            address='Street 1', city='City', state='State', zip_code='000000',
+        )
+        # Just inside and just outside both ends of the [START, END) range
+        moments = [
+            self.START - timedelta(seconds=1), self.START,
+            self.END - timedelta(seconds=1), self.END,
+        ]
+        for number, (moment, status) in enumerate(zip(moments, ['delivered', 'delivered', 'pending', 'shipped'])):
+            order = Order.objects.create(
+                user=customer, merchant=store, order_number=f'RPT{index:02d}{number}', status=status,
+                subtotal=Decimal('10.00'), total_amount=Decimal(10 * (number + 1) + index),
+                shipping_address=address, billing_address=address,
+            )
+            Order.objects.filter(pk=order.pk).update(created_at=moment)
+            commission = Transaction.objects.create(
+                user=merchant, transaction_type='commission', amount=Decimal('1.50'), status='completed',
+            )
+            Transaction.objects.filter(pk=commission.pk).update(created_at=moment)
+        return merchant, customer
+
+    def _query_count(self, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params or {})
+            self.assertEqual(response.status_code, 200)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return len(queries)
+
+    def _assert_query_count_is_constant(self, url):
+        self._add_merchant_with_orders()
+        params = {'start_date': '2026-01-10', 'end_date': '2026-01-10'}
+        before = [self._query_count(url, params), self._query_count(url, {**params, 'export': 'csv'})]
+        for _ in range(4):
+            self._add_merchant_with_orders()
+        after = [self._query_count(url, params), self._query_count(url, {**params, 'export': 'csv'})]
+        self.assertEqual(before, after)
+
+    def test_merchant_report_query_count_is_constant(self):
+        self._assert_query_count_is_constant(reverse('myadmin:reports:merchant_report'))
+
+    def test_customer_report_query_count_is_constant(self):
+        self._assert_query_count_is_constant(reverse('myadmin:reports:customer_report'))
+
+    def test_merchant_totals_match_orders_in_the_date_range(self):
+        merchants = [self._add_merchant_with_orders()[0] for _ in range(2)]
+        response = self.client.get(
+            reverse('myadmin:reports:merchant_report'), {'start_date': '2026-01-10', 'end_date': '2026-01-10'}
+        )
+        rows = {row['merchant'].pk: row for row in response.context['merchants_data']}
+        for merchant in merchants:
+            orders = list(Order.objects.filter(
+                merchant__owner=merchant, created_at__gte=self.START, created_at__lt=self.END
+            ))
+            revenue = [order.total_amount for order in orders if order.status in REVENUE_STATUSES]
+            row = rows[merchant.pk]
+            self.assertEqual(len(orders), 2)
+            self.assertEqual(row['total_orders'], len(orders))
+            self.assertEqual(row['total_revenue'], sum(revenue))
+            self.assertEqual(row['avg_order_value'], sum(revenue) / len(revenue))
+            self.assertEqual(row['total_commission'], Decimal('3.00'))
+            self.assertEqual((row['total_stores'], row['active_stores']), (1, 1))
+
+    def test_customer_totals_match_orders_in_the_date_range(self):
+        customers = [self._add_merchant_with_orders()[1] for _ in range(2)]
+        response = self.client.get(
+            reverse('myadmin:reports:customer_report'), {'start_date': '2026-01-10', 'end_date': '2026-01-10'}
+        )
+        rows = {row['customer'].pk: row for row in response.context['customers_data']}
+        for customer in customers:
+            orders = list(Order.objects.filter(user=customer, created_at__gte=self.START, created_at__lt=self.END))
+            revenue = [order.total_amount for order in orders if order.status in REVENUE_STATUSES]
+            lifetime = Order.objects.filter(user=customer, status__in=REVENUE_STATUSES)
+            row = rows[customer.pk]
+            self.assertEqual(row['total_orders'], len(orders))
+            self.assertEqual(row['total_spending'], sum(revenue))
+            self.assertEqual(row['avg_order_value'], sum(revenue) / len(revenue))
+            self.assertEqual(row['lifetime_value'], sum(order.total_amount for order in lifetime))
+            self.assertEqual(row['last_order_date'], self.END - timedelta(seconds=1))
+
+
+class CsvExportTests(TestCase):
+    """CSV exports join their related columns and page in the queryset's order."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(
+            phone='9700000004',
+            name='Staff',
+            password='testpass123',
+            is_staff=True,
+            is_superuser=True,
+        )
+
+    def _rows(self, response):
+        return b''.join(response.streaming_content).decode().splitlines()[1:]
+
+    def _export_queries(self):
+        """Queries and rows of the products export (store, category) and finance report export (related_order)"""
+        with CaptureQueriesContext(connection) as product_queries:
+            product_rows = self._rows(export_products_csv(Product.objects.order_by('-created_at')))
+        self.client.force_login(self.staff)
+        with CaptureQueriesContext(connection) as finance_queries:
+            finance_rows = self._rows(self.client.get(reverse('myadmin:reports:finance_report'), {'export': 'csv'}))
+        return [(len(product_queries), len(product_rows)), (len(finance_queries), len(finance_rows))]
+
+    def _add_product_and_transaction(self):
+        index = Product.objects.count()
+        owner = User.objects.create_user(phone=f'97400000{index:02d}', name=f'Owner {index}', password='testpass123')
+        store = Store.objects.create(name=f'Store {index}', owner=owner, phone=owner.phone)
+        category = Category.objects.create(name=f'Category {index}')
+        Product.objects.create(name=f'Product {index}', description='', store=store, category=category, price=Decimal('5.00'))
+        address = Address.objects.create(
+            user=owner, title='Home', full_name=owner.name, phone=owner.phone,
+            address='Street 1', city='City', state='State', zip_code='000000',
+        )
+        order = Order.objects.create(
+            user=owner, merchant=store, order_number=f'CSV{index:04d}',
+            subtotal=Decimal('5.00'), total_amount=Decimal('5.00'),
+            shipping_address=address, billing_address=address,
+        )
+        Transaction.objects.create(user=owner, transaction_type='payout', amount=Decimal('5.00'), related_order=order)
+
+    def _assert_constant_queries(self):
+        self._add_product_and_transaction()
+        before = self._export_queries()
+        for _ in range(4):
+            self._add_product_and_transaction()
+        after = self._export_queries()
+        self.assertEqual([rows for _, rows in before], [1, 1])
+        self.assertEqual([rows for _, rows in after], [5, 5])
+        self.assertEqual([queries for queries, _ in before], [queries for queries, _ in after])
+
+    def test_related_columns_do_not_add_queries(self):
+        self._assert_constant_queries()
+
+    def test_related_columns_do_not_add_queries_with_keyset_pages(self):
+        with mock.patch.object(connection, 'vendor', 'mysql'):
+            self._assert_constant_queries()
+
+    def test_keyset_pages_keep_the_queryset_order(self):
+        for index in range(7):
+            user = User.objects.create_user(phone=f'97500000{index:02d}', name=f'User {index}', password='testpass123')
+            User.objects.filter(pk=user.pk).update(fcm_token=None if index % 3 == 0 else f'token-{index % 2}')
+        users = list(User.objects.order_by('pk'))
+        # NULLs first ascending and last descending, ties broken by pk
+        ascending = sorted(users, key=lambda user: (user.fcm_token is not None, user.fcm_token or '', user.pk))
+        descending = ascending[::-1]
+        descending = [user for user in descending if user.fcm_token] + [user for user in descending if not user.fcm_token]
 
-# Create your tests here.
+        with mock.patch.object(connection, 'vendor', 'mysql'):
+            self.assertEqual(list(iterate_in_chunks(User.objects.order_by('fcm_token'), 2)), ascending)
+            self.assertEqual(list(iterate_in_chunks(User.objects.order_by('-fcm_token'), 2)), descending)
+            self.assertEqual(list(iterate_in_chunks(User.objects.order_by('-pk'), 2)), users[::-1])
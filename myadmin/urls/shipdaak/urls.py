@@ -9,6 +9,7 @@ app_name = 'shipdaak'
 urlpatterns = [
     # Tracking URLs
     path('tracking/', tracking_views.ShipmentTrackingListView.as_view(), name='tracking_list'),
+    path('tracking/refresh/', tracking_views.RefreshTrackingListView.as_view(), name='tracking_refresh'),
     path('tracking/<int:pk>/', tracking_views.ShipmentTrackingDetailView.as_view(), name='tracking_detail'),
     path('tracking/<int:pk>/update/', tracking_views.UpdateTrackingView.as_view(), name='tracking_update'),
     path('tracking/<int:pk>/cancel-shipment/', tracking_views.CancelShipmentView.as_view(), name='tracking_cancel_shipment'),
@@ -4,7 +4,9 @@ Bulk action utilities for admin panel
 from django.contrib import messages
 from django.db import transaction
 from django.db.models import Q
+from django.utils import timezone
 from typing import List, Any, Callable
+from core.services.kpi_rollup import mark_queryset_dirty
 
 
 def bulk_delete(request, model_class, object_ids: List[int], 
@@ -78,6 +80,12 @@ def bulk_update_status(request, model_class, object_ids: List[int],
             
             if count > 0:
                 update_dict = {status_field: new_status}
+                # queryset.update() skips auto_now, which delta sync relies on
+                if any(getattr(field, 'auto_now', False) and field.name == 'updated_at'
+                       for field in model_class._meta.concrete_fields):
+                    update_dict['updated_at'] = timezone.now()
+                # ... and the post_save that marks rolled-up KPI days dirty
+                mark_queryset_dirty(queryset)
                 queryset.update(**update_dict)
                 updated_count = count
                 
@@ -1,38 +1,144 @@
 """
 CSV Export utility for admin panel
+Exports are streamed: rows are read in chunks and written to a
+StreamingHttpResponse as they are produced, so memory use stays constant
+however many rows are exported. MySQL drivers buffer a whole result set on
+the client even for QuerySet.iterator(), so there the rows are read with
+keyset pagination on the queryset's first ordering field plus the primary key
+instead (so e.g. reports ordered by -created_at keep that order).
 """
 import csv
-from django.http import HttpResponse
-from django.db.models import QuerySet
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.http import StreamingHttpResponse
+from django.db import connections
+from django.db.models import Q, QuerySet
 from typing import List, Dict, Any
 
 
+class Echo:
+    """File-like object whose write() returns the value, for streaming csv.writer output"""
+
+    def write(self, value):
+        return value
+
+
+def get_related_paths(model, field_names: List[str]) -> List[str]:
+    """
+    Forward FK/one-to-one paths needed to read the given field names
+
+    'store' and 'store__owner__name' both need a join on store; the latter
+    also on store__owner. Unknown names (properties, annotations) are skipped.
+    """
+    paths = set()
+    for field_name in field_names:
+        current_model = model
+        parts = []
+        for part in field_name.split('__'):
+            try:
+                field = current_model._meta.get_field(part)
+            except FieldDoesNotExist:
+                break
+            if not (field.is_relation and (field.many_to_one or field.one_to_one) and field.related_model):
+                break
+            parts.append(part)
+            paths.add('__'.join(parts))
+            current_model = field.related_model
+    return sorted(paths)
+
+
+def _keyset_field(queryset: QuerySet):
+    """
+    (name, descending) of the first ordering field if rows can be paged on it
+    
+    Only local concrete fields and annotations qualify; anything else
+    (related paths, expressions, random order) pages on the primary key alone.
+    """
+    ordering = queryset.query.order_by or queryset.model._meta.ordering or ['pk']
+    first = ordering[0]
+    if not isinstance(first, str) or first == '?':
+        return None, False
+    descending = first.startswith('-')
+    name = first.lstrip('-')
+    if name in ('pk', queryset.model._meta.pk.name) or '__' in name:
+        return None, descending
+    if name in queryset.query.annotations:
+        return name, descending
+    try:
+        field = queryset.model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None, descending
+    if not field.concrete or field.is_relation:
+        return None, descending
+    return name, descending
+
+
+def _after(name, value, pk, descending):
+    """Rows after (value, pk) in (name, pk) order; MySQL sorts NULLs first ascending and last descending"""
+    if name is None:
+        return Q(pk__lt=pk) if descending else Q(pk__gt=pk)
+    if value is None:
+        if descending:
+            return Q(**{f'{name}__isnull': True, 'pk__lt': pk})
+        return Q(**{f'{name}__isnull': True, 'pk__gt': pk}) | Q(**{f'{name}__isnull': False})
+    if descending:
+        return (Q(**{f'{name}__lt': value}) | Q(**{name: value, 'pk__lt': pk})
+                | Q(**{f'{name}__isnull': True}))
+    return Q(**{f'{name}__gt': value}) | Q(**{name: value, 'pk__gt': pk})
+
+
+def iterate_in_chunks(queryset: QuerySet, chunk_size: int):
+    """Yield the objects of a queryset without holding more than one chunk in memory"""
+    if connections[queryset.db].vendor != 'mysql':
+        yield from queryset.iterator(chunk_size=chunk_size)
+        return
+    
+    name, descending = _keyset_field(queryset)
+    direction = '-' if descending else ''
+    order = [f'{direction}{name}', f'{direction}pk'] if name else [f'{direction}pk']
+    queryset = queryset.order_by(*order)
+    last = None
+    while True:
+        chunk = queryset if last is None else queryset.filter(_after(name, *last, descending))
+        objects = list(chunk[:chunk_size])
+        yield from objects
+        if len(objects) < chunk_size:
+            return
+        last_object = objects[-1]
+        last = (getattr(last_object, name) if name else None, last_object.pk)
+
+
 def export_to_csv(queryset: QuerySet, filename: str, field_names: List[str] = None, 
-                  field_labels: Dict[str, str] = None, get_field_value=None) -> HttpResponse:
+                  field_labels: Dict[str, str] = None, get_field_value=None,
+                  select_related: List[str] = None) -> StreamingHttpResponse:
     """
     Export a queryset to CSV format
     
     Args:
         queryset: Django queryset to export
         filename: Name of the CSV file (without .csv extension)
-        field_names: List of field names to export (if None, uses all model fields)
+        field_names: List of field names to export (if None, uses all model fields);
+            related fields can be given as paths like 'store__owner__name'
         field_labels: Dictionary mapping field names to display labels
         get_field_value: Optional function to get custom field values (obj, field_name) -> value
+        select_related: Extra relations the custom get_field_value reads; relations
+            named in field_names are joined automatically
     
     Returns:
-        HttpResponse with CSV content
+        StreamingHttpResponse with CSV content
     """
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
-    
-    writer = csv.writer(response)
+    model = queryset.model
     
     # Get model fields if not specified
     if field_names is None:
-        model = queryset.model
         field_names = [f.name for f in model._meta.get_fields() 
                       if not f.many_to_many and not f.one_to_many]
     
+    # Join every related object the rows will touch, so there is no query per row
+    related_paths = get_related_paths(model, field_names) + list(select_related or [])
+    if related_paths:
+        queryset = queryset.select_related(*related_paths)
+    
     # Write header row
     if field_labels:
         headers = [field_labels.get(field, field.replace('_', ' ').title()) 
@@ -40,54 +146,61 @@ def export_to_csv(queryset: QuerySet, filename: str, field_names: List[str] = No
     else:
         headers = [field.replace('_', ' ').title() for field in field_names]
     
-    writer.writerow(headers)
+    chunk_size = getattr(settings, 'CSV_EXPORT_CHUNK_SIZE', 2000)
     
-    # Write data rows
-    for obj in queryset:
-        row = []
-        for field_name in field_names:
-            if get_field_value:
-                value = get_field_value(obj, field_name)
-            else:
-                value = get_field_value_default(obj, field_name)
-            
-            # Convert to string and handle None
-            if value is None:
-                row.append('')
-            elif isinstance(value, bool):
-                row.append('Yes' if value else 'No')
-            else:
-                row.append(str(value))
+    def rows():
+        writer = csv.writer(Echo())
+        yield writer.writerow(headers)
         
-        writer.writerow(row)
+        # Write data rows
+        for obj in iterate_in_chunks(queryset, chunk_size):
+            row = []
+            for field_name in field_names:
+                if get_field_value:
+                    value = get_field_value(obj, field_name)
+                else:
+                    value = get_field_value_default(obj, field_name)
+                
+                # Convert to string and handle None
+                if value is None:
+                    row.append('')
+                elif isinstance(value, bool):
+                    row.append('Yes' if value else 'No')
+                else:
+                    row.append(str(value))
+            
+            yield writer.writerow(row)
     
+    response = StreamingHttpResponse(rows(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
     return response
 
 
 def get_field_value_default(obj, field_name: str) -> Any:
     """
     Get field value from object with fallback for related fields
+
+    Paths like 'store__owner__name' are followed attribute by attribute.
     """
-    try:
-            # Try direct attribute access
-            value = getattr(obj, field_name)
-            
-            # Handle callable values (like methods)
-            if callable(value) and not isinstance(value, type):
-                value = value()
-            
-            # Handle related objects
-            if hasattr(value, 'pk'):
-                # It's a related object, get its string representation
-                return str(value)
-            
-            return value
-    except AttributeError:
-        # Try as a property or method
+    value = obj
+    for part in field_name.split('__'):
+        if value is None:
+            return None
         try:
-            return getattr(obj, field_name, '')
-        except:
+            value = getattr(value, part)
+        except AttributeError:
             return ''
+        
+        # Handle callable values (like methods)
+        if callable(value) and not isinstance(value, type):
+            value = value()
+    
+    # Handle related objects
+    if hasattr(value, 'pk'):
+        # It's a related object, get its string representation
+        return str(value)
+    
+    return value
 
 
 def export_users_csv(queryset):
@@ -1,9 +1,11 @@
 """SuperSetting management views (singleton - update only)"""
 from django.contrib import messages
+from django.http import HttpResponseRedirect
 from django.views.generic import DetailView, UpdateView
 from django.urls import reverse_lazy
 from myadmin.mixins import StaffRequiredMixin
 from core.models import SuperSetting
+from core.services.platform_balance import get_platform_balance
 from myadmin.forms.core_forms import SuperSettingForm
 
 
@@ -17,6 +19,12 @@ class SuperSettingDetailView(StaffRequiredMixin, DetailView):
         """Get or create SuperSetting instance (singleton pattern)"""
         obj, created = SuperSetting.objects.get_or_create()
         return obj
+    
+    def get_context_data(self, **kwargs):
+        """Add the platform balance including credits not yet rolled up"""
+        context = super().get_context_data(**kwargs)
+        context['platform_balance'] = get_platform_balance()
+        return context
 
 
 class SuperSettingUpdateView(StaffRequiredMixin, UpdateView):
@@ -31,9 +39,11 @@ class SuperSettingUpdateView(StaffRequiredMixin, UpdateView):
         return obj
     
     def form_valid(self, form):
-        """Handle successful form submission"""
+        """Save only the form's fields so a concurrent balance credit or rollup is not overwritten"""
+        self.object = form.save(commit=False)
+        self.object.save(update_fields=[*form._meta.fields, 'updated_at'])
         messages.success(self.request, 'Super Setting updated successfully.')
-        return super().form_valid(form)
+        return HttpResponseRedirect(self.get_success_url())
     
     def get_success_url(self):
         """Redirect to detail view after successful update"""
@@ -13,6 +13,7 @@ from django.db import IntegrityError, transaction
 from decimal import Decimal
 from myadmin.mixins import StaffRequiredMixin
 from core.models import Withdrawal, UserPaymentMethod, Transaction, User
+from core.services.wallet_ledger import LedgerEntry, InsufficientBalanceError, post_entries
 from myadmin.forms.core_forms import WithdrawalForm
 
 
@@ -242,41 +243,32 @@ class WithdrawalApproveView(StaffRequiredMixin, View):
                 return redirect('myadmin:core:withdrawal_detail', pk=pk)
             
             # Approve withdrawal and deduct balance (atomic transaction)
-            with transaction.atomic():
-                # Deduct from merchant balance
-                wallet_before = merchant_balance
-                merchant.balance = merchant_balance - withdrawal.amount
-                merchant.save()
-                wallet_after = merchant.balance
-                
-                # Update withdrawal status
-                withdrawal.status = 'approved'
-                withdrawal.save()
-                
-                # Update or create transaction record
-                related_transaction = Transaction.objects.filter(
-                    related_withdrawal=withdrawal
-                ).first()
-                
-                if related_transaction:
-                    related_transaction.transaction_type = 'withdrawal_processed'
-                    related_transaction.status = 'completed'
-                    related_transaction.wallet_before = wallet_before
-                    related_transaction.wallet_after = wallet_after
-                    related_transaction.description = f'Withdrawal #{withdrawal.id} processed'
-                    related_transaction.save()
-                else:
-                    # Create new transaction if not found
-                    Transaction.objects.create(
-                        user=merchant,
-                        transaction_type='withdrawal_processed',
-                        amount=withdrawal.amount,
-                        status='completed',
+            try:
+                with transaction.atomic():
+                    # Re-check under a row lock so a concurrent approval can't deduct twice
+                    withdrawal = Withdrawal.objects.select_for_update().get(pk=withdrawal.pk)
+                    if withdrawal.status != 'pending':
+                        messages.info(request, f'Withdrawal #{withdrawal.id} is already {withdrawal.get_status_display().lower()}.')
+                        return redirect('myadmin:core:withdrawal_detail', pk=pk)
+
+                    # Deduct from merchant balance and complete the pending transaction record
+                    related_transaction = Transaction.objects.filter(
+                        related_withdrawal=withdrawal
+                    ).first()
+                    post_entries([LedgerEntry(
+                        merchant, -withdrawal.amount, 'withdrawal_processed',
                         description=f'Withdrawal #{withdrawal.id} processed',
+                        transaction_amount=withdrawal.amount,
+                        transaction=related_transaction,
                         related_withdrawal=withdrawal,
-                        wallet_before=wallet_before,
-                        wallet_after=wallet_after
-                    )
+                    )])
+                    
+                    # Update withdrawal status
+                    withdrawal.status = 'approved'
+                    withdrawal.save()
+            except InsufficientBalanceError as e:
+                messages.error(request, f'Insufficient balance. Available: ₹{e.balance}, Requested: ₹{withdrawal.amount}')
+                return redirect('myadmin:core:withdrawal_detail', pk=pk)
             
             messages.success(request, f'Withdrawal #{withdrawal.id} approved successfully. ₹{withdrawal.amount} deducted from {merchant.name}\'s wallet.')
             
@@ -1,7 +1,9 @@
 """
 Dashboard views for admin panel
 """
-from django.db.models import Count, Sum, Q
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
 from django.utils import timezone
 from datetime import timedelta
 from myadmin.mixins import StaffRequiredMixin
@@ -9,119 +11,140 @@ from django.views.generic import TemplateView
 from core.models import User
 from ecommerce.models import Product, Order as EcommerceOrder, Store
 from taxi.models import TaxiBooking
+from core.services.kpi_rollup import KpiReader
+
+REVENUE_STATUSES = ['delivered', 'shipped', 'accepted']
+DASHBOARD_CACHE_KEY = 'myadmin:dashboard:snapshot'
 
 
 class DashboardView(StaffRequiredMixin, TemplateView):
     """Admin dashboard with analytics"""
     template_name = 'admin/dashboard.html'
-    
+
     def calculate_growth(self, current, previous):
         """Calculate growth percentage"""
         if previous == 0:
             return 100.0 if current > 0 else 0.0
         return ((current - previous) / previous) * 100
-    
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        
+
+        # The snapshot is shared by all staff users for ADMIN_DASHBOARD_CACHE_TTL seconds
+        ttl = getattr(settings, 'ADMIN_DASHBOARD_CACHE_TTL', 60)
+        snapshot = cache.get(DASHBOARD_CACHE_KEY) if ttl else None
+        if snapshot is None:
+            snapshot = self.build_snapshot()
+            if ttl:
+                cache.set(DASHBOARD_CACHE_KEY, snapshot, ttl)
+
+        context.update(snapshot)
+        return context
+
+    def build_snapshot(self):
+        """Dashboard statistics, with one aggregation query per model"""
         # Get date ranges
-        now = timezone.now()
-        today = now.date()
+        today = timezone.localdate()
         yesterday = today - timedelta(days=1)
         week_ago = today - timedelta(days=7)
         last_week_start = week_ago - timedelta(days=7)
         month_ago = today - timedelta(days=30)
         last_month_start = month_ago - timedelta(days=30)
-        
+
+        # Users, orders and revenue come from the daily KPI rollups (today is read live)
+        kpis = KpiReader()
+
         # User statistics
-        total_users = User.objects.count()
-        new_users_today = User.objects.filter(created_at__date=today).count()
-        new_users_yesterday = User.objects.filter(created_at__date=yesterday).count()
-        new_users_week = User.objects.filter(created_at__date__gte=week_ago).count()
-        new_users_last_week = User.objects.filter(created_at__date__gte=last_week_start, created_at__date__lt=week_ago).count()
-        new_users_month = User.objects.filter(created_at__date__gte=month_ago).count()
-        new_users_last_month = User.objects.filter(created_at__date__gte=last_month_start, created_at__date__lt=month_ago).count()
-        
+        users = kpis.window_totals('users.new', {
+            'total': (None, None),
+            'today': (today, None),
+            'yesterday': (yesterday, today),
+            'week': (week_ago, None),
+            'last_week': (last_week_start, week_ago),
+            'month': (month_ago, None),
+            'last_month': (last_month_start, month_ago),
+        })
+        total_users = users['total']['count']
+        new_users_today = users['today']['count']
+        new_users_yesterday = users['yesterday']['count']
+        new_users_week = users['week']['count']
+        new_users_last_week = users['last_week']['count']
+        new_users_month = users['month']['count']
+        new_users_last_month = users['last_month']['count']
+
         # Ecommerce statistics
-        total_products = Product.objects.count()
-        active_products = Product.objects.filter(is_active=True).count()
-        total_stores = Store.objects.count()
-        active_stores = Store.objects.filter(is_active=True).count()
-        
-        # Order statistics
-        total_orders = EcommerceOrder.objects.count()
-        orders_today = EcommerceOrder.objects.filter(created_at__date=today).count()
-        orders_yesterday = EcommerceOrder.objects.filter(created_at__date=yesterday).count()
-        pending_orders = EcommerceOrder.objects.filter(status='pending').count()
-        completed_orders = EcommerceOrder.objects.filter(status='delivered').count()
-        orders_week = EcommerceOrder.objects.filter(created_at__date__gte=week_ago).count()
-        orders_last_week = EcommerceOrder.objects.filter(created_at__date__gte=last_week_start, created_at__date__lt=week_ago).count()
-        
+        products = Product.objects.aggregate(
+            total=Count('pk'),
+            active=Count('pk', filter=Q(is_active=True)),
+        )
+        stores = Store.objects.aggregate(
+            total=Count('pk'),
+            active=Count('pk', filter=Q(is_active=True)),
+        )
+
+        # Order and revenue statistics
+        orders = kpis.window_totals('orders', {
+            'total': (None, None),
+            'today': (today, None),
+            'yesterday': (yesterday, today),
+            'week': (week_ago, None),
+            'last_week': (last_week_start, week_ago),
+            'revenue_total': (None, None, REVENUE_STATUSES),
+            'revenue_today': (today, None, REVENUE_STATUSES),
+            'revenue_yesterday': (yesterday, today, REVENUE_STATUSES),
+            'revenue_week': (week_ago, None, REVENUE_STATUSES),
+            'revenue_last_week': (last_week_start, week_ago, REVENUE_STATUSES),
+            'revenue_month': (month_ago, None, REVENUE_STATUSES),
+            'revenue_last_month': (last_month_start, month_ago, REVENUE_STATUSES),
+        })
+        total_orders = orders['total']['count']
+        orders_today = orders['today']['count']
+        orders_yesterday = orders['yesterday']['count']
+        orders_week = orders['week']['count']
+        orders_last_week = orders['last_week']['count']
+
+        # Order status breakdown (current state, read live)
+        order_status_counts = list(EcommerceOrder.objects.values('status').annotate(
+            count=Count('id')
+        ).order_by('status'))
+        status_totals = {row['status']: row['count'] for row in order_status_counts}
+        pending_orders = status_totals.get('pending', 0)
+        completed_orders = status_totals.get('delivered', 0)
+
         # Revenue statistics
-        total_revenue = EcommerceOrder.objects.filter(
-            status__in=['delivered', 'shipped', 'accepted']
-        ).aggregate(total=Sum('total_amount'))['total'] or 0
-        
-        today_revenue = EcommerceOrder.objects.filter(
-            created_at__date=today,
-            status__in=['delivered', 'shipped', 'accepted']
-        ).aggregate(total=Sum('total_amount'))['total'] or 0
-        
-        yesterday_revenue = EcommerceOrder.objects.filter(
-            created_at__date=yesterday,
-            status__in=['delivered', 'shipped', 'accepted']
-        ).aggregate(total=Sum('total_amount'))['total'] or 0
-        
-        week_revenue = EcommerceOrder.objects.filter(
-            created_at__date__gte=week_ago,
-            status__in=['delivered', 'shipped', 'accepted']
-        ).aggregate(total=Sum('total_amount'))['total'] or 0
-        
-        last_week_revenue = EcommerceOrder.objects.filter(
-            created_at__date__gte=last_week_start,
-            created_at__date__lt=week_ago,
-            status__in=['delivered', 'shipped', 'accepted']
-        ).aggregate(total=Sum('total_amount'))['total'] or 0
-        
-        month_revenue = EcommerceOrder.objects.filter(
-            created_at__date__gte=month_ago,
-            status__in=['delivered', 'shipped', 'accepted']
-        ).aggregate(total=Sum('total_amount'))['total'] or 0
-        
-        last_month_revenue = EcommerceOrder.objects.filter(
-            created_at__date__gte=last_month_start,
-            created_at__date__lt=month_ago,
-            status__in=['delivered', 'shipped', 'accepted']
-        ).aggregate(total=Sum('total_amount'))['total'] or 0
-        
+        total_revenue = orders['revenue_total']['amount']
+        today_revenue = orders['revenue_today']['amount']
+        yesterday_revenue = orders['revenue_yesterday']['amount']
+        week_revenue = orders['revenue_week']['amount']
+        last_week_revenue = orders['revenue_last_week']['amount']
+        month_revenue = orders['revenue_month']['amount']
+        last_month_revenue = orders['revenue_last_month']['amount']
+
         # Taxi statistics
-        total_taxi_bookings = TaxiBooking.objects.count()
-        pending_taxi_bookings = TaxiBooking.objects.filter(trip_status='pending').count()
-        completed_taxi_bookings = TaxiBooking.objects.filter(trip_status='completed').count()
-        
+        taxi = TaxiBooking.objects.aggregate(
+            total=Count('pk'),
+            pending=Count('pk', filter=Q(trip_status='pending')),
+            completed=Count('pk', filter=Q(trip_status='completed')),
+        )
+
         # Recent data
-        recent_orders = EcommerceOrder.objects.select_related('user').order_by('-created_at')[:10]
-        recent_users = User.objects.order_by('-created_at')[:10]
-        recent_products = Product.objects.select_related('store', 'category').order_by('-created_at')[:10]
-        
-        # Order status breakdown
-        order_status_counts = EcommerceOrder.objects.values('status').annotate(
-            count=Count('id')
-        ).order_by('status')
-        
+        recent_orders = list(EcommerceOrder.objects.select_related('user').order_by('-created_at')[:10])
+        recent_users = list(User.objects.order_by('-created_at')[:10])
+        recent_products = list(Product.objects.select_related('store', 'category').order_by('-created_at')[:10])
+
         # Calculate growth percentages
         users_growth_today = self.calculate_growth(new_users_today, new_users_yesterday)
         users_growth_week = self.calculate_growth(new_users_week, new_users_last_week)
         users_growth_month = self.calculate_growth(new_users_month, new_users_last_month)
-        
+
         orders_growth_today = self.calculate_growth(orders_today, orders_yesterday)
         orders_growth_week = self.calculate_growth(orders_week, orders_last_week)
-        
+
         revenue_growth_today = self.calculate_growth(today_revenue, yesterday_revenue)
         revenue_growth_week = self.calculate_growth(week_revenue, last_week_revenue)
         revenue_growth_month = self.calculate_growth(month_revenue, last_month_revenue)
-        
-        context.update({
+
+        return {
             'total_users': total_users,
             'new_users_today': new_users_today,
             'new_users_yesterday': new_users_yesterday,
@@ -132,10 +155,10 @@ class DashboardView(StaffRequiredMixin, TemplateView):
             'users_growth_today': users_growth_today,
             'users_growth_week': users_growth_week,
             'users_growth_month': users_growth_month,
-            'total_products': total_products,
-            'active_products': active_products,
-            'total_stores': total_stores,
-            'active_stores': active_stores,
+            'total_products': products['total'],
+            'active_products': products['active'],
+            'total_stores': stores['total'],
+            'active_stores': stores['active'],
             'total_orders': total_orders,
             'orders_today': orders_today,
             'orders_yesterday': orders_yesterday,
@@ -155,14 +178,11 @@ class DashboardView(StaffRequiredMixin, TemplateView):
             'revenue_growth_today': revenue_growth_today,
             'revenue_growth_week': revenue_growth_week,
             'revenue_growth_month': revenue_growth_month,
-            'total_taxi_bookings': total_taxi_bookings,
-            'pending_taxi_bookings': pending_taxi_bookings,
-            'completed_taxi_bookings': completed_taxi_bookings,
+            'total_taxi_bookings': taxi['total'],
+            'pending_taxi_bookings': taxi['pending'],
+            'completed_taxi_bookings': taxi['completed'],
             'recent_orders': recent_orders,
             'recent_users': recent_users,
             'recent_products': recent_products,
             'order_status_counts': order_status_counts,
-        })
-        
-        return context
-
+        }
@@ -2,16 +2,47 @@
 Report views for admin panel
 """
 from django.shortcuts import render
-from django.http import HttpResponse
 from django.views.generic import ListView
 from django.utils import timezone
-from django.db.models import Q, Sum, Count, Avg, F
-from django.db.models.functions import TruncDate
-from datetime import timedelta
+from django.db.models import (
+    Q, Sum, Count, Avg, Max, Exists, OuterRef, Subquery, Value,
+    DateTimeField, DecimalField, IntegerField,
+)
+from django.db.models.functions import Coalesce
+from datetime import datetime, timedelta
 from myadmin.mixins import StaffRequiredMixin
 from core.models import Transaction, User
 from ecommerce.models import Order, Store
-from myadmin.utils.export import export_to_csv
+from myadmin.utils.export import export_to_csv, get_field_value_default
+
+REVENUE_STATUSES = ['delivered', 'shipped', 'accepted']
+MONEY_FIELD = DecimalField(max_digits=14, decimal_places=2)
+
+
+def _date_range_q(request, field='created_at'):
+    """Half-open created_at range from the start_date/end_date (YYYY-MM-DD) query params"""
+    q = Q()
+    for param, lookup, offset in (('start_date', 'gte', 0), ('end_date', 'lt', 1)):
+        value = request.GET.get(param)
+        if not value:
+            continue
+        try:
+            day = datetime.strptime(value, '%Y-%m-%d') + timedelta(days=offset)
+        except ValueError:
+            continue
+        q &= Q(**{f'{field}__{lookup}': timezone.make_aware(day)})
+    return q
+
+
+def _subquery_aggregate(queryset, group_by, aggregate, output_field, default=0):
+    """Correlated subquery computing one aggregate of `queryset` per outer row"""
+    subquery = Subquery(
+        queryset.order_by().values(group_by).annotate(value=aggregate).values('value')[:1],
+        output_field=output_field,
+    )
+    if default is None:
+        return subquery
+    return Coalesce(subquery, Value(default), output_field=output_field)
 
 
 class FinanceReportView(StaffRequiredMixin, ListView):
@@ -146,7 +177,8 @@ class FinanceReportView(StaffRequiredMixin, ListView):
             
             def get_field_value(obj, field_name):
                 if field_name == 'user':
-                    return f"{obj.user.name} ({obj.user.phone})"
+                    # Platform (system) transactions have no user
+                    return f"{obj.user.name} ({obj.user.phone})" if obj.user else 'Platform'
                 elif field_name == 'transaction_type':
                     return obj.get_transaction_type_display()
                 elif field_name == 'status':
@@ -157,7 +189,8 @@ class FinanceReportView(StaffRequiredMixin, ListView):
                     value = getattr(obj, field_name, '')
                     return str(value) if value else ''
             
-            return export_to_csv(queryset, 'finance_report', field_names, field_labels, get_field_value)
+            return export_to_csv(queryset, 'finance_report', field_names, field_labels, get_field_value,
+                                 select_related=['user', 'related_order'])
         
         return super().get(request, *args, **kwargs)
 
@@ -170,7 +203,7 @@ class MerchantReportView(StaffRequiredMixin, ListView):
     
     def get_queryset(self):
         # Get all merchants (users with is_merchant=True)
-        queryset = User.objects.filter(is_merchant=True).select_related().order_by('-created_at')
+        queryset = User.objects.filter(is_merchant=True).order_by('-created_at')
         
         # Search filter
         search = self.request.GET.get('search')
@@ -185,9 +218,9 @@ class MerchantReportView(StaffRequiredMixin, ListView):
         # Store status filter
         store_status = self.request.GET.get('store_status')
         if store_status == 'active':
-            queryset = queryset.filter(stores__is_active=True).distinct()
+            queryset = queryset.filter(Exists(Store.objects.filter(owner=OuterRef('pk'), is_active=True)))
         elif store_status == 'inactive':
-            queryset = queryset.filter(stores__is_active=False).distinct()
+            queryset = queryset.filter(Exists(Store.objects.filter(owner=OuterRef('pk'), is_active=False)))
         
         # KYC status filter
         kyc_status = self.request.GET.get('kyc_status')
@@ -196,99 +229,67 @@ class MerchantReportView(StaffRequiredMixin, ListView):
         elif kyc_status == 'pending':
             queryset = queryset.filter(is_kyc_verified=False)
         
-        return queryset
+        return self.annotate_statistics(queryset)
+    
+    def annotate_statistics(self, queryset):
+        """Annotate merchants with store, order and commission statistics (one query for any number of rows)"""
+        date_range = _date_range_q(self.request)
+        orders = Order.objects.filter(date_range, merchant__owner=OuterRef('pk'))
+        revenue_orders = orders.filter(status__in=REVENUE_STATUSES)
+        commissions = Transaction.objects.filter(
+            date_range,
+            user=OuterRef('pk'),
+            transaction_type='commission',
+            status__in=['completed', 'success'],
+        )
+        stores = Store.objects.filter(owner=OuterRef('pk'))
+        return queryset.annotate(
+            total_stores=_subquery_aggregate(stores, 'owner', Count('pk'), IntegerField()),
+            active_stores=_subquery_aggregate(stores.filter(is_active=True), 'owner', Count('pk'), IntegerField()),
+            total_orders=_subquery_aggregate(orders, 'merchant__owner', Count('pk'), IntegerField()),
+            total_revenue=_subquery_aggregate(revenue_orders, 'merchant__owner', Sum('total_amount'), MONEY_FIELD),
+            avg_order_value=_subquery_aggregate(revenue_orders, 'merchant__owner', Avg('total_amount'), MONEY_FIELD),
+            total_commission=_subquery_aggregate(commissions, 'user', Sum('amount'), MONEY_FIELD),
+        )
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Get date range for order/revenue calculations
-        start_date = self.request.GET.get('start_date')
-        end_date = self.request.GET.get('end_date')
-        
-        # Get paginated merchants (current page)
+        # Current page; statistics were annotated in the page query
         paginated_merchants = context.get('object_list', [])
-        
-        # Get all filtered merchants for stats
-        filtered_merchants = self.get_queryset()
-        
-        # Calculate statistics for each merchant on current page
-        merchants_data = []
-        for merchant in paginated_merchants:
-            # Get merchant's stores
-            stores = Store.objects.filter(owner=merchant)
-            
-            # Get orders for this merchant within date range
-            orders_query = Order.objects.filter(merchant__owner=merchant)
-            if start_date:
-                orders_query = orders_query.filter(created_at__gte=start_date)
-            if end_date:
-                from datetime import datetime
-                end_datetime = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
-                orders_query = orders_query.filter(created_at__lt=end_datetime)
-            
-            total_orders = orders_query.count()
-            total_revenue = orders_query.filter(
-                status__in=['delivered', 'shipped', 'accepted']
-            ).aggregate(total=Sum('total_amount'))['total'] or 0
-            
-            # Calculate commission earned
-            commission_transactions = Transaction.objects.filter(
-                user=merchant,
-                transaction_type='commission',
-                status__in=['completed', 'success']
-            )
-            if start_date:
-                commission_transactions = commission_transactions.filter(created_at__gte=start_date)
-            if end_date:
-                from datetime import datetime
-                end_datetime = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
-                commission_transactions = commission_transactions.filter(created_at__lt=end_datetime)
-            
-            total_commission = commission_transactions.aggregate(total=Sum('amount'))['total'] or 0
-            
-            # Average order value
-            avg_order_value = orders_query.filter(
-                status__in=['delivered', 'shipped', 'accepted']
-            ).aggregate(avg=Avg('total_amount'))['avg'] or 0
-            
-            merchants_data.append({
+        context['merchants_data'] = [
+            {
                 'merchant': merchant,
-                'stores': stores,
-                'total_stores': stores.count(),
-                'active_stores': stores.filter(is_active=True).count(),
-                'total_orders': total_orders,
-                'total_revenue': total_revenue,
-                'total_commission': total_commission,
-                'avg_order_value': avg_order_value,
-            })
-        
-        context['merchants_data'] = merchants_data
+                'total_stores': merchant.total_stores,
+                'active_stores': merchant.active_stores,
+                'total_orders': merchant.total_orders,
+                'total_revenue': merchant.total_revenue,
+                'total_commission': merchant.total_commission,
+                'avg_order_value': merchant.avg_order_value,
+            }
+            for merchant in paginated_merchants
+        ]
         
         # Overall statistics
-        all_merchants = User.objects.filter(is_merchant=True)
-        all_stores = Store.objects.all()
-        all_orders = Order.objects.all()
-        if start_date:
-            all_orders = all_orders.filter(created_at__gte=start_date)
-        if end_date:
-            from datetime import datetime
-            end_datetime = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
-            all_orders = all_orders.filter(created_at__lt=end_datetime)
-        
-        context['total_merchants'] = all_merchants.count()
-        context['active_merchants'] = all_merchants.filter(stores__is_active=True).distinct().count()
-        context['total_stores'] = all_stores.count()
-        context['active_stores'] = all_stores.filter(is_active=True).count()
-        context['total_orders'] = all_orders.count()
-        context['total_revenue'] = all_orders.filter(
-            status__in=['delivered', 'shipped', 'accepted']
-        ).aggregate(total=Sum('total_amount'))['total'] or 0
-        context['avg_order_value'] = all_orders.filter(
-            status__in=['delivered', 'shipped', 'accepted']
-        ).aggregate(avg=Avg('total_amount'))['avg'] or 0
+        context.update(User.objects.filter(is_merchant=True).aggregate(
+            total_merchants=Count('pk'),
+            active_merchants=Count('pk', filter=Q(Exists(Store.objects.filter(owner=OuterRef('pk'), is_active=True)))),
+        ))
+        context.update(Store.objects.aggregate(
+            total_stores=Count('pk'),
+            active_stores=Count('pk', filter=Q(is_active=True)),
+        ))
+        order_stats = Order.objects.filter(_date_range_q(self.request)).aggregate(
+            total_orders=Count('pk'),
+            total_revenue=Sum('total_amount', filter=Q(status__in=REVENUE_STATUSES)),
+            avg_order_value=Avg('total_amount', filter=Q(status__in=REVENUE_STATUSES)),
+        )
+        context['total_orders'] = order_stats['total_orders']
+        context['total_revenue'] = order_stats['total_revenue'] or 0
+        context['avg_order_value'] = order_stats['avg_order_value'] or 0
         
         # Filtered statistics
-        context['filtered_merchants'] = filtered_merchants.count()
+        context['filtered_merchants'] = context['paginator'].count
         
         # Context for filters
         context['start_date'] = self.request.GET.get('start_date', '')
@@ -302,73 +303,25 @@ class MerchantReportView(StaffRequiredMixin, ListView):
     def get(self, request, *args, **kwargs):
         # Handle CSV export
         if request.GET.get('export') == 'csv':
-            # Get all filtered merchants (no pagination for export)
-            filtered_merchants = self.get_queryset()
-            
-            # Get date range
-            start_date = request.GET.get('start_date')
-            end_date = request.GET.get('end_date')
-            
-            response = HttpResponse(content_type='text/csv')
-            response['Content-Disposition'] = 'attachment; filename="merchant_report.csv"'
-            
-            import csv
-            writer = csv.writer(response)
-            writer.writerow([
-                'Merchant ID', 'Merchant Name', 'Phone', 'Email', 'Merchant Code',
-                'KYC Verified', 'Total Stores', 'Active Stores', 'Total Orders',
-                'Total Revenue', 'Total Commission', 'Average Order Value'
-            ])
-            
-            for merchant in filtered_merchants:
-                # Calculate stats for this merchant
-                stores = Store.objects.filter(owner=merchant)
-                orders_query = Order.objects.filter(merchant__owner=merchant)
-                if start_date:
-                    orders_query = orders_query.filter(created_at__gte=start_date)
-                if end_date:
-                    from datetime import datetime
-                    end_datetime = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
-                    orders_query = orders_query.filter(created_at__lt=end_datetime)
-                
-                total_orders = orders_query.count()
-                total_revenue = orders_query.filter(
-                    status__in=['delivered', 'shipped', 'accepted']
-                ).aggregate(total=Sum('total_amount'))['total'] or 0
-                
-                commission_transactions = Transaction.objects.filter(
-                    user=merchant,
-                    transaction_type='commission',
-                    status__in=['completed', 'success']
-                )
-                if start_date:
-                    commission_transactions = commission_transactions.filter(created_at__gte=start_date)
-                if end_date:
-                    from datetime import datetime
-                    end_datetime = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
-                    commission_transactions = commission_transactions.filter(created_at__lt=end_datetime)
-                
-                total_commission = commission_transactions.aggregate(total=Sum('amount'))['total'] or 0
-                avg_order_value = orders_query.filter(
-                    status__in=['delivered', 'shipped', 'accepted']
-                ).aggregate(avg=Avg('total_amount'))['avg'] or 0
-                
-                writer.writerow([
-                    merchant.id,
-                    merchant.name,
-                    merchant.phone,
-                    merchant.email or '',
-                    merchant.merchant_code or '',
-                    'Yes' if merchant.is_kyc_verified else 'No',
-                    stores.count(),
-                    stores.filter(is_active=True).count(),
-                    total_orders,
-                    total_revenue,
-                    total_commission,
-                    avg_order_value,
-                ])
-            
-            return response
+            # All filtered merchants (no pagination for export), statistics annotated in one query
+            field_names = ['id', 'name', 'phone', 'email', 'merchant_code', 'is_kyc_verified',
+                           'total_stores', 'active_stores', 'total_orders', 'total_revenue',
+                           'total_commission', 'avg_order_value']
+            field_labels = {
+                'id': 'Merchant ID',
+                'name': 'Merchant Name',
+                'phone': 'Phone',
+                'email': 'Email',
+                'merchant_code': 'Merchant Code',
+                'is_kyc_verified': 'KYC Verified',
+                'total_stores': 'Total Stores',
+                'active_stores': 'Active Stores',
+                'total_orders': 'Total Orders',
+                'total_revenue': 'Total Revenue',
+                'total_commission': 'Total Commission',
+                'avg_order_value': 'Average Order Value',
+            }
+            return export_to_csv(self.get_queryset(), 'merchant_report', field_names, field_labels)
         
         return super().get(request, *args, **kwargs)
 
@@ -402,90 +355,61 @@ class CustomerReportView(StaffRequiredMixin, ListView):
         # Active customers filter (customers with at least one order)
         active_filter = self.request.GET.get('active')
         if active_filter == 'yes':
-            queryset = queryset.filter(orders__isnull=False).distinct()
+            queryset = queryset.filter(Exists(Order.objects.filter(user=OuterRef('pk'))))
         elif active_filter == 'no':
-            queryset = queryset.filter(orders__isnull=True)
+            queryset = queryset.filter(~Exists(Order.objects.filter(user=OuterRef('pk'))))
         
-        return queryset
+        return self.annotate_statistics(queryset)
+    
+    def annotate_statistics(self, queryset):
+        """Annotate customers with order and spending statistics (one query for any number of rows)"""
+        orders = Order.objects.filter(_date_range_q(self.request), user=OuterRef('pk'))
+        revenue_orders = orders.filter(status__in=REVENUE_STATUSES)
+        lifetime_orders = Order.objects.filter(user=OuterRef('pk'), status__in=REVENUE_STATUSES)
+        return queryset.annotate(
+            total_orders=_subquery_aggregate(orders, 'user', Count('pk'), IntegerField()),
+            total_spending=_subquery_aggregate(revenue_orders, 'user', Sum('total_amount'), MONEY_FIELD),
+            avg_order_value=_subquery_aggregate(revenue_orders, 'user', Avg('total_amount'), MONEY_FIELD),
+            # Customer lifetime value (all orders regardless of date range)
+            lifetime_value=_subquery_aggregate(lifetime_orders, 'user', Sum('total_amount'), MONEY_FIELD),
+            last_order_date=_subquery_aggregate(orders, 'user', Max('created_at'), DateTimeField(), default=None),
+        )
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Get date range for order/spending calculations
-        start_date = self.request.GET.get('start_date')
-        end_date = self.request.GET.get('end_date')
-        
-        # Get paginated customers (current page)
+        # Current page; statistics were annotated in the page query
         paginated_customers = context.get('object_list', [])
-        
-        # Get all filtered customers for stats
-        filtered_customers = self.get_queryset()
-        
-        # Calculate statistics for each customer on current page
-        customers_data = []
-        for customer in paginated_customers:
-            # Get orders for this customer within date range
-            orders_query = Order.objects.filter(user=customer)
-            if start_date:
-                orders_query = orders_query.filter(created_at__gte=start_date)
-            if end_date:
-                from datetime import datetime
-                end_datetime = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
-                orders_query = orders_query.filter(created_at__lt=end_datetime)
-            
-            total_orders = orders_query.count()
-            total_spending = orders_query.filter(
-                status__in=['delivered', 'shipped', 'accepted']
-            ).aggregate(total=Sum('total_amount'))['total'] or 0
-            
-            # Average order value
-            avg_order_value = orders_query.filter(
-                status__in=['delivered', 'shipped', 'accepted']
-            ).aggregate(avg=Avg('total_amount'))['avg'] or 0
-            
-            # Customer lifetime value (all orders regardless of date range)
-            lifetime_value = Order.objects.filter(
-                user=customer,
-                status__in=['delivered', 'shipped', 'accepted']
-            ).aggregate(total=Sum('total_amount'))['total'] or 0
-            
-            # Last order date
-            last_order = orders_query.order_by('-created_at').first()
-            last_order_date = last_order.created_at if last_order else None
-            
-            customers_data.append({
+        context['customers_data'] = [
+            {
                 'customer': customer,
-                'total_orders': total_orders,
-                'total_spending': total_spending,
-                'avg_order_value': avg_order_value,
-                'lifetime_value': lifetime_value,
-                'last_order_date': last_order_date,
-            })
-        
-        context['customers_data'] = customers_data
+                'total_orders': customer.total_orders,
+                'total_spending': customer.total_spending,
+                'avg_order_value': customer.avg_order_value,
+                'lifetime_value': customer.lifetime_value,
+                'last_order_date': customer.last_order_date,
+            }
+            for customer in paginated_customers
+        ]
         
         # Overall statistics
-        all_customers = User.objects.filter(is_merchant=False, is_driver=False)
-        all_orders = Order.objects.filter(user__is_merchant=False, user__is_driver=False)
-        if start_date:
-            all_orders = all_orders.filter(created_at__gte=start_date)
-        if end_date:
-            from datetime import datetime
-            end_datetime = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
-            all_orders = all_orders.filter(created_at__lt=end_datetime)
-        
-        context['total_customers'] = all_customers.count()
-        context['active_customers'] = all_customers.filter(orders__isnull=False).distinct().count()
-        context['total_orders'] = all_orders.count()
-        context['total_spending'] = all_orders.filter(
-            status__in=['delivered', 'shipped', 'accepted']
-        ).aggregate(total=Sum('total_amount'))['total'] or 0
-        context['avg_order_value'] = all_orders.filter(
-            status__in=['delivered', 'shipped', 'accepted']
-        ).aggregate(avg=Avg('total_amount'))['avg'] or 0
+        context.update(User.objects.filter(is_merchant=False, is_driver=False).aggregate(
+            total_customers=Count('pk'),
+            active_customers=Count('pk', filter=Q(Exists(Order.objects.filter(user=OuterRef('pk'))))),
+        ))
+        order_stats = Order.objects.filter(
+            _date_range_q(self.request), user__is_merchant=False, user__is_driver=False
+        ).aggregate(
+            total_orders=Count('pk'),
+            total_spending=Sum('total_amount', filter=Q(status__in=REVENUE_STATUSES)),
+            avg_order_value=Avg('total_amount', filter=Q(status__in=REVENUE_STATUSES)),
+        )
+        context['total_orders'] = order_stats['total_orders']
+        context['total_spending'] = order_stats['total_spending'] or 0
+        context['avg_order_value'] = order_stats['avg_order_value'] or 0
         
         # Filtered statistics
-        context['filtered_customers'] = filtered_customers.count()
+        context['filtered_customers'] = context['paginator'].count
         
         # Context for filters
         context['start_date'] = self.request.GET.get('start_date', '')
@@ -499,64 +423,27 @@ class CustomerReportView(StaffRequiredMixin, ListView):
     def get(self, request, *args, **kwargs):
         # Handle CSV export
         if request.GET.get('export') == 'csv':
-            # Get all filtered customers (no pagination for export)
-            filtered_customers = self.get_queryset()
-            
-            # Get date range
-            start_date = request.GET.get('start_date')
-            end_date = request.GET.get('end_date')
-            
-            response = HttpResponse(content_type='text/csv')
-            response['Content-Disposition'] = 'attachment; filename="customer_report.csv"'
-            
-            import csv
-            writer = csv.writer(response)
-            writer.writerow([
-                'Customer ID', 'Customer Name', 'Phone', 'Email', 'KYC Verified',
-                'Total Orders', 'Total Spending', 'Average Order Value', 'Lifetime Value', 'Last Order Date'
-            ])
+            # All filtered customers (no pagination for export), statistics annotated in one query
+            field_names = ['id', 'name', 'phone', 'email', 'is_kyc_verified', 'total_orders',
+                           'total_spending', 'avg_order_value', 'lifetime_value', 'last_order_date']
+            field_labels = {
+                'id': 'Customer ID',
+                'name': 'Customer Name',
+                'phone': 'Phone',
+                'email': 'Email',
+                'is_kyc_verified': 'KYC Verified',
+                'total_orders': 'Total Orders',
+                'total_spending': 'Total Spending',
+                'avg_order_value': 'Average Order Value',
+                'lifetime_value': 'Lifetime Value',
+                'last_order_date': 'Last Order Date',
+            }
             
-            for customer in filtered_customers:
-                # Calculate stats for this customer
-                orders_query = Order.objects.filter(user=customer)
-                if start_date:
-                    orders_query = orders_query.filter(created_at__gte=start_date)
-                if end_date:
-                    from datetime import datetime
-                    end_datetime = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
-                    orders_query = orders_query.filter(created_at__lt=end_datetime)
-                
-                total_orders = orders_query.count()
-                total_spending = orders_query.filter(
-                    status__in=['delivered', 'shipped', 'accepted']
-                ).aggregate(total=Sum('total_amount'))['total'] or 0
-                
-                avg_order_value = orders_query.filter(
-                    status__in=['delivered', 'shipped', 'accepted']
-                ).aggregate(avg=Avg('total_amount'))['avg'] or 0
-                
-                lifetime_value = Order.objects.filter(
-                    user=customer,
-                    status__in=['delivered', 'shipped', 'accepted']
-                ).aggregate(total=Sum('total_amount'))['total'] or 0
-                
-                last_order = orders_query.order_by('-created_at').first()
-                last_order_date = last_order.created_at if last_order else None
-                
-                writer.writerow([
-                    customer.id,
-                    customer.name,
-                    customer.phone,
-                    customer.email or '',
-                    'Yes' if customer.is_kyc_verified else 'No',
-                    total_orders,
-                    total_spending,
-                    avg_order_value,
-                    lifetime_value,
-                    last_order_date.strftime('%Y-%m-%d %H:%M:%S') if last_order_date else '',
-                ])
+            def get_field_value(obj, field_name):
+                if field_name == 'last_order_date':
+                    return obj.last_order_date.strftime('%Y-%m-%d %H:%M:%S') if obj.last_order_date else ''
+                return get_field_value_default(obj, field_name)
             
-            return response
+            return export_to_csv(self.get_queryset(), 'customer_report', field_names, field_labels, get_field_value)
         
         return super().get(request, *args, **kwargs)
-
@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+from django.conf import settings
+
+
+class SimulatorConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'simulator'
+    
+    def ready(self):
+        from simulator import transport, fcm
+        if getattr(settings, 'SIMULATOR_TRANSPORT', 'http') == 'inprocess':
+            transport.install()
+        if getattr(settings, 'SIMULATOR_PATCH_FCM', True):
+            fcm.install()
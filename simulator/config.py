@@ -0,0 +1,86 @@
+"""
+Simulator behaviour profile
+Latency and error rates per integration, read from settings.SIMULATOR and
+overridable at runtime through the /simulator/config/ endpoint.
+"""
+import random
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+OVERRIDE_CACHE_KEY = 'simulator:config_override'
+
+DEFAULTS = {
+    # Milliseconds; a number or [min, max] for uniform jitter. Keyed by service or 'default'
+    'latency_ms': {'default': 0},
+    # Probability (0-1) that a call fails with an upstream error
+    'error_rate': {'default': 0.0},
+    # Delay before webhook/redirect callbacks are delivered
+    'webhook_delay_ms': 500,
+    # Origin callbacks are delivered to (this app)
+    'webhook_target': 'http://127.0.0.1:8000',
+    # Seconds between simulated Shipdaak tracking status transitions
+    'tracking_step_seconds': 60,
+}
+
+SERVICES = ['shipdaak', 'fast2sms', 'kaicho', 'phonepe', 'sabpaisa', 'razorpay', 'fcm']
+
+
+def get_config():
+    """Effective simulator config: defaults < settings.SIMULATOR < runtime override"""
+    config = {key: (value.copy() if isinstance(value, dict) else value) for key, value in DEFAULTS.items()}
+    for source in (getattr(settings, 'SIMULATOR', {}), cache.get(OVERRIDE_CACHE_KEY) or {}):
+        for key, value in source.items():
+            if isinstance(value, dict) and isinstance(config.get(key), dict):
+                config[key].update(value)
+            else:
+                config[key] = value
+    return config
+
+
+def set_override(values):
+    """Merge values into the runtime override (shared through the cache)"""
+    override = cache.get(OVERRIDE_CACHE_KEY) or {}
+    for key, value in values.items():
+        if isinstance(value, dict) and isinstance(override.get(key), dict):
+            override[key].update(value)
+        else:
+            override[key] = value
+    cache.set(OVERRIDE_CACHE_KEY, override, None)
+    return get_config()
+
+
+def _for_service(mapping, service, fallback):
+    if not isinstance(mapping, dict):
+        return mapping
+    return mapping.get(service, mapping.get('default', fallback))
+
+
+def apply_latency(service):
+    """Sleep for the configured latency of a service"""
+    latency = _for_service(get_config()['latency_ms'], service, 0)
+    if isinstance(latency, (list, tuple)):
+        latency = random.uniform(latency[0], latency[1])
+    if latency:
+        time.sleep(float(latency) / 1000)
+
+
+def should_fail(service):
+    """Draw against the configured error rate of a service"""
+    return random.random() < float(_for_service(get_config()['error_rate'], service, 0.0))
+
+
+def simulate_conditions(service):
+    """
+    Apply configured latency for a service and decide whether the call fails
+    
+    Returns:
+        True if the call should fail with a simulated upstream error
+    """
+    apply_latency(service)
+    return should_fail(service)
+
+
+def simulator_url(path):
+    """Absolute URL of a simulator endpoint, as seen by the app's HTTP clients"""
+    return f"{settings.SIMULATOR_BASE_URL.rstrip('/')}/{path.lstrip('/')}"
@@ -0,0 +1,93 @@
+"""
+Simulated Firebase Cloud Messaging
+Replaces the firebase_admin.messaging send functions with local fakes that
+honour the simulator latency/error profile, so push fan-out can be exercised
+without Firebase credentials.
+"""
+import uuid
+from simulator.config import simulate_conditions, apply_latency, should_fail
+
+_originals = {}
+
+
+class SimulatedSendResponse:
+    def __init__(self, message_id=None, exception=None):
+        self.message_id = message_id
+        self.exception = exception
+    
+    @property
+    def success(self):
+        return self.exception is None
+
+
+class SimulatedBatchResponse:
+    def __init__(self, responses):
+        self.responses = responses
+        self.success_count = sum(1 for response in responses if response.success)
+        self.failure_count = len(responses) - self.success_count
+
+
+def _message_id():
+    return f"projects/simulator/messages/{uuid.uuid4().hex}"
+
+
+def _send(message, dry_run=False, app=None):
+    from firebase_admin import exceptions
+    if simulate_conditions('fcm'):
+        raise exceptions.UnavailableError('Simulated FCM error')
+    return _message_id()
+
+
+def _send_batch(tokens):
+    from firebase_admin import exceptions
+    # One latency sample per batch request, one error draw per token
+    apply_latency('fcm')
+    responses = []
+    for _ in tokens:
+        if should_fail('fcm'):
+            responses.append(SimulatedSendResponse(exception=exceptions.UnavailableError('Simulated FCM error')))
+        else:
+            responses.append(SimulatedSendResponse(message_id=_message_id()))
+    return SimulatedBatchResponse(responses)
+
+
+def _send_multicast(multicast_message, dry_run=False, app=None):
+    return _send_batch(multicast_message.tokens)
+
+
+def _send_each(messages, dry_run=False, app=None):
+    return _send_batch(messages)
+
+
+def install():
+    """Patch firebase_admin.messaging (no-op if firebase-admin is not installed)"""
+    try:
+        from firebase_admin import messaging
+    except ImportError:
+        return False
+    from core.services.fcm_service import FCMService
+    
+    if not _originals:
+        for name in ('send', 'send_multicast', 'send_each', 'send_each_for_multicast'):
+            _originals[name] = getattr(messaging, name, None)
+    messaging.send = _send
+    messaging.send_multicast = _send_multicast
+    messaging.send_each = _send_each
+    messaging.send_each_for_multicast = _send_multicast
+    FCMService._initialized = True
+    return True
+
+
+def uninstall():
+    """Restore the original firebase_admin.messaging functions"""
+    try:
+        from firebase_admin import messaging
+    except ImportError:
+        return
+    for name, original in _originals.items():
+        if original is None:
+            if hasattr(messaging, name):
+                delattr(messaging, name)
+        else:
+            setattr(messaging, name, original)
+    _originals.clear()
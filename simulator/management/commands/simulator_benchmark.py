@@ -0,0 +1,131 @@
+"""
+Django management command to load-test integration flows against the simulator
+Drives the app's real service clients (SMS, Shipdaak, Razorpay, PhonePe, FCM)
+concurrently and reports throughput and latency percentiles.
+
+    python manage.py simulator_benchmark --flow shipping_rates --requests 500 --concurrency 20 \
+        --settings=ecommerce_backend.settings_simulator
+"""
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _otp_flow(index):
+    from core.utils.sms_service import sms_service
+    country_code = '+91' if index % 2 else '+977'
+    result = sms_service.send_otp(f'98{index:08d}', '123456', country_code)
+    return bool(result.get('success'))
+
+
+def _shipping_rates_flow(index):
+    from ecommerce.services.shipdaak_service import ShipdaakService
+    response = ShipdaakService().get_rate_serviceability(
+        '110001', str(400001 + index % 500), 500 + (index % 10) * 250, 10, 10, 10, 999, use_cache=False
+    )
+    return response is not None
+
+
+def _tracking_flow(index):
+    from ecommerce.services.shipdaak_service import ShipdaakService
+    return ShipdaakService().track_shipment(f'SIMBENCH{index:06d}') is not None
+
+
+def _razorpay_status_flow(index):
+    from ecommerce.services.razorpay_service import verify_payment_status
+    return bool(verify_payment_status(f'pay_bench{index:08d}').get('success'))
+
+
+def _phonepe_order_flow(index):
+    from ecommerce.services.phonepe_service import create_order_for_mobile_sdk
+    result = create_order_for_mobile_sdk(100.0, f'BENCH-{uuid.uuid4().hex[:20]}')
+    return bool(result and result.get('success'))
+
+
+def _fcm_flow(index):
+    from core.services.fcm_service import FCMService
+    tokens = [f'sim-token-{index}-{n}' for n in range(10)]
+    result = FCMService.send_multicast_notification(tokens, {'title': 'Benchmark', 'body': f'Message {index}'})
+    return result.get('failure_count', 0) == 0
+
+
+FLOWS = {
+    'otp': _otp_flow,
+    'shipping_rates': _shipping_rates_flow,
+    'tracking': _tracking_flow,
+    'razorpay_status': _razorpay_status_flow,
+    'phonepe_order': _phonepe_order_flow,
+    'fcm': _fcm_flow,
+}
+
+
+def _percentile(sorted_values, percent):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(percent / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = 'Load-test integration flows against the offline gateway simulator'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--flow',
+            choices=sorted(FLOWS) + ['all'],
+            default='all',
+            help='Flow to exercise (default: all)',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=100,
+            help='Number of calls per flow (default: 100)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=10,
+            help='Number of concurrent callers (default: 10)',
+        )
+
+    def handle(self, *args, **options):
+        if 'simulator' not in settings.INSTALLED_APPS:
+            raise CommandError('The simulator app is not installed; use --settings=ecommerce_backend.settings_simulator')
+
+        flows = sorted(FLOWS) if options['flow'] == 'all' else [options['flow']]
+        total = max(1, options['requests'])
+        concurrency = max(1, options['concurrency'])
+
+        self.stdout.write(
+            f"Simulator transport: {getattr(settings, 'SIMULATOR_TRANSPORT', 'http')}, "
+            f"{total} calls per flow, concurrency {concurrency}"
+        )
+        for name in flows:
+            self._run_flow(name, FLOWS[name], total, concurrency)
+
+    def _run_flow(self, name, flow, total, concurrency):
+        def _timed(index):
+            started = time.perf_counter()
+            try:
+                ok = flow(index)
+            except Exception:
+                ok = False
+            return ok, (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(_timed, range(total)))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for _, latency in results)
+        errors = sum(1 for ok, _ in results if not ok)
+        style = self.style.SUCCESS if not errors else self.style.WARNING
+        self.stdout.write(style(
+            f"{name:16s} {total / elapsed:8.1f} req/s  "
+            f"p50 {_percentile(latencies, 50):7.1f}ms  p95 {_percentile(latencies, 95):7.1f}ms  "
+            f"p99 {_percentile(latencies, 99):7.1f}ms  max {latencies[-1]:7.1f}ms  "
+            f"errors {errors}/{total}"
+        ))
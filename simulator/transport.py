@@ -0,0 +1,112 @@
+"""
+In-process transport for the simulator
+Routes requests made with the `requests` library to SIMULATOR_BASE_URL's origin
+through django.test.Client instead of the network, so the simulator (and the
+callbacks it delivers back to the app) work without a running server.
+"""
+import threading
+from contextlib import contextmanager
+from io import BytesIO
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from django.conf import settings
+from django.db import connection
+
+_original_get_adapter = None
+_lock = threading.Lock()
+
+
+def _origin(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def _intercepted_origins():
+    from simulator.config import get_config
+    return {_origin(settings.SIMULATOR_BASE_URL), _origin(get_config()['webhook_target'])}
+
+
+class SimulatorAdapter(BaseAdapter):
+    """requests adapter that dispatches to Django's URL resolver in-process"""
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        from django.test import Client
+        parts = urlsplit(request.url)
+        path = parts.path + (f"?{parts.query}" if parts.query else '')
+
+        headers = {
+            f"HTTP_{name.upper().replace('-', '_')}": value
+            for name, value in request.headers.items()
+            if name.lower() not in ('content-type', 'content-length', 'host')
+        }
+        body = request.body or b''
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+
+        client = Client(raise_request_exception=False, SERVER_NAME=parts.hostname or 'testserver')
+        try:
+            django_response = client.generic(
+                request.method, path, data=body,
+                content_type=request.headers.get('Content-Type', 'application/octet-stream'),
+                **headers
+            )
+        finally:
+            # Worker threads (tracking pool, webhook timers) each get their own DB connection
+            if threading.current_thread() is not threading.main_thread():
+                connection.close()
+
+        response = requests.Response()
+        response.status_code = django_response.status_code
+        response.headers = CaseInsensitiveDict(django_response.headers.items())
+        content = b''.join(django_response.streaming_content) if django_response.streaming else django_response.content
+        response.raw = BytesIO(content)
+        response._content = content
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.reason = getattr(django_response, 'reason_phrase', '')
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+_adapter = SimulatorAdapter()
+
+
+def _get_adapter(self, url):
+    if _origin(url) in _intercepted_origins():
+        return _adapter
+    return _original_get_adapter(self, url)
+
+
+def install():
+    """Route simulator-bound requests in-process (idempotent)"""
+    global _original_get_adapter
+    with _lock:
+        if _original_get_adapter is None:
+            _original_get_adapter = requests.Session.get_adapter
+            requests.Session.get_adapter = _get_adapter
+
+
+def uninstall():
+    """Restore normal network transport"""
+    global _original_get_adapter
+    with _lock:
+        if _original_get_adapter is not None:
+            requests.Session.get_adapter = _original_get_adapter
+            _original_get_adapter = None
+
+
+@contextmanager
+def inprocess():
+    """Context manager form of install()/uninstall() for tests and scripts"""
+    already_installed = _original_get_adapter is not None
+    install()
+    try:
+        yield
+    finally:
+        if not already_installed:
+            uninstall()
@@ -0,0 +1,36 @@
+from django.urls import path
+from simulator import views
+
+app_name = 'simulator'
+
+urlpatterns = [
+    path('config/', views.config_view, name='config'),
+    
+    # Shipdaak
+    path('shipdaak/v1/auth/token', views.shipdaak_token, name='shipdaak_token'),
+    path('shipdaak/v1/warehouse/create-warehouse', views.shipdaak_create_warehouse, name='shipdaak_create_warehouse'),
+    path('shipdaak/v1/shipments/generate-shipment', views.shipdaak_generate_shipment, name='shipdaak_generate_shipment'),
+    path('shipdaak/v1/shipments/cancel-shipment', views.shipdaak_cancel_shipment, name='shipdaak_cancel_shipment'),
+    path('shipdaak/v1/shipments/track-shipment/<str:awb_number>', views.shipdaak_track_shipment, name='shipdaak_track_shipment'),
+    path('shipdaak/v1/shipments/bulk-label-shipment', views.shipdaak_bulk_document, {'kind': 'label'}, name='shipdaak_bulk_label'),
+    path('shipdaak/v1/shipments/bulk-manifest-shipment', views.shipdaak_bulk_document, {'kind': 'manifest'}, name='shipdaak_bulk_manifest'),
+    path('shipdaak/v1/courier/get-courier', views.shipdaak_get_couriers, name='shipdaak_get_couriers'),
+    path('shipdaak/v1/courier/get-rate-serviceability', views.shipdaak_rate_serviceability, name='shipdaak_rate_serviceability'),
+    path('shipdaak/documents/<str:kind>/<str:name>.pdf', views.shipdaak_document, name='shipdaak_document'),
+    
+    # SMS
+    path('fast2sms/dev/bulkV2', views.fast2sms_bulk, name='fast2sms_bulk'),
+    path('kaicho/smsapi/index.php', views.kaicho_send, name='kaicho_send'),
+    
+    # PhonePe
+    path('phonepe/apis/identity-manager/v1/oauth/token', views.phonepe_oauth_token, name='phonepe_oauth_token'),
+    path('phonepe/apis/pg/checkout/v2/sdk/order', views.phonepe_sdk_order, name='phonepe_sdk_order'),
+    
+    # SabPaisa
+    path('sabpaisa/SabPaisa/sabPaisaInit', views.sabpaisa_init, name='sabpaisa_init'),
+    
+    # Razorpay
+    path('razorpay/v1/orders', views.razorpay_orders, name='razorpay_orders'),
+    path('razorpay/v1/payments', views.razorpay_payments, name='razorpay_capture_payment'),
+    path('razorpay/v1/payments/<str:payment_id>', views.razorpay_payments, name='razorpay_payment'),
+]
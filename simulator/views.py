@@ -0,0 +1,365 @@
+"""
+Simulated third-party gateway endpoints
+Each view mimics the request/response shape the app's service clients rely on.
+"""
+import base64
+import hashlib
+import hmac
+import io
+import json
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse, HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST, require_http_methods
+from reportlab.pdfgen import canvas
+from simulator.config import simulate_conditions, simulator_url, get_config, set_override
+from simulator.webhooks import schedule_callback
+
+
+SIMULATED_ERROR = 'Simulated upstream error'
+
+COURIERS = [
+    {'id': 1, 'name': 'Simulated Express', 'base_rate': 45.0, 'per_500g': 20.0},
+    {'id': 2, 'name': 'Simulated Surface', 'base_rate': 35.0, 'per_500g': 15.0},
+    {'id': 3, 'name': 'Simulated Air', 'base_rate': 70.0, 'per_500g': 30.0},
+]
+
+TRACKING_STATUSES = ['Pending Pickup', 'Picked Up', 'In Transit', 'Out For Delivery', 'Delivered']
+
+
+def _json_body(request):
+    try:
+        return json.loads(request.body or b'{}')
+    except ValueError:
+        return {}
+
+
+def _pdf(title, lines):
+    buffer = io.BytesIO()
+    can = canvas.Canvas(buffer, pagesize=(288, 432))
+    can.drawString(20, 400, title)
+    for index, line in enumerate(lines):
+        can.drawString(20, 370 - index * 18, str(line))
+    can.showPage()
+    can.save()
+    return buffer.getvalue()
+
+
+# ---------------------------------------------------------------------------
+# Simulator control
+# ---------------------------------------------------------------------------
+
+@csrf_exempt
+@require_http_methods(['GET', 'POST'])
+def config_view(request):
+    """GET current latency/error profile, POST JSON to override it at runtime"""
+    if request.method == 'POST':
+        return JsonResponse(set_override(_json_body(request)))
+    return JsonResponse(get_config())
+
+
+# ---------------------------------------------------------------------------
+# Shipdaak
+# ---------------------------------------------------------------------------
+
+def _shipdaak_error():
+    return JsonResponse({'status': False, 'message': SIMULATED_ERROR}, status=503)
+
+
+@csrf_exempt
+@require_POST
+def shipdaak_token(request):
+    if simulate_conditions('shipdaak'):
+        return _shipdaak_error()
+    header = base64.urlsafe_b64encode(json.dumps({'alg': 'none'}).encode()).decode().rstrip('=')
+    payload = base64.urlsafe_b64encode(json.dumps({'exp': int(time.time()) + 86400}).encode()).decode().rstrip('=')
+    return JsonResponse({'access_token': f'{header}.{payload}.simulated'})
+
+
+@csrf_exempt
+@require_POST
+def shipdaak_create_warehouse(request):
+    if simulate_conditions('shipdaak'):
+        return _shipdaak_error()
+    body = _json_body(request)
+    pickup_id = body.get('pickup_warehouse_id') or int(uuid.uuid4().int % 900000) + 100000
+    return JsonResponse({
+        'status': True,
+        'message': 'Warehouse created/verified successfully',
+        'data': {
+            'pickup_warehouse_id': pickup_id,
+            'rto_warehouse_id': body.get('rto_warehouse_id') or pickup_id + 1,
+        }
+    })
+
+
+@csrf_exempt
+@require_POST
+def shipdaak_generate_shipment(request):
+    if simulate_conditions('shipdaak'):
+        return _shipdaak_error()
+    body = _json_body(request)
+    awb_number = f"SIM{uuid.uuid4().hex[:12].upper()}"
+    cache.set(f'simulator:shipdaak:awb:{awb_number}', time.time(), None)
+    courier = next((c for c in COURIERS if c['id'] == body.get('courier')), COURIERS[0])
+    return JsonResponse({
+        'status': True,
+        'data': {
+            'awb_number': awb_number,
+            'shipment_id': int(uuid.uuid4().int % 9000000) + 1000000,
+            'order_id': int(uuid.uuid4().int % 9000000) + 1000000,
+            'label': simulator_url(f'shipdaak/documents/label/{awb_number}.pdf'),
+            'manifest': simulator_url(f'shipdaak/documents/manifest/{awb_number}.pdf'),
+            'status': TRACKING_STATUSES[0],
+            'courier_id': courier['id'],
+            'courier_name': courier['name'],
+        }
+    })
+
+
+@csrf_exempt
+@require_POST
+def shipdaak_cancel_shipment(request):
+    if simulate_conditions('shipdaak'):
+        return _shipdaak_error()
+    awb_number = _json_body(request).get('awb_number')
+    cache.set(f'simulator:shipdaak:cancelled:{awb_number}', True, None)
+    return JsonResponse({'status': True, 'message': f'Shipment {awb_number} cancelled'})
+
+
+@require_GET
+def shipdaak_track_shipment(request, awb_number):
+    """Status advances one step every SIMULATOR['tracking_step_seconds'] since the AWB was first seen"""
+    if simulate_conditions('shipdaak'):
+        return _shipdaak_error()
+    first_seen_key = f'simulator:shipdaak:awb:{awb_number}'
+    cache.add(first_seen_key, time.time(), None)
+    first_seen = cache.get(first_seen_key)
+    step_seconds = max(1, get_config()['tracking_step_seconds'])
+
+    if cache.get(f'simulator:shipdaak:cancelled:{awb_number}'):
+        reached = ['Pending Pickup', 'Cancelled']
+    else:
+        steps = int((time.time() - first_seen) // step_seconds)
+        reached = TRACKING_STATUSES[:min(steps, len(TRACKING_STATUSES) - 1) + 1]
+
+    history = []
+    for index, status_name in enumerate(reached):
+        event_time = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(first_seen + index * step_seconds))
+        history.append({
+            'statusCode': status_name.upper().replace(' ', '_'),
+            'message': status_name,
+            'location': 'Simulator Hub',
+            'eventTime': event_time,
+        })
+
+    data = {'awb_number': awb_number, 'status': reached[-1], 'history': history}
+    if len(reached) > 1:
+        data['pickupDate'] = history[1]['eventTime']
+    if reached[-1] == 'Delivered':
+        data['deliveredDate'] = history[-1]['eventTime']
+    return JsonResponse({'status': True, 'data': data})
+
+
+@require_GET
+def shipdaak_get_couriers(request):
+    if simulate_conditions('shipdaak'):
+        return _shipdaak_error()
+    return JsonResponse({'status': True, 'data': [{'id': c['id'], 'name': c['name']} for c in COURIERS]})
+
+
+@csrf_exempt
+@require_POST
+def shipdaak_bulk_document(request, kind):
+    if simulate_conditions('shipdaak'):
+        return _shipdaak_error()
+    awb_numbers = _json_body(request).get('awb_nos') or []
+    batch_id = hashlib.sha256(','.join(awb_numbers).encode()).hexdigest()[:16]
+    cache.set(f'simulator:shipdaak:batch:{batch_id}', awb_numbers, 60 * 60 * 24)
+    return JsonResponse({'status': True, 'data': simulator_url(f'shipdaak/documents/{kind}/batch-{batch_id}.pdf')})
+
+
+@require_GET
+def shipdaak_document(request, kind, name):
+    if name.startswith('batch-'):
+        awb_numbers = cache.get(f'simulator:shipdaak:batch:{name[6:]}') or []
+    else:
+        awb_numbers = [name]
+    return HttpResponse(_pdf(f'Simulated {kind}', awb_numbers), content_type='application/pdf')
+
+
+@csrf_exempt
+@require_POST
+def shipdaak_rate_serviceability(request):
+    if simulate_conditions('shipdaak'):
+        return _shipdaak_error()
+    body = _json_body(request)
+    weight = float(body.get('weight') or 500)
+    volumetric = float(body.get('length') or 0) * float(body.get('breadth') or 0) * float(body.get('height') or 0) / 5
+    slabs = max(1, int((max(weight, volumetric) + 499) // 500))
+    return JsonResponse({
+        'status': True,
+        'data': [
+            {
+                'courier_id': c['id'],
+                'courier_name': c['name'],
+                'total_charges': round(c['base_rate'] + c['per_500g'] * (slabs - 1), 2),
+                'estimated_delivery_days': 2 + index,
+                'serviceable': True,
+            }
+            for index, c in enumerate(COURIERS)
+        ]
+    })
+
+
+# ---------------------------------------------------------------------------
+# SMS (Fast2SMS, Kaicho)
+# ---------------------------------------------------------------------------
+
+@csrf_exempt
+@require_POST
+def fast2sms_bulk(request):
+    if simulate_conditions('fast2sms'):
+        return JsonResponse({'return': False, 'status_code': 500, 'message': SIMULATED_ERROR}, status=500)
+    return JsonResponse({'return': True, 'request_id': uuid.uuid4().hex, 'message': ['SMS sent successfully.']})
+
+
+@require_GET
+def kaicho_send(request):
+    if simulate_conditions('kaicho'):
+        return HttpResponse(f'ERR: {SIMULATED_ERROR}')
+    return HttpResponse(f'SMS-SHOOT-ID/{uuid.uuid4().hex[:16]}')
+
+
+# ---------------------------------------------------------------------------
+# PhonePe (REST endpoints called directly, not through the SDK)
+# ---------------------------------------------------------------------------
+
+@csrf_exempt
+@require_POST
+def phonepe_oauth_token(request):
+    if simulate_conditions('phonepe'):
+        return JsonResponse({'code': 'INTERNAL_SERVER_ERROR', 'message': SIMULATED_ERROR}, status=500)
+    return JsonResponse({
+        'access_token': f'sim-{uuid.uuid4().hex}',
+        'token_type': 'O-Bearer',
+        'expires_at': int(time.time()) + 3600,
+    })
+
+
+@csrf_exempt
+@require_POST
+def phonepe_sdk_order(request):
+    """Create an order token and redirect the customer back to the payment callback"""
+    if simulate_conditions('phonepe'):
+        return JsonResponse({'code': 'INTERNAL_SERVER_ERROR', 'message': SIMULATED_ERROR}, status=500)
+    merchant_order_id = _json_body(request).get('merchantOrderId')
+    schedule_callback('GET', '/api/payments/callback/', params={'merchant_order_id': merchant_order_id})
+    return JsonResponse({
+        'orderId': f'OMO{uuid.uuid4().hex[:20].upper()}',
+        'state': 'PENDING',
+        'expireAt': int(time.time() * 1000) + 15 * 60 * 1000,
+        'token': f'sim-{uuid.uuid4().hex}',
+    })
+
+
+# ---------------------------------------------------------------------------
+# SabPaisa
+# ---------------------------------------------------------------------------
+
+@csrf_exempt
+@require_POST
+def sabpaisa_init(request):
+    """Accept the encrypted checkout form and post an encrypted result to the callback"""
+    from ecommerce.services.sabpaisa_service import encrypt_sabpaisa_data, decrypt_sabpaisa_data
+
+    params = dict(
+        part.split('=', 1) for part in
+        decrypt_sabpaisa_data(settings.SABPAISA_AES_KEY, settings.SABPAISA_AES_IV, request.POST.get('encData', '')).split('&')
+        if '=' in part
+    )
+    failed = simulate_conditions('sabpaisa')
+    result = '&'.join([
+        f"clientTxnId={params.get('clientTxnId', '')}",
+        f"statusCode={'0300' if failed else '0000'}",
+        f"sabpaisaTxnId=SIM{uuid.uuid4().hex[:14].upper()}",
+        f"sabpaisaMessage={'Transaction Failed' if failed else 'Transaction Successful'}",
+        'paymentMode=UPI',
+        'bankName=Simulated Bank',
+        f"paidAmount={params.get('amount', '0')}",
+        f"payerName={params.get('payerName', '')}",
+        f"payerEmail={params.get('payerEmail', '')}",
+        f"payerMobile={params.get('payerMobile', '')}",
+    ])
+    enc_response = encrypt_sabpaisa_data(settings.SABPAISA_AES_KEY, settings.SABPAISA_AES_IV, result)
+    schedule_callback('POST', '/api/payments/sabpaisa/callback/', data={'encResponse': enc_response})
+    return HttpResponse('<html><body>Simulated SabPaisa checkout: result posted to callback.</body></html>')
+
+
+# ---------------------------------------------------------------------------
+# Razorpay
+# ---------------------------------------------------------------------------
+
+def _razorpay_error():
+    return JsonResponse({'error': {'code': 'SERVER_ERROR', 'description': SIMULATED_ERROR}}, status=500)
+
+
+def _razorpay_payment(payment_id, amount=10000, order_id=''):
+    return {
+        'id': payment_id,
+        'entity': 'payment',
+        'amount': amount,
+        'currency': 'INR',
+        'status': 'captured',
+        'method': 'upi',
+        'captured': True,
+        'order_id': order_id,
+        'created_at': int(time.time()),
+    }
+
+
+@csrf_exempt
+@require_POST
+def razorpay_orders(request):
+    if simulate_conditions('razorpay'):
+        return _razorpay_error()
+    body = _json_body(request)
+    return JsonResponse({
+        'id': f'order_{uuid.uuid4().hex[:14]}',
+        'entity': 'order',
+        'amount': body.get('amount', 0),
+        'currency': body.get('currency', 'INR'),
+        'receipt': body.get('receipt'),
+        'status': 'created',
+    })
+
+
+@csrf_exempt
+@require_http_methods(['GET', 'POST'])
+def razorpay_payments(request, payment_id=None):
+    """
+    GET  v1/payments/<id>  fetch a (captured) payment
+    POST v1/payments/      simulator helper: capture a payment and send the signed payment.captured webhook
+    """
+    if simulate_conditions('razorpay'):
+        return _razorpay_error()
+
+    if request.method == 'GET':
+        payment = cache.get(f'simulator:razorpay:payment:{payment_id}') or _razorpay_payment(payment_id)
+        return JsonResponse(payment)
+
+    body = _json_body(request)
+    payment = _razorpay_payment(f'pay_{uuid.uuid4().hex[:14]}', int(body.get('amount', 10000)), body.get('order_id', ''))
+    cache.set(f"simulator:razorpay:payment:{payment['id']}", payment, 60 * 60 * 24)
+
+    webhook_body = json.dumps({'event': 'payment.captured', 'payload': {'payment': {'entity': payment}}})
+    signature = hmac.new(settings.RAZORPAY_KEY_SECRET.encode(), webhook_body.encode(), hashlib.sha256).hexdigest()
+    schedule_callback(
+        'POST', '/api/payments/razorpay/callback/',
+        data=webhook_body,
+        headers={'Content-Type': 'application/json', 'X-Razorpay-Signature': signature},
+    )
+    return JsonResponse(payment)
@@ -0,0 +1,35 @@
+"""
+Delayed webhook / redirect callback delivery
+Callbacks are sent from a timer thread after the configured delay, the way
+the real gateways call back some time after the original API request.
+"""
+import sys
+import threading
+import requests
+from simulator.config import get_config
+
+
+def schedule_callback(method, path, **kwargs):
+    """
+    Deliver a callback to the app after SIMULATOR['webhook_delay_ms']
+    
+    Args:
+        method: HTTP method ('GET' or 'POST')
+        path: Path on the webhook target, e.g. '/api/payments/razorpay/callback/'
+        **kwargs: Passed to requests.request (data, json, headers, params)
+    """
+    config = get_config()
+    url = f"{config['webhook_target'].rstrip('/')}/{path.lstrip('/')}"
+    
+    def _deliver():
+        try:
+            response = requests.request(method, url, timeout=30, **kwargs)
+            print(f"[SIMULATOR] Callback {method} {url} -> {response.status_code}")
+        except requests.exceptions.RequestException as e:
+            print(f"[SIMULATOR] Callback {method} {url} failed: {str(e)}")
+        sys.stdout.flush()
+    
+    timer = threading.Timer(config['webhook_delay_ms'] / 1000, _deliver)
+    timer.daemon = True
+    timer.start()
+    return timer
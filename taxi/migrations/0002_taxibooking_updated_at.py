@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:23
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_created_at(apps, schema_editor):
+    """Start existing bookings at their creation time rather than the migration time"""
+    TaxiBooking = apps.get_model('taxi', 'TaxiBooking')
+    TaxiBooking.objects.update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taxi', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taxibooking',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='taxibooking',
+            index=models.Index(fields=['vehicle', 'updated_at'], name='taxi_taxibo_vehicle_174e31_idx'),
+        ),
+    ]
@@ -86,9 +86,13 @@ class TaxiBooking(models.Model):
     trip_status = models.CharField(max_length=20, choices=TRIP_STATUS_CHOICES, default='pending')
     remarks = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"Booking {self.id} - {self.customer.name} ({self.trip})"
     
     class Meta:
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['vehicle', 'updated_at']),
+        ]
\ No newline at end of file
@@ -29,6 +29,7 @@ urlpatterns = [
     
     # Driver-specific URLs
     path('driver/my-bookings/', driver_api_views.driver_my_bookings, name='driver-my-bookings'),
+    path('driver/my-bookings/sync/', driver_api_views.driver_my_bookings_sync, name='driver-my-bookings-sync'),
     path('driver/bookings/<int:pk>/accept/', driver_api_views.driver_accept_booking, name='driver-accept-booking'),
     path('driver/bookings/<int:pk>/reject/', driver_api_views.driver_reject_booking, name='driver-reject-booking'),
     path('driver/bookings/<int:pk>/update-status/', driver_api_views.driver_update_booking_status, name='driver-update-booking-status'),
@@ -8,6 +8,7 @@ from django.utils import timezone
 from datetime import timedelta
 from ...models import Driver, Vehicle, TaxiBooking
 from ...serializers import TaxiBookingSerializer, VehicleSerializer, VehicleCreateSerializer, DriverSerializer
+from core.services.delta_sync import delta_sync_response
 
 
 def check_driver_permission(user):
@@ -71,6 +72,25 @@ def driver_my_bookings(request):
     return paginator.get_paginated_response(serializer.data)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def driver_my_bookings_sync(request):
+    """Driver's assigned bookings changed or deleted since the ?since= cursor of a previous sync"""
+    if not check_driver_permission(request.user):
+        return Response({
+            'error': 'Only drivers can access this endpoint'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    driver = get_driver_profile(request.user)
+    if not driver:
+        return Response({
+            'error': 'Driver profile not found. Please complete your driver registration.'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    bookings = TaxiBooking.objects.filter(vehicle__driver=driver, vehicle__is_active=True)
+    return delta_sync_response(request, bookings, 'taxi.bookings.driver', driver.id, TaxiBookingSerializer)
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def driver_accept_booking(request, pk):
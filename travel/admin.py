@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
     TravelCommittee, TravelVehicle, TravelVehicleImage, TravelVehicleSeat,
-    TravelCommitteeStaff, TravelDealer, TravelBooking
+    TravelCommitteeStaff, TravelDealer, TravelBooking, TravelSeatInventory
 )
 
 
@@ -58,4 +58,11 @@ class TravelBookingAdmin(admin.ModelAdmin):
     list_display = ['ticket_number', 'name', 'phone', 'vehicle', 'status', 'booking_date', 'created_at']
     list_filter = ['status', 'gender', 'created_at']
     search_fields = ['ticket_number', 'name', 'phone', 'vehicle__name']
-    readonly_fields = ['created_at', 'updated_at']
\ No newline at end of file
+    readonly_fields = ['created_at', 'updated_at']
+
+@admin.register(TravelSeatInventory)
+class TravelSeatInventoryAdmin(admin.ModelAdmin):
+    list_display = ['vehicle', 'service_date', 'booked_count', 'version', 'updated_at']
+    list_filter = ['service_date']
+    search_fields = ['vehicle__name', 'vehicle__vehicle_no']
+    readonly_fields = ['vehicle', 'service_date', 'seat_base', 'occupied', 'booked_count', 'version', 'updated_at']
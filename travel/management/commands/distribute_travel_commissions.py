@@ -0,0 +1,15 @@
+"""
+Django management command to pay out commissions of boarded travel bookings
+Boarding distributes commissions once the boarding transaction commits;
+this sweeps up any boarded booking whose payout didn't run.
+"""
+from django.core.management.base import BaseCommand
+from travel.services.boarding import distribute_pending_commissions
+
+
+class Command(BaseCommand):
+    help = 'Distribute commissions for boarded travel bookings not yet paid out'
+
+    def handle(self, *args, **options):
+        count = distribute_pending_commissions()
+        self.stdout.write(self.style.SUCCESS(f'Distributed commissions for {count} boarded bookings'))
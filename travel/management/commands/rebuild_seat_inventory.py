@@ -0,0 +1,52 @@
+"""
+Django management command to recompute per-date seat inventory from bookings
+Rows are normally kept current by the booking signals; run this after bulk
+changes made outside the ORM, or to repair drift.
+"""
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from travel.models import TravelBooking, TravelSeatInventory
+from travel.services.seat_inventory import rebuild_inventory, service_date
+
+
+class Command(BaseCommand):
+    help = 'Recompute TravelSeatInventory rows from pending/booked bookings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vehicle', type=int, help='Only this vehicle id')
+        parser.add_argument('--date', help='Only this service date (YYYY-MM-DD)')
+        parser.add_argument('--from', dest='date_from', help='First service date (default: today)')
+        parser.add_argument('--to', dest='date_to', help='Last service date (default: no limit)')
+
+    def _parse(self, value):
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f'Invalid date: {value}')
+
+    def handle(self, *args, **options):
+        if options['date']:
+            date_from = date_to = self._parse(options['date'])
+        else:
+            date_from = self._parse(options['date_from']) if options['date_from'] else timezone.localdate()
+            date_to = self._parse(options['date_to']) if options['date_to'] else None
+
+        # Every (vehicle, day) that has a booking or an existing inventory row
+        bookings = TravelBooking.objects.filter(booking_date__date__gte=date_from)
+        inventories = TravelSeatInventory.objects.filter(service_date__gte=date_from)
+        if date_to is not None:
+            bookings = bookings.filter(booking_date__date__lte=date_to)
+            inventories = inventories.filter(service_date__lte=date_to)
+        if options['vehicle']:
+            bookings = bookings.filter(vehicle_id=options['vehicle'])
+            inventories = inventories.filter(vehicle_id=options['vehicle'])
+
+        keys = set(inventories.values_list('vehicle_id', 'service_date'))
+        for vehicle_id, booking_date in bookings.values_list('vehicle_id', 'booking_date').iterator():
+            keys.add((vehicle_id, service_date(booking_date)))
+
+        for vehicle_id, day in sorted(keys):
+            rebuild_inventory(vehicle_id, day)
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(keys)} seat inventory rows'))
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:29
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_seat_inventory(apps, schema_editor):
+    """Build inventory rows from the pending/booked bookings"""
+    TravelBooking = apps.get_model('travel', 'TravelBooking')
+    TravelSeatInventory = apps.get_model('travel', 'TravelSeatInventory')
+
+    held = defaultdict(set)
+    bookings = TravelBooking.objects.filter(status__in=['pending', 'booked']).values_list(
+        'vehicle_id', 'booking_date', 'vehicle_seat_id'
+    )
+    for vehicle_id, booking_date, seat_id in bookings.iterator():
+        day = timezone.localtime(booking_date).date() if timezone.is_aware(booking_date) else booking_date.date()
+        held[(vehicle_id, day)].add(seat_id)
+
+    rows = []
+    for (vehicle_id, day), seat_ids in held.items():
+        base = min(seat_ids)
+        bits = 0
+        for seat_id in seat_ids:
+            bits |= 1 << (seat_id - base)
+        rows.append(TravelSeatInventory(
+            vehicle_id=vehicle_id, service_date=day, seat_base=base,
+            occupied=format(bits, 'x'), booked_count=len(seat_ids),
+        ))
+    TravelSeatInventory.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel', '0006_travelbooking_ticket_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TravelSeatInventory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('service_date', models.DateField()),
+                ('seat_base', models.BigIntegerField(default=0, help_text='Seat id of bit 0 in occupied')),
+                ('occupied', models.TextField(blank=True, default='', help_text='Hex bitmap of held seats, bit n = seat id seat_base + n')),
+                ('booked_count', models.PositiveIntegerField(default=0)),
+                ('version', models.PositiveIntegerField(default=0, help_text='Bumped on every change; writes are conditional on it')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Travel Seat Inventory',
+                'verbose_name_plural': 'Travel Seat Inventories',
+                'ordering': ['vehicle', 'service_date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='travelbooking',
+            index=models.Index(fields=['vehicle', 'booking_date'], name='travel_trav_vehicle_e9067f_idx'),
+        ),
+        migrations.AddField(
+            model_name='travelseatinventory',
+            name='vehicle',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seat_inventories', to='travel.travelvehicle'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='travelseatinventory',
+            unique_together={('vehicle', 'service_date')},
+        ),
+        migrations.RunPython(backfill_seat_inventory, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shared', '0001_initial'),
+        ('travel', '0007_travelseatinventory'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='travelvehicle',
+            index=models.Index(fields=['from_place', 'to_place', 'is_active', 'departure_time'], name='travel_trav_from_pl_c3530f_idx'),
+        ),
+    ]
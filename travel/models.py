@@ -45,6 +45,10 @@ class TravelVehicle(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Travel Vehicle'
         verbose_name_plural = 'Travel Vehicles'
+        indexes = [
+            # Route search: from/to/active, ordered by departure time
+            models.Index(fields=['from_place', 'to_place', 'is_active', 'departure_time']),
+        ]
 
 
 class TravelVehicleImage(models.Model):
@@ -101,6 +105,26 @@ class TravelVehicleSeat(models.Model):
         verbose_name_plural = 'Travel Vehicle Seats'
 
 
+class TravelSeatInventory(models.Model):
+    """Seats held by pending/booked tickets of one vehicle on one service date (see travel.services.seat_inventory)"""
+    vehicle = models.ForeignKey(TravelVehicle, on_delete=models.CASCADE, related_name='seat_inventories')
+    service_date = models.DateField()
+    seat_base = models.BigIntegerField(default=0, help_text='Seat id of bit 0 in occupied')
+    occupied = models.TextField(blank=True, default='', help_text='Hex bitmap of held seats, bit n = seat id seat_base + n')
+    booked_count = models.PositiveIntegerField(default=0)
+    version = models.PositiveIntegerField(default=0, help_text='Bumped on every change; writes are conditional on it')
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.vehicle_id} {self.service_date}: {self.booked_count} seats held"
+    
+    class Meta:
+        ordering = ['vehicle', 'service_date']
+        unique_together = ['vehicle', 'service_date']
+        verbose_name = 'Travel Seat Inventory'
+        verbose_name_plural = 'Travel Seat Inventories'
+
+
 class TravelCommitteeStaff(models.Model):
     """Travel Committee Staff model"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='travel_committee_staff')
@@ -247,4 +271,5 @@ class TravelBooking(models.Model):
         indexes = [
             models.Index(fields=['ticket_number']),
             models.Index(fields=['status', '-created_at']),
+            models.Index(fields=['vehicle', 'booking_date']),
         ]
\ No newline at end of file
@@ -81,6 +81,29 @@ class TravelVehiclePublicSerializer(serializers.ModelSerializer):
         return obj.seats.count()
 
 
+def serialize_search_results(rows, request):
+    """Compact vehicle rows for route search (see travel.services.vehicle_search)"""
+    from django.core.files.storage import default_storage
+
+    results = []
+    for row in rows:
+        image = row['image']
+        results.append({
+            'id': row['id'],
+            'name': row['name'],
+            'vehicle_no': row['vehicle_no'],
+            'image': request.build_absolute_uri(default_storage.url(image)) if image else None,
+            'committee': {'id': row['committee_id'], 'name': row['committee__name']},
+            'from_place': {'id': row['from_place_id'], 'name': row['from_place__name']},
+            'to_place': {'id': row['to_place_id'], 'name': row['to_place__name']},
+            'departure_time': row['departure_time'].isoformat(),
+            'seat_price': str(row['seat_price']),
+            'seat_count': row['seat_count'],
+            'available_seats': row['available_seats'],
+        })
+    return results
+
+
 class TravelVehicleCreateUpdateSerializer(serializers.ModelSerializer):
     """Travel Vehicle create/update serializer (write-only fields)"""
     seats = TravelVehicleSeatSerializer(many=True, required=False, write_only=True)
@@ -359,17 +382,16 @@ class TravelBookingCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(error)
         
         # Seats belong to vehicle and have no pending/booked ticket on this calendar day
-        from travel.utils import seat_has_blocking_booking_for_date
+        from travel.services.seat_inventory import held_seat_ids, service_date
 
         seats = TravelVehicleSeat.objects.filter(id__in=seat_ids, vehicle=vehicle)
         if seats.count() != len(seat_ids):
             raise serializers.ValidationError("Some selected seats are invalid for this vehicle")
 
-        for seat in seats:
-            if seat_has_blocking_booking_for_date(seat, booking_date):
-                raise serializers.ValidationError(
-                    "One or more seats are already reserved for this date"
-                )
+        if held_seat_ids(vehicle.id, service_date(booking_date)) & set(seat_ids):
+            raise serializers.ValidationError(
+                "One or more seats are already reserved for this date"
+            )
 
         return data
 
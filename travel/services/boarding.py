@@ -0,0 +1,136 @@
+"""
+Ticket boarding
+Boards scanned tickets in one transaction: one locking query resolves every
+ticket number (unique index), one UPDATE per table marks bookings and seats
+boarded, and the seats are released from the per-date inventory.
+
+Scans may have been collected offline; each is checked against the day it
+was scanned, not the day it is uploaded. Commission distribution is deferred
+until the transaction commits and then posted once per vehicle departure
+(and swept up by `manage.py distribute_travel_commissions` if that is ever
+interrupted).
+"""
+from collections import defaultdict
+from datetime import datetime
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from travel.models import TravelBooking, TravelVehicleSeat
+from travel.services.commission_service import distribute_commissions
+from travel.services.seat_inventory import release_seats, service_date
+
+# Scans accepted in one offline sync upload
+MAX_SYNC_SCANS = 500
+
+BOARDED = 'boarded'
+ALREADY_BOARDED = 'already_boarded'
+NOT_FOUND = 'not_found'
+WRONG_DATE = 'wrong_date'
+INVALID_STATUS = 'invalid_status'
+SEAT_NOT_BOOKED = 'seat_not_booked'
+
+
+def parse_scanned_at(value):
+    """Aware scan time from an ISO string (None/blank means now; future times are clamped to now)"""
+    now = timezone.now()
+    if not value:
+        return now
+    scanned_at = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if timezone.is_naive(scanned_at):
+        scanned_at = timezone.make_aware(scanned_at)
+    return min(scanned_at, now)
+
+
+def board_tickets(committee, scans):
+    """
+    Board scanned tickets of a committee
+
+    Args:
+        scans: List of (ticket_number, scanned_at) pairs
+
+    Returns:
+        list: One dict per scan with ticket_number, result, booking (or None) and error
+    """
+    ticket_numbers = {ticket_number for ticket_number, _ in scans}
+    results = []
+    boarded = []
+    with db_transaction.atomic():
+        bookings = {
+            booking.ticket_number: booking
+            for booking in TravelBooking.objects.select_for_update().select_related('vehicle_seat').filter(
+                ticket_number__in=ticket_numbers,
+                vehicle__committee=committee,
+            )
+        }
+
+        for ticket_number, scanned_at in scans:
+            booking = bookings.get(ticket_number)
+            result, error = BOARDED, None
+            if booking is None:
+                result, error = NOT_FOUND, 'Ticket not found'
+            elif booking.status == 'boarded':
+                result = ALREADY_BOARDED
+            elif service_date(booking.booking_date) != service_date(scanned_at):
+                result, error = WRONG_DATE, (
+                    f'Ticket is for {service_date(booking.booking_date)}, not {service_date(scanned_at)}'
+                )
+            elif booking.status != 'booked':
+                result, error = INVALID_STATUS, f'Booking status is {booking.get_status_display()}, cannot board'
+            elif booking.vehicle_seat.status != 'booked':
+                result, error = SEAT_NOT_BOOKED, 'Seat is not in booked status'
+            else:
+                booking.status = 'boarded'
+                booking.boarding_date = scanned_at
+                booking.updated_at = timezone.now()
+                booking.vehicle_seat.status = 'boarded'
+                boarded.append(booking)
+            results.append({'ticket_number': ticket_number, 'result': result, 'booking': booking, 'error': error})
+
+        if boarded:
+            TravelBooking.objects.bulk_update(boarded, ['status', 'boarding_date', 'updated_at'])
+            TravelVehicleSeat.objects.filter(id__in=[b.vehicle_seat_id for b in boarded]).update(
+                status='boarded', updated_at=timezone.now()
+            )
+            # bulk_update skips post_save: release the seats from the inventory here
+            released = defaultdict(list)
+            for booking in boarded:
+                released[(booking.vehicle_id, service_date(booking.booking_date))].append(booking.vehicle_seat_id)
+            for (vehicle_id, day), seat_ids in released.items():
+                release_seats(vehicle_id, day, seat_ids)
+            for booking in boarded:
+                booking._seat_hold = None
+
+            # robust: a failed payout must not fail the boarding request; the
+            # bookings stay commission_distributed=False for the sweep command
+            booking_ids = [booking.pk for booking in boarded]
+            db_transaction.on_commit(lambda: distribute_pending_commissions(booking_ids), robust=True)
+
+    return results
+
+
+def board_departure(committee, vehicle_id, day):
+    """Board every booked ticket of a committee vehicle on a date, as scanned now"""
+    ticket_numbers = TravelBooking.objects.filter(
+        vehicle_id=vehicle_id,
+        vehicle__committee=committee,
+        booking_date__date=day,
+        status='booked',
+        ticket_number__isnull=False,
+    ).values_list('ticket_number', flat=True)
+    now = timezone.now()
+    return board_tickets(committee, [(ticket_number, now) for ticket_number in ticket_numbers])
+
+
+def distribute_pending_commissions(booking_ids=None):
+    """
+    Distribute commissions of boarded bookings that haven't been paid out (all of them if no ids)
+
+    Bookings are paid out one vehicle departure (vehicle, date) at a time,
+    each as a single ledger posting.
+    """
+    bookings = TravelBooking.objects.filter(status='boarded', commission_distributed=False)
+    if booking_ids is not None:
+        bookings = bookings.filter(pk__in=booking_ids)
+    departures = defaultdict(list)
+    for pk, vehicle_id, booking_date in bookings.values_list('pk', 'vehicle_id', 'booking_date').iterator():
+        departures[(vehicle_id, service_date(booking_date))].append(pk)
+    return sum(distribute_commissions(ids) for ids in departures.values())
@@ -1,7 +1,9 @@
 """Commission calculation and distribution service"""
 from decimal import Decimal, ROUND_HALF_UP
+from django.db import transaction as db_transaction
 from travel.models import TravelBooking
 from travel.utils import calculate_travel_commissions
+from core.services.wallet_ledger import LedgerEntry, post_entries
 
 
 def calculate_commissions(booking):
@@ -9,8 +11,69 @@ def calculate_commissions(booking):
     return calculate_travel_commissions(booking)
 
 
-def distribute_commissions(booking):
-    """Distribute commissions on boarding - this is handled by signals"""
-    # Commissions are distributed automatically via signals when status changes to 'boarded'
-    # This function is kept for reference but actual distribution happens in signals.py
-    pass
+def _commission_entries(booking):
+    """Ledger entries paying out one boarded booking"""
+    committee_user = booking.vehicle.committee.user
+    dealer_user = None
+    agent_user = None
+    
+    if booking.agent:
+        agent_user = booking.agent.user
+        if booking.agent.dealer:
+            dealer_user = booking.agent.dealer.user
+    
+    actual_price = Decimal(str(booking.actual_price))
+    dealer_commission = Decimal(str(booking.dealer_commission))
+    agent_commission = Decimal(str(booking.agent_commission))
+    system_commission = Decimal(str(booking.system_commission))
+    description = f'Travel booking revenue for ticket {booking.ticket_number}'
+    
+    # Committee gets actual_price, dealer/agent their commissions, system the rest
+    entries = [
+        LedgerEntry(committee_user, actual_price, 'travel_booking_revenue',
+                    description=description, related_travel_booking=booking),
+    ]
+    if dealer_user:
+        entries.append(LedgerEntry(dealer_user, dealer_commission, 'travel_booking_revenue',
+                                   description=description, related_travel_booking=booking))
+    if agent_user:
+        entries.append(LedgerEntry(agent_user, agent_commission, 'travel_booking_revenue',
+                                   description=description, related_travel_booking=booking))
+    entries.append(LedgerEntry(
+        None, system_commission, 'travel_booking_commission',
+        description=f'Platform revenue (system) for travel ticket {booking.ticket_number}',
+        related_travel_booking=booking,
+    ))
+    return entries
+
+
+def distribute_commissions(booking_ids):
+    """
+    Distribute commissions of boarded bookings in one posting
+    
+    Bookings already paid out (commission_distributed) or not boarded are
+    skipped. Each recipient's wallet gets one balance UPDATE for all the
+    bookings, the Transaction rows (one per booking and recipient, as before)
+    are bulk-created, and the bookings are flagged with one UPDATE.
+    
+    Returns:
+        int: Number of bookings paid out
+    """
+    with db_transaction.atomic():
+        # Lock on the bare table; the joins below may be outer joins
+        locked_ids = list(TravelBooking.objects.select_for_update().filter(
+            pk__in=booking_ids, status='boarded', commission_distributed=False,
+        ).order_by('pk').values_list('pk', flat=True))
+        if not locked_ids:
+            return 0
+        
+        bookings = TravelBooking.objects.filter(pk__in=locked_ids).select_related(
+            'vehicle__committee__user', 'agent__user', 'agent__dealer__user',
+        ).order_by('pk')
+        entries = []
+        for booking in bookings:
+            entries.extend(_commission_entries(booking))
+        post_entries(entries, allow_negative=True)
+        
+        TravelBooking.objects.filter(pk__in=locked_ids).update(commission_distributed=True)
+    return len(locked_ids)
@@ -0,0 +1,188 @@
+"""
+Per-date seat inventory
+TravelSeatInventory keeps one row per (vehicle, service date) with a bitmap
+of the seats held by pending/booked tickets, so availability is a single-row
+read and a seat claim is one UPDATE conditional on the row version instead of
+a TravelBooking scan per seat.
+
+Bookings stay the source of truth: every booking save/delete adjusts the
+bitmap (see travel.signals), set-based changes call the functions here
+directly, and `manage.py rebuild_seat_inventory` recomputes rows from the
+bookings.
+"""
+from datetime import datetime, date, timedelta
+from django.db import transaction as db_transaction
+from django.db.models import F
+from django.utils import timezone
+from travel.models import TravelSeatInventory, TravelBooking
+
+# Ticket statuses that hold a seat for the day
+BLOCKING_STATUSES = ('pending', 'booked')
+
+# Lock-free attempts before falling back to a locking read
+OPTIMISTIC_ATTEMPTS = 3
+
+
+class SeatConflict(Exception):
+    """One or more seats are already held for the date"""
+
+    def __init__(self, seat_ids):
+        self.seat_ids = sorted(seat_ids)
+        super().__init__(f'Seats already reserved: {self.seat_ids}')
+
+
+def service_date(booking_date):
+    """Calendar date a booking_date (datetime, date or ISO string) holds its seat on"""
+    if isinstance(booking_date, str):
+        booking_date = datetime.fromisoformat(booking_date.replace('Z', '+00:00'))
+    if isinstance(booking_date, datetime):
+        # Same day boundaries as booking_date__date lookups
+        if timezone.is_aware(booking_date):
+            booking_date = timezone.localtime(booking_date)
+        return booking_date.date()
+    if isinstance(booking_date, date):
+        return booking_date
+    raise TypeError('booking_date must be datetime, date, or ISO string')
+
+
+def decode_seats(inventory):
+    """Seat ids set in an inventory row's bitmap"""
+    if inventory is None or not inventory.occupied:
+        return set()
+    bits = int(inventory.occupied, 16)
+    seat_ids = set()
+    offset = 0
+    while bits:
+        if bits & 1:
+            seat_ids.add(inventory.seat_base + offset)
+        bits >>= 1
+        offset += 1
+    return seat_ids
+
+
+def _encode(seat_ids):
+    """(seat_base, hex bitmap) for a set of seat ids"""
+    if not seat_ids:
+        return 0, ''
+    base = min(seat_ids)
+    bits = 0
+    for seat_id in seat_ids:
+        bits |= 1 << (seat_id - base)
+    return base, format(bits, 'x')
+
+
+def held_seat_ids(vehicle_id, day):
+    """Seat ids held on a date (one query)"""
+    inventory = TravelSeatInventory.objects.filter(vehicle_id=vehicle_id, service_date=day).first()
+    return decode_seats(inventory)
+
+
+def _write(inventory, seat_ids):
+    """Conditional write of a new seat set; False if the row changed since it was read"""
+    base, occupied = _encode(seat_ids)
+    updated = TravelSeatInventory.objects.filter(pk=inventory.pk, version=inventory.version).update(
+        seat_base=base,
+        occupied=occupied,
+        booked_count=len(seat_ids),
+        version=F('version') + 1,
+        updated_at=timezone.now(),
+    )
+    return updated == 1
+
+
+def _change(vehicle_id, day, add=(), remove=(), exclusive=False):
+    """
+    Apply a seat change to the (vehicle, day) row
+
+    Args:
+        add: Seat ids to hold
+        remove: Seat ids to release
+        exclusive: Raise SeatConflict instead of re-holding seats that are already held
+
+    Returns:
+        set: Held seat ids after the change
+    """
+    add, remove = set(add), set(remove)
+    with db_transaction.atomic():
+        if add:
+            inventory, _ = TravelSeatInventory.objects.get_or_create(vehicle_id=vehicle_id, service_date=day)
+        else:
+            # Releasing never creates rows (the vehicle may be being deleted)
+            inventory = TravelSeatInventory.objects.filter(vehicle_id=vehicle_id, service_date=day).first()
+            if inventory is None:
+                return set()
+        attempt = 0
+        while True:
+            held = decode_seats(inventory)
+            if exclusive and held & add:
+                raise SeatConflict(held & add)
+            new_held = (held - remove) | add
+            if new_held == held or _write(inventory, new_held):
+                return new_held
+            attempt += 1
+            # Someone else changed the row: re-read it (a locking read once the
+            # optimistic attempts are used up, so the next write can't lose)
+            rows = TravelSeatInventory.objects.filter(pk=inventory.pk)
+            if attempt >= OPTIMISTIC_ATTEMPTS:
+                rows = rows.select_for_update()
+            inventory = rows.get()
+
+
+def claim_seats(vehicle_id, day, seat_ids):
+    """Hold seats for a date, failing with SeatConflict if any is already held"""
+    return _change(vehicle_id, day, add=seat_ids, exclusive=True)
+
+
+def hold_seats(vehicle_id, day, seat_ids):
+    """Hold seats for a date (idempotent)"""
+    return _change(vehicle_id, day, add=seat_ids)
+
+
+def release_seats(vehicle_id, day, seat_ids):
+    """Release seats for a date (idempotent)"""
+    return _change(vehicle_id, day, remove=seat_ids)
+
+
+def clear_inventory(vehicle_id, day=None):
+    """Release every seat of a vehicle on a date, or on all dates"""
+    rows = TravelSeatInventory.objects.filter(vehicle_id=vehicle_id)
+    if day is not None:
+        rows = rows.filter(service_date=day)
+    return rows.update(
+        seat_base=0, occupied='', booked_count=0, version=F('version') + 1, updated_at=timezone.now()
+    )
+
+
+def rebuild_inventory(vehicle_id, day):
+    """Recompute a (vehicle, day) row from its bookings"""
+    start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+    end = timezone.make_aware(datetime.combine(day + timedelta(days=1), datetime.min.time()))
+    with db_transaction.atomic():
+        inventory, _ = TravelSeatInventory.objects.select_for_update().get_or_create(
+            vehicle_id=vehicle_id, service_date=day
+        )
+        seat_ids = set(TravelBooking.objects.filter(
+            vehicle_id=vehicle_id,
+            booking_date__gte=start,
+            booking_date__lt=end,
+            status__in=BLOCKING_STATUSES,
+        ).values_list('vehicle_seat_id', flat=True))
+        _write(inventory, seat_ids)
+    return seat_ids
+
+
+def booking_hold(vehicle_id, vehicle_seat_id, booking_date, status):
+    """(vehicle_id, day, seat_id) a booking with these values holds, or None"""
+    if status not in BLOCKING_STATUSES or not (vehicle_id and vehicle_seat_id and booking_date):
+        return None
+    return vehicle_id, service_date(booking_date), vehicle_seat_id
+
+
+def sync_booking_hold(previous, current):
+    """Move a booking's seat hold from its previous (vehicle, day, seat) to its current one"""
+    if previous == current:
+        return
+    if previous is not None:
+        release_seats(previous[0], previous[1], [previous[2]])
+    if current is not None:
+        hold_seats(current[0], current[1], [current[2]])
@@ -0,0 +1,68 @@
+"""
+Route-and-date vehicle search
+One query returns the active vehicles on a route with their seat count and
+the seats held for the date (from TravelSeatInventory), so free-seat counts
+don't need an available_seats call per vehicle.
+
+Results can be cached per (route, date) for TRAVEL_SEARCH_CACHE_SECONDS.
+Cached counts may lag bookings by that long; create_booking still claims
+seats against the inventory, so a stale count can't oversell.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from travel.models import TravelVehicle, TravelVehicleSeat, TravelSeatInventory
+
+SEARCH_FIELDS = (
+    'id', 'name', 'vehicle_no', 'image', 'departure_time', 'seat_price',
+    'committee_id', 'committee__name',
+    'from_place_id', 'from_place__name', 'to_place_id', 'to_place__name',
+    'seat_count', 'booked_count',
+)
+
+
+def _cache_key(from_place_id, to_place_id, day):
+    return f'travel:search:{from_place_id}:{to_place_id}:{day.isoformat()}'
+
+
+def _search_rows(from_place_id, to_place_id, day):
+    seat_count = TravelVehicleSeat.objects.filter(vehicle=OuterRef('pk')).order_by().values(
+        'vehicle'
+    ).annotate(count=Count('id')).values('count')
+    booked_count = TravelSeatInventory.objects.filter(
+        vehicle=OuterRef('pk'), service_date=day
+    ).values('booked_count')
+
+    vehicles = TravelVehicle.objects.filter(
+        from_place_id=from_place_id,
+        to_place_id=to_place_id,
+        is_active=True,
+    ).annotate(
+        seat_count=Coalesce(Subquery(seat_count, output_field=IntegerField()), Value(0)),
+        booked_count=Coalesce(Subquery(booked_count, output_field=IntegerField()), Value(0)),
+    ).order_by('departure_time', 'id')
+
+    rows = list(vehicles.values(*SEARCH_FIELDS))
+    for row in rows:
+        row['available_seats'] = max(row['seat_count'] - row['booked_count'], 0)
+    return rows
+
+
+def search_vehicles(from_place_id, to_place_id, day):
+    """
+    Active vehicles from one place to another with free seats on a date
+
+    Returns:
+        list: One dict per vehicle (SEARCH_FIELDS plus available_seats), by departure time
+    """
+    timeout = getattr(settings, 'TRAVEL_SEARCH_CACHE_SECONDS', 0)
+    if not timeout:
+        return _search_rows(from_place_id, to_place_id, day)
+
+    key = _cache_key(from_place_id, to_place_id, day)
+    rows = cache.get(key)
+    if rows is None:
+        rows = _search_rows(from_place_id, to_place_id, day)
+        cache.set(key, rows, timeout)
+    return rows
@@ -1,9 +1,91 @@
 """Travel app signals"""
-from django.db.models.signals import post_save
+from django.db.models.signals import post_init, post_save, pre_delete, post_delete, m2m_changed
 from django.dispatch import receiver
-from decimal import Decimal, ROUND_HALF_UP
-from travel.models import TravelBooking
-from core.models import Transaction, SuperSetting
+from travel.models import TravelBooking, TravelCommittee, TravelCommitteeStaff, TravelDealer
+from travel.services.seat_inventory import booking_hold, sync_booking_hold
+from travel.services.commission_service import distribute_commissions
+from travel.utils import invalidate_travel_roles
+from core.models import Agent
+
+
+# Committee/dealer deletes use pre_delete: the cascade removes the staff,
+# agent-committee links and agent.dealer references the lookups below need
+@receiver(post_save, sender=TravelCommittee)
+@receiver(pre_delete, sender=TravelCommittee)
+def invalidate_committee_roles(sender, instance, **kwargs):
+    """Cached roles embed the committee for its owner, staff and agents"""
+    user_ids = [instance.user_id]
+    user_ids += TravelCommitteeStaff.objects.filter(travel_committee_id=instance.pk).values_list('user_id', flat=True)
+    user_ids += Agent.objects.filter(committees__id=instance.pk).values_list('user_id', flat=True)
+    invalidate_travel_roles(user_ids)
+
+
+@receiver(post_save, sender=TravelCommitteeStaff)
+@receiver(post_delete, sender=TravelCommitteeStaff)
+def invalidate_staff_roles(sender, instance, **kwargs):
+    invalidate_travel_roles([instance.user_id])
+
+
+@receiver(post_save, sender=TravelDealer)
+@receiver(pre_delete, sender=TravelDealer)
+def invalidate_dealer_roles(sender, instance, **kwargs):
+    """Cached roles embed the dealer for its owner and its agents (agent.dealer)"""
+    user_ids = [instance.user_id]
+    user_ids += Agent.objects.filter(dealer_id=instance.pk).values_list('user_id', flat=True)
+    invalidate_travel_roles(user_ids)
+
+
+@receiver(post_save, sender=Agent)
+@receiver(post_delete, sender=Agent)
+def invalidate_agent_roles(sender, instance, **kwargs):
+    invalidate_travel_roles([instance.user_id])
+
+
+@receiver(m2m_changed, sender=Agent.committees.through)
+def invalidate_agent_committee_roles(sender, instance, action, reverse, pk_set, **kwargs):
+    """Agent <-> committee assignments change agent.committees"""
+    if action == 'pre_clear' and reverse:
+        # Clearing from the committee side doesn't pass the removed agents
+        instance._cleared_agent_user_ids = list(instance.agents.values_list('user_id', flat=True))
+        return
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate_travel_roles([instance.user_id])
+    elif action == 'post_clear':
+        invalidate_travel_roles(getattr(instance, '_cleared_agent_user_ids', []))
+    else:
+        invalidate_travel_roles(Agent.objects.filter(pk__in=pk_set).values_list('user_id', flat=True))
+
+
+def _current_hold(instance):
+    # Read through __dict__ so deferred fields aren't loaded
+    values = instance.__dict__
+    return booking_hold(
+        values.get('vehicle_id'), values.get('vehicle_seat_id'), values.get('booking_date'), values.get('status')
+    )
+
+
+@receiver(post_init, sender=TravelBooking)
+def remember_seat_hold(sender, instance, **kwargs):
+    """Remember which seat/date the booking held when loaded, to adjust the inventory on save"""
+    instance._seat_hold = _current_hold(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=TravelBooking)
+def update_seat_inventory(sender, instance, raw=False, **kwargs):
+    """Keep TravelSeatInventory in step with the booking's status, seat and date"""
+    if raw:
+        return
+    current = _current_hold(instance)
+    sync_booking_hold(getattr(instance, '_seat_hold', None), current)
+    instance._seat_hold = current
+
+
+@receiver(post_delete, sender=TravelBooking)
+def release_seat_inventory(sender, instance, **kwargs):
+    """Release the seat the deleted booking held"""
+    sync_booking_hold(getattr(instance, '_seat_hold', None), None)
 
 
 @receiver(post_save, sender=TravelBooking)
@@ -17,111 +99,7 @@ def handle_booking_status_change(sender, instance, created, **kwargs):
 
 
 def distribute_travel_commissions(booking):
-    """Distribute commissions on boarding status (idempotent via commission_distributed)."""
-    from django.db import transaction as db_transaction
-    
+    """Distribute commissions on boarding (idempotent via commission_distributed)."""
     if booking.status != 'boarded':
         return
-    
-    with db_transaction.atomic():
-        booking_locked = TravelBooking.objects.select_for_update().get(pk=booking.pk)
-        if booking_locked.commission_distributed:
-            return
-        
-        # Get all parties
-        committee_user = booking_locked.vehicle.committee.user
-        dealer_user = None
-        agent_user = None
-        
-        if booking_locked.agent:
-            agent_user = booking_locked.agent.user
-            if booking_locked.agent.dealer:
-                dealer_user = booking_locked.agent.dealer.user
-        
-        # Get current balances
-        committee_balance_before = Decimal(str(committee_user.balance))
-        dealer_balance_before = Decimal(str(dealer_user.balance)) if dealer_user else Decimal('0')
-        agent_balance_before = Decimal(str(agent_user.balance)) if agent_user else Decimal('0')
-        
-        # Get SuperSetting for system balance
-        super_setting = SuperSetting.objects.select_for_update().first()
-        if not super_setting:
-            super_setting = SuperSetting.objects.create()
-        system_balance_before = Decimal(str(super_setting.balance))
-        
-        # Update balances
-        actual_price = Decimal(str(booking_locked.actual_price))
-        dealer_commission = Decimal(str(booking_locked.dealer_commission))
-        agent_commission = Decimal(str(booking_locked.agent_commission))
-        system_commission = Decimal(str(booking_locked.system_commission))
-        
-        # Committee gets actual_price
-        committee_user.balance = committee_balance_before + actual_price
-        committee_user.balance = committee_user.balance.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-        committee_user.save()
-        
-        # Dealer gets dealer_commission
-        if dealer_user:
-            dealer_user.balance = dealer_balance_before + dealer_commission
-            dealer_user.balance = dealer_user.balance.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-            dealer_user.save()
-        
-        # Agent gets agent_commission
-        if agent_user:
-            agent_user.balance = agent_balance_before + agent_commission
-            agent_user.balance = agent_user.balance.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-            agent_user.save()
-        
-        # System gets system_commission
-        super_setting.balance = system_balance_before + system_commission
-        super_setting.balance = super_setting.balance.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-        super_setting.save()
-        
-        # Create transactions
-        Transaction.objects.create(
-            user=committee_user,
-            transaction_type='travel_booking_revenue',
-            amount=actual_price,
-            status='completed',
-            description=f'Travel booking revenue for ticket {booking_locked.ticket_number}',
-            related_travel_booking=booking_locked,
-            wallet_before=committee_balance_before,
-            wallet_after=committee_user.balance
-        )
-        
-        if dealer_user:
-            Transaction.objects.create(
-                user=dealer_user,
-                transaction_type='travel_booking_revenue',
-                amount=dealer_commission,
-                status='completed',
-                description=f'Travel booking revenue for ticket {booking_locked.ticket_number}',
-                related_travel_booking=booking_locked,
-                wallet_before=dealer_balance_before,
-                wallet_after=dealer_user.balance
-            )
-        
-        if agent_user:
-            Transaction.objects.create(
-                user=agent_user,
-                transaction_type='travel_booking_revenue',
-                amount=agent_commission,
-                status='completed',
-                description=f'Travel booking revenue for ticket {booking_locked.ticket_number}',
-                related_travel_booking=booking_locked,
-                wallet_before=agent_balance_before,
-                wallet_after=agent_user.balance
-            )
-        
-        Transaction.objects.create(
-            user=None,
-            transaction_type='travel_booking_commission',
-            amount=system_commission,
-            status='completed',
-            description=f'Platform revenue (system) for travel ticket {booking_locked.ticket_number}',
-            related_travel_booking=booking_locked,
-            wallet_before=system_balance_before,
-            wallet_after=super_setting.balance
-        )
-        
-        TravelBooking.objects.filter(pk=booking_locked.pk).update(commission_distributed=True)
+    distribute_commissions([booking.pk])
@@ -1,8 +1,14 @@
 """Travel API and domain tests."""
 from decimal import Decimal
 from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework.authtoken.models import Token
@@ -17,12 +23,42 @@ from travel.models import (
     TravelVehicle,
     TravelVehicleSeat,
     TravelBooking,
+    TravelSeatInventory,
 )
+from travel.services.commission_service import distribute_commissions
+from travel.services.seat_inventory import held_seat_ids
+from travel.utils import _role_cache_key, calculate_travel_commissions, check_user_travel_role
 
 
 class TravelSetupMixin:
     """Shared fixtures for travel tests."""
 
+    def setUp(self):
+        # Cached travel roles are keyed by user id, which the rolled-back fixtures reuse
+        cache.clear()
+        self.client = APIClient()
+        self.tomorrow = (timezone.now() + timedelta(days=1)).replace(
+            hour=10, minute=0, second=0, microsecond=0,
+        )
+
+    def _auth(self, user):
+        token, _ = Token.objects.get_or_create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def _book(self, seat_ids, booking_date, phone='666'):
+        return self.client.post(
+            '/api/travel/bookings/create/',
+            {
+                'name': 'P',
+                'phone': phone,
+                'gender': 'male',
+                'vehicle': self.vehicle.id,
+                'seat_ids': seat_ids,
+                'booking_date': booking_date.isoformat(),
+            },
+            format='json',
+        )
+
     @classmethod
     def _create_user(cls, phone_suffix, name):
         return User.objects.create_user(
@@ -82,16 +118,6 @@ class TravelSetupMixin:
 
 
 class TravelBookingApiTests(TravelSetupMixin, TestCase):
-    def setUp(self):
-        self.client = APIClient()
-        self.tomorrow = (timezone.now() + timedelta(days=1)).replace(
-            hour=10, minute=0, second=0, microsecond=0,
-        )
-
-    def _auth(self, user):
-        token, _ = Token.objects.get_or_create(user=user)
-        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
-
     def test_multi_seat_create_distinct_tickets_and_ticket_price(self):
         self._auth(self.staff_user)
         payload = {
@@ -255,6 +281,229 @@ class TravelBookingApiTests(TravelSetupMixin, TestCase):
         self.assertTrue(can_use_merchant_wallet_services(self.staff_user))
 
 
+class TravelSeatInventoryTests(TravelSetupMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self._auth(self.staff_user)
+
+    def test_booking_claims_seats_and_rejects_overlap(self):
+        r = self._book([self.seat1.id], self.tomorrow)
+        self.assertEqual(r.status_code, 201, r.content)
+        self.assertEqual(held_seat_ids(self.vehicle.id, self.tomorrow.date()), {self.seat1.id})
+
+        r2 = self._book([self.seat2.id, self.seat1.id], self.tomorrow, phone='667')
+        self.assertEqual(r2.status_code, 400)
+        self.assertEqual(TravelBooking.objects.filter(vehicle=self.vehicle).count(), 1)
+        self.assertEqual(held_seat_ids(self.vehicle.id, self.tomorrow.date()), {self.seat1.id})
+
+    def test_group_booking_query_count_independent_of_seat_count(self):
+        seats = [self.seat1, self.seat2] + [
+            TravelVehicleSeat.objects.create(vehicle=self.vehicle, side='B', number=n, floor='lower')
+            for n in range(1, 19)
+        ]
+        with CaptureQueriesContext(connection) as small:
+            r = self._book([seat.id for seat in seats[:2]], self.tomorrow)
+        self.assertEqual(r.status_code, 201, r.content)
+        with CaptureQueriesContext(connection) as large:
+            r = self._book([seat.id for seat in seats[2:]], self.tomorrow, phone='668')
+        self.assertEqual(r.status_code, 201, r.content)
+        self.assertEqual(len(r.json()), 18)
+        # The first booking also creates the inventory row
+        self.assertLessEqual(len(large), len(small))
+        self.assertEqual(
+            TravelVehicleSeat.objects.filter(vehicle=self.vehicle, status='booked').count(), 20
+        )
+
+    def test_cancel_releases_seat_and_rebuild_matches(self):
+        r = self._book([self.seat1.id, self.seat2.id], self.tomorrow)
+        self.assertEqual(r.status_code, 201, r.content)
+        booking = TravelBooking.objects.get(pk=r.json()[0]['id'])
+        booking.status = 'cancelled'
+        booking.save()
+        remaining = {self.seat1.id, self.seat2.id} - {booking.vehicle_seat_id}
+        self.assertEqual(held_seat_ids(self.vehicle.id, self.tomorrow.date()), remaining)
+
+        TravelSeatInventory.objects.all().delete()
+        call_command('rebuild_seat_inventory', vehicle=self.vehicle.id, stdout=StringIO())
+        self.assertEqual(held_seat_ids(self.vehicle.id, self.tomorrow.date()), remaining)
+
+
+class TravelVehicleSearchTests(TravelSetupMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self._auth(self.agent_user)
+
+    def test_search_counts_free_seats_in_constant_queries(self):
+        for index in range(5):
+            vehicle = TravelVehicle.objects.create(
+                name=f'Bus {index + 2}', vehicle_no=f'TEST-BUS-1{index:02d}', committee=self.committee,
+                from_place=self.place_a, to_place=self.place_b, departure_time='07:00:00',
+                actual_seat_price=Decimal('80.00'), seat_price=Decimal('100.00'),
+            )
+            TravelVehicleSeat.objects.create(vehicle=vehicle, side='A', number=1, floor='lower')
+        TravelVehicle.objects.create(
+            name='Return', vehicle_no='TEST-BUS-RET', committee=self.committee,
+            from_place=self.place_b, to_place=self.place_a, departure_time='07:00:00',
+            actual_seat_price=Decimal('80.00'), seat_price=Decimal('100.00'),
+        )
+        TravelBooking.objects.create(
+            name='P', phone='777', gender='male', vehicle=self.vehicle, vehicle_seat=self.seat1,
+            booking_date=self.tomorrow, status='booked', actual_price=Decimal('80.00'),
+        )
+
+        params = {
+            'from_place': self.place_a.id,
+            'to_place': self.place_b.id,
+            'date': self.tomorrow.date().isoformat(),
+        }
+        with CaptureQueriesContext(connection) as queries:
+            r = self.client.get('/api/travel/vehicles/search/', params)
+        self.assertEqual(r.status_code, 200, r.content)
+        # Token auth, role lookups, agent committees and one search query
+        self.assertLessEqual(len(queries), 8)
+
+        rows = r.json()
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[-1]['id'], self.vehicle.id)
+        self.assertEqual(rows[-1]['seat_count'], 2)
+        self.assertEqual(rows[-1]['available_seats'], 1)
+        self.assertEqual(rows[0]['available_seats'], 1)
+
+    def test_search_requires_route(self):
+        r = self.client.get('/api/travel/vehicles/search/', {'date': self.tomorrow.date().isoformat()})
+        self.assertEqual(r.status_code, 400)
+
+
+class TravelBoardingScanTests(TravelSetupMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self._auth(self.staff_user)
+
+    def _ticket(self, seat):
+        r = self._book([seat.id], timezone.now(), phone='888')
+        self.assertEqual(r.status_code, 201, r.content)
+        return r.json()[0]['ticket_number']
+
+    def test_scan_and_board_marks_boarded_and_distributes(self):
+        ticket = self._ticket(self.seat1)
+        with self.captureOnCommitCallbacks(execute=True):
+            r = self.client.post('/api/travel/boarding/scan/board/', {'qr_code': ticket}, format='json')
+        self.assertEqual(r.status_code, 200, r.content)
+        self.assertEqual(r.json()['result'], 'boarded')
+        booking = TravelBooking.objects.get(ticket_number=ticket)
+        self.assertEqual(booking.status, 'boarded')
+        self.assertTrue(booking.commission_distributed)
+        self.seat1.refresh_from_db()
+        self.assertEqual(self.seat1.status, 'boarded')
+
+        r = self.client.post('/api/travel/boarding/scan/board/', {'ticket_number': 'TRV-MISSING'}, format='json')
+        self.assertEqual(r.status_code, 404)
+
+    def test_failed_payout_does_not_fail_boarding(self):
+        ticket = self._ticket(self.seat1)
+        with mock.patch('travel.services.boarding.distribute_commissions', side_effect=RuntimeError('ledger down')):
+            with self.assertLogs('django.test', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+                r = self.client.post('/api/travel/boarding/scan/board/', {'qr_code': ticket}, format='json')
+        self.assertEqual(r.status_code, 200, r.content)
+        booking = TravelBooking.objects.get(ticket_number=ticket)
+        self.assertEqual(booking.status, 'boarded')
+        self.assertFalse(booking.commission_distributed)
+
+        call_command('distribute_travel_commissions', stdout=StringIO())
+        booking.refresh_from_db()
+        self.assertTrue(booking.commission_distributed)
+
+    def test_offline_sync_applies_batch_with_per_scan_results(self):
+        first = self._ticket(self.seat1)
+        second = self._ticket(self.seat2)
+        scanned_at = timezone.now().isoformat()
+        payload = {'scans': [
+            {'ticket_number': first, 'scanned_at': scanned_at},
+            {'ticket_number': second, 'scanned_at': scanned_at},
+            {'ticket_number': first, 'scanned_at': scanned_at},
+            {'ticket_number': 'TRV-MISSING'},
+        ]}
+        r = self.client.post('/api/travel/boarding/scan/sync/', payload, format='json')
+        self.assertEqual(r.status_code, 200, r.content)
+        self.assertEqual(r.json()['boarded'], 2)
+        self.assertEqual(
+            [row['result'] for row in r.json()['results']],
+            ['boarded', 'boarded', 'already_boarded', 'not_found'],
+        )
+        self.assertEqual(TravelBooking.objects.filter(status='boarded', commission_distributed=False).count(), 2)
+
+        call_command('distribute_travel_commissions', stdout=StringIO())
+        self.assertFalse(TravelBooking.objects.filter(status='boarded', commission_distributed=False).exists())
+
+
+class TravelDepartureBoardingTests(TravelSetupMixin, TestCase):
+    def test_board_departure_pays_out_all_bookings_once(self):
+        self._auth(self.agent_user)
+        r = self._book([self.seat1.id, self.seat2.id], timezone.now(), phone='999')
+        self.assertEqual(r.status_code, 201, r.content)
+        agent_commission = sum(Decimal(str(b.agent_commission)) for b in TravelBooking.objects.all())
+        agent_balance = Decimal(str(User.objects.get(pk=self.agent_user.pk).balance))
+
+        self._auth(self.staff_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            r = self.client.post(f'/api/travel/boarding/vehicles/{self.vehicle.id}/depart/', {}, format='json')
+        self.assertEqual(r.status_code, 200, r.content)
+        self.assertEqual(r.json()['boarded'], 2)
+
+        self.assertFalse(TravelBooking.objects.exclude(status='boarded', commission_distributed=True).exists())
+        self.assertEqual(
+            Transaction.objects.filter(user=self.committee_user, transaction_type='travel_booking_revenue').count(), 2
+        )
+        self.assertEqual(
+            Decimal(str(User.objects.get(pk=self.agent_user.pk).balance)), agent_balance + agent_commission
+        )
+        self.assertEqual(distribute_commissions(list(TravelBooking.objects.values_list('pk', flat=True))), 0)
+
+    def test_board_departure_rejects_other_committee_vehicle(self):
+        other_user = self._create_user('0099', 'Other Committee')
+        other = TravelCommittee.objects.create(user=other_user, name='Other')
+        vehicle = TravelVehicle.objects.create(
+            name='Other Bus', vehicle_no='TEST-BUS-OTHER', committee=other,
+            from_place=self.place_a, to_place=self.place_b, departure_time='09:00:00',
+            actual_seat_price=Decimal('80.00'), seat_price=Decimal('100.00'),
+        )
+        self._auth(self.staff_user)
+        r = self.client.post(f'/api/travel/boarding/vehicles/{vehicle.id}/depart/', {}, format='json')
+        self.assertEqual(r.status_code, 403)
+
+
+@override_settings(TRAVEL_ROLE_CACHE_TTL=60)
+class TravelRoleCacheTests(TravelSetupMixin, TestCase):
+    def test_roles_memoized_per_request_without_cross_request_cache(self):
+        user = User.objects.get(pk=self.agent_user.pk)
+        with override_settings(TRAVEL_ROLE_CACHE_TTL=0):
+            roles = check_user_travel_role(user)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertIs(check_user_travel_role(user), roles)
+            self.assertEqual(len(queries), 0)
+            self.assertIsNone(cache.get(_role_cache_key(user.pk)))
+
+    def test_roles_cached_and_invalidated_on_role_writes(self):
+        roles = check_user_travel_role(User.objects.get(pk=self.agent_user.pk))
+        self.assertTrue(roles['is_agent'])
+
+        user = User.objects.get(pk=self.agent_user.pk)
+        with CaptureQueriesContext(connection) as queries:
+            roles = check_user_travel_role(user)
+            self.assertEqual(roles['agent'].dealer.user.name, 'Dealer')
+            self.assertEqual([c.id for c in roles['agent'].committees.all()], [self.committee.id])
+        self.assertEqual(len(queries), 0)
+
+        self.agent.committees.remove(self.committee)
+        roles = check_user_travel_role(User.objects.get(pk=self.agent_user.pk))
+        self.assertEqual(list(roles['agent'].committees.all()), [])
+
+        self.agent.is_active = False
+        self.agent.save()
+        roles = check_user_travel_role(User.objects.get(pk=self.agent_user.pk))
+        self.assertFalse(roles['is_agent'])
+
+
 class TravelCommissionPoolTests(TravelSetupMixin, TestCase):
     def test_calculate_commissions_raises_when_pool_exceeded(self):
         self.dealer.commission_type = 'percentage'
@@ -275,7 +524,6 @@ class TravelCommissionPoolTests(TravelSetupMixin, TestCase):
             actual_price=self.vehicle.actual_seat_price,
             agent=self.agent,
         )
-        from travel.utils import calculate_travel_commissions
 
         with self.assertRaises(ValueError):
             calculate_travel_commissions(booking)
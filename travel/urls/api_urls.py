@@ -24,10 +24,14 @@ urlpatterns = [
     # Boarding endpoints
     path('boarding/', boarding_views.boarding_screen, name='boarding-screen'),
     path('boarding/scan/', boarding_views.scan_ticket, name='boarding-scan'),
+    path('boarding/scan/board/', boarding_views.scan_and_board, name='boarding-scan-board'),
+    path('boarding/scan/sync/', boarding_views.sync_boarding_scans, name='boarding-scan-sync'),
     path('boarding/<int:booking_id>/confirm/', boarding_views.confirm_boarding, name='boarding-confirm'),
+    path('boarding/vehicles/<int:vehicle_id>/depart/', boarding_views.board_departure, name='boarding-departure'),
     
     # Vehicle endpoints
     path('vehicles/', vehicle_views.vehicle_list, name='vehicle-list'),
+    path('vehicles/search/', vehicle_views.vehicle_search, name='vehicle-search'),
     path('vehicles/<int:pk>/', vehicle_views.vehicle_detail, name='vehicle-detail'),
     path('vehicles/<int:vehicle_id>/seats/', vehicle_views.seat_layout, name='vehicle-seat-layout'),
     path('vehicles/<int:vehicle_id>/available-seats/', vehicle_views.available_seats, name='vehicle-available-seats'),
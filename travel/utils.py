@@ -1,4 +1,6 @@
 """Travel app utility functions"""
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 from datetime import datetime, date
 from decimal import Decimal
@@ -6,8 +8,21 @@ from travel.models import TravelCommittee, TravelCommitteeStaff, TravelDealer, T
 from core.models import Agent
 
 
-def check_user_travel_role(user):
-    """Check user's travel roles and return role dictionary"""
+ROLE_CACHE_PREFIX = 'travel_roles'
+
+
+def _role_cache_key(user_id):
+    return f"{ROLE_CACHE_PREFIX}:{user_id}"
+
+
+def invalidate_travel_roles(user_ids):
+    """Drop cached travel roles for these users (after writes to committee/staff/dealer/agent rows)"""
+    keys = [_role_cache_key(user_id) for user_id in set(user_ids) if user_id]
+    if keys:
+        cache.delete_many(keys)
+
+
+def _load_travel_roles(user):
     roles = {
         'is_travel_committee': False,
         'is_travel_staff': False,
@@ -26,7 +41,7 @@ def check_user_travel_role(user):
         roles['committee'] = committee
     
     # Check Travel Committee Staff
-    staff = TravelCommitteeStaff.objects.filter(user=user).first()
+    staff = TravelCommitteeStaff.objects.filter(user=user).select_related('travel_committee').first()
     if staff:
         roles['is_travel_staff'] = True
         roles['staff'] = staff
@@ -38,7 +53,9 @@ def check_user_travel_role(user):
         roles['dealer'] = dealer
     
     # Check Agent
-    agent = Agent.objects.filter(user=user, is_active=True).first()
+    agent = Agent.objects.filter(user=user, is_active=True).select_related(
+        'dealer__user'
+    ).prefetch_related('committees').first()
     if agent:
         roles['is_agent'] = True
         roles['agent'] = agent
@@ -46,6 +63,36 @@ def check_user_travel_role(user):
     return roles
 
 
+def check_user_travel_role(user):
+    """
+    Check user's travel roles and return role dictionary
+    
+    Memoized on the user object for the rest of the request. With a shared
+    cache, also cached per user for TRAVEL_ROLE_CACHE_TTL seconds (dropped by
+    travel.signals when a committee, staff, dealer or agent row changes; off
+    by default, as other workers' local caches would not see the drop).
+    staff.travel_committee, agent.dealer and agent.committees come preloaded.
+    """
+    roles = getattr(user, '_travel_roles', None)
+    if roles is not None:
+        return roles
+    
+    ttl = getattr(settings, 'TRAVEL_ROLE_CACHE_TTL', 0)
+    key = _role_cache_key(user.pk)
+    roles = cache.get(key) if ttl and user.pk else None
+    if roles is None:
+        roles = _load_travel_roles(user)
+        if ttl and user.pk:
+            cache.set(key, roles, ttl)
+    user._travel_roles = roles
+    return roles
+
+
+def active_agent_committees(agent):
+    """Agent's active committees, from the preloaded committees when available"""
+    return [committee for committee in agent.committees.all() if committee.is_active]
+
+
 def calculate_travel_commissions(booking):
     """Calculate dealer/agent/system commissions for a booking"""
     from decimal import Decimal, ROUND_HALF_UP
@@ -105,18 +152,6 @@ def to_booking_calendar_date(booking_date):
     raise TypeError('booking_date must be datetime, date, or ISO string')
 
 
-def seat_has_blocking_booking_for_date(vehicle_seat, booking_date):
-    """True if this seat already has a pending or booked ticket for the calendar day."""
-    from travel.models import TravelBooking
-
-    d = to_booking_calendar_date(booking_date)
-    return TravelBooking.objects.filter(
-        vehicle_seat=vehicle_seat,
-        booking_date__date=d,
-        status__in=['pending', 'booked'],
-    ).exists()
-
-
 def validate_booking_date(vehicle, booking_date):
     """Validate booking date - must be today or future"""
     try:
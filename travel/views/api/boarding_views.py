@@ -6,9 +6,11 @@ from rest_framework import status
 from django.db import transaction as db_transaction
 from django.utils import timezone
 from datetime import datetime
-from travel.models import TravelBooking, TravelVehicleSeat
+from travel.models import TravelBooking, TravelVehicle, TravelVehicleSeat
 from travel.serializers import serialize_bookings, serialize_booking
 from travel.utils import check_user_travel_role, to_booking_calendar_date
+from travel.services import boarding
+from travel.services.seat_inventory import service_date
 
 
 def _get_boarding_committee(roles):
@@ -173,3 +175,146 @@ def confirm_boarding(request, booking_id):
         'message': 'Boarding confirmed successfully',
         'booking': serialize_booking(booking, request),
     })
+
+
+BOARDING_ERROR_STATUS = {
+    boarding.NOT_FOUND: status.HTTP_404_NOT_FOUND,
+    boarding.WRONG_DATE: status.HTTP_400_BAD_REQUEST,
+    boarding.INVALID_STATUS: status.HTTP_400_BAD_REQUEST,
+    boarding.SEAT_NOT_BOOKED: status.HTTP_400_BAD_REQUEST,
+}
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def scan_and_board(request):
+    """Board a ticket by number or QR code scan in one step - committee or staff with permission"""
+    roles = check_user_travel_role(request.user)
+    committee = _get_boarding_committee(roles)
+    if not committee:
+        return Response({
+            'error': 'You do not have boarding permission'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    search_value = request.data.get('ticket_number') or request.data.get('qr_code')
+    if not search_value:
+        return Response({
+            'error': 'Ticket number or QR code is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    result = boarding.board_tickets(committee, [(search_value, timezone.now())])[0]
+    if result['result'] in BOARDING_ERROR_STATUS:
+        return Response({
+            'error': result['error']
+        }, status=BOARDING_ERROR_STATUS[result['result']])
+
+    return Response({
+        'message': 'Already boarded' if result['result'] == boarding.ALREADY_BOARDED else 'Boarding confirmed successfully',
+        'result': result['result'],
+        'booking': serialize_booking(result['booking'], request),
+    })
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def sync_boarding_scans(request):
+    """
+    Apply scans collected offline: {"scans": [{"ticket_number": ..., "scanned_at": ISO}, ...]}
+    
+    All scans are applied in one transaction; each gets its own result, and
+    re-uploading a scan reports already_boarded, so uploads can be retried.
+    """
+    roles = check_user_travel_role(request.user)
+    committee = _get_boarding_committee(roles)
+    if not committee:
+        return Response({
+            'error': 'You do not have boarding permission'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    raw_scans = request.data.get('scans')
+    if not isinstance(raw_scans, list) or not raw_scans:
+        return Response({
+            'error': 'scans must be a non-empty list'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if len(raw_scans) > boarding.MAX_SYNC_SCANS:
+        return Response({
+            'error': f'At most {boarding.MAX_SYNC_SCANS} scans per upload'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    scans = []
+    for index, scan in enumerate(raw_scans):
+        ticket_number = (scan.get('ticket_number') or scan.get('qr_code')) if isinstance(scan, dict) else None
+        if not ticket_number:
+            return Response({
+                'error': f'scans[{index}]: ticket number or QR code is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            scanned_at = boarding.parse_scanned_at(scan.get('scanned_at'))
+        except (TypeError, ValueError):
+            return Response({
+                'error': f'scans[{index}]: invalid scanned_at'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        scans.append((str(ticket_number), scanned_at))
+
+    results = boarding.board_tickets(committee, scans)
+    return Response({
+        'boarded': sum(1 for r in results if r['result'] == boarding.BOARDED),
+        'results': [
+            {
+                'ticket_number': r['ticket_number'],
+                'result': r['result'],
+                'booking_id': r['booking'].id if r['booking'] else None,
+                'error': r['error'],
+            }
+            for r in results
+        ],
+    })
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def board_departure(request, vehicle_id):
+    """Board every booked ticket of a vehicle for today's departure - committee or staff with permission"""
+    roles = check_user_travel_role(request.user)
+    committee = _get_boarding_committee(roles)
+    if not committee:
+        return Response({
+            'error': 'You do not have boarding permission'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    vehicle = TravelVehicle.objects.filter(pk=vehicle_id).only('id', 'committee_id').first()
+    if vehicle is None:
+        return Response({
+            'error': 'Vehicle not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    if vehicle.committee_id != committee.id:
+        return Response({
+            'error': 'Vehicle does not belong to your committee'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    today = timezone.localdate()
+    date_param = request.data.get('date')
+    if date_param:
+        try:
+            day = service_date(date_param)
+        except (TypeError, ValueError):
+            return Response({
+                'error': 'Invalid date format'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if day != today:
+            return Response({
+                'error': f'Departure is for {day}, not today'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+    results = boarding.board_departure(committee, vehicle.id, today)
+    return Response({
+        'boarded': sum(1 for r in results if r['result'] == boarding.BOARDED),
+        'skipped': [
+            {
+                'ticket_number': r['ticket_number'],
+                'result': r['result'],
+                'error': r['error'],
+            }
+            for r in results if r['result'] != boarding.BOARDED
+        ],
+    })
@@ -5,6 +5,7 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
 from django.db import transaction as db_transaction
+from django.db.models import prefetch_related_objects
 from django.utils import timezone
 from datetime import datetime
 from travel.models import TravelBooking, TravelVehicle, TravelVehicleSeat
@@ -18,8 +19,8 @@ from travel.utils import (
     check_user_travel_role,
     validate_booking_date,
     generate_ticket_pdf,
-    seat_has_blocking_booking_for_date,
 )
+from travel.services.seat_inventory import service_date, claim_seats, clear_inventory, SeatConflict
 from travel.services.commission_service import calculate_commissions
 from django.http import HttpResponse
 from rest_framework.exceptions import ValidationError
@@ -52,45 +53,59 @@ def create_booking(request):
         return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
     
     created_bookings = []
+    day = service_date(booking_date)
     with db_transaction.atomic():
-        seats = list(
-            TravelVehicleSeat.objects.select_for_update().filter(
-                id__in=seat_ids, vehicle=vehicle
-            )
-        )
+        seats = list(TravelVehicleSeat.objects.filter(id__in=seat_ids, vehicle=vehicle))
         if len(seats) != len(seat_ids):
             return Response({
                 'error': 'Some selected seats are invalid for this vehicle'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        for seat in seats:
-            if seat_has_blocking_booking_for_date(seat, booking_date):
-                return Response({
-                    'error': 'One or more seats are already reserved for this date'
-                }, status=status.HTTP_400_BAD_REQUEST)
+        # One conditional update on the (vehicle, date) inventory row claims every seat
+        try:
+            claim_seats(vehicle.id, day, seat_ids)
+        except SeatConflict:
+            return Response({
+                'error': 'One or more seats are already reserved for this date'
+            }, status=status.HTTP_400_BAD_REQUEST)
 
+        # Build every ticket in memory and insert them in one statement.
+        # bulk_create skips post_save, which is fine: the seats are claimed above
+        # and new 'booked' tickets have no commission to distribute yet.
         for seat in seats:
-            booking_data = data.copy()
-            booking_data['vehicle_seat'] = seat
-            booking_data['actual_price'] = vehicle.actual_seat_price
-            booking_data['ticket_price'] = vehicle.seat_price
-            booking_data['status'] = 'booked'
-            
-            if roles['is_agent']:
-                booking_data['agent'] = roles['agent']
-            
-            booking = TravelBooking.objects.create(**booking_data)
-            booking.generate_ticket_number()
+            booking = TravelBooking(
+                **data,
+                vehicle_seat=seat,
+                actual_price=vehicle.actual_seat_price,
+                ticket_price=vehicle.seat_price,
+                status='booked',
+                agent=roles['agent'] if roles['is_agent'] else None,
+            )
             booking.generate_qr_code()
             try:
                 calculate_commissions(booking)
             except ValueError as e:
                 raise ValidationError(str(e))
-            booking.save()
-            seat.status = 'booked'
-            seat.save()
             created_bookings.append(booking)
-    
+
+        TravelBooking.objects.bulk_create(created_bookings)
+        if created_bookings[0].pk is None:
+            # Backends without RETURNING (MySQL) don't set ids on bulk_create
+            ids = dict(TravelBooking.objects.filter(
+                ticket_number__in=[b.ticket_number for b in created_bookings]
+            ).values_list('ticket_number', 'id'))
+            for booking in created_bookings:
+                booking.pk = ids[booking.ticket_number]
+                booking._state.adding = False
+        for booking in created_bookings:
+            booking._seat_hold = (vehicle.id, day, booking.vehicle_seat_id)
+
+        TravelVehicleSeat.objects.filter(id__in=seat_ids).update(status='booked', updated_at=timezone.now())
+        for seat in seats:
+            seat.status = 'booked'
+
+    # Every ticket shares the vehicle instance; load its seats/images once for serialization
+    prefetch_related_objects([vehicle], 'seats', 'images')
     return Response(
         serialize_bookings(created_bookings, request),
         status=status.HTTP_201_CREATED
@@ -288,6 +303,7 @@ def reset_seats(request, vehicle_id):
                 id__in=list(seat_ids_to_clear),
                 status__in=['booked', 'boarded'],
             ).update(status='available')
+            clear_inventory(vehicle.id, booking_date_only)
         else:
             cancelled = TravelBooking.objects.filter(
                 vehicle=vehicle,
@@ -297,6 +313,7 @@ def reset_seats(request, vehicle_id):
                 vehicle=vehicle,
                 status__in=['booked', 'boarded'],
             ).update(status='available')
+            clear_inventory(vehicle.id)
 
     return Response({
         'message': f'{count} seats reset to available; {cancelled} booking(s) cancelled',
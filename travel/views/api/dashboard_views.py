@@ -12,7 +12,8 @@ from travel.models import (
     TravelVehicle, TravelBooking, TravelVehicleSeat
 )
 from core.models import Agent, Transaction
-from travel.utils import check_user_travel_role
+from travel.utils import check_user_travel_role, active_agent_committees
+from core.services.kpi_rollup import KpiReader, day_start
 
 
 @api_view(['GET'])
@@ -50,37 +51,28 @@ def travel_committee_dashboard(request):
     committee = roles['committee']
     
     # Get date ranges
-    today = timezone.now().date()
+    today = timezone.localdate()
     week_ago = today - timedelta(days=7)
     month_ago = today - timedelta(days=30)
+    kpis = KpiReader()
     
     # Vehicle stats
     total_vehicles = TravelVehicle.objects.filter(committee=committee).count()
     active_vehicles = TravelVehicle.objects.filter(committee=committee, is_active=True).count()
     
-    # Booking stats
-    bookings = TravelBooking.objects.filter(vehicle__committee=committee)
-    total_bookings = bookings.count()
-    today_bookings = bookings.filter(created_at__date=today).count()
-    week_bookings = bookings.filter(created_at__date__gte=week_ago).count()
-    month_bookings = bookings.filter(created_at__date__gte=month_ago).count()
-    pending_bookings = bookings.filter(status='pending').count()
+    # Booking stats (daily rollups plus today live)
+    committee_ids = [committee.id]
+    total_bookings = kpis.total('travel.bookings.committee', dimensions=committee_ids)['count']
+    today_bookings = kpis.total('travel.bookings.committee', today, dimensions=committee_ids)['count']
+    week_bookings = kpis.total('travel.bookings.committee', week_ago, dimensions=committee_ids)['count']
+    month_bookings = kpis.total('travel.bookings.committee', month_ago, dimensions=committee_ids)['count']
+    pending_bookings = TravelBooking.objects.filter(vehicle__committee=committee, status='pending').count()
     
     # Revenue stats (from transactions)
-    revenue_transactions = Transaction.objects.filter(
-        user=request.user,
-        transaction_type='travel_booking_revenue',
-        status='completed'
-    )
-    today_revenue = revenue_transactions.filter(created_at__date=today).aggregate(
-        total=Sum('amount')
-    )['total'] or Decimal('0')
-    week_revenue = revenue_transactions.filter(created_at__date__gte=week_ago).aggregate(
-        total=Sum('amount')
-    )['total'] or Decimal('0')
-    month_revenue = revenue_transactions.filter(created_at__date__gte=month_ago).aggregate(
-        total=Sum('amount')
-    )['total'] or Decimal('0')
+    user_ids = [request.user.id]
+    today_revenue = kpis.total('travel.revenue', today, dimensions=user_ids)['amount']
+    week_revenue = kpis.total('travel.revenue', week_ago, dimensions=user_ids)['amount']
+    month_revenue = kpis.total('travel.revenue', month_ago, dimensions=user_ids)['amount']
     
     # Staff stats
     active_staff = TravelCommitteeStaff.objects.filter(travel_committee=committee).count()
@@ -143,7 +135,7 @@ def travel_staff_dashboard(request):
     staff = roles['staff']
     committee = staff.travel_committee
     
-    today = timezone.now().date()
+    today_start = day_start(timezone.localdate())
     
     # Permission-based widgets
     widgets = {}
@@ -152,7 +144,7 @@ def travel_staff_dashboard(request):
     if staff.booking_permission:
         today_bookings = TravelBooking.objects.filter(
             vehicle__committee=committee,
-            created_at__date=today
+            created_at__gte=today_start
         ).count()
         pending_count = TravelBooking.objects.filter(
             vehicle__committee=committee,
@@ -180,7 +172,7 @@ def travel_staff_dashboard(request):
             user=committee_user,
             transaction_type='travel_booking_revenue',
             status='completed',
-            created_at__date=today
+            created_at__gte=today_start
         ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
         widgets['finance'] = {
             'today_revenue': float(today_revenue),
@@ -217,9 +209,10 @@ def travel_dealer_dashboard(request):
     
     dealer = roles['dealer']
     
-    today = timezone.now().date()
+    today = timezone.localdate()
     week_ago = today - timedelta(days=7)
     month_ago = today - timedelta(days=30)
+    kpis = KpiReader()
     
     # Agent stats
     agents = Agent.objects.filter(dealer=dealer)
@@ -227,25 +220,17 @@ def travel_dealer_dashboard(request):
     active_agents = agents.filter(is_active=True).count()
     
     # Booking stats (from agents)
-    bookings = TravelBooking.objects.filter(agent__dealer=dealer)
-    total_bookings = bookings.count()
-    today_bookings = bookings.filter(created_at__date=today).count()
-    week_bookings = bookings.filter(created_at__date__gte=week_ago).count()
-    month_bookings = bookings.filter(created_at__date__gte=month_ago).count()
+    dealer_ids = [dealer.id]
+    total_bookings = kpis.total('travel.bookings.dealer', dimensions=dealer_ids)['count']
+    today_bookings = kpis.total('travel.bookings.dealer', today, dimensions=dealer_ids)['count']
+    week_bookings = kpis.total('travel.bookings.dealer', week_ago, dimensions=dealer_ids)['count']
+    month_bookings = kpis.total('travel.bookings.dealer', month_ago, dimensions=dealer_ids)['count']
     
     # Revenue stats
-    revenue_transactions = Transaction.objects.filter(
-        user=request.user,
-        transaction_type='travel_booking_revenue',
-        status='completed'
-    )
-    total_revenue = revenue_transactions.aggregate(total=Sum('amount'))['total'] or Decimal('0')
-    today_revenue = revenue_transactions.filter(created_at__date=today).aggregate(
-        total=Sum('amount')
-    )['total'] or Decimal('0')
-    month_revenue = revenue_transactions.filter(created_at__date__gte=month_ago).aggregate(
-        total=Sum('amount')
-    )['total'] or Decimal('0')
+    user_ids = [request.user.id]
+    total_revenue = kpis.total('travel.revenue', dimensions=user_ids)['amount']
+    today_revenue = kpis.total('travel.revenue', today, dimensions=user_ids)['amount']
+    month_revenue = kpis.total('travel.revenue', month_ago, dimensions=user_ids)['amount']
     
     # Top performing agents
     top_agents = agents.annotate(
@@ -299,28 +284,24 @@ def agent_dashboard(request):
     
     agent = roles['agent']
     
-    today = timezone.now().date()
+    today = timezone.localdate()
     week_ago = today - timedelta(days=7)
     month_ago = today - timedelta(days=30)
+    kpis = KpiReader()
     
     # Booking stats
-    bookings = TravelBooking.objects.filter(agent=agent)
-    total_bookings = bookings.count()
-    today_bookings = bookings.filter(created_at__date=today).count()
-    week_bookings = bookings.filter(created_at__date__gte=week_ago).count()
-    month_bookings = bookings.filter(created_at__date__gte=month_ago).count()
-    pending_bookings = bookings.filter(status='pending').count()
+    agent_ids = [agent.id]
+    total_bookings = kpis.total('travel.bookings.agent', dimensions=agent_ids)['count']
+    today_bookings = kpis.total('travel.bookings.agent', today, dimensions=agent_ids)['count']
+    week_bookings = kpis.total('travel.bookings.agent', week_ago, dimensions=agent_ids)['count']
+    month_bookings = kpis.total('travel.bookings.agent', month_ago, dimensions=agent_ids)['count']
+    pending_bookings = TravelBooking.objects.filter(agent=agent, status='pending').count()
     
     # Revenue stats
-    revenue_transactions = Transaction.objects.filter(
-        user=request.user,
-        transaction_type='travel_booking_revenue',
-        status='completed'
-    )
-    total_revenue = revenue_transactions.aggregate(total=Sum('amount'))['total'] or Decimal('0')
+    total_revenue = kpis.total('travel.revenue', dimensions=[request.user.id])['amount']
     
     # Available committees
-    committees = agent.committees.filter(is_active=True)
+    committees = active_agent_committees(agent)
     
     return Response({
         'agent': {
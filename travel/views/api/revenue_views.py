@@ -3,12 +3,12 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Sum, Q
+from django.db.models import Q
 from django.utils import timezone
 from datetime import timedelta
-from decimal import Decimal
 from core.models import Transaction
 from travel.utils import check_user_travel_role
+from core.services.kpi_rollup import KpiReader
 from travel.serializers import TravelBookingPublicSerializer
 
 
@@ -77,23 +77,19 @@ def revenue_stats(request):
     """Get revenue statistics by period"""
     roles = check_user_travel_role(request.user)
     
-    today = timezone.now().date()
+    today = timezone.localdate()
     week_ago = today - timedelta(days=7)
     month_ago = today - timedelta(days=30)
     year_ago = today - timedelta(days=365)
     
-    transactions = Transaction.objects.filter(
-        user=request.user,
-        transaction_type='travel_booking_revenue',
-        status='completed'
-    )
-    
-    # Calculate stats
-    total_revenue = transactions.aggregate(total=Sum('amount'))['total'] or Decimal('0')
-    today_revenue = transactions.filter(created_at__date=today).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-    week_revenue = transactions.filter(created_at__date__gte=week_ago).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-    month_revenue = transactions.filter(created_at__date__gte=month_ago).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-    year_revenue = transactions.filter(created_at__date__gte=year_ago).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+    # Calculate stats from the daily rollups (today is read live)
+    kpis = KpiReader()
+    user_ids = [request.user.id]
+    total_revenue = kpis.total('travel.revenue', dimensions=user_ids)['amount']
+    today_revenue = kpis.total('travel.revenue', today, dimensions=user_ids)['amount']
+    week_revenue = kpis.total('travel.revenue', week_ago, dimensions=user_ids)['amount']
+    month_revenue = kpis.total('travel.revenue', month_ago, dimensions=user_ids)['amount']
+    year_revenue = kpis.total('travel.revenue', year_ago, dimensions=user_ids)['amount']
     
     return Response({
         'total': float(total_revenue),
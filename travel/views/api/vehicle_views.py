@@ -12,8 +12,11 @@ from travel.serializers import (
     TravelVehiclePublicSerializer,
     TravelVehicleCreateUpdateSerializer,
     TravelVehicleSeatSerializer,
+    serialize_search_results,
 )
-from travel.utils import check_user_travel_role, validate_booking_date
+from travel.utils import check_user_travel_role, validate_booking_date, active_agent_committees
+from travel.services.seat_inventory import held_seat_ids, service_date
+from travel.services.vehicle_search import search_vehicles
 
 
 def _vehicle_read_serializer_class(request):
@@ -123,6 +126,50 @@ def vehicle_list(request):
     return Response(serializer.data)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def vehicle_search(request):
+    """Search active vehicles by route with free seats for a date (?from_place=&to_place=&date=)"""
+    try:
+        from_place_id = int(request.query_params.get('from_place', ''))
+        to_place_id = int(request.query_params.get('to_place', ''))
+    except ValueError:
+        return Response({
+            'error': 'from_place and to_place are required place ids'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    booking_date = request.query_params.get('date')
+    if not booking_date:
+        return Response({
+            'error': 'Date parameter is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        day = service_date(booking_date)
+    except ValueError:
+        return Response({
+            'error': 'Invalid date format'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    is_valid, error = validate_booking_date(None, day)
+    if not is_valid:
+        return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Same visibility as vehicle_list, applied to the (cacheable) route results
+    roles = check_user_travel_role(request.user)
+    if roles['is_travel_committee']:
+        committee_ids = {roles['committee'].id}
+    elif roles['is_travel_staff']:
+        committee_ids = {roles['staff'].travel_committee_id}
+    elif roles['is_agent']:
+        committee_ids = {committee.id for committee in active_agent_committees(roles['agent'])}
+    else:
+        committee_ids = None
+
+    rows = search_vehicles(from_place_id, to_place_id, day)
+    if committee_ids is not None:
+        rows = [row for row in rows if row['committee_id'] in committee_ids]
+    return Response(serialize_search_results(rows, request))
+
+
 @api_view(['GET', 'PATCH', 'PUT', 'DELETE'])
 @permission_classes([IsAuthenticated])
 def vehicle_detail(request, pk):
@@ -209,13 +256,7 @@ def available_seats(request, vehicle_id):
     # Get all seats
     all_seats = TravelVehicleSeat.objects.filter(vehicle=vehicle)
     
-    booked_ids = set(
-        TravelBooking.objects.filter(
-            vehicle=vehicle,
-            booking_date__date=booking_date.date(),
-            status__in=['pending', 'booked'],
-        ).values_list('vehicle_seat_id', flat=True)
-    )
+    booked_ids = held_seat_ids(vehicle.id, service_date(booking_date))
 
     seats_data = []
     for seat in all_seats:
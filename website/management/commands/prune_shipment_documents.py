@@ -0,0 +1,16 @@
+"""
+Django management command to clean up the shipment document cache
+Run this periodically (e.g., hourly via cron) so logo-stamped labels and
+manifests stay within SHIPMENT_DOCUMENT_CACHE_MAX_AGE_DAYS and
+SHIPMENT_DOCUMENT_CACHE_MAX_MB; downloads never prune on their own.
+"""
+from django.core.management.base import BaseCommand
+from website.views.ecommerce.shipment_views import prune_document_cache
+
+
+class Command(BaseCommand):
+    help = 'Delete old and least recently used cached shipment PDFs'
+
+    def handle(self, *args, **options):
+        deleted = prune_document_cache()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} cached shipment documents'))
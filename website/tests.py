@@ -1,3 +1,127 @@
-from django.test import TestCase
+"""Website view tests."""
+import io
+import os
+import shutil
+import tempfile
+import time
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from PyPDF2 import PdfReader
+from reportlab.pdfgen import canvas
+
+from core.models import User, Address
+from ecommerce.models import Store, Order
+from website.views.ecommerce import shipment_views
+
+
+def _pdf_bytes(text):
+    packet = io.BytesIO()
+    can = canvas.Canvas(packet, pagesize=(288, 432))
+    can.drawString(20, 20, text)
+    can.save()
+    return packet.getvalue()
+
+
+class ShipmentDocumentCacheTests(TestCase):
+    """Logo-stamped shipment PDFs are cached on disk and pruned out of band."""
+
+    @classmethod
+    def setUpTestData(cls):
+        customer = User.objects.create_user(phone='9600000031', name='Customer', password='testpass123')
+        cls.owner = User.objects.create_user(phone='9600000032', name='Merchant', password='testpass123')
+        cls.store = Store.objects.create(name='Store', owner=cls.owner, phone='9600000032')
+        address = Address.objects.create(
+            user=customer, title='Home', full_name='Customer', phone='9600000031',
+            address='Street 1', city='City', state='State', zip_code='000000',
+        )
+        cls.orders = [
+            Order.objects.create(
+                user=customer, merchant=cls.store, order_number=f'LBL{index:04d}',
+                subtotal=Decimal('50.00'), total_amount=Decimal('50.00'),
+                shipping_address=address, billing_address=address,
+                shipdaak_label_url=f'https://labels.example.com/{index}.pdf',
+            )
+            for index in range(2)
+        ]
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        Image.new('RGB', (40, 20), 'red').save(os.path.join(self.cache_dir, 'logo.png'))
+        settings_override = override_settings(
+            STATIC_ROOT=self.cache_dir,
+            SHIPMENT_DOCUMENT_CACHE_DIR=os.path.join(self.cache_dir, 'documents'),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        patcher = mock.patch.object(shipment_views.requests, 'get', side_effect=self._fake_get)
+        self.get = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.force_login(self.owner)
+
+    def _fake_get(self, url, timeout=None):
+        return mock.Mock(content=_pdf_bytes(url), raise_for_status=mock.Mock())
+
+    def _download(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        content = b''.join(response.streaming_content)
+        response.close()
+        return PdfReader(io.BytesIO(content))
+
+    def _cached_files(self):
+        return sorted(os.listdir(os.path.join(self.cache_dir, 'documents')))
+
+    def test_label_is_stamped_once_then_served_from_cache(self):
+        url = f'/{self.store.id}/{self.orders[0].id}/shipment/documents/label/'
+        first = self._download(url)
+        second = self._download(url)
+
+        self.assertEqual(self.get.call_count, 1)
+        self.assertEqual(len(first.pages), 1)
+        self.assertEqual(len(second.pages), 1)
+        self.assertEqual(len(self._cached_files()), 1)
+
+    def test_changed_logo_misses_the_cache(self):
+        url = f'/{self.store.id}/{self.orders[0].id}/shipment/documents/label/'
+        self._download(url)
+        Image.new('RGB', (40, 20), 'blue').save(os.path.join(self.cache_dir, 'logo.png'))
+        self._download(url)
+
+        self.assertEqual(self.get.call_count, 2)
+        self.assertEqual(len(self._cached_files()), 2)
+
+    def test_bulk_download_merges_cached_labels(self):
+        url = f'/{self.store.id}/shipment/documents/labels/?orders={self.orders[0].id},{self.orders[1].id}'
+        merged = self._download(url)
+        self._download(url)
+
+        self.assertEqual(len(merged.pages), 2)
+        self.assertEqual(self.get.call_count, 2)
+        self.assertEqual([name.split('_')[0] for name in self._cached_files()], ['label', 'label', 'merged'])
+
+    @override_settings(SHIPMENT_DOCUMENT_CACHE_MAX_MB=0)
+    def test_downloads_never_prune_the_cache(self):
+        url = f'/{self.store.id}/shipment/documents/labels/?orders={self.orders[0].id},{self.orders[1].id}'
+        self._download(url)
+        self.assertEqual(len(self._cached_files()), 3)
+
+    @override_settings(SHIPMENT_DOCUMENT_CACHE_MAX_AGE_DAYS=1)
+    def test_prune_command_keeps_recently_used_files(self):
+        self._download(f'/{self.store.id}/{self.orders[0].id}/shipment/documents/label/')
+        recent = self._cached_files()[0]
+        stale_path = os.path.join(self.cache_dir, 'documents', 'label_stale.pdf')
+        with open(stale_path, 'wb') as stale_file:
+            stale_file.write(b'%PDF')
+        two_days_ago = time.time() - 2 * 24 * 60 * 60
+        os.utime(stale_path, (two_days_ago, two_days_ago))
+
+        with override_settings(SHIPMENT_DOCUMENT_CACHE_MAX_MB=0):
+            call_command('prune_shipment_documents', stdout=io.StringIO())
+
+        self.assertEqual(self._cached_files(), [recent])
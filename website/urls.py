@@ -29,6 +29,7 @@ urlpatterns = [
     path('<int:store_id>/<int:order_id>/shipment/documents/', ecommerce.shipment_documents_view, name='shipment_documents'),
     path('<int:store_id>/<int:order_id>/shipment/documents/label/', ecommerce.download_shipment_label, name='download_shipment_label'),
     path('<int:store_id>/<int:order_id>/shipment/documents/manifest/', ecommerce.download_shipment_manifest, name='download_shipment_manifest'),
+    path('<int:store_id>/shipment/documents/labels/', ecommerce.download_shipment_labels_bulk, name='download_shipment_labels_bulk'),
     
     # Taxi routes
     path('taxi/', taxi_view.taxi_view, name='taxi'),
@@ -1,21 +1,14 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth import login
 from django.contrib import messages
-from django.utils import timezone
-from datetime import timedelta
-from django.conf import settings as django_settings
-import random
-from core.models import User, Otp
+from core.models import User
+from core.services import otp_store
+from core.services.otp_store import get_otp_backend, generate_otp
 from core.utils.sms_service import sms_service
 from core.utils.role_helpers import get_dashboard_path_for_user
 from website.models import MySetting, CMSPages
 
 
-def generate_otp():
-    """Generate 6-digit OTP"""
-    return str(random.randint(100000, 999999))
-
-
 def send_otp_view(request):
     """Send OTP for registration"""
     if request.user.is_authenticated:
@@ -47,17 +40,8 @@ def send_otp_view(request):
         # Generate OTP
         otp = generate_otp()
         
-        # Delete any existing OTP for this phone
-        Otp.objects.filter(phone=phone, country_code=country_code).delete()
-        
-        # Create new OTP with expiration
-        expires_at = timezone.now() + timedelta(minutes=getattr(django_settings, 'OTP_EXPIRY_MINUTES', 10))
-        Otp.objects.create(
-            phone=phone,
-            otp=otp,
-            country_code=country_code,
-            expires_at=expires_at
-        )
+        # Store OTP (replaces any previous OTP for this phone; expires after OTP_EXPIRY_MINUTES)
+        get_otp_backend().issue(phone, country_code, otp)
         
         # Send SMS based on country code
         if country_code == '+91':
@@ -140,41 +124,40 @@ def register_view(request):
             elif len(otp) != 6 or not otp.isdigit():
                 messages.error(request, 'OTP must be a 6-digit number.')
             else:
-                # Verify OTP
-                try:
-                    otp_record = Otp.objects.get(phone=phone, otp=otp, country_code=country_code)
-                    if otp_record.is_expired():
-                        messages.error(request, 'OTP has expired. Please request a new one.')
+                # Verify OTP (invalidated only once the account is created)
+                otp_result = get_otp_backend().verify(phone, country_code, otp, consume=False)
+                if otp_result == otp_store.EXPIRED:
+                    messages.error(request, 'OTP has expired. Please request a new one.')
+                    # Clear session
+                    request.session.pop('reg_phone', None)
+                    request.session.pop('reg_country_code', None)
+                    request.session.pop('reg_country', None)
+                elif otp_result != otp_store.VALID:
+                    messages.error(request, f"{otp_store.ERROR_MESSAGES[otp_result]}.")
+                else:
+                    # OTP is valid, create user
+                    try:
+                        user = User.objects.create_user(
+                            phone=phone,
+                            name=name,
+                            email=email,
+                            password=password,
+                            country_code=country_code,
+                            country=country,
+                        )
+                        # Invalidate OTP after successful registration
+                        get_otp_backend().invalidate(phone, country_code)
+                        
                         # Clear session
                         request.session.pop('reg_phone', None)
                         request.session.pop('reg_country_code', None)
                         request.session.pop('reg_country', None)
-                    else:
-                        # OTP is valid, create user
-                        try:
-                            user = User.objects.create_user(
-                                phone=phone,
-                                name=name,
-                                email=email,
-                                password=password,
-                                country_code=country_code,
-                                country=country,
-                            )
-                            # Delete OTP after successful registration
-                            otp_record.delete()
-                            
-                            # Clear session
-                            request.session.pop('reg_phone', None)
-                            request.session.pop('reg_country_code', None)
-                            request.session.pop('reg_country', None)
-                            
-                            login(request, user)
-                            messages.success(request, 'Registration successful!')
-                            return redirect(get_dashboard_path_for_user(user))
-                        except Exception as e:
-                            messages.error(request, f'Registration failed: {str(e)}')
-                except Otp.DoesNotExist:
-                    messages.error(request, 'Invalid OTP code.')
+                        
+                        login(request, user)
+                        messages.success(request, 'Registration successful!')
+                        return redirect(get_dashboard_path_for_user(user))
+                    except Exception as e:
+                        messages.error(request, f'Registration failed: {str(e)}')
         else:
             # This should not happen, redirect to step 1
             return redirect('website:register')
@@ -6,7 +6,9 @@ from .checkout_views import checkout_view, process_checkout, payment_result_view
 from .order_views import orders_view, order_detail_view
 from .wishlist_views import wishlist_view
 from .search_views import search_view
-from .shipment_views import shipment_documents_view, download_shipment_label, download_shipment_manifest
+from .shipment_views import (
+    shipment_documents_view, download_shipment_label, download_shipment_manifest, download_shipment_labels_bulk
+)
 
 __all__ = [
     'shop_view',
@@ -24,5 +26,6 @@ __all__ = [
     'shipment_documents_view',
     'download_shipment_label',
     'download_shipment_manifest',
+    'download_shipment_labels_bulk',
 ]
 
@@ -122,13 +122,13 @@ def split_order_by_vendor(temp_order):
             
             # Shipping charge history will be created when merchant accepts order
             
-            # Send push notification to merchant
+            # Queue push notification to merchant (sent by the outbox dispatcher)
             try:
                 from core.services.fcm_service import FCMService
                 if store.owner:
-                    FCMService.send_order_notification(store.owner, order)
+                    FCMService.queue_order_notification(store.owner, order)
             except Exception as e:
-                print(f"[ERROR] Failed to send order notification: {str(e)}")
+                print(f"[ERROR] Failed to queue order notification: {str(e)}")
                 sys.stdout.flush()
             
             created_orders.append(order)
@@ -316,13 +316,13 @@ def process_checkout(request):
                 
                 # Shipping charge history will be created when merchant accepts order
                 
-                # Send push notification to merchant
+                # Queue push notification to merchant (sent by the outbox dispatcher)
                 try:
                     from core.services.fcm_service import FCMService
                     if store.owner:
-                        FCMService.send_order_notification(store.owner, order)
+                        FCMService.queue_order_notification(store.owner, order)
                 except Exception as e:
-                    print(f"[ERROR] Failed to send order notification: {str(e)}")
+                    print(f"[ERROR] Failed to queue order notification: {str(e)}")
                     sys.stdout.flush()
                 
                 created_orders.append(order)
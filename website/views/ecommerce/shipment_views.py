@@ -1,15 +1,20 @@
+from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, get_object_or_404, HttpResponse
+from django.http import FileResponse, Http404
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from ecommerce.models import Order, Store
 from website.models import MySetting
 import requests
+import hashlib
 import io
+import tempfile
 from PyPDF2 import PdfReader, PdfWriter
 from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
 from PIL import Image
 import os
+import time
 
 
 def shipment_documents_view(request, store_id, order_id):
@@ -82,44 +87,140 @@ def shipment_documents_view(request, store_id, order_id):
         return render(request, 'website/ecommerce/shipment_documents.html', context, status=500)
 
 
-def _add_logo_to_label_pdf(pdf_url, logo_path):
+def _label_logo_box(page_width, page_height, logo_aspect):
+    """Logo at top-right corner, max 100px width"""
+    logo_width = min(100, page_width * 0.15)
+    logo_height = logo_width * logo_aspect
+    # Position logo at top-right (with some margin)
+    return page_width - logo_width - 20, page_height - logo_height - 20, logo_width, logo_height
+
+
+def _manifest_logo_box(page_width, page_height, logo_aspect):
+    """Logo at top-left, smaller size (max 60px), typically above Courier area"""
+    logo_width = min(60, page_width * 0.10)
+    logo_height = logo_width * logo_aspect
+    # Increased gap from top to position logo lower (more downside)
+    return 45, page_height - logo_height - 60, logo_width, logo_height
+
+
+DOCUMENT_LOGO_BOXES = {
+    'label': _label_logo_box,
+    'manifest': _manifest_logo_box,
+}
+
+_logo_hash_cache = {}
+
+
+def _logo_hash(logo_path):
+    """SHA-256 of the logo file, memoized per (path, mtime, size)"""
+    if not os.path.exists(logo_path):
+        raise FileNotFoundError(f"Logo file not found: {logo_path}")
+    stat = os.stat(logo_path)
+    memo_key = (logo_path, stat.st_mtime_ns, stat.st_size)
+    if memo_key not in _logo_hash_cache:
+        with open(logo_path, 'rb') as logo_file:
+            _logo_hash_cache[memo_key] = hashlib.sha256(logo_file.read()).hexdigest()
+    return _logo_hash_cache[memo_key]
+
+
+def _document_cache_dir():
+    cache_dir = getattr(settings, 'SHIPMENT_DOCUMENT_CACHE_DIR', os.path.join(settings.BASE_DIR, 'cache', 'shipment_documents'))
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+# Files used more recently than this are never pruned, so a bulk download can
+# still merge the labels it has just fetched
+DOCUMENT_CACHE_IN_USE_SECONDS = 10 * 60
+
+
+def _touch_cached(path):
+    """True if a cached file exists, marking it recently used for prune_document_cache"""
+    try:
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def prune_document_cache():
     """
-    Download PDF from URL, add logo at top-right, and return PDF bytes
-    Logo positioned at top-right corner, max 100px width
+    Delete cached PDFs older than SHIPMENT_DOCUMENT_CACHE_MAX_AGE_DAYS, then the
+    least recently used ones until the directory fits SHIPMENT_DOCUMENT_CACHE_MAX_MB
+    
+    Run from the prune_shipment_documents command, never from a request.
+    Files used within DOCUMENT_CACHE_IN_USE_SECONDS are kept.
+    
+    Returns:
+        int: Number of files deleted
     """
+    now = time.time()
+    max_age = getattr(settings, 'SHIPMENT_DOCUMENT_CACHE_MAX_AGE_DAYS', 7) * 24 * 60 * 60
+    max_bytes = getattr(settings, 'SHIPMENT_DOCUMENT_CACHE_MAX_MB', 500) * 1024 * 1024
+    cache_dir = _document_cache_dir()
+    
+    files = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        # Cache hits touch the file, so mtime is the last use
+        files.append((stat.st_mtime, stat.st_size, path))
+    files.sort()
+    
+    deleted = 0
+    total = sum(size for _, size, _ in files)
+    for used_at, size, path in files:
+        if now - used_at <= max_age and total <= max_bytes:
+            break
+        if now - used_at < DOCUMENT_CACHE_IN_USE_SECONDS:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        deleted += 1
+    return deleted
+
+
+def _write_atomically(path, write):
+    """Write a cache file via a temp file + rename so readers never see partial PDFs"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
     try:
-        # Download original PDF
-        response = requests.get(pdf_url, timeout=30)
-        response.raise_for_status()
-        
-        # Read original PDF
-        original_pdf = PdfReader(io.BytesIO(response.content))
-        pdf_writer = PdfWriter()
-        
-        # Load logo image
-        if not os.path.exists(logo_path):
-            raise FileNotFoundError(f"Logo file not found: {logo_path}")
-        
-        logo_img = Image.open(logo_path)
-        
-        # Process each page
-        for page_num, page in enumerate(original_pdf.pages):
-            # Get page dimensions
-            page_width = float(page.mediabox.width)
-            page_height = float(page.mediabox.height)
-            
+        with os.fdopen(fd, 'wb') as tmp_file:
+            write(tmp_file)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _stamp_pdf(pdf_content, logo_path, logo_box, output):
+    """
+    Add logo to every page of a PDF and write the result to output
+    Logo overlays are rendered once per distinct page size
+    """
+    original_pdf = PdfReader(io.BytesIO(pdf_content))
+    pdf_writer = PdfWriter()
+    
+    logo_img = Image.open(logo_path)
+    logo_aspect = logo_img.height / logo_img.width
+    overlays = {}
+    
+    for page in original_pdf.pages:
+        page_width = float(page.mediabox.width)
+        page_height = float(page.mediabox.height)
+        
+        overlay = overlays.get((page_width, page_height))
+        if overlay is None:
             # Create a new PDF page with logo
             packet = io.BytesIO()
             can = canvas.Canvas(packet, pagesize=(page_width, page_height))
-            
-            # Calculate logo size (max 100px width, maintain aspect ratio)
-            logo_width = min(100, page_width * 0.15)
-            logo_aspect = logo_img.height / logo_img.width
-            logo_height = logo_width * logo_aspect
-            
-            # Position logo at top-right (with some margin)
-            x_position = page_width - logo_width - 20
-            y_position = page_height - logo_height - 20
+            x_position, y_position, logo_width, logo_height = logo_box(page_width, page_height, logo_aspect)
             
             # Draw logo (fully opaque, 100% opacity)
             can.drawImage(
@@ -131,104 +232,62 @@ def _add_logo_to_label_pdf(pdf_url, logo_path):
                 preserveAspectRatio=True,
                 mask='auto'
             )
-            
             can.save()
-            
-            # Move to the beginning of the StringIO buffer
             packet.seek(0)
-            logo_pdf = PdfReader(packet)
-            
-            # Merge logo page with original page
-            page.merge_page(logo_pdf.pages[0])
-            
-            # Add merged page to writer
-            pdf_writer.add_page(page)
-        
-        # Write merged PDF to bytes
-        output = io.BytesIO()
-        pdf_writer.write(output)
-        output.seek(0)
-        
-        return output.getvalue()
-        
-    except Exception as e:
-        raise Exception(f"Error processing PDF: {str(e)}")
+            overlay = PdfReader(packet).pages[0]
+            overlays[(page_width, page_height)] = overlay
+        
+        # Merge logo page with original page
+        page.merge_page(overlay)
+        pdf_writer.add_page(page)
+    
+    pdf_writer.write(output)
 
 
-def _add_logo_to_manifest_pdf(pdf_url, logo_path):
+def _get_stamped_pdf(kind, pdf_url, logo_path):
     """
-    Download PDF from URL, add logo at top-left (smaller size), and return PDF bytes
-    Logo positioned at top-left, smaller size (max 60px), typically above Courier area
+    Return the path of the logo-stamped PDF for a Shipdaak document URL
+    
+    Stamped files are content-addressed by document kind, source URL and logo
+    hash, so each document is downloaded and rewritten at most once per logo.
     """
     try:
+        cache_key = hashlib.sha256(f"{kind}:{pdf_url}:{_logo_hash(logo_path)}".encode()).hexdigest()
+        path = os.path.join(_document_cache_dir(), f"{kind}_{cache_key}.pdf")
+        if _touch_cached(path):
+            return path
+        
         # Download original PDF
         response = requests.get(pdf_url, timeout=30)
         response.raise_for_status()
         
-        # Read original PDF
-        original_pdf = PdfReader(io.BytesIO(response.content))
-        pdf_writer = PdfWriter()
-        
-        # Load logo image
-        if not os.path.exists(logo_path):
-            raise FileNotFoundError(f"Logo file not found: {logo_path}")
-        
-        logo_img = Image.open(logo_path)
-        
-        # Process each page
-        for page_num, page in enumerate(original_pdf.pages):
-            # Get page dimensions
-            page_width = float(page.mediabox.width)
-            page_height = float(page.mediabox.height)
-            
-            # Create a new PDF page with logo
-            packet = io.BytesIO()
-            can = canvas.Canvas(packet, pagesize=(page_width, page_height))
-            
-            # Calculate logo size (max 60px width, smaller than label, maintain aspect ratio)
-            logo_width = min(60, page_width * 0.10)
-            logo_aspect = logo_img.height / logo_img.width
-            logo_height = logo_width * logo_aspect
-            
-            # Position logo at top-left (with some margin, above Courier area)
-            # Increased gap from top to position logo lower (more downside)
-            x_position = 45
-            y_position = page_height - logo_height - 60
-            
-            # Draw logo (fully opaque, 100% opacity)
-            can.drawImage(
-                ImageReader(logo_img),
-                x_position,
-                y_position,
-                width=logo_width,
-                height=logo_height,
-                preserveAspectRatio=True,
-                mask='auto'
-            )
-            
-            can.save()
-            
-            # Move to the beginning of the StringIO buffer
-            packet.seek(0)
-            logo_pdf = PdfReader(packet)
-            
-            # Merge logo page with original page
-            page.merge_page(logo_pdf.pages[0])
-            
-            # Add merged page to writer
-            pdf_writer.add_page(page)
-        
-        # Write merged PDF to bytes
-        output = io.BytesIO()
-        pdf_writer.write(output)
-        output.seek(0)
-        
-        return output.getvalue()
+        _write_atomically(path, lambda output: _stamp_pdf(response.content, logo_path, DOCUMENT_LOGO_BOXES[kind], output))
+        return path
         
     except Exception as e:
         raise Exception(f"Error processing PDF: {str(e)}")
 
 
+def _merge_pdfs(paths):
+    """
+    Merge cached PDFs into one cached PDF and return its path
+    Output is written straight to disk rather than built up in memory
+    """
+    cache_key = hashlib.sha256('\n'.join(paths).encode()).hexdigest()
+    path = os.path.join(_document_cache_dir(), f"merged_{cache_key}.pdf")
+    if _touch_cached(path):
+        return path
+    
+    def write(output):
+        pdf_writer = PdfWriter()
+        for source_path in paths:
+            pdf_writer.append(source_path)
+        pdf_writer.write(output)
+    
+    _write_atomically(path, write)
+    return path
+
+
 def download_shipment_label(request, store_id, order_id):
     """Download shipment label PDF with logo"""
     try:
@@ -242,15 +301,18 @@ def download_shipment_label(request, store_id, order_id):
         # Get logo path
         logo_path = os.path.join(settings.STATIC_ROOT, 'logo.png')
         
-        # Add logo to PDF (top-right position)
-        pdf_bytes = _add_logo_to_label_pdf(order.shipdaak_label_url, logo_path)
-        
-        # Create response
-        response = HttpResponse(pdf_bytes, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="label_order_{order.order_number}.pdf"'
+        # Add logo to PDF (top-right position), cached on disk
+        pdf_path = _get_stamped_pdf('label', order.shipdaak_label_url, logo_path)
         
-        return response
+        return FileResponse(
+            open(pdf_path, 'rb'),
+            as_attachment=True,
+            filename=f"label_order_{order.order_number}.pdf",
+            content_type='application/pdf'
+        )
         
+    except Http404:
+        raise
     except Exception as e:
         return HttpResponse(f"Error downloading label: {str(e)}", status=500)
 
@@ -268,14 +330,59 @@ def download_shipment_manifest(request, store_id, order_id):
         # Get logo path
         logo_path = os.path.join(settings.STATIC_ROOT, 'logo.png')
         
-        # Add logo to PDF (top-left position, smaller size)
-        pdf_bytes = _add_logo_to_manifest_pdf(order.shipdaak_manifest_url, logo_path)
-        
-        # Create response
-        response = HttpResponse(pdf_bytes, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="manifest_order_{order.order_number}.pdf"'
+        # Add logo to PDF (top-left position, smaller size), cached on disk
+        pdf_path = _get_stamped_pdf('manifest', order.shipdaak_manifest_url, logo_path)
         
-        return response
+        return FileResponse(
+            open(pdf_path, 'rb'),
+            as_attachment=True,
+            filename=f"manifest_order_{order.order_number}.pdf",
+            content_type='application/pdf'
+        )
         
+    except Http404:
+        raise
     except Exception as e:
         return HttpResponse(f"Error downloading manifest: {str(e)}", status=500)
+
+
+MAX_BULK_LABELS = 25
+
+
+@login_required
+def download_shipment_labels_bulk(request, store_id):
+    """
+    Download labels for many orders of the merchant's own store merged into one PDF
+    Orders are passed as ?orders=1,2,3 (at most MAX_BULK_LABELS)
+    """
+    try:
+        store = get_object_or_404(Store, id=store_id, is_active=True, owner=request.user)
+        
+        order_ids = [
+            int(order_id) for order_id in request.GET.get('orders', '').split(',')
+            if order_id.strip().isdigit()
+        ][:MAX_BULK_LABELS]
+        if not order_ids:
+            return HttpResponse("No orders specified.", status=400)
+        
+        orders = Order.objects.filter(
+            id__in=order_ids, merchant=store
+        ).exclude(shipdaak_label_url__isnull=True).exclude(shipdaak_label_url='').order_by('id')
+        if not orders:
+            return HttpResponse("Labels not available for these orders.", status=404)
+        
+        logo_path = os.path.join(settings.STATIC_ROOT, 'logo.png')
+        label_paths = [_get_stamped_pdf('label', order.shipdaak_label_url, logo_path) for order in orders]
+        pdf_path = label_paths[0] if len(label_paths) == 1 else _merge_pdfs(label_paths)
+        
+        return FileResponse(
+            open(pdf_path, 'rb'),
+            as_attachment=True,
+            filename=f"labels_store_{store.id}.pdf",
+            content_type='application/pdf'
+        )
+        
+    except Http404:
+        raise
+    except Exception as e:
+        return HttpResponse(f"Error downloading labels: {str(e)}", status=500)